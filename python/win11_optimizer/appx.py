@@ -0,0 +1,104 @@
+"""
+AppX package removal for Windows 11 Optimizer.
+
+`Get-AppxPackage *Xbox* | Remove-AppxPackage` enumerates every installed
+package for each pattern. removal_script() builds one script that
+enumerates once, matches all patterns with -like and removes the matches
+in the same pass, timing each removal. Every outcome is printed as an
+"APPX_RESULT {json}" line, so parse_removal_output() can recover the
+per-package results even from a run that failed or timed out part way.
+"""
+import json
+from collections import namedtuple
+
+ENUM_PREFIX = "APPX_ENUM "
+RESULT_PREFIX = "APPX_RESULT "
+
+DEFAULT_TIMEOUT = 900  # seconds for enumeration plus every removal
+
+
+class AppxRemoval(namedtuple("AppxRemoval", "name package pattern ok duration error")):
+    """Outcome of removing one package; duration in seconds"""
+    __slots__ = ()
+
+    def __str__(self):
+        status = "removed" if self.ok else f"FAILED ({self.error})"
+        return f"{self.package} [{self.pattern}] {status} in {self.duration:.2f}s"
+
+
+class AppxReport:
+    """Enumeration count and time plus one AppxRemoval per matched package"""
+
+    def __init__(self, enumerated=None, enumerate_seconds=0.0, removals=None):
+        self.enumerated = enumerated   # None if the enumeration line never arrived
+        self.enumerate_seconds = enumerate_seconds
+        self.removals = removals or []
+
+    @property
+    def failures(self):
+        return [r for r in self.removals if not r.ok]
+
+    def summary(self):
+        if self.enumerated is None:
+            return "Package enumeration did not complete"
+        removed = len(self.removals) - len(self.failures)
+        text = (f"Removed {removed} of {len(self.removals)} matching packages "
+                f"({self.enumerated} enumerated in {self.enumerate_seconds:.1f}s)")
+        if self.failures:
+            text += f"; failed: {', '.join(r.name for r in self.failures)}"
+        return text
+
+
+def ps_quote(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def removal_script(patterns, all_users=False):
+    """One PowerShell script that removes every package whose Name is -like one of patterns"""
+    scope = " -AllUsers" if all_users else ""
+    return "\n".join([
+        f"$patterns = @({', '.join(ps_quote(p) for p in patterns)})",
+        "$watch = [Diagnostics.Stopwatch]::StartNew()",
+        f"$packages = @(Get-AppxPackage{scope})",
+        f"'{ENUM_PREFIX}' + $packages.Count + ' ' + $watch.ElapsedMilliseconds",
+        "foreach ($package in $packages) {",
+        "    $pattern = $patterns | Where-Object { $package.Name -like $_ } | Select-Object -First 1",
+        "    if (-not $pattern) { continue }",
+        "    $watch.Restart()",
+        "    $ok = $true; $message = ''",
+        f"    try {{ Remove-AppxPackage -Package $package.PackageFullName{scope} -ErrorAction Stop }}",
+        "    catch { $ok = $false; $message = $_.Exception.Message }",
+        f"    '{RESULT_PREFIX}' + (@{{name = $package.Name; package = $package.PackageFullName; "
+        "pattern = $pattern; ok = $ok; ms = $watch.ElapsedMilliseconds; error = $message} "
+        "| ConvertTo-Json -Compress)",
+        "}",
+    ])
+
+
+def parse_removal_output(output):
+    """AppxReport from the text printed by removal_script(); other lines are ignored"""
+    report = AppxReport()
+    for line in str(output).splitlines():
+        line = line.strip()
+        if line.startswith(ENUM_PREFIX):
+            count, ms = line[len(ENUM_PREFIX):].split()
+            report.enumerated, report.enumerate_seconds = int(count), int(ms) / 1000.0
+        elif line.startswith(RESULT_PREFIX):
+            try:
+                data = json.loads(line[len(RESULT_PREFIX):])
+            except ValueError:
+                continue
+            report.removals.append(AppxRemoval(data.get("name", ""), data.get("package", ""),
+                                               data.get("pattern", ""), bool(data.get("ok")),
+                                               int(data.get("ms") or 0) / 1000.0,
+                                               (data.get("error") or "").strip()))
+    return report
+
+
+def remove_packages(patterns, run_ps, timeout=DEFAULT_TIMEOUT, all_users=False):
+    """
+    Remove the packages matching patterns in a single PowerShell
+    invocation; returns (AppxReport, raw output of run_ps)
+    """
+    output = run_ps(removal_script(patterns, all_users), timeout=timeout)
+    return parse_removal_output(output), output
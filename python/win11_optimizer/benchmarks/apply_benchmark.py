@@ -0,0 +1,326 @@
+"""
+Apply pipeline benchmark for Windows 11 Optimizer.
+
+Runs what Apply does for each mode (Basic with every tweak ticked,
+Standard, Ultimate and Extreme with every tweak and Basic fix ticked) and
+then Undo Tweaks, through engine.run_tweaks() / engine.undo_tweaks()
+against simulated Windows backends: the in-memory registry, service
+manager and event log store, a fake command launcher and PowerShell host,
+and stand-in handlers for the CallOp tweaks. Each kind of operation waits
+a configurable latency, so the numbers show how the pipeline schedules
+work rather than how fast a particular machine is. Runs on Linux.
+
+    python benchmarks/apply_benchmark.py --runs 5 --output results.json
+    python benchmarks/apply_benchmark.py --baseline results.json --max-regression 15
+    python benchmarks/apply_benchmark.py --registry-ms 1 --command-ms 200 --modes Extreme
+
+Reports per scenario the operation count, median wall time, p50/p99 per
+operation latency, peak traced Python memory and failed operations
+(which should stay 0 against the simulation). With --baseline it
+prints the change against an earlier --output file and exits 1 if any
+scenario's median wall time grew by more than --max-regression percent.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+import engine  # noqa: E402
+from command_pool import CommandPool, FakeLauncher  # noqa: E402
+from eventlog_backend import MemoryEventLogs  # noqa: E402
+from inventory import Inventory  # noqa: E402
+from planner import compile_plan  # noqa: E402
+from registry_backend import MemoryRegistry  # noqa: E402
+from service_backend import RUNNING, MemoryServices  # noqa: E402
+from tweak_catalog import ADVANCED_OPTIONAL, MODES, select_for_mode, tweaks_for_mode  # noqa: E402
+
+RESULT_FORMAT = 1
+
+
+class Simulator:
+    """Per-kind latency (seconds) and the duration of every simulated operation"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.samples = []      # (kind, seconds)
+        self._lock = threading.Lock()
+
+    def wait(self, kind):
+        delay = self.latency.get(kind, 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def add(self, kind, seconds):
+        with self._lock:
+            self.samples.append((kind, seconds))
+
+    def timed(self, kind, fn, *args):
+        started = time.perf_counter()
+        try:
+            self.wait(kind)
+            return fn(*args)
+        finally:
+            self.add(kind, time.perf_counter() - started)
+
+
+class SimRegistry(MemoryRegistry):
+    def __init__(self, sim):
+        super().__init__()
+        self.sim = sim
+
+    def read(self, hive, path, name):
+        return self.sim.timed("registry", super().read, hive, path, name)
+
+    def write(self, hive, path, name, reg_type, data):
+        return self.sim.timed("registry", super().write, hive, path, name, reg_type, data)
+
+    def read_key(self, hive, path):
+        return self.sim.timed("registry", super().read_key, hive, path)
+
+    def delete(self, hive, path, name):
+        return self.sim.timed("registry", super().delete, hive, path, name)
+
+
+class SimServices(MemoryServices):
+    def __init__(self, sim, services, transition):
+        super().__init__(services, transition=transition)
+        self.sim = sim
+
+    def status(self, name):
+        return self.sim.timed("service", super().status, name)
+
+    def start_type(self, name):
+        return self.sim.timed("service", super().start_type, name)
+
+    def set_start_type(self, name, start):
+        return self.sim.timed("service", super().set_start_type, name, start)
+
+    def request_stop(self, name):
+        return self.sim.timed("service", super().request_stop, name)
+
+    def request_start(self, name):
+        return self.sim.timed("service", super().request_start, name)
+
+
+class SimEventLogs(MemoryEventLogs):
+    def __init__(self, sim, channels):
+        super().__init__(channels)
+        self.sim = sim
+
+    def read(self, channel):
+        return self.sim.timed("eventlog", super().read, channel)
+
+    def write(self, channel, changes):
+        return self.sim.timed("eventlog", super().write, channel, changes)
+
+
+class SimPowerShellPool:
+    """Stands in for engine.ps_pool: every script succeeds after the PowerShell latency"""
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def run(self, script, timeout=None):
+        self.sim.wait("powershell")
+        return True, ""
+
+    def close(self):
+        pass
+
+
+def sim_handlers(sim):
+    """Stand-ins for the CallOp handlers (domain trust repair, temp cleanup, AppX removal)"""
+    def handler():
+        sim.timed("handler", lambda: None)
+        return "simulated"
+    return {name: handler for name in engine.TWEAK_HANDLERS}
+
+
+def scenario_tweaks(mode):
+    """Tweak ids the GUI applies for mode with everything ticked"""
+    ids = [t.id for t in tweaks_for_mode(mode)]
+    if mode == "Basic":
+        return select_for_mode(mode, ids)
+    return select_for_mode(mode, ids, ADVANCED_OPTIONAL)
+
+
+def install(sim, tweak_ids, args, backup_dir):
+    """Point the engine at fresh simulated backends holding the services and logs the plan touches"""
+    plan = compile_plan(tweak_ids)
+    engine.configure(backup_dir)
+    engine.last_backup = None
+    engine.applied_tweaks.clear()
+    engine.registry = SimRegistry(sim)
+    engine.inventory = Inventory(engine.registry)
+    engine.services = SimServices(sim, {op.name: (RUNNING, "auto") for op in plan.services.values()},
+                                  args.service_stop_ms / 1000.0)
+    engine.eventlogs = SimEventLogs(sim, {op.channel: (20971520, False, False) for op in plan.eventlogs.values()})
+    engine.ps_pool = SimPowerShellPool(sim)
+    engine.commands = CommandPool(max_parallel=args.max_commands,
+                                  launcher=FakeLauncher(delay=args.command_ms / 1000.0))
+
+    def on_command(record):
+        kind = "powershell" if record.command.startswith("PowerShell: ") else "command"
+        sim.add(kind, record.wall)
+    engine.commands.hooks.append(on_command)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def measure(fn):
+    """Run fn under tracemalloc; returns (result, wall seconds, peak bytes)"""
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - started
+    return result, wall, tracemalloc.get_traced_memory()[1]
+
+
+def run_scenarios(args, latency):
+    """{scenario: [(wall, peak, failures, samples), ...]} for apply and undo of each mode"""
+    runs = {}
+    tracemalloc.start()
+    try:
+        for _ in range(args.runs):
+            for mode in args.modes:
+                tweak_ids = scenario_tweaks(mode)
+                backup_dir = tempfile.mkdtemp(prefix="w11opt_apply_bench_")
+                try:
+                    sim = Simulator(latency)
+                    install(sim, tweak_ids, args, backup_dir)
+                    handlers = sim_handlers(sim)
+                    (_, result), wall, peak = measure(lambda: engine.run_tweaks(tweak_ids, handlers=handlers))
+                    runs.setdefault(f"apply {mode}", []).append((wall, peak, len(result.failures), sim.samples))
+                    sim.samples = []
+                    result, wall, peak = measure(engine.undo_tweaks)
+                    runs.setdefault(f"undo {mode}", []).append((wall, peak, len(result.failures), sim.samples))
+                finally:
+                    engine.oplog.close()
+                    shutil.rmtree(backup_dir, ignore_errors=True)
+    finally:
+        tracemalloc.stop()
+    return runs
+
+
+def summarise(runs):
+    rows = []
+    for scenario, results in runs.items():
+        walls = [wall for wall, _, _, _ in results]
+        samples = [s for _, _, _, run_samples in results for s in run_samples]
+        latencies = [seconds for _, seconds in samples]
+        kinds = {}
+        for kind, _ in samples:
+            kinds[kind] = kinds.get(kind, 0) + 1
+        rows.append({
+            "scenario": scenario,
+            "runs": len(results),
+            "ops": len(samples) // len(results),
+            "ops_by_kind": {kind: count // len(results) for kind, count in sorted(kinds.items())},
+            "wall_median": statistics.median(walls),
+            "wall_min": min(walls),
+            "wall_max": max(walls),
+            "op_p50_ms": percentile(latencies, 50) * 1000,
+            "op_p99_ms": percentile(latencies, 99) * 1000,
+            "peak_memory": max(peak for _, peak, _, _ in results),
+            "failures": max(failures for _, _, failures, _ in results),
+        })
+    return rows
+
+
+def app_version():
+    try:
+        with open(os.path.join(APP_DIR, "win11_optimizer.py"), encoding="utf-8") as f:
+            match = re.search(r'^VERSION = "([^"]+)"', f.read(), re.M)
+        return match.group(1) if match else "unknown"
+    except OSError:
+        return "unknown"
+
+
+def compare(rows, baseline, max_regression):
+    """Print wall time changes against a baseline result; returns True if any exceeds max_regression"""
+    before = {row["scenario"]: row for row in baseline.get("results", [])}
+    regressed = False
+    print(f"\nagainst baseline v{baseline.get('version', '?')}:")
+    for row in rows:
+        old = before.get(row["scenario"])
+        if old is None or not old["wall_median"]:
+            print(f"  {row['scenario']:<18} no baseline")
+            continue
+        change = (row["wall_median"] - old["wall_median"]) / old["wall_median"] * 100
+        flag = ""
+        if max_regression is not None and change > max_regression:
+            regressed, flag = True, "  REGRESSION"
+        print(f"  {row['scenario']:<18}{old['wall_median']:>8.3f}s -> {row['wall_median']:.3f}s ({change:+.1f}%){flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--registry-ms", type=float, default=0.05, help="per registry read/write")
+    parser.add_argument("--service-ms", type=float, default=2.0, help="per service manager call")
+    parser.add_argument("--service-stop-ms", type=float, default=50.0, help="time a service takes to stop")
+    parser.add_argument("--eventlog-ms", type=float, default=5.0, help="per event log channel read/save")
+    parser.add_argument("--command-ms", type=float, default=50.0, help="per external command")
+    parser.add_argument("--powershell-ms", type=float, default=100.0, help="per PowerShell script")
+    parser.add_argument("--handler-ms", type=float, default=500.0, help="per custom handler")
+    parser.add_argument("--max-commands", type=int, default=engine.DEFAULT_MAX_PARALLEL)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--max-regression", type=float, help="fail if a median wall time grows by more percent")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    latency = {"registry": args.registry_ms, "service": args.service_ms, "eventlog": args.eventlog_ms,
+               "powershell": args.powershell_ms, "handler": args.handler_ms}
+    latency = {kind: ms / 1000.0 for kind, ms in latency.items()}
+    rows = summarise(run_scenarios(args, latency))
+    result = {
+        "format": RESULT_FORMAT,
+        "version": app_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency_ms": dict({kind: s * 1000 for kind, s in latency.items()}, command=args.command_ms,
+                           service_stop=args.service_stop_ms),
+        "max_commands": args.max_commands,
+        "results": rows,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"v{result['version']}, {args.runs} runs per scenario, latencies (ms): "
+              + ", ".join(f"{kind} {ms:g}" for kind, ms in result["latency_ms"].items()))
+        print(f"{'scenario':<18}{'ops':>6}{'wall':>10}{'op p50':>10}{'op p99':>10}{'peak mem':>10}{'failed':>8}")
+        for row in rows:
+            print(f"{row['scenario']:<18}{row['ops']:>6}{row['wall_median']:>9.3f}s{row['op_p50_ms']:>8.2f}ms"
+                  f"{row['op_p99_ms']:>8.2f}ms{row['peak_memory'] / 1048576:>8.1f}MB{row['failures']:>8}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            if compare(rows, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
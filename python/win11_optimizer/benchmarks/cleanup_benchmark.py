@@ -0,0 +1,103 @@
+"""
+Temp cleanup benchmark for Windows 11 Optimizer.
+
+Builds a synthetic temp tree (many small files in nested folders), then
+times deleting it with temp_cleanup.clean_tree() - single-threaded and
+on a worker pool - and with the PowerShell pipeline cleanup_temp_files
+used before, when powershell / pwsh is installed. Each method gets a
+freshly built tree of the same shape.
+
+    python benchmarks/cleanup_benchmark.py --files 100000
+    python benchmarks/cleanup_benchmark.py --files 20000 --workers 1 4 8 16
+
+Point --dir at the disk you care about; the default is the system temp
+folder, which on Linux is often tmpfs and flatters every method.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+from temp_cleanup import clean_tree  # noqa: E402
+
+POWERSHELL_CLEANUP = ("Get-ChildItem -Path '{root}' -Recurse -Force | "
+                      "Remove-Item -Force -Recurse -ErrorAction SilentlyContinue")
+
+
+def make_tree(root, files, fanout, size):
+    """files files of size bytes spread over fanout folders, each with a nested sub folder"""
+    payload = b"x" * size
+    for i in range(files):
+        folder = os.path.join(root, f"d{i % fanout:04d}", "sub" if i % 3 == 0 else "")
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(os.path.join(folder, f"f{i:07d}.tmp"), "wb") as f:
+            f.write(payload)
+
+
+def powershell():
+    return shutil.which("powershell") or shutil.which("pwsh")
+
+
+def run_python(root, workers):
+    result = clean_tree([root], workers=workers)
+    return result.files, result.duration
+
+
+def run_powershell(root, files):
+    started = time.perf_counter()
+    subprocess.run([powershell(), "-NoProfile", "-NonInteractive", "-Command",
+                    POWERSHELL_CLEANUP.format(root=root)],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    duration = time.perf_counter() - started
+    remaining = sum(len(names) for _, _, names in os.walk(root))
+    return files - remaining, duration
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--fanout", type=int, default=200, help="top level folders")
+    parser.add_argument("--size", type=int, default=512, help="bytes per file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--dir", help="where to build the trees (default: system temp folder)")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args(argv)
+
+    methods = [(f"python workers={n}", lambda root, n=n: run_python(root, n)) for n in args.workers]
+    if powershell():
+        methods.append(("powershell Remove-Item", lambda root: run_powershell(root, args.files)))
+
+    rows = []
+    for name, method in methods:
+        root = tempfile.mkdtemp(prefix="w11opt_cleanup_", dir=args.dir)
+        try:
+            make_tree(root, args.files, args.fanout, args.size)
+            removed, duration = method(root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        rows.append({"method": name, "files": removed, "seconds": duration,
+                     "files_per_second": removed / duration if duration else 0.0})
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{args.files} files x {args.size} bytes in {args.fanout} folders")
+    print(f"{'method':<26}{'removed':>9}{'seconds':>10}{'files/s':>10}")
+    for row in rows:
+        print(f"{row['method']:<26}{row['files']:>9}{row['seconds']:>9.2f}s{row['files_per_second']:>10.0f}")
+    if not powershell():
+        print("powershell / pwsh not found - PowerShell baseline skipped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
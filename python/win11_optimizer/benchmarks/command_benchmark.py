@@ -0,0 +1,84 @@
+"""
+Command launch benchmark for Windows 11 Optimizer.
+
+Times the per-command latency of starting a short-lived program through
+cmd.exe (shell=True, how every run_cmd call used to start) against
+starting it directly (command_pool.direct_launcher, what run_cmd does
+now for anything without pipes or shell builtins). The command should
+exit at once so the numbers are launch overhead, not work.
+
+    python benchmarks/command_benchmark.py --runs 200
+    python benchmarks/command_benchmark.py --command "ipconfig /flushdns" --runs 50
+
+The default command is `hostname` on Windows and `true` elsewhere.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+from command_pool import direct_launcher, needs_shell, shell_launcher  # noqa: E402
+
+DEFAULT_COMMAND = "hostname" if os.name == "nt" else "true"
+
+
+def time_launches(launcher, command, runs, timeout):
+    """Seconds taken by each of runs launches; raises if the command fails"""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        exit_code, output = launcher(command, timeout)
+        times.append(time.perf_counter() - started)
+        if exit_code != 0:
+            raise RuntimeError(f"{command!r} exited with {exit_code}: {output.strip()[:200]}")
+    return times
+
+
+def describe(times):
+    ordered = sorted(times)
+    return {"runs": len(times), "mean_ms": statistics.mean(times) * 1000,
+            "median_ms": statistics.median(times) * 1000,
+            "p90_ms": ordered[int(0.9 * (len(ordered) - 1))] * 1000, "min_ms": ordered[0] * 1000}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--command", default=DEFAULT_COMMAND, help="command line to launch")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed launches per method first")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args(argv)
+
+    if needs_shell(args.command):
+        print(f"{args.command!r} needs the shell (pipe, redirection or builtin) - pick a plain program")
+        return 2
+
+    rows = []
+    # Interleaved warm-up so neither method gets the cold file cache
+    for name, launcher in (("shell=True", shell_launcher), ("direct", direct_launcher)):
+        time_launches(launcher, args.command, args.warmup, args.timeout)
+    for name, launcher in (("shell=True", shell_launcher), ("direct", direct_launcher)):
+        rows.append(dict(describe(time_launches(launcher, args.command, args.runs, args.timeout)), method=name))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{args.runs} launches of {args.command!r}")
+    print(f"{'method':<12}{'mean':>10}{'median':>10}{'p90':>10}{'min':>10}")
+    for row in rows:
+        print(f"{row['method']:<12}{row['mean_ms']:>8.2f}ms{row['median_ms']:>8.2f}ms"
+              f"{row['p90_ms']:>8.2f}ms{row['min_ms']:>8.2f}ms")
+    saved = rows[0]["median_ms"] - rows[1]["median_ms"]
+    print(f"direct saves {saved:.2f}ms per command (median)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+.reg backup reader benchmark for Windows 11 Optimizer.
+
+Measures reg_backup.RegBackup on a UTF-16 export: building the sidecar
+index (one streaming pass reading only key lines), parsing every value
+(what finding a key by reading the whole file costs) and indexed
+lookups of single keys. With --memory each step is repeated under
+tracemalloc and its peak Python memory reported, to check it does not
+grow with the size of the backup (the traced runs are much slower, so
+they are not the ones timed).
+
+    python benchmarks/reg_backup_benchmark.py --keys 200000 --memory
+    python benchmarks/reg_backup_benchmark.py --file D:\\backups\\registry_backup_20240101_120000.reg
+
+Without --file a backup shaped like `reg export HKCU` output (nested keys,
+strings, DWORDs, wrapped hex values) is generated in a temporary folder.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+from reg_backup import RegBackup  # noqa: E402
+
+def hex_lines(prefix, raw):
+    """Lines of a hex value the way reg export wraps them, at about 80 columns"""
+    octets = [f"{b:02x}" for b in raw]
+    lines, line = [], prefix
+    for i, octet in enumerate(octets):
+        line += octet + ("," if i < len(octets) - 1 else "")
+        if len(line) > 76 and i < len(octets) - 1:
+            lines.append(line + "\\")
+            line = "  "
+    lines.append(line)
+    return lines
+
+
+def generate_backup(path, keys, values_per_key, seed=1):
+    """Write a UTF-16 .reg export with keys sections; returns the key paths written"""
+    rng = random.Random(seed)
+    written = []
+    with open(path, "w", encoding="utf-16", newline="\r\n") as f:
+        f.write("Windows Registry Editor Version 5.00\n\n")
+        stack = ["HKEY_CURRENT_USER"]
+        for index in range(keys):
+            depth = rng.randint(1, 6)
+            stack = stack[:depth] + [f"Key{index} {rng.choice(['Settings', 'Cache', 'Policy', 'Ñame'])}"]
+            key = "\\".join(stack)
+            written.append(key)
+            lines = [f"[{key}]"]
+            for v in range(rng.randint(0, values_per_key * 2)):
+                kind = rng.random()
+                if kind < 0.4:
+                    text = "C:\\\\Program Files\\\\App " * rng.randint(1, 3)
+                    lines.append(f'"Value{v}"="{text}\\"quoted\\""')
+                elif kind < 0.7:
+                    lines.append(f'"Value{v}"=dword:{rng.getrandbits(32):08x}')
+                elif kind < 0.9:
+                    lines += hex_lines(f'"Value{v}"=hex:', rng.randbytes(rng.randint(1, 120)))
+                else:
+                    lines += hex_lines(f'"Value{v}"=hex(7):', "a\0bb\0\0".encode("utf-16-le"))
+            f.write("\n".join(lines) + "\n\n")
+    return written
+
+
+def measure(fn, memory=False):
+    """(result, seconds, peak traced bytes or None) of fn(); the peak comes from a second, traced call"""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    if not memory:
+        return result, elapsed, None
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def format_peak(peak):
+    return "" if peak is None else f"   peak {peak / 1048576:.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", help="existing .reg export to read instead of a generated one")
+    parser.add_argument("--keys", type=int, default=50000, help="key sections to generate")
+    parser.add_argument("--values", type=int, default=4, help="average values per generated key")
+    parser.add_argument("--lookups", type=int, default=500, help="random single-key lookups to time")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="read size")
+    parser.add_argument("--run-size", type=int, default=100000, help="index entries sorted in memory at once")
+    parser.add_argument("--memory", action="store_true", help="also measure peak traced memory (slow)")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args(argv)
+
+    folder = tempfile.mkdtemp(prefix="regbackup_bench_")
+    try:
+        if args.file:
+            path = os.path.join(folder, os.path.basename(args.file))
+            shutil.copyfile(args.file, path)   # The index is written next to the file
+            keys = None
+        else:
+            path = os.path.join(folder, "registry_backup.reg")
+            keys = generate_backup(path, args.keys, args.values)
+        size_mb = os.path.getsize(path) / 1048576
+        backup = RegBackup(path, chunk_size=args.chunk_kb * 1024, run_size=args.run_size)
+
+        sections, index_s, index_peak = measure(backup.build_index, args.memory)
+        values, parse_s, parse_peak = measure(lambda: sum(len(ops) for _, ops in backup.sections()), args.memory)
+        if keys is None:
+            keys = [key for key, _ in backup.sections()]
+        rng = random.Random(2)
+        times = []
+        for key in (rng.choice(keys) for _ in range(args.lookups)):
+            started = time.perf_counter()
+            if backup.read_key(key) is None:
+                raise RuntimeError(f"{key} missing from the index")
+            times.append(time.perf_counter() - started)
+        _, _, lookup_peak = measure(lambda: backup.read_key(keys[-1]), args.memory)
+        ordered = sorted(times)
+        result = {
+            "file_mb": size_mb, "sections": sections, "values": values,
+            "index": {"seconds": index_s, "mb_per_s": size_mb / index_s, "peak_memory": index_peak},
+            "parse": {"seconds": parse_s, "mb_per_s": size_mb / parse_s, "peak_memory": parse_peak},
+            "lookup": {"runs": len(times), "median_ms": statistics.median(times) * 1000,
+                       "p99_ms": ordered[int(0.99 * (len(ordered) - 1))] * 1000, "peak_memory": lookup_peak},
+        }
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"{result['file_mb']:.1f} MB, {sections} key sections, {values} values")
+    for name in ("index", "parse"):
+        row = result[name]
+        print(f"{name:<8}{row['seconds']:>8.2f}s{row['mb_per_s']:>9.1f} MB/s{format_peak(row['peak_memory'])}")
+    lookup = result["lookup"]
+    print(f"lookup  median {lookup['median_ms']:.2f}ms  p99 {lookup['p99_ms']:.2f}ms over {lookup['runs']} keys"
+          f"{format_peak(lookup['peak_memory'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
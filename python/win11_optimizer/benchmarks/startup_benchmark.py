@@ -0,0 +1,82 @@
+"""
+Startup benchmark for Windows 11 Optimizer.
+
+Launches the GUI (the frozen exe from dist/ or the script under Python)
+with W11OPT_STARTUP_TRACE / W11OPT_STARTUP_EXIT set, so it records when
+it finished importing, when the first window was painted and when it
+became interactive (engine loaded, endpoint security check done), then
+closes itself. Times are measured from process launch.
+
+    python benchmarks/startup_benchmark.py --runs 10
+    python benchmarks/startup_benchmark.py --exe "dist/Windows 11 Optimizer v4.7.exe"
+
+Run it on the kind of machine users have (cold HDD VDI) - the first run
+after a reboot is the cold start, the rest are warm.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+MARKS = ("imports", "first_window", "interactive")
+
+
+def launch_once(argv, timeout):
+    """Run the app once and return {mark: seconds since launch}"""
+    fd, trace_path = tempfile.mkstemp(prefix="w11opt_startup_", suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, W11OPT_STARTUP_TRACE=trace_path, W11OPT_STARTUP_EXIT="1")
+    try:
+        launched = time.time()
+        proc = subprocess.run(argv, cwd=APP_DIR, env=env, timeout=timeout,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        exited = time.time()
+        with open(trace_path, encoding="utf-8") as f:
+            content = f.read()
+        if not content:
+            raise RuntimeError(f"No startup trace written (exit {proc.returncode}): {proc.stderr.strip()}")
+        marks = json.loads(content)["marks"]
+    finally:
+        os.remove(trace_path)
+    timings = {name: marks[name] - launched for name in MARKS if name in marks}
+    timings["exit"] = exited - launched
+    return timings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--exe", help="frozen executable to launch (default: run win11_optimizer.py)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", action="store_true", help="print raw per-run timings as JSON")
+    args = parser.parse_args(argv)
+
+    target = [args.exe] if args.exe else [sys.executable, os.path.join(APP_DIR, "win11_optimizer.py")]
+    runs = [launch_once(target, args.timeout) for _ in range(args.runs)]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return 0
+
+    print(f"{' '.join(target)}: {len(runs)} runs")
+    print(f"{'mark':<14}{'first':>9}{'median':>9}{'p90':>9}{'max':>9}")
+    for name in MARKS + ("exit",):
+        values = [run[name] for run in runs if name in run]
+        if values:
+            print(f"{name:<14}{values[0]:>8.3f}s{statistics.median(values):>8.3f}s"
+                  f"{percentile(values, 90):>8.3f}s{max(values):>8.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
 # build.spec
+import os
+
 block_cipher = None
 
+# Onefile re-extracts everything to %TEMP% on every launch, which dominates
+# cold start on slow disks. Set W11OPT_ONEDIR=1 to build a folder instead.
+ONEDIR = os.environ.get("W11OPT_ONEDIR") == "1"
+
 a = Analysis(
     ['win11_optimizer.py'],
     pathex=[],
@@ -22,7 +28,19 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Never imported by the app - keeps the archive small and extraction fast
+    excludes=[
+        'unittest',
+        'doctest',
+        'pydoc',
+        'pdb',
+        'lib2to3',
+        'idlelib',
+        'turtle',
+        'turtledemo',
+        'tkinter.test',
+        'test',
+    ],
     noarchive=False,
 )
 pyz = PYZ(a.pure)
@@ -30,14 +48,15 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
+    *(() if ONEDIR else (a.binaries, a.datas)),
     [],
+    exclude_binaries=ONEDIR,
     name='Windows 11 Optimizer v4.7',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX-packed DLLs are decompressed (and rescanned by AV) on every start
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -48,4 +67,14 @@ exe = EXE(
     entitlements_file=None,
     icon=['optimizer.ico'],
     version='version.rc'
-)
\ No newline at end of file
+)
+
+if ONEDIR:
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='Windows 11 Optimizer v4.7',
+    )
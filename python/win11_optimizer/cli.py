@@ -0,0 +1,320 @@
+"""
+Headless command line for Windows 11 Optimizer.
+
+    python -m win11_optimizer plan   --mode Extreme [--select ID ...] [--all] [--max-cost SECONDS]
+    python -m win11_optimizer apply  --mode Extreme [--select ID ...] [--all] [--all-users]
+    python -m win11_optimizer verify --mode Extreme [--select ID ...] [--all]
+    python -m win11_optimizer undo
+    python -m win11_optimizer monitor --mode Extreme [--select ID ...] [--all] [--duration SECONDS]
+    python -m win11_optimizer bake   --mode Extreme [--select ID ...] [--all] --image D:\\mount
+    python -m win11_optimizer backup-query   FILE.reg KEY [--value NAME] [--recurse]
+    python -m win11_optimizer backup-restore FILE.reg KEY [--recurse]
+
+Shares the tweak engine with the GUI but never imports tkinter, so it
+runs without a display and starts quickly on managed deployments. The
+exit status tells the caller what happened (see EXIT_*).
+"""
+import argparse
+import json
+import sys
+import time
+
+import engine
+from drift_monitor import DEFAULT_COALESCE
+from reg_backup import RegBackup, query_lines, shown_values
+from registry_backend import REG_TYPE_NAMES
+from snapshot import SnapshotError, encode_data
+from tweak_catalog import ADVANCED_OPTIONAL, MODES, command_text, get_tweak, select_for_mode, tweaks_for_mode
+
+EXIT_OK = 0
+EXIT_FAILED = 1        # some operations failed
+EXIT_USAGE = 2         # bad arguments (argparse uses 2 as well)
+EXIT_NONCOMPLIANT = 3  # verify found settings that differ from the plan
+EXIT_BLOCKED = 4       # endpoint security software detected
+EXIT_TOO_COSTLY = 5    # plan --max-cost: the dry run estimate is over budget
+
+
+# -----------------------------
+# SELECTION
+# -----------------------------
+def resolve_selection(mode, select, select_all):
+    """Turn --mode/--select/--all into the tweak ids a GUI run with the same ticks would apply"""
+    mode_ids = [t.id for t in tweaks_for_mode(mode)]
+    for tweak_id in select:
+        get_tweak(tweak_id)
+        if tweak_id not in mode_ids and tweak_id not in ADVANCED_OPTIONAL:
+            raise KeyError(f"Tweak {tweak_id} is not part of {mode} mode")
+    if mode == "Basic":
+        return select_for_mode(mode, mode_ids if select_all else select)
+    selected = mode_ids if select_all else [tid for tid in select if tid in mode_ids]
+    return select_for_mode(mode, selected, [tid for tid in select if tid in ADVANCED_OPTIONAL])
+
+
+def pending_lines(pending):
+    """Settings a pending plan would still change, one line each"""
+    lines = [f"registry  {op}" for op in pending.registry.values()]
+    lines += [f"service   {svc.name}: start={svc.start}" for svc in pending.services.values() if svc.start]
+    lines += [f"eventlog  {log.channel}: " + ", ".join(f"{prop}={getattr(log, prop)}" for prop in log._fields[1:]
+                                                     if getattr(log, prop) is not None)
+              for log in pending.eventlogs.values()]
+    if pending.power:
+        lines.append(f"power     {pending.power[1].scheme}")
+    return lines
+
+
+def emit(args, data, text):
+    """Print data as JSON with --json, otherwise the human readable text"""
+    if args.json:
+        print(json.dumps(data, indent=2, default=str))
+    else:
+        print(text)
+
+
+# -----------------------------
+# COMMANDS
+# -----------------------------
+def cmd_plan(args, tweak_ids):
+    """Dry run: print the current -> target diff with estimated costs, change nothing"""
+    plan, compliance, report = engine.dry_run(tweak_ids)
+    over_budget = args.max_cost is not None and report.total_cost > args.max_cost
+    data = {
+        "tweaks": plan.tweaks,
+        "stats": plan.stats(),
+        "compliance": compliance.summary(),
+        "commands": [command_text(cmd) for _, cmd in plan.commands],
+        **report.as_dict(include_unchanged=args.unchanged),
+    }
+    lines = [f"Tweaks: {', '.join(plan.tweaks)}", ""]
+    lines += report.lines(include_unchanged=args.unchanged)
+    lines += ["", compliance.summary(), report.summary()]
+    if over_budget:
+        data["rejected"] = f"estimated {report.total_cost:.1f}s exceeds --max-cost {args.max_cost:g}s"
+        lines.append(f"REJECTED: {data['rejected']}; most expensive:")
+        lines += [f"  {entry}" for entry in report.expensive(0)[:5]]
+    emit(args, data, "\n".join(lines))
+    return EXIT_TOO_COSTLY if over_budget else EXIT_OK
+
+
+def cmd_apply(args, tweak_ids):
+    if not args.allow_endpoint_security:
+        from endpoint_security import check_endpoint_security
+        products = check_endpoint_security()
+        if products:
+            print("Endpoint security detected, refusing to apply tweaks:", file=sys.stderr)
+            for product in products:
+                print(f"  {product}", file=sys.stderr)
+            return EXIT_BLOCKED
+    if args.restore_point:
+        engine.create_restore_point()
+    try:
+        plan, result = engine.run_tweaks(tweak_ids)
+    except SnapshotError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    failures = list(result.failures)
+    users = None
+    if args.all_users:
+        users = engine.apply_to_all_users(plan)
+        failures += users.failures
+    data = {
+        "tweaks": plan.tweaks,
+        "stats": plan.stats(),
+        "compliance": result.compliance.summary(),
+        "executed": result.executed,
+        "failures": [{"operation": op, "error": error} for op, error in failures],
+        "duration": result.duration,
+        "backup": engine.last_backup,
+    }
+    lines = [result.summary(), result.compliance.summary(), f"Backup: {engine.last_backup}"]
+    if users is not None:
+        data["user_profiles"] = [{"sid": r.profile.sid, "loaded": r.profile.loaded, "changed": len(r.changed),
+                                  "errors": [error for _, error in r.errors]} for r in users.profiles]
+        lines += [users.summary()] + [f"  {r}" for r in users.profiles]
+    lines += [f"FAILED {op}: {error}" for op, error in failures]
+    emit(args, data, "\n".join(lines))
+    return EXIT_FAILED if failures else EXIT_OK
+
+
+def cmd_verify(args, tweak_ids):
+    _, pending, compliance = engine.check_tweaks(tweak_ids)
+    drift = pending_lines(pending)
+    data = {"compliant": not drift, "compliance": compliance.summary(), "pending": drift}
+    emit(args, data, "\n".join([compliance.summary()] + drift))
+    return EXIT_NONCOMPLIANT if drift else EXIT_OK
+
+
+def cmd_undo(args):
+    entries = engine.journal.entries()
+    if not entries:
+        emit(args, {"restored": 0, "failures": []}, "No journaled changes to undo.")
+        return EXIT_OK
+    result = engine.undo_tweaks()
+    data = {
+        "restored": result.restored,
+        "failures": [{"operation": op, "error": error} for op, error in result.failures],
+    }
+    lines = [result.summary()] + [f"FAILED {op}: {error}" for op, error in result.failures]
+    emit(args, data, "\n".join(lines))
+    return EXIT_FAILED if result.failures else EXIT_OK
+
+
+def cmd_monitor(args, tweak_ids):
+    def report(event):
+        emit(args, {"keys": event.keys, "checked": event.checked, "drifted": [str(op) for op in event.drifted],
+                    "failures": [{"operation": str(op), "error": str(error)} for op, error in event.errors]},
+             "\n".join([str(event)] + [f"  restored {op}" for op in event.drifted]))
+        sys.stdout.flush()
+
+    monitor = engine.start_drift_monitor(tweak_ids, coalesce=args.coalesce, on_drift=report)
+    print(f"Watching {len(monitor.keys)} registry keys, {monitor.restored} values restored at start; "
+          f"Ctrl+C to stop", file=sys.stderr)
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(60)  # Ctrl+C interrupts the sleep
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+    return EXIT_OK
+
+
+def cmd_bake(args, tweak_ids):
+    """Write the tweaks into the hives of a mounted image instead of this machine"""
+    try:
+        plan, report = engine.bake_image(tweak_ids, args.image)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    data = {
+        "tweaks": plan.tweaks,
+        "image": args.image,
+        "written": report.written,
+        "unchanged": report.unchanged,
+        "failures": [{"operation": op, "error": error} for op, error in report.failures],
+        "skipped": [{"operation": op, "reason": reason} for op, reason in report.skipped],
+        "duration": report.duration,
+    }
+    lines = [report.summary()]
+    lines += [f"FAILED {op}: {error}" for op, error in report.failures]
+    lines += [f"skipped {op} ({reason})" for op, reason in report.skipped]
+    emit(args, data, "\n".join(lines))
+    return EXIT_FAILED if report.failures else EXIT_OK
+
+
+def cmd_backup_query(args):
+    """Print one key of a .reg backup like `reg query` does, reading only that key"""
+    sections = RegBackup(args.file).values(args.key, args.recurse)
+    if not sections:
+        print(f"error: {args.key} is not in {args.file}", file=sys.stderr)
+        return EXIT_FAILED
+    data = [{"key": key, "values": [{"name": op.name, "type": REG_TYPE_NAMES.get(op.type, op.type),
+                                     "data": encode_data(op.type, op.data)} for op in shown_values(ops, args.value)]}
+            for key, ops in sections]
+    emit(args, data, "\n".join(query_lines(sections, args.value)).rstrip())
+    return EXIT_OK
+
+
+def cmd_backup_restore(args):
+    """Put back the values a .reg backup holds for one key, without importing the whole file"""
+    results = engine.restore_from_backup(args.file, args.key, args.recurse)
+    if not results:
+        print(f"error: no values for {args.key} in {args.file}", file=sys.stderr)
+        return EXIT_FAILED
+    failures = [(str(op), str(error)) for op, error in results if error is not None]
+    data = {"restored": len(results) - len(failures),
+            "failures": [{"operation": op, "error": error} for op, error in failures]}
+    lines = [f"{len(results) - len(failures)} of {len(results)} values restored"]
+    lines += [f"FAILED {op}: {error}" for op, error in failures]
+    emit(args, data, "\n".join(lines))
+    return EXIT_FAILED if failures else EXIT_OK
+
+
+# -----------------------------
+# ENTRY POINT
+# -----------------------------
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--backup-dir", help=f"snapshot, journal and log directory (default {engine.BACKUP_DIR})")
+    common.add_argument("--json", action="store_true", help="print machine readable JSON")
+    common.add_argument("--max-commands", type=int, metavar="N",
+                        help=f"external commands allowed to run at once (default {engine.commands.max_parallel})")
+    parser = argparse.ArgumentParser(prog="win11_optimizer",
+                                     description="Windows 11 Optimizer (headless)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help):
+        return commands.add_parser(name, help=help, parents=[common])
+
+    def add_selection(sub):
+        sub.add_argument("--mode", choices=MODES, required=True)
+        sub.add_argument("--select", nargs="+", action="extend", default=[], metavar="ID",
+                         help="tweak ids to tick (as in the GUI)")
+        sub.add_argument("--all", action="store_true", help="tick every tweak of the mode")
+
+    plan = add_command("plan", "dry run: diff the current state against the tweaks, with cost estimates")
+    add_selection(plan)
+    plan.add_argument("--unchanged", action="store_true", help="also list settings that are already compliant")
+    plan.add_argument("--max-cost", type=float, metavar="SECONDS",
+                      help=f"exit {EXIT_TOO_COSTLY} if the estimated run time of the changes exceeds this")
+    apply = add_command("apply", "apply tweaks")
+    add_selection(apply)
+    apply.add_argument("--restore-point", action="store_true", help="create a system restore point first")
+    apply.add_argument("--allow-endpoint-security", action="store_true",
+                       help="apply even if endpoint security software is installed")
+    apply.add_argument("--all-users", action="store_true",
+                       help="also apply the per-user (HKCU) tweaks to every other user profile")
+    add_selection(add_command("verify", "check the system matches the tweaks"))
+    add_command("undo", "restore everything recorded in the undo journal")
+    monitor = add_command("monitor", "keep the tweaks' registry values in place, rewriting any that get reverted")
+    add_selection(monitor)
+    monitor.add_argument("--coalesce", type=float, default=DEFAULT_COALESCE, metavar="SECONDS",
+                         help="gather changes for this long before checking (default %(default)s)")
+    monitor.add_argument("--duration", type=float, metavar="SECONDS", help="stop after this long (default: Ctrl+C)")
+    bake = add_command("bake", "write the tweaks into the registry hives of a mounted Windows image")
+    add_selection(bake)
+    bake.add_argument("--image", required=True, metavar="DIR", help="root of the mounted image (holds Windows\\)")
+    query = add_command("backup-query", "show one key of a .reg registry backup, like reg query")
+    query.add_argument("file", help="registry_backup_*.reg file")
+    query.add_argument("key", help="key to show, e.g. HKCU\\Control Panel\\Desktop")
+    query.add_argument("--value", metavar="NAME", help="only this value")
+    query.add_argument("--recurse", action="store_true", help="include subkeys")
+    restore = add_command("backup-restore", "restore one key's values from a .reg registry backup")
+    restore.add_argument("file", help="registry_backup_*.reg file")
+    restore.add_argument("key", help="key to restore")
+    restore.add_argument("--recurse", action="store_true", help="include subkeys")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.backup_dir:
+        engine.configure(args.backup_dir)
+    if args.max_commands:
+        engine.commands.max_parallel = args.max_commands
+    if args.command == "undo":
+        return cmd_undo(args)
+    if args.command in ("backup-query", "backup-restore"):
+        handler = {"backup-query": cmd_backup_query, "backup-restore": cmd_backup_restore}[args.command]
+        try:
+            return handler(args)
+        except (OSError, ValueError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_USAGE if isinstance(e, ValueError) else EXIT_FAILED
+    try:
+        tweak_ids = resolve_selection(args.mode, args.select, args.all)
+    except (KeyError, ValueError) as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return EXIT_USAGE
+    if not tweak_ids:
+        print("error: no tweaks selected", file=sys.stderr)
+        return EXIT_USAGE
+    handler = {"plan": cmd_plan, "apply": cmd_apply, "verify": cmd_verify, "monitor": cmd_monitor,
+               "bake": cmd_bake}[args.command]
+    return handler(args, tweak_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
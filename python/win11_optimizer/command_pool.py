@@ -0,0 +1,286 @@
+"""
+Shared command pool for Windows 11 Optimizer.
+
+Every external command (and PowerShell host call) runs in one of a
+bounded number of slots, so the executor, restore point and undo threads
+together never launch more than max_parallel processes at once. Waiting
+callers are admitted by priority class - normal tweak work ahead of
+background maintenance - and first come, first served within a class.
+Interactive commands (diagnostics the user is watching) have their own
+interactive_slots, so they never queue behind tweak work or each other.
+The caller's own thread runs the command; the pool only decides when.
+
+Each command leaves a CommandRecord (queue wait, wall time, exit code,
+output size) in a bounded history and is passed to any registered hooks.
+Processes are started by a launcher callable, so FakeLauncher can stand
+in for subprocess on Linux. The default launcher starts programs directly
+and only goes through cmd.exe for command lines that use pipes,
+redirection or a shell builtin.
+"""
+import contextlib
+import heapq
+import itertools
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+
+from registry_backend import split_command
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_INTERACTIVE_SLOTS = 10   # every domain trust probe at once
+DEFAULT_HISTORY = 1000
+
+SHELL_METACHARACTERS = "|&<>^"
+# cmd.exe internal commands - there is no executable to start for these
+SHELL_BUILTINS = {"assoc", "call", "cd", "chdir", "cls", "copy", "del", "dir", "echo", "erase", "exit", "for",
+                  "ftype", "if", "md", "mkdir", "mklink", "move", "path", "popd", "pushd", "rd", "ren", "rename",
+                  "rmdir", "set", "start", "title", "type", "ver", "vol"}
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+CommandRecord = namedtuple("CommandRecord", "seq command priority queued wall exit_code output_bytes error")
+
+_context = threading.local()
+
+
+@contextlib.contextmanager
+def priority_scope(priority):
+    """Run commands started on this thread at priority while the block runs"""
+    previous = getattr(_context, "priority", None)
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority():
+    priority = getattr(_context, "priority", None)
+    return NORMAL if priority is None else priority
+
+
+def command_label(cmd):
+    """Command line text for an argv list or a command line string"""
+    return cmd if isinstance(cmd, str) else subprocess.list2cmdline(cmd)
+
+
+def needs_shell(cmd):
+    """True if a command line pipes, redirects or runs a cmd.exe builtin, so only the shell can run it"""
+    quoted = False
+    for ch in cmd:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in SHELL_METACHARACTERS:
+            return True
+    words = cmd.split(None, 1)
+    return bool(words) and words[0].lower() in SHELL_BUILTINS
+
+
+def expand_vars(cmd):
+    """Expand %NAME% references the way cmd.exe would; undefined names are left as they are"""
+    return re.sub(r"%([^%\s]+)%", lambda m: os.environ.get(m.group(1), m.group(0)), cmd)
+
+
+def shell_launcher(cmd, timeout):
+    """Run cmd through the shell; returns (exit_code, output). Raises subprocess.TimeoutExpired."""
+    proc = subprocess.run(command_label(cmd), shell=True, text=True, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, timeout=timeout, creationflags=CREATE_NO_WINDOW)
+    return proc.returncode, proc.stdout or ""
+
+
+def direct_launcher(cmd, timeout):
+    """
+    Start the program without a shell; returns (exit_code, output).
+    An argv list is passed as it is. A command line string has its %NAME%
+    references expanded and then, on Windows, goes to CreateProcess
+    unchanged - the program parses its own arguments exactly as it would
+    under cmd.exe - and elsewhere is split into argv. A timeout kills the
+    program itself rather than a cmd.exe parent. Raises
+    subprocess.TimeoutExpired, and FileNotFoundError for a missing program.
+    """
+    if isinstance(cmd, str):
+        cmd = expand_vars(cmd)
+        if os.name != "nt":
+            cmd = split_command(cmd)
+    proc = subprocess.run(cmd, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout,
+                          creationflags=CREATE_NO_WINDOW)
+    return proc.returncode, proc.stdout or ""
+
+
+def subprocess_launcher(cmd, timeout):
+    """Direct launch, falling back to the shell for command lines that need it"""
+    if isinstance(cmd, str) and needs_shell(cmd):
+        return shell_launcher(cmd, timeout)
+    return direct_launcher(cmd, timeout)
+
+
+class CommandPool:
+    """Bounded, prioritised slots for external commands, with per-command telemetry"""
+
+    def __init__(self, max_parallel=DEFAULT_MAX_PARALLEL, launcher=subprocess_launcher, history=DEFAULT_HISTORY,
+                 interactive_slots=DEFAULT_INTERACTIVE_SLOTS):
+        self.launcher = launcher
+        self._max_parallel = max(1, max_parallel)
+        self.interactive_slots = interactive_slots   # 0 queues interactive commands with the rest
+        self._active = 0
+        self._interactive = 0
+        self._waiting = []          # heap of (priority, ticket)
+        self._tickets = itertools.count()
+        self._seq = itertools.count(1)
+        self._cond = threading.Condition()
+        self.records = deque(maxlen=history)
+        self.hooks = []             # callables taking a CommandRecord
+        self.peak = 0               # most commands seen running at once
+
+    @property
+    def max_parallel(self):
+        return self._max_parallel
+
+    @max_parallel.setter
+    def max_parallel(self, value):
+        with self._cond:
+            self._max_parallel = max(1, value)
+            self._cond.notify_all()
+
+    @property
+    def seq(self):
+        """Sequence number of the last recorded command (for stats(since=...))"""
+        return self.records[-1].seq if self.records else 0
+
+    @contextlib.contextmanager
+    def slot(self, priority=None):
+        """Hold one slot while the block runs; yields the seconds spent waiting for it"""
+        priority = current_priority() if priority is None else priority
+        started = time.perf_counter()
+        interactive = priority == INTERACTIVE and self.interactive_slots > 0
+        with self._cond:
+            if interactive:
+                while self._interactive >= self.interactive_slots:
+                    self._cond.wait()
+                self._interactive += 1
+            else:
+                ticket = (priority, next(self._tickets))
+                heapq.heappush(self._waiting, ticket)
+                while self._active >= self._max_parallel or self._waiting[0] != ticket:
+                    self._cond.wait()
+                heapq.heappop(self._waiting)
+                self._active += 1
+                # The next waiter may fit as well
+                self._cond.notify_all()
+            self.peak = max(self.peak, self._active + self._interactive)
+        try:
+            yield time.perf_counter() - started
+        finally:
+            with self._cond:
+                if interactive:
+                    self._interactive -= 1
+                else:
+                    self._active -= 1
+                self._cond.notify_all()
+
+    def call(self, label, fn, priority=None):
+        """
+        Run fn() in a slot and record it under label. fn returns
+        (exit_code, output); its exceptions are recorded and re-raised.
+        """
+        priority = current_priority() if priority is None else priority
+        with self.slot(priority) as queued:
+            started = time.perf_counter()
+            exit_code, output, error = None, None, None
+            try:
+                exit_code, output = fn()
+                return exit_code, output
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                size = len(output.encode("utf-8", errors="replace")) if output else 0
+                self._record(label, priority, queued, time.perf_counter() - started, exit_code, size, error)
+
+    def run(self, cmd, timeout=30, priority=None):
+        """Run a command line or argv list with the launcher; returns (exit_code, output)"""
+        return self.call(command_label(cmd), lambda: self.launcher(cmd, timeout), priority)
+
+    def _record(self, label, priority, queued, wall, exit_code, output_bytes, error):
+        record = CommandRecord(next(self._seq), label, priority, queued, wall, exit_code, output_bytes, error)
+        self.records.append(record)
+        for hook in list(self.hooks):
+            try:
+                hook(record)
+            except Exception:
+                pass  # Telemetry must never break a command
+
+    # -----------------------------
+    # TELEMETRY
+    # -----------------------------
+    def stats(self, since=0):
+        """Aggregates over the recorded commands with seq > since"""
+        records = [r for r in self.records if r.seq > since]
+        by_priority = {}
+        for r in records:
+            name = PRIORITY_NAMES.get(r.priority, str(r.priority))
+            by_priority[name] = by_priority.get(name, 0) + 1
+        return {
+            "commands": len(records),
+            "by_priority": by_priority,
+            "failed": sum(1 for r in records if r.error or r.exit_code),
+            "wall_total": sum(r.wall for r in records),
+            "wall_max": max((r.wall for r in records), default=0.0),
+            "queued_max": max((r.queued for r in records), default=0.0),
+            "output_bytes": sum(r.output_bytes for r in records),
+            "peak_parallel": self.peak,
+        }
+
+    def slowest(self, count=5, since=0):
+        return sorted((r for r in self.records if r.seq > since), key=lambda r: -r.wall)[:count]
+
+    def summary(self, since=0):
+        stats = self.stats(since)
+        if not stats["commands"]:
+            return "No commands run"
+        classes = ", ".join(f"{name} {count}" for name, count in sorted(stats["by_priority"].items()))
+        slowest = self.slowest(1, since)[0]
+        return (f"{stats['commands']} commands ({classes}), {stats['failed']} failed, "
+                f"{stats['wall_total']:.1f}s total, slowest {slowest.wall:.1f}s ({slowest.command[:60]}), "
+                f"max queue wait {stats['queued_max']:.2f}s, peak {stats['peak_parallel']}/{self.max_parallel} "
+                f"in parallel")
+
+
+class FakeLauncher:
+    """
+    Launcher for tests: results maps a command line to (exit_code, output)
+    or to a callable returning that (argv lists are looked up by their
+    command line); unknown commands succeed with no output. Every launch
+    sleeps delay seconds and is remembered in calls.
+    """
+
+    def __init__(self, results=None, delay=0.0):
+        self.results = dict(results or {})
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, cmd, timeout):
+        with self._lock:
+            self.calls.append(cmd)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            if self.delay > timeout:
+                time.sleep(timeout)
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            time.sleep(self.delay)
+            result = self.results.get(command_label(cmd), (0, ""))
+            return result() if callable(result) else result
+        finally:
+            with self._lock:
+                self.running -= 1
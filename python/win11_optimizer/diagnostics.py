@@ -0,0 +1,192 @@
+"""
+Domain trust diagnostics for Windows 11 Optimizer.
+
+Each check is a Probe that runs one or more commands and classifies the
+output as ok / warn / fail. run_probes() starts every probe at once on a
+thread pool under a single deadline, so the slowest probe - not the sum
+of all of them - bounds the report, and every command is given only the
+time left before that deadline. Results are handed to a callback as they
+arrive; the report itself is always assembled in probe order.
+"""
+import datetime
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+OK = "ok"
+WARN = "warn"
+FAIL = "fail"
+
+DEFAULT_DEADLINE = 20.0  # seconds for the whole report
+
+
+class ProbeResult(namedtuple("ProbeResult", "name title status latency output detail")):
+    """Outcome of one probe: status is OK/WARN/FAIL, latency in seconds, output is the raw text"""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"[{self.status.upper()}] {self.title} ({self.latency * 1000:.0f} ms): {self.detail}"
+
+
+class Probe:
+    """A named check: commands to run and a classifier for their combined output"""
+
+    def __init__(self, name, title, commands, classify, powershell=False):
+        self.name = name
+        self.title = title
+        self.commands = commands
+        self.classify = classify
+        self.powershell = powershell
+
+    def run(self, run_cmd, run_ps, end):
+        """Run the commands before end (a time.monotonic() deadline) and return a ProbeResult"""
+        started = time.perf_counter()
+        outputs = []
+        for command in self.commands:
+            remaining = max(1, int(end - time.monotonic()))
+            if self.powershell:
+                outputs.append(run_ps(command, timeout=remaining))
+            else:
+                outputs.append(run_cmd(command, timeout=remaining))
+        output = "\n".join(str(o) for o in outputs)
+        if any(str(o).startswith("Failed") for o in outputs):
+            status, detail = FAIL, first_line(output)
+        else:
+            status, detail = self.classify(output)
+        return ProbeResult(self.name, self.title, status, time.perf_counter() - started, output, detail)
+
+
+def first_line(text):
+    for line in str(text).splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+
+# -----------------------------
+# CLASSIFIERS
+# -----------------------------
+def classify_present(output):
+    return (OK, first_line(output)) if output.strip() else (WARN, "No output")
+
+
+def classify_secure_channel(output):
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    if lines and lines[-1] == "True":
+        return OK, "Secure channel is healthy"
+    if lines and lines[-1] == "False":
+        return FAIL, "Secure channel is broken"
+    return WARN, first_line(output)
+
+
+def classify_netlogon(output):
+    if "RUNNING" in output:
+        return OK, "Netlogon is running"
+    if "STOPPED" in output or "PENDING" in output:
+        return FAIL, "Netlogon is not running"
+    return WARN, first_line(output)
+
+
+def classify_nltest(output):
+    if "NERR_Success" in output or "completed successfully" in output:
+        return OK, first_line(output)
+    return FAIL, first_line(output)
+
+
+def classify_time(output):
+    if "Local CMOS Clock" in output or "Free-running" in output:
+        return WARN, "Time is not synchronised with the domain"
+    for line in output.splitlines():
+        if line.strip().startswith("Source:"):
+            return OK, line.strip()
+    return WARN, first_line(output)
+
+
+def classify_kerberos(output):
+    if "Cached Tickets: (0)" in output:
+        return WARN, "No Kerberos tickets cached"
+    if "Cached Tickets" in output:
+        return OK, first_line(output)
+    return FAIL, first_line(output)
+
+
+def classify_ping(output):
+    if "TTL=" in output:
+        return OK, "Domain answers ping"
+    # ICMP is often filtered, so an unanswered ping is only a warning
+    return WARN, "No reply to ping"
+
+
+DOMAIN_TRUST_PROBES = [
+    Probe("computer", "COMPUTER INFORMATION", ["hostname", "echo %USERDOMAIN%"], classify_present),
+    Probe("secure_channel", "SECURE CHANNEL TEST", ["Test-ComputerSecureChannel -Verbose"],
+          classify_secure_channel, powershell=True),
+    Probe("netlogon", "NETLOGON SERVICE STATUS", ["sc query netlogon"], classify_netlogon),
+    Probe("dsgetdc", "DOMAIN CONNECTIVITY", ["nltest /dsgetdc:%USERDOMAIN%"], classify_nltest),
+    Probe("sc_query", "SECURE CHANNEL DETAILS", ["nltest /sc_query:%USERDOMAIN%"], classify_nltest),
+    Probe("dns", "DNS REGISTRATION", ['ipconfig /all | findstr /i "dns"'], classify_present),
+    Probe("time", "TIME SYNCHRONIZATION", ["w32tm /query /status"], classify_time),
+    Probe("kerberos", "KERBEROS TICKETS", ["klist"], classify_kerberos),
+    Probe("ping", "NETWORK CONNECTIVITY", ["ping -n 2 %USERDOMAIN%"], classify_ping),
+]
+
+
+# -----------------------------
+# RUNNER / REPORT
+# -----------------------------
+def run_probes(probes, run_cmd, run_ps, deadline=DEFAULT_DEADLINE, on_result=None):
+    """
+    Run every probe concurrently; returns ProbeResults in probe order.
+    on_result(index, result) is called from this thread as each finishes.
+    Probes still running at the deadline are reported as failed.
+    """
+    results = [None] * len(probes)
+    end = time.monotonic() + deadline
+    pool = ThreadPoolExecutor(max_workers=max(1, len(probes)), thread_name_prefix="probe")
+    try:
+        pending = {pool.submit(probe.run, run_cmd, run_ps, end): i for i, probe in enumerate(probes)}
+        while pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = ProbeResult(probes[i].name, probes[i].title, FAIL, 0.0, "", f"Probe error: {e}")
+                if on_result:
+                    on_result(i, results[i])
+        for future, i in pending.items():
+            results[i] = ProbeResult(probes[i].name, probes[i].title, FAIL, deadline, "",
+                                     f"No result within {deadline:.0f} seconds")
+            if on_result:
+                on_result(i, results[i])
+    finally:
+        # Abandoned probes finish on their own; their command timeouts bound them
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def format_report(probes, results, timestamp=None):
+    """Text report in probe order; probes without a result yet show as running"""
+    lines = ["=== DOMAIN TRUST STATUS CHECK ===",
+             f"Timestamp: {timestamp or datetime.datetime.now()}"]
+    finished = [r for r in results if r is not None]
+    if finished:
+        counts = {status: sum(1 for r in finished if r.status == status) for status in (OK, WARN, FAIL)}
+        lines.append(f"Summary: {counts[OK]} ok, {counts[WARN]} warnings, {counts[FAIL]} failed"
+                     f" ({len(finished)}/{len(probes)} checks done)")
+    lines.append("")
+    for i, probe in enumerate(probes):
+        result = results[i]
+        if result is None:
+            lines.append(f"{i + 1}. {probe.title}: running...")
+            continue
+        lines.append(f"{i + 1}. {probe.title}: [{result.status.upper()}] {result.detail} "
+                     f"({result.latency * 1000:.0f} ms)")
+        for line in result.output.splitlines():
+            lines.append(f"   {line}")
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,302 @@
+"""
+Registry drift monitor for Windows 11 Optimizer.
+
+Group Policy refreshes and Windows Update put back some of the values
+the tweaks set (automatic updates, telemetry, processor scheduling...).
+Instead of re-running a whole mode, DriftMonitor watches only the keys
+of the applied plan. When a key changes it re-reads that key and rewrites
+just the values that no longer match. Changes that arrive within the
+coalescing window are handled as one burst. Between events the watcher
+thread is blocked in the notifier, so it costs nothing while idle.
+
+RegNotifier waits on RegNotifyChangeKeyValue events. FakeNotifier fires
+changes on demand, for exercising the monitor on Linux.
+
+With a journal, each rewrite is journaled first like any other write,
+so Undo still ends at the values from before the tweaks were applied.
+"""
+import ctypes
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from state_probe import StateProbe
+
+try:
+    import winreg
+    from ctypes import wintypes
+    advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+except (AttributeError, OSError, ImportError, ValueError):  # Not on Windows - only FakeNotifier is usable
+    advapi32 = kernel32 = None
+
+DEFAULT_COALESCE = 2.0   # seconds to gather a burst of changes before checking
+
+
+class DriftEvent(namedtuple("DriftEvent", "keys checked drifted errors duration")):
+    """One check: keys re-read, values compared, RegOps rewritten and (op, error) failures"""
+    __slots__ = ()
+
+    def __str__(self):
+        text = (f"{len(self.drifted)} of {self.checked} values drifted in {len(self.keys)} keys, "
+                f"{len(self.drifted) - len(self.errors)} restored in {self.duration * 1000:.0f}ms")
+        if self.errors:
+            text += "; failed: " + ", ".join(f"{op} ({error})" for op, error in self.errors)
+        return text
+
+
+# -----------------------------
+# NOTIFIERS
+# -----------------------------
+class KeyNotifier:
+    """Interface shared by the registry change notifier and the fake"""
+
+    def watch(self, keys):
+        """Start watching (hive, path) keys"""
+        raise NotImplementedError
+
+    def wait(self, timeout=None):
+        """Block until watched keys change; returns the set of changed (hive, path), empty on timeout or close"""
+        raise NotImplementedError
+
+    def close(self):
+        """Stop watching and wake any waiter"""
+
+
+class QueueNotifier(KeyNotifier):
+    """Changes are delivered through a queue; wait() drains everything already queued"""
+
+    def __init__(self):
+        self._changes = queue.Queue()
+
+    def _deliver(self, key):
+        self._changes.put(key)
+
+    def wait(self, timeout=None):
+        try:
+            first = self._changes.get(timeout=timeout)
+        except queue.Empty:
+            return set()
+        changed = set() if first is None else {first}
+        while True:
+            try:
+                key = self._changes.get_nowait()
+            except queue.Empty:
+                return changed
+            if key is not None:
+                changed.add(key)
+
+    def close(self):
+        self._changes.put(None)
+
+
+class FakeNotifier(QueueNotifier):
+    """Notifier for tests: fire(hive, path) reports a change of a watched key"""
+
+    def __init__(self):
+        super().__init__()
+        self.watched = []
+
+    def watch(self, keys):
+        self.watched.extend(keys)
+
+    def fire(self, hive, path):
+        self._deliver((hive, path))
+
+
+class RegNotifier(QueueNotifier):
+    """
+    RegNotifyChangeKeyValue on every watched key; one waiting thread per
+    63 keys (WaitForMultipleObjects takes 64 handles, one is the stop
+    event). A key that does not exist yet is watched through its nearest
+    existing parent, including subkeys.
+    """
+
+    ROOTS = {"HKCU": "HKEY_CURRENT_USER", "HKLM": "HKEY_LOCAL_MACHINE", "HKU": "HKEY_USERS",
+             "HKCR": "HKEY_CLASSES_ROOT", "HKCC": "HKEY_CURRENT_CONFIG"}
+    REG_NOTIFY_CHANGE_NAME = 0x1
+    REG_NOTIFY_CHANGE_LAST_SET = 0x4
+    REG_NOTIFY_THREAD_AGNOSTIC = 0x10000000   # keep the registration alive after the arming thread exits
+    MAXIMUM_WAIT_OBJECTS = 64
+    INFINITE = 0xFFFFFFFF
+
+    def __init__(self):
+        if advapi32 is None:
+            raise RuntimeError("Registry change notifications are not available on this platform")
+        super().__init__()
+        advapi32.RegNotifyChangeKeyValue.argtypes = [wintypes.HKEY, wintypes.BOOL, wintypes.DWORD,
+                                                     wintypes.HANDLE, wintypes.BOOL]
+        kernel32.CreateEventW.restype = wintypes.HANDLE
+        kernel32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE),
+                                                    wintypes.BOOL, wintypes.DWORD]
+        kernel32.SetEvent.argtypes = [wintypes.HANDLE]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._stop = kernel32.CreateEventW(None, True, False, None)
+        self._watches = []     # [key handle, event, subtree, (hive, path)]
+        self._threads = []
+
+    def _open_nearest(self, hive, path):
+        """(handle, subtree) for the key, or for its nearest existing parent watched with subkeys"""
+        root = getattr(winreg, self.ROOTS[hive])
+        parts = path.split("\\")
+        for depth in range(len(parts), -1, -1):
+            try:
+                handle = winreg.OpenKeyEx(root, "\\".join(parts[:depth]), 0,
+                                          winreg.KEY_NOTIFY | winreg.KEY_WOW64_64KEY)
+                return handle, depth < len(parts)
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"{hive}\\{path}")
+
+    def _arm(self, watch):
+        """
+        Register for the next change of a watch. watch() arms on the
+        caller's thread, which may exit long before the change comes, so
+        the registration must not be tied to it.
+        """
+        handle, event, subtree, _ = watch
+        flags = self.REG_NOTIFY_CHANGE_NAME | self.REG_NOTIFY_CHANGE_LAST_SET | self.REG_NOTIFY_THREAD_AGNOSTIC
+        status = advapi32.RegNotifyChangeKeyValue(handle.handle, subtree, flags, event, True)
+        if status:
+            raise ctypes.WinError(status)
+
+    def watch(self, keys):
+        watches = []
+        for hive, path in keys:
+            handle, subtree = self._open_nearest(hive, path)
+            watch = [handle, kernel32.CreateEventW(None, False, False, None), subtree, (hive, path)]
+            self._arm(watch)
+            watches.append(watch)
+        self._watches.extend(watches)
+        size = self.MAXIMUM_WAIT_OBJECTS - 1
+        for start in range(0, len(watches), size):
+            thread = threading.Thread(target=self._wait_group, args=(watches[start:start + size],),
+                                      name="drift-notify", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _wait_group(self, watches):
+        handles = (wintypes.HANDLE * (len(watches) + 1))(self._stop, *(w[1] for w in watches))
+        while True:
+            index = kernel32.WaitForMultipleObjects(len(handles), handles, False, self.INFINITE)
+            if index == 0 or index >= len(handles):
+                return   # Stop event, or the wait itself failed
+            watch = watches[index - 1]
+            try:
+                self._arm(watch)   # Notifications are one-shot
+            except OSError:
+                pass
+            self._deliver(watch[3])
+
+    def close(self):
+        kernel32.SetEvent(self._stop)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        for handle, event, _, _ in self._watches:
+            handle.Close()
+            kernel32.CloseHandle(event)
+        self._watches, self._threads = [], []
+        super().close()
+
+
+def default_notifier():
+    """Return the registry change notifier on Windows and the fake elsewhere"""
+    if advapi32 is not None:
+        return RegNotifier()
+    return FakeNotifier()
+
+
+# -----------------------------
+# MONITOR
+# -----------------------------
+class DriftMonitor:
+    """
+    Keeps the registry values of ops (RegOps the applied profile owns) in
+    place. registry may be an inventory.Inventory; changed keys are
+    invalidated there before they are re-read. owners maps an op to its
+    tweak id for the journal. on_drift(DriftEvent) is called from the
+    watcher thread for every check that found drift.
+    """
+
+    def __init__(self, ops, registry, notifier, coalesce=DEFAULT_COALESCE, on_drift=None, log=None,
+                 journal=None, owners=None):
+        self.registry = registry
+        self.notifier = notifier
+        self.coalesce = coalesce
+        self.on_drift = on_drift
+        self.log = log or (lambda **fields: None)
+        self.journal = journal
+        self.owners = owners or {}
+        self._by_key = {}          # (hive, path_lower) -> [RegOp]
+        self._paths = {}           # (hive, path_lower) -> (hive, path) as first written
+        for op in ops:
+            key = (op.hive, op.path.lower())
+            self._by_key.setdefault(key, []).append(op)
+            self._paths.setdefault(key, (op.hive, op.path))
+        self._stopping = threading.Event()
+        self._thread = None
+        self.checks = 0
+        self.restored = 0
+
+    @property
+    def keys(self):
+        return list(self._paths.values())
+
+    def start(self):
+        """Watch the keys, rewrite anything that drifted already, then wait for changes"""
+        self.notifier.watch(self.keys)
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self.notifier.close()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            changed = self.notifier.wait()
+            if not changed or self._stopping.is_set():
+                continue
+            # Group Policy writes a key's values one at a time - take the whole burst
+            deadline = time.monotonic() + self.coalesce
+            while not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                changed |= self.notifier.wait(remaining)
+            if not self._stopping.is_set():
+                try:
+                    self.check(changed)
+                except Exception as e:
+                    self.log(op="drift", target="", error=str(e))
+
+    def check(self, keys=None):
+        """Re-read keys (every watched key when None) and rewrite drifted values; returns a DriftEvent"""
+        started = time.perf_counter()
+        keys = self.keys if keys is None else [self._paths[(hive, path.lower())] for hive, path in keys
+                                               if (hive, path.lower()) in self._paths]
+        invalidate = getattr(self.registry, "invalidate", None)
+        if invalidate is not None:
+            for hive, path in keys:
+                invalidate(hive, path)
+        probe = StateProbe(self.registry)
+        ops = [op for hive, path in keys for op in self._by_key[(hive, path.lower())]]
+        drifted = [op for op in ops if not probe.registry_compliant(op)]
+        if drifted and self.journal is not None:
+            self.journal.record_all([(op, self.owners.get(op)) for op in drifted], probe)
+        errors = [(op, error) for op, error in self.registry.apply(drifted) if error is not None]
+        self.registry.close()
+        event = DriftEvent(keys, len(ops), drifted, errors, time.perf_counter() - started)
+        self.checks += 1
+        self.restored += len(drifted) - len(errors)
+        for op in drifted:
+            error = next((e for failed, e in errors if failed is op), None)
+            self.log(op="drift", target=str(op), exit_code=1 if error else 0, error=str(error) if error else None,
+                     tweak=self.owners.get(op))
+        if drifted and self.on_drift is not None:
+            self.on_drift(event)
+        return event
@@ -0,0 +1,212 @@
+"""
+Dry run for Windows 11 Optimizer.
+
+diff_plan() reads the current registry values, service states, event
+log settings and the active power scheme through the backends - nothing
+is written, stopped or launched - and returns one DiffEntry per planned
+operation with the current value, the target value and an estimated cost
+in seconds.
+Commands and handlers cannot be probed, so they are always listed as
+"run" with the cost of the program they launch. The estimates are rough
+per-program figures for a typical desktop and are meant for comparing
+plans and rejecting expensive ones, not for progress bars.
+"""
+from collections import namedtuple
+
+from eventlog_backend import PROPERTIES, changed_properties
+from registry_backend import REG_TYPE_NAMES
+from service_backend import RUNNING, STATE_NAMES
+from tweak_catalog import CmdOp, command_text
+
+# Change markers
+ADD = "+"        # value does not exist yet
+SET = "~"        # value exists and differs
+DELETE = "-"     # value exists and will be removed
+SAME = "="       # already compliant, nothing to do
+RUN = "!"        # command or handler, cannot be probed
+
+# -----------------------------
+# COST MODEL (estimated seconds)
+# -----------------------------
+REGISTRY_COST = 0.001        # one value write through a cached key handle
+SERVICE_CONFIG_COST = 0.02   # ChangeServiceConfig on an open handle
+SERVICE_STOP_COST = 3.0      # stop request plus the wait for STOPPED
+EVENTLOG_COST = 0.05         # one channel config save
+POWER_COST = 0.5             # powercfg /setactive
+DEFAULT_CMD_COST = 0.3       # process launch of a small console tool
+DEFAULT_PS_COST = 0.5        # script on a warm PowerShell host
+DEFAULT_HANDLER_COST = 30.0
+
+# First word of a command line (lower case) -> seconds
+COMMAND_COSTS = {
+    "defrag": 900.0,
+    "cleanmgr": 300.0,
+    "wmic": 1.5,
+    "rundll32.exe": 2.0,
+    "ipconfig": 0.3,
+    "netsh": 0.3,
+    "schtasks": 0.3,
+    "wevtutil": 0.2,
+    "taskkill": 0.2,
+    "cmdkey": 0.1,
+    "klist": 0.1,
+}
+
+# Cmdlet found anywhere in a PowerShell script -> seconds (first match wins)
+POWERSHELL_COSTS = [
+    ("Optimize-Volume", 300.0),
+    ("Remove-AppxPackage", 30.0),
+    ("Get-ChildItem", 60.0),
+    ("Remove-CimInstance", 5.0),
+    ("Clear-EventLog", 1.0),
+    ("Remove-Item", 0.5),
+]
+
+HANDLER_COSTS = {
+    "fix_domain_trust_relationship": 180.0,
+    "cleanup_temp_files": 15.0,
+    "remove_bloat_apps": 20.0,
+}
+
+
+def command_cost(cmd):
+    """Estimated seconds for a CmdOp or PsOp"""
+    if isinstance(cmd, CmdOp):
+        words = cmd.cmd.split(None, 1)
+        return COMMAND_COSTS.get(words[0].lower() if words else "", DEFAULT_CMD_COST)
+    for cmdlet, cost in POWERSHELL_COSTS:
+        if cmdlet.lower() in cmd.script.lower():
+            return cost
+    return DEFAULT_PS_COST
+
+
+def format_value(value):
+    """(type, data) as read from the registry backend -> "REG_DWORD:0" / "(absent)" """
+    if value is None:
+        return "(absent)"
+    return f"{REG_TYPE_NAMES.get(value[0], value[0])}:{value[1]!r}"
+
+
+class DiffEntry(namedtuple("DiffEntry", "change kind target current desired cost tweak")):
+    """One planned operation: change is a marker (ADD/SET/DELETE/SAME/RUN), cost in seconds"""
+    __slots__ = ()
+
+    def __str__(self):
+        if self.change == RUN:
+            return f"{RUN} {self.kind:<8} {self.target}  (~{self.cost:.3g}s)  [{self.tweak}]"
+        return (f"{self.change} {self.kind:<8} {self.target}  {self.current} -> {self.desired}"
+                f"  (~{self.cost:.3g}s)  [{self.tweak}]")
+
+    def as_dict(self):
+        return dict(self._asdict())
+
+
+# -----------------------------
+# DIFF
+# -----------------------------
+def diff_plan(plan, probe, services=None):
+    """
+    Diff every op of plan against the system; returns a DryRunReport.
+    probe is a state_probe.StateProbe; with a services backend the
+    running state of each service is read as well, so stops are costed
+    only for services that are actually running.
+    """
+    entries = []
+    for value_id, op in plan.registry.items():
+        current = probe.registry_value(op)
+        tweak = plan.owners[value_id]
+        target = f"{op.hive}\\{op.path} [{op.name if op.name is not None else '(Default)'}]"
+        if probe.registry_compliant(op):
+            entries.append(DiffEntry(SAME, "registry", target, format_value(current),
+                                     format_value(current), 0.0, tweak))
+        elif op.action == "delete":
+            entries.append(DiffEntry(DELETE, "registry", target, format_value(current), "(absent)",
+                                     REGISTRY_COST, tweak))
+        else:
+            entries.append(DiffEntry(ADD if current is None else SET, "registry", target,
+                                     format_value(current), format_value((op.type, op.data)),
+                                     REGISTRY_COST, tweak))
+
+    for name, svc in plan.services.items():
+        status = services.query(svc.name) if services is not None else None
+        start = probe.service_start(svc.name) or (status.start if status else None)
+        state = STATE_NAMES.get(status.state, "unknown") if status else "unknown"
+        current = f"{state}, start={start or 'unknown'}"
+        desired = f"{'stopped' if svc.stop else state}, start={svc.start or start or 'unknown'}"
+        tweak = plan.service_owners[name]
+        if probe.service_compliant(svc):
+            entries.append(DiffEntry(SAME, "service", svc.name, current, current, 0.0, tweak))
+            continue
+        cost = SERVICE_CONFIG_COST if svc.start else 0.0
+        # Without a services backend the state is unknown; assume the stop has to wait
+        if svc.stop and (status is None or status.state == RUNNING):
+            cost += SERVICE_STOP_COST
+        entries.append(DiffEntry(SET, "service", svc.name, current, desired, cost, tweak))
+
+    for channel, log in plan.eventlogs.items():
+        config = probe.eventlog_config(log.channel)
+        changes = changed_properties(config, log)
+        current = ", ".join(f"{prop}={getattr(config, prop) if config else '?'}" for prop in PROPERTIES
+                            if getattr(log, prop) is not None)
+        desired = ", ".join(f"{prop}={getattr(log, prop)}" for prop in PROPERTIES if getattr(log, prop) is not None)
+        tweak = plan.eventlog_owners[channel]
+        if config is not None and not changes:
+            entries.append(DiffEntry(SAME, "eventlog", log.channel, current, current, 0.0, tweak))
+        else:
+            entries.append(DiffEntry(SET, "eventlog", log.channel, current, desired, EVENTLOG_COST, tweak))
+
+    if plan.power:
+        tweak, power_op = plan.power
+        current = probe.active_power_scheme() or "unknown"
+        if probe.power_compliant(power_op):
+            entries.append(DiffEntry(SAME, "power", "active scheme", current, current, 0.0, tweak))
+        else:
+            entries.append(DiffEntry(SET, "power", "active scheme", current, power_op.scheme.lower(),
+                                     POWER_COST, tweak))
+
+    for tweak, cmd in plan.commands:
+        kind = "command" if isinstance(cmd, CmdOp) else "ps"
+        entries.append(DiffEntry(RUN, kind, command_text(cmd), "", "", command_cost(cmd), tweak))
+
+    for tweak, call in plan.calls:
+        entries.append(DiffEntry(RUN, "handler", call.handler, "", "",
+                                 HANDLER_COSTS.get(call.handler, DEFAULT_HANDLER_COST), tweak))
+
+    return DryRunReport(entries)
+
+
+class DryRunReport:
+    """The entries of one dry run plus totals over the ones that would do work"""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @property
+    def changes(self):
+        """Entries that would change something or run a program"""
+        return [e for e in self.entries if e.change != SAME]
+
+    @property
+    def total_cost(self):
+        """Estimated seconds if every change ran one after another"""
+        return sum(e.cost for e in self.changes)
+
+    def expensive(self, threshold):
+        """Changes estimated to take longer than threshold seconds, most expensive first"""
+        return sorted((e for e in self.changes if e.cost > threshold), key=lambda e: -e.cost)
+
+    def summary(self):
+        unchanged = len(self.entries) - len(self.changes)
+        return (f"{len(self.changes)} of {len(self.entries)} operations would change the system "
+                f"({unchanged} already compliant), estimated {self.total_cost:.1f}s")
+
+    def lines(self, include_unchanged=False):
+        """The diff, one line per entry"""
+        return [str(e) for e in self.entries if include_unchanged or e.change != SAME]
+
+    def as_dict(self, include_unchanged=False):
+        return {
+            "summary": self.summary(),
+            "estimated_seconds": round(self.total_cost, 3),
+            "diff": [e.as_dict() for e in self.entries if include_unchanged or e.change != SAME],
+        }
@@ -0,0 +1,111 @@
+"""
+Endpoint security detection for Windows 11 Optimizer.
+
+Third-party endpoint protection tends to raise "Anti Theft" alerts when
+the optimizer changes services and policies, so both front ends refuse to
+run while one is installed. Detection looks at installed programs,
+running processes and services.
+"""
+import subprocess
+
+try:
+    import winreg
+except ImportError:  # Not on Windows - only the process check can run
+    winreg = None
+
+
+def check_endpoint_security():
+    """Check for installed endpoint security software (excluding Microsoft Defender)"""
+    security_products = []
+    
+    # Common endpoint security product names and services
+    security_indicators = [
+        # Sophos
+        ("Sophos", ["Sophos", "Sophos Endpoint", "Sophos Anti-Virus", "Sophos Endpoint Defense"]),
+        ("McAfee", ["McAfee", "VirusScan", "Endpoint Security", "McAfee Agent"]),
+        ("Norton", ["Norton", "Symantec", "Norton Security", "Symantec Endpoint"]),
+        ("Kaspersky", ["Kaspersky", "Kaspersky Endpoint", "Kaspersky Security"]),
+        ("Trend Micro", ["Trend Micro", "OfficeScan", "Trend Micro Apex One"]),
+        ("ESET", ["ESET", "ESET Endpoint", "ESET Security"]),
+        ("CrowdStrike", ["CrowdStrike", "Falcon"]),
+        ("SentinelOne", ["SentinelOne", "Sentinel Agent"]),
+        ("Carbon Black", ["Carbon Black", "CB Defense", "VMware Carbon Black"]),
+        ("Bitdefender", ["Bitdefender", "Bitdefender Endpoint", "Bitdefender GravityZone"]),
+        ("Avast", ["Avast", "Avast Business", "AVG Business"]),
+        ("AVG", ["AVG", "AVG Business"]),
+        ("Webroot", ["Webroot", "Webroot SecureAnywhere"]),
+        ("Malwarebytes", ["Malwarebytes", "Malwarebytes Endpoint"]),
+        ("Cylance", ["Cylance", "CylancePROTECT"]),
+        ("FireEye", ["FireEye", "FireEye Endpoint", "FireEye HX"]),
+        ("Check Point", ["Check Point", "ZoneAlarm", "Endpoint Security"]),
+        ("Panda", ["Panda", "Panda Security"]),
+        ("Comodo", ["Comodo", "Comodo Security"]),
+    ]
+    
+    # Check installed programs from registry
+    try:
+        # Check in registry
+        reg_paths = [
+            r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+            r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+        ]
+        
+        for reg_path in reg_paths:
+            try:
+                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
+                for i in range(0, winreg.QueryInfoKey(key)[0]):
+                    try:
+                        subkey_name = winreg.EnumKey(key, i)
+                        subkey = winreg.OpenKey(key, subkey_name)
+                        try:
+                            display_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
+                            for product_name, keywords in security_indicators:
+                                if any(keyword.lower() in display_name.lower() for keyword in keywords):
+                                    if not any(product_name in p for p in security_products):
+                                        security_products.append(f"{product_name}: {display_name}")
+                        except:
+                            pass
+                        winreg.CloseKey(subkey)
+                    except:
+                        continue
+                winreg.CloseKey(key)
+            except:
+                continue
+    except Exception as e:
+        print(f"Registry check error: {e}")
+    
+    # Check running processes (psutil is loaded here, not at startup)
+    try:
+        import psutil
+        for proc in psutil.process_iter(['name']):
+            try:
+                proc_name = proc.info['name'].lower()
+                for product_name, keywords in security_indicators:
+                    if any(keyword.lower() in proc_name for keyword in keywords):
+                        if not any(product_name in p for p in security_products):
+                            security_products.append(f"{product_name}: {proc_name} (running process)")
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+    except Exception as e:
+        print(f"Process check error: {e}")
+    
+    # Check installed services
+    try:
+        output = subprocess.check_output(['sc', 'query'], text=True, stderr=subprocess.STDOUT)
+        for line in output.split('\n'):
+            for product_name, keywords in security_indicators:
+                if any(keyword.lower() in line.lower() for keyword in keywords):
+                    if not any(product_name in p for p in security_products):
+                        security_products.append(f"{product_name}: Service detected")
+    except Exception as e:
+        print(f"Service check error: {e}")
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_products = []
+    for product in security_products:
+        if product not in seen:
+            seen.add(product)
+            unique_products.append(product)
+    
+    return unique_products
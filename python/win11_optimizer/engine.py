@@ -0,0 +1,561 @@
+"""
+Tweak engine for Windows 11 Optimizer.
+
+Everything needed to plan, apply, verify and undo tweaks without a GUI:
+command, PowerShell and registry runners that log to the operation log,
+the snapshot / journal bookkeeping and run_tweaks(). The Tk front end and
+the headless CLI both drive this module; it never imports tkinter.
+"""
+import datetime
+import os
+import subprocess
+import tempfile
+import time
+
+from appx import remove_packages
+from command_pool import BACKGROUND, DEFAULT_MAX_PARALLEL, CommandPool, command_label
+from drift_monitor import DEFAULT_COALESCE, DriftMonitor, default_notifier
+from dry_run import diff_plan
+from eventlog_backend import default_eventlog_backend
+from executor import execute_plan
+from inventory import Inventory, catalog_keys, plan_keys
+from offline_image import OfflineImage, bake_plan
+from oplog import OperationLog
+from planner import compile_plan
+from progress import DONE, FAIL, OK
+from ps_host import HostTimeout, PowerShellPool
+from reg_backup import RegBackup
+from registry_backend import default_backend, parse_reg_command
+from service_backend import STATE_NAMES, default_service_backend
+from snapshot import SnapshotError, save_snapshot, take_snapshot
+from state_probe import POWER_SCHEMES_KEY, SERVICES_KEY, StateProbe, prune_compliant
+from temp_cleanup import clean_tree, format_bytes
+from tweak_catalog import BLOAT_APP_PATTERNS, ServiceOp
+from undo_journal import UndoJournal, undo
+from user_hives import apply_to_profiles, default_hive_loader, user_ops
+
+BACKUP_DIR = r"C:\\Win11_Optimizer_Backup"
+last_backup = None
+journal = UndoJournal(os.path.join(BACKUP_DIR, "undo_journal.jsonl"))  # Prior values for Undo Tweaks
+oplog = OperationLog(os.path.join(BACKUP_DIR, "operations.jsonl"))  # Rotating structured log behind Export Report
+applied_tweaks = []  # Track all applied tweaks for restoration
+registry = default_backend()  # Native winreg writer with cached key handles
+inventory = Inventory(registry)  # Whole-key index every probe reads from and every registry write goes through
+services = default_service_backend()  # One SCM handle for every service change
+eventlogs = default_eventlog_backend()  # Channel settings read once, saved once per log
+ps_pool = PowerShellPool(size=2)  # Long-lived PowerShell hosts, started on first use
+# Every command and PowerShell call takes a slot here; W11OPT_MAX_COMMANDS overrides the limit
+commands = CommandPool(max_parallel=int(os.environ.get("W11OPT_MAX_COMMANDS", DEFAULT_MAX_PARALLEL)))
+
+
+def configure(backup_dir):
+    """Keep snapshots, the undo journal and the operation log under backup_dir"""
+    global BACKUP_DIR, journal, oplog
+    oplog.close()
+    BACKUP_DIR = backup_dir
+    journal = UndoJournal(os.path.join(backup_dir, "undo_journal.jsonl"))
+    oplog = OperationLog(os.path.join(backup_dir, "operations.jsonl"))
+
+# -----------------------------
+# HELPER FUNCTIONS
+# -----------------------------
+def run_cmd(cmd, timeout=30, priority=None):
+    """Execute a command line or argv list in a command pool slot and log results safely"""
+    # reg add / reg delete of a single value is done in-process - no reg.exe spawn
+    reg_op = parse_reg_command(cmd) if isinstance(cmd, str) else None
+    if reg_op is not None:
+        return run_reg(cmd, reg_op)
+    cmd_text = command_label(cmd)
+    started = time.perf_counter()
+    try:
+        exit_code, output = commands.run(cmd, timeout=timeout, priority=priority)
+        output = output.strip()
+        if exit_code != 0:
+            raise subprocess.CalledProcessError(exit_code, cmd_text, output)
+        oplog.record("command", cmd_text, output=output, exit_code=0, duration=time.perf_counter() - started)
+        return output
+    except subprocess.TimeoutExpired:
+        oplog.record("command", cmd_text, error=f"Timeout after {timeout} seconds", duration=time.perf_counter() - started)
+        return "Failed: Timeout"
+    except subprocess.CalledProcessError as e:
+        oplog.record("command", cmd_text, output=(e.output or "").strip(), error=str(e), exit_code=e.returncode,
+                     duration=time.perf_counter() - started)
+        return f"Failed: {e}"
+    except Exception as e:
+        oplog.record("command", cmd_text, error=str(e), duration=time.perf_counter() - started)
+        return f"Failed: {e}"
+
+def run_ps(script, timeout=30, priority=None):
+    """Run a PowerShell script in the shared persistent host and log results safely"""
+    label = script.strip()
+    started = time.perf_counter()
+    
+    def run_in_host():
+        succeeded, output = ps_pool.run(script, timeout=timeout)
+        return (0 if succeeded else 1), output
+    
+    try:
+        exit_code, output = commands.call(f"PowerShell: {label}", run_in_host, priority)
+    except HostTimeout:
+        oplog.record("powershell", label, error=f"Timeout after {timeout} seconds",
+                     duration=time.perf_counter() - started)
+        return "Failed: Timeout"
+    except Exception as e:
+        oplog.record("powershell", label, error=str(e), duration=time.perf_counter() - started)
+        return f"Failed: {e}"
+    if exit_code != 0:
+        oplog.record("powershell", label, error=output, exit_code=1, duration=time.perf_counter() - started)
+        return f"Failed: {output}"
+    oplog.record("powershell", label, output=output, exit_code=0, duration=time.perf_counter() - started)
+    return output
+
+def run_reg(cmd, reg_op):
+    """Apply a parsed reg add/delete through the native registry backend"""
+    started = time.perf_counter()
+    try:
+        journal.record(reg_op, StateProbe(inventory, eventlogs))
+        inventory.apply_op(reg_op)
+        output = "The operation completed successfully."
+        oplog.record("registry", str(reg_op), output=output, exit_code=0, duration=time.perf_counter() - started)
+        return output
+    except Exception as e:
+        oplog.record("registry", str(reg_op), error=str(e), exit_code=1, duration=time.perf_counter() - started)
+        return f"Failed: {e}"
+
+def stop_services(names, dependents=False):
+    """Stop services through the SCM and wait for them; returns "Failed: ..." if any are still running"""
+    started = time.perf_counter()
+    still_running = services.stop(names, dependents=dependents)
+    for name in names:
+        state = services.query(name)
+        oplog.record("service_stop", name, output=STATE_NAMES.get(state.state) if state else "not installed",
+                     error="did not stop" if name in still_running else None,
+                     duration=time.perf_counter() - started)
+    return f"Failed: {', '.join(still_running)} did not stop" if still_running else "Stopped"
+
+def start_services(names):
+    """Start services in order through the SCM, waiting for each; returns "Failed: ..." if any did not start"""
+    failed = []
+    for name in names:
+        started = time.perf_counter()
+        if services.start([name]):
+            failed.append(name)
+            oplog.record("service_start", name, error="did not start", duration=time.perf_counter() - started)
+        else:
+            oplog.record("service_start", name, output="running", duration=time.perf_counter() - started)
+    return f"Failed: {', '.join(failed)} did not start" if failed else "Started"
+
+def set_service_start(name, start):
+    """Journal and change a service start type through the SCM"""
+    op = ServiceOp(name, start, False)
+    try:
+        journal.record(op, StateProbe(inventory, eventlogs, services))
+        services.set_start_type(name, start)
+        inventory.invalidate("HKLM", f"{SERVICES_KEY}\\{name}")
+        oplog.record("service", name, output=f"start={start}", exit_code=0)
+        return f"start={start}"
+    except Exception as e:
+        oplog.record("service", name, error=str(e), exit_code=1)
+        return f"Failed: {e}"
+
+def backup_registry(plan, path=None):
+    """
+    Snapshot exactly the values, services and power scheme the plan will
+    change; returns its path or raises SnapshotError
+    """
+    global last_backup
+    last_backup = None  # Never report an earlier run's snapshot as this one's
+    path = path or BACKUP_DIR
+    try:
+        snapshot = take_snapshot(plan, StateProbe(inventory, eventlogs))
+        last_backup = save_snapshot(snapshot, path)
+    except Exception as e:
+        oplog.record("snapshot", path, error=str(e))
+        raise SnapshotError(f"Snapshot of the settings to change failed, nothing was changed: {e}") from e
+    oplog.record("snapshot", last_backup, values=len(snapshot["registry"]), services=len(snapshot["services"]))
+    return last_backup
+
+def create_restore_point():
+    """Create a system restore point; returns the PowerShell output or "Failed: ..." """
+    return run_ps('Checkpoint-Computer -Description "Win11Optimizer Backup" -RestorePointType "MODIFY_SETTINGS"',
+                  timeout=300, priority=BACKGROUND)
+
+# -----------------------------
+# DOMAIN TRUST REPAIR
+# -----------------------------
+def repair_domain_trust(progress=None):
+    """
+    Permanently fix 'domain is broken or trust relationship issue' error;
+    returns the repair log path. Each stage is reported to progress (a
+    ProgressChannel) when one is given.
+    """
+    result_log = []
+    
+    def section(title):
+        result_log.append(f"\n=== {title} ===")
+        if progress is not None:
+            progress.step(f"trust:{title.lower()}", f"Domain trust: {title.capitalize()}")
+    
+    # 1. FIRST CHECK CURRENT STATUS
+    result_log.append("=== DOMAIN TRUST REPAIR STARTED ===")
+    if progress is not None:
+        progress.step("trust:check", "Domain trust: Checking current status")
+    result_log.append(f"Timestamp: {datetime.datetime.now()}")
+    
+    # Get current domain
+    current_domain = os.environ.get("USERDOMAIN", "")
+    if not current_domain:
+        current_domain = "openaccess.bpo"  # Default fallback
+    
+    # Check current domain status
+    status1 = run_cmd(["netdom", "verify", f"/d:{current_domain}"])
+    result_log.append(f"Initial domain status: {status1}")
+    
+    # 2. STOP CRITICAL SERVICES TEMPORARILY
+    section("STOPPING SERVICES")
+    stop_services(['netlogon'], dependents=True)
+    stop_services(['kdc', 'dns', 'w32time'])
+    
+    # 3. COMPLETELY CLEAR AUTHENTICATION CACHE
+    section("CLEARING AUTHENTICATION CACHE")
+    run_cmd('klist purge -li 0x3e7')
+    run_cmd('klist purge -li 0x0')
+    run_cmd('klist purge')
+    
+    # Clear credential manager
+    run_cmd('cmdkey /delete:TERMSRV/*')
+    run_cmd(["cmdkey", f"/delete:{current_domain}"])
+    run_cmd('cmdkey /list | findstr /i "domain" | for /f "tokens=1,2 delims= " %a in (''more'') do cmdkey /delete:%b')
+    
+    # 4. FORCE COMPUTER ACCOUNT PASSWORD RESET (MULTIPLE METHODS)
+    section("RESETTING COMPUTER ACCOUNT PASSWORD")
+    
+    # Method 1: Using netdom (most reliable)
+    run_cmd(["netdom", "resetpwd", f"/s:{current_domain}", f"/ud:{current_domain}\\administrator", "/pd:*"])
+    
+    # Method 2: PowerShell method
+    ps_command = f'''
+    $domain = "{current_domain}"
+    $computer = $env:COMPUTERNAME
+    try {{
+        Reset-ComputerMachinePassword -Server $domain -ErrorAction Stop
+        Write-Output "Password reset successful for $computer in domain $domain"
+    }} catch {{
+        Write-Output "Failed to reset password: $_"
+        # Try alternative method
+        nltest /sc_reset:$domain
+    }}
+    '''
+    run_ps(ps_command)
+    
+    # Method 3: Direct registry method
+    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "MachinePassword" /f')
+    
+    # 5. REBUILD SECURE CHANNEL FROM SCRATCH
+    section("REBUILDING SECURE CHANNEL")
+    
+    # Reset secure channel completely
+    run_cmd(["nltest", f"/sc_reset:{current_domain}"])
+    run_cmd(["nltest", f"/sc_verify:{current_domain}"])
+    run_cmd(["nltest", f"/dsgetdc:{current_domain}"])
+    
+    # Force re-discovery of domain controller
+    run_cmd(["nltest", f"/dsgetdc:{current_domain}", "/force"])
+    
+    # 6. FIX DNS REGISTRATION (CRITICAL)
+    section("FIXING DNS REGISTRATION")
+    
+    # Clear ALL DNS caches
+    run_cmd('ipconfig /flushdns')
+    run_cmd('ipconfig /registerdns')
+    run_cmd('ipconfig /release')
+    run_cmd('ipconfig /renew')
+    run_cmd('ipconfig /registerdns')
+    
+    # Force DNS registration
+    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Tcpip\\Parameters" /v "DisableDynamicUpdate" /t REG_DWORD /d 0 /f')
+    
+    # 7. FIX TIME SYNCHRONIZATION (ESSENTIAL FOR KERBEROS)
+    section("FIXING TIME SYNCHRONIZATION")
+    
+    # Configure time service for domain
+    run_cmd('w32tm /config /syncfromflags:domhier /update')
+    run_cmd('w32tm /resync /force')
+    run_cmd('w32tm /query /status')
+    
+    # Set time service to auto
+    set_service_start('w32time', 'auto')
+    start_services(['w32time'])
+    
+    # 8. FIX NETLOGON SERVICE SETTINGS
+    section("CONFIGURING NETLOGON SERVICE")
+    
+    # Reset Netlogon service to defaults and reconfigure
+    set_service_start('netlogon', 'auto')
+    run_cmd('sc failure netlogon reset= 86400 actions= restart/5000/restart/10000/restart/30000')
+    
+    # Configure Netlogon for better domain communication
+    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "ScavengeInterval" /t REG_DWORD /d 172800 /f')
+    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "MaximumPasswordAge" /t REG_DWORD /d 42 /f')
+    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SecureChannelIdleTimeout" /t REG_DWORD /d 1209600 /f')  # 14 days
+    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SecureChannelTimeout" /t REG_DWORD /d 7200 /f')  # 2 hours
+    
+    # 9. FIX GROUP POLICY PROCESSING
+    section("FIXING GROUP POLICY")
+    
+    # Clear Group Policy cache
+    run_cmd('rd /s /q "%WinDir%\\System32\\GroupPolicyUsers"')
+    run_cmd('rd /s /q "%WinDir%\\System32\\GroupPolicy"')
+    
+    # Force Group Policy update
+    run_cmd('gpupdate /force')
+    
+    # 10. RESTART SERVICES IN CORRECT ORDER
+    section("RESTARTING SERVICES")
+    
+    start_services(['w32time', 'dns', 'netlogon', 'kdc'])
+    
+    # 11. VERIFY REPAIR
+    section("VERIFYING REPAIR")
+    
+    # Test secure channel
+    verify1 = run_cmd(["nltest", f"/sc_query:{current_domain}"])
+    result_log.append(f"Secure channel query: {verify1}")
+    
+    # Test domain trust
+    verify2 = run_cmd(["netdom", "verify", f"/d:{current_domain}"])
+    result_log.append(f"Domain verification: {verify2}")
+    
+    # Test computer secure channel
+    verify3 = run_ps('Test-ComputerSecureChannel -Verbose')
+    result_log.append(f"Test-ComputerSecureChannel: {verify3}")
+    
+    # 12. CREATE REPAIR LOG
+    result_log.append("\n=== REPAIR COMPLETE ===")
+    result_log.append(f"Timestamp: {datetime.datetime.now()}")
+    
+    # Save detailed log
+    log_path = r"C:\Windows\DomainTrustRepair.log"
+    try:
+        with open(log_path, 'w') as f:
+            f.write('\n'.join(result_log))
+    except:
+        log_path = r"C:\DomainTrustRepair.log"
+        with open(log_path, 'w') as f:
+            f.write('\n'.join(result_log))
+    
+    # 13. FINAL CLEANUP AND REBOOT RECOMMENDATION
+    section("FINAL CLEANUP")
+    run_cmd('gpupdate /force')
+    run_cmd('ipconfig /flushdns')
+    if progress is not None:
+        progress.finish("trust:final cleanup", detail=f"Log saved to {log_path}")
+    
+    return log_path
+
+def fix_domain_trust_relationship():
+    """Headless handler for the fix_domain_trust_relationship tweak"""
+    log_path = repair_domain_trust()
+    return (f"Domain trust repair completed. REBOOT REQUIRED for changes to take full effect. "
+            f"Log saved to: {log_path}")
+
+def cleanup_temp_files(progress=None):
+    """Handler for cleanup_temp_files: delete the user's temp files on a worker pool"""
+    root = os.environ.get("TEMP") or tempfile.gettempdir()
+    label = "Deleting temporary files"
+    
+    def report(files, size):
+        progress.publish("cleanup:temp", label, detail=f"{files} files, {format_bytes(size)}")
+    
+    if progress is not None:
+        progress.step("cleanup:temp", label, detail=root)
+    result = clean_tree([root], progress=report if progress is not None else None)
+    oplog.record("cleanup", root, duration=result.duration, files=result.files, bytes=result.bytes,
+                 dirs=result.dirs, locked=result.locked, errors=result.errors,
+                 output="\n".join(f"{path}: {error}" for path, error in result.error_samples))
+    if progress is not None:
+        progress.finish("cleanup:temp", detail=result.summary())
+    return result.summary()
+
+def remove_bloat_apps(progress=None):
+    """Handler for remove_bloat_apps: one enumeration, every pattern, per-package results"""
+    if progress is not None:
+        progress.step("appx:remove", f"Removing apps matching {', '.join(BLOAT_APP_PATTERNS)}")
+    report, output = remove_packages(BLOAT_APP_PATTERNS, run_ps)
+    for removal in report.removals:
+        oplog.record("appx", removal.package, duration=removal.duration, exit_code=0 if removal.ok else 1,
+                     error=removal.error or None, pattern=removal.pattern)
+        if progress is not None:
+            progress.publish(f"appx:{removal.package}", removal.name, OK if removal.ok else FAIL,
+                             detail=removal.error or removal.pattern, elapsed=removal.duration)
+    summary = report.summary()
+    if progress is not None:
+        progress.finish("appx:remove", FAIL if report.failures or report.enumerated is None else DONE,
+                        detail=summary)
+    if report.enumerated is None:
+        return output if str(output).startswith("Failed") else f"Failed: {summary}"
+    return f"Failed: {summary}" if report.failures else summary
+
+# -----------------------------
+# PLAN / APPLY / VERIFY / UNDO
+# -----------------------------
+# Tweaks whose catalog entry is a CallOp
+TWEAK_HANDLERS = {
+    "fix_domain_trust_relationship": fix_domain_trust_relationship,
+    "cleanup_temp_files": cleanup_temp_files,
+    "remove_bloat_apps": remove_bloat_apps,
+}
+
+def warm_inventory():
+    """Bulk read every key the catalog touches into the inventory; returns how many keys were read"""
+    count = inventory.load(catalog_keys())
+    registry.close()
+    return count
+
+def forget_side_effects(plan):
+    """Drop inventory keys a plan changed behind the registry backend (SCM, powercfg, commands, handlers)"""
+    if plan.commands or plan.calls:
+        inventory.invalidate()
+        return
+    for svc in plan.services.values():
+        inventory.invalidate("HKLM", f"{SERVICES_KEY}\\{svc.name}")
+    if plan.power:
+        inventory.invalidate("HKLM", POWER_SCHEMES_KEY)
+
+def check_tweaks(tweak_ids):
+    """Compile tweak_ids and compare them with the live system; returns (plan, pending, compliance)"""
+    plan = compile_plan(tweak_ids)
+    inventory.load(plan_keys(plan))
+    pending, compliance = prune_compliant(plan, StateProbe(inventory, eventlogs))
+    registry.close()
+    eventlogs.close()
+    return plan, pending, compliance
+
+def dry_run(tweak_ids):
+    """
+    Compile tweak_ids and diff them against the live system without
+    changing anything; returns (plan, compliance, DryRunReport)
+    """
+    plan = compile_plan(tweak_ids)
+    inventory.load(plan_keys(plan))
+    probe = StateProbe(inventory, eventlogs)
+    _, compliance = prune_compliant(plan, probe)
+    report = diff_plan(plan, probe, services)
+    registry.close()
+    services.close()
+    eventlogs.close()
+    return plan, compliance, report
+
+def run_tweaks(tweak_ids, handlers=None, progress=None):
+    """
+    Compile the selected tweaks into one deduplicated plan and execute it,
+    reporting each stage and task to progress when a ProgressChannel is given
+    """
+    if progress is not None:
+        progress.step("plan", "Planning and checking current state")
+    first_command = commands.seq
+    plan = compile_plan(tweak_ids)
+    stats = plan.stats()
+    oplog.record("plan", ", ".join(plan.tweaks), **stats)
+    # Only write what differs from the current state, read in one pass per key
+    inventory.load(plan_keys(plan))
+    pending, compliance = prune_compliant(plan, StateProbe(inventory, eventlogs))
+    oplog.record("state_check", "", output=compliance.summary())
+    if progress is not None:
+        progress.step("snapshot", "Snapshot of settings to change", compliance.summary())
+    # Wait for the snapshot so nothing is changed before its prior state is on disk
+    try:
+        backup_registry(pending)
+    except SnapshotError as e:
+        if progress is not None:
+            progress.finish("snapshot", FAIL, detail=str(e))
+        registry.close()
+        eventlogs.close()
+        raise
+    if progress is not None:
+        progress.finish("snapshot", detail=last_backup)
+    result = execute_plan(pending, inventory, run_cmd, handlers=handlers or TWEAK_HANDLERS, log=oplog.record,
+                          journal=journal, run_ps=run_ps, services=services, progress=progress,
+                          eventlogs=eventlogs)
+    forget_side_effects(pending)
+    result.compliance = compliance
+    applied_tweaks.extend(plan.tweaks)
+    oplog.record("result", "", output=f"{result.summary()}; {result.schedule.summary()}",
+                 duration=result.duration, failures=len(result.failures))
+    for timing in result.schedule.slowest():
+        oplog.record("task", timing.name, duration=timing.duration, started=round(timing.start, 4))
+    oplog.record("commands", "", output=commands.summary(since=first_command), **commands.stats(since=first_command))
+    oplog.record("inventory", "", **inventory.stats())
+    # Release the key, service and channel handles held open during the run
+    registry.close()
+    services.close()
+    eventlogs.close()
+    return plan, result
+
+def apply_to_all_users(plan, loader=None):
+    """
+    Apply the HKCU part of plan to every user profile, logged on or not;
+    returns a user_hives.UserHivesResult
+    """
+    result = apply_to_profiles(plan, loader or default_hive_loader(), journal=journal, log=oplog.record)
+    # The running user's hive is one of them, written behind the inventory's back
+    for op, _ in user_ops(plan):
+        inventory.invalidate(op.hive, op.path)
+    oplog.record("user_hives", "", output=result.summary(), duration=result.duration,
+                 failures=len(result.failures))
+    return result
+
+def start_drift_monitor(tweak_ids, notifier=None, coalesce=DEFAULT_COALESCE, on_drift=None):
+    """
+    Watch the registry keys of tweak_ids and rewrite values that get
+    reverted; returns the running DriftMonitor (call stop() to end it)
+    """
+    plan = compile_plan(tweak_ids)
+    owners = {op: plan.owners[value_id] for value_id, op in plan.registry.items()}
+    monitor = DriftMonitor(plan.registry.values(), inventory, notifier or default_notifier(),
+                           coalesce=coalesce, on_drift=on_drift, log=oplog.record, journal=journal, owners=owners)
+    monitor.start()
+    oplog.record("drift_monitor", ", ".join(plan.tweaks), keys=len(monitor.keys), restored=monitor.restored)
+    return monitor
+
+def bake_image(tweak_ids, image_root):
+    """
+    Apply tweak_ids to the hives of the Windows image mounted at
+    image_root instead of this machine; returns (plan, BakeReport)
+    """
+    plan = compile_plan(tweak_ids)
+    image = OfflineImage(image_root)
+    report = bake_plan(plan, image)
+    image.close()  # Saves the changed hives; nothing is written if baking raised
+    oplog.record("bake", image_root, output=report.summary(), duration=report.duration,
+                 failures=len(report.failures), skipped=len(report.skipped))
+    for description, error in report.failures:
+        oplog.record("bake", description, error=error)
+    return plan, report
+
+def restore_from_backup(path, key, recurse=False):
+    """
+    Put back the values a .reg backup holds for key (and its subkeys with
+    recurse), journaled so Undo Tweaks can reverse it; returns [(RegOp, error)]
+    """
+    ops = RegBackup(path).restore_ops(key, recurse)
+    journal.record_all([(op, None) for op in ops], StateProbe(inventory, eventlogs))
+    results = inventory.apply(ops)
+    registry.close()
+    failures = [(op, error) for op, error in results if error is not None]
+    oplog.record("backup_restore", f"{path} {key}",
+                 output=f"{len(ops) - len(failures)} of {len(ops)} values restored", failures=len(failures))
+    for op, error in failures:
+        oplog.record("backup_restore", str(op), error=str(error))
+    return results
+
+def undo_tweaks():
+    """Replay the undo journal and log the outcome; returns an UndoResult"""
+    result = undo(journal, inventory, run_cmd, services=services, eventlogs=eventlogs)
+    # Service start types and the power scheme were restored outside the registry backend
+    inventory.invalidate()
+    oplog.record("undo", journal.path, output=result.summary(), failures=len(result.failures))
+    for description, error in result.failures:
+        oplog.record("undo", description, error=error)
+    applied_tweaks.clear()
+    return result
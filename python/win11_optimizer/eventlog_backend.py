@@ -0,0 +1,255 @@
+"""
+Event log channel backend for Windows 11 Optimizer.
+
+Reads a channel's maximum size, retention and auto-backup settings once
+and writes only the properties that differ, saved in one operation per
+channel, instead of one `wevtutil sl` process per option. The channel
+configuration is what Windows persists for the log (for classic logs the
+Services\\EventLog\\<log> registry values), so no separate registry
+writes are needed.
+
+MemoryEventLogs is an in-memory channel store with the same interface,
+for exercising the engine on machines without the event log service.
+"""
+import ctypes
+import threading
+from collections import namedtuple
+
+try:
+    from ctypes import wintypes
+    wevtapi = ctypes.WinDLL("wevtapi", use_last_error=True)
+except (AttributeError, OSError, ImportError, ValueError):  # Not on Windows - only MemoryEventLogs is usable
+    wevtapi = None
+
+PROPERTIES = ("max_size", "retention", "auto_backup")
+
+
+class ChannelConfig(namedtuple("ChannelConfig", "channel max_size retention auto_backup")):
+    """Logging settings of one channel; max_size in bytes, retention/auto_backup booleans"""
+    __slots__ = ()
+
+    def __str__(self):
+        size = "?" if self.max_size is None else f"{self.max_size / 1048576:.0f} MB"
+        return f"{self.channel}: max {size}, retention={self.retention}, auto_backup={self.auto_backup}"
+
+
+class ChannelNotFound(OSError):
+    """The event log channel does not exist"""
+
+
+def changed_properties(current, op):
+    """{property: target} for the properties of an EventLogOp that differ from current"""
+    changes = {}
+    for prop in PROPERTIES:
+        target = getattr(op, prop)
+        if target is not None and (current is None or getattr(current, prop) != target):
+            changes[prop] = target
+    return changes
+
+
+def wevtutil_command(op):
+    """argv for a single `wevtutil sl` call setting every property of an EventLogOp"""
+    options = []
+    if op.max_size is not None:
+        options.append(f"/ms:{op.max_size}")
+    if op.retention is not None:
+        options.append(f"/rt:{str(op.retention).lower()}")
+    if op.auto_backup is not None:
+        options.append(f"/ab:{str(op.auto_backup).lower()}")
+    return ["wevtutil", "sl", op.channel] + options
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class EventLogBackend:
+    """Interface shared by the wevtapi backend and the in-memory fake"""
+
+    def read(self, channel):
+        """Return the ChannelConfig; raises ChannelNotFound"""
+        raise NotImplementedError
+
+    def write(self, channel, changes):
+        """Set {property: value} and save them in one operation; raises OSError"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any cached handles"""
+
+    def query(self, channel):
+        """ChannelConfig for channel, or None if it does not exist"""
+        try:
+            return self.read(channel)
+        except ChannelNotFound:
+            return None
+
+    def apply(self, ops):
+        """
+        Apply EventLogOps, one save per channel that needs changing. Returns
+        [(op, before, after, error)] with error None on success. If a
+        combined save is refused, each property is retried on its own so
+        one rejected value does not hold back the others.
+        """
+        results = []
+        for op in ops:
+            error = None
+            try:
+                before = self.read(op.channel)
+            except OSError as e:
+                results.append((op, None, None, e))
+                continue
+            changes = changed_properties(before, op)
+            if changes:
+                try:
+                    self.write(op.channel, changes)
+                except OSError as e:
+                    error = e
+                    if len(changes) > 1:
+                        refused = []
+                        for prop, value in changes.items():
+                            try:
+                                self.write(op.channel, {prop: value})
+                            except OSError as single:
+                                refused.append(f"{prop}: {single}")
+                        error = OSError(f"{op.channel} refused {'; '.join(refused)}") if refused else None
+            results.append((op, before, self.query(op.channel), error))
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+if wevtapi is not None:
+    class EVT_VARIANT(ctypes.Structure):
+        # The union is 8 bytes; BooleanVal sits in its low 32 bits
+        _fields_ = [("value", ctypes.c_uint64), ("Count", wintypes.DWORD), ("Type", wintypes.DWORD)]
+
+    EVT_HANDLE = wintypes.HANDLE
+    wevtapi.EvtOpenChannelConfig.argtypes = [EVT_HANDLE, wintypes.LPCWSTR, wintypes.DWORD]
+    wevtapi.EvtOpenChannelConfig.restype = EVT_HANDLE
+    wevtapi.EvtGetChannelConfigProperty.argtypes = [EVT_HANDLE, ctypes.c_int, wintypes.DWORD, wintypes.DWORD,
+                                                    ctypes.POINTER(EVT_VARIANT), ctypes.POINTER(wintypes.DWORD)]
+    wevtapi.EvtSetChannelConfigProperty.argtypes = [EVT_HANDLE, ctypes.c_int, wintypes.DWORD,
+                                                    ctypes.POINTER(EVT_VARIANT)]
+    wevtapi.EvtSaveChannelConfig.argtypes = [EVT_HANDLE, wintypes.DWORD]
+    wevtapi.EvtClose.argtypes = [EVT_HANDLE]
+
+
+class WevtBackend(EventLogBackend):
+    """wevtapi implementation with cached channel config handles"""
+
+    # EVT_CHANNEL_CONFIG_PROPERTY_ID and EVT_VARIANT_TYPE values
+    PROPERTY_IDS = {"retention": 6, "auto_backup": 7, "max_size": 8}
+    EVT_VAR_TYPE_UINT64 = 10
+    EVT_VAR_TYPE_BOOLEAN = 13
+    ERROR_EVT_CHANNEL_NOT_FOUND = 15007
+
+    def __init__(self):
+        if wevtapi is None:
+            raise RuntimeError("The event log API is not available on this platform")
+        self._handles = {}
+        self._lock = threading.RLock()
+
+    def _error(self, channel):
+        code = ctypes.get_last_error()
+        if code == self.ERROR_EVT_CHANNEL_NOT_FOUND:
+            return ChannelNotFound(code, f"Event log {channel} does not exist")
+        return ctypes.WinError(code)
+
+    def _open(self, channel):
+        with self._lock:
+            handle = self._handles.get(channel.lower())
+            if handle is None:
+                handle = wevtapi.EvtOpenChannelConfig(None, channel, 0)
+                if not handle:
+                    raise self._error(channel)
+                self._handles[channel.lower()] = handle
+            return handle
+
+    def _discard(self, channel):
+        """Drop a handle holding unsaved property changes"""
+        with self._lock:
+            handle = self._handles.pop(channel.lower(), None)
+            if handle:
+                wevtapi.EvtClose(handle)
+
+    def read(self, channel):
+        with self._lock:
+            handle = self._open(channel)
+            values = {}
+            for prop, prop_id in self.PROPERTY_IDS.items():
+                variant, used = EVT_VARIANT(), wintypes.DWORD()
+                if not wevtapi.EvtGetChannelConfigProperty(handle, prop_id, 0, ctypes.sizeof(variant),
+                                                           ctypes.byref(variant), ctypes.byref(used)):
+                    raise self._error(channel)
+                values[prop] = variant.value if prop == "max_size" else bool(variant.value & 0xFFFFFFFF)
+            return ChannelConfig(channel, values["max_size"], values["retention"], values["auto_backup"])
+
+    def write(self, channel, changes):
+        with self._lock:
+            handle = self._open(channel)
+            try:
+                for prop, value in changes.items():
+                    variant = EVT_VARIANT()
+                    variant.value = int(value)
+                    variant.Type = self.EVT_VAR_TYPE_UINT64 if prop == "max_size" else self.EVT_VAR_TYPE_BOOLEAN
+                    if not wevtapi.EvtSetChannelConfigProperty(handle, self.PROPERTY_IDS[prop], 0,
+                                                               ctypes.byref(variant)):
+                        raise self._error(channel)
+                if not wevtapi.EvtSaveChannelConfig(handle, 0):
+                    raise self._error(channel)
+            except OSError:
+                self._discard(channel)
+                raise
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                wevtapi.EvtClose(handle)
+            self._handles.clear()
+
+
+class MemoryEventLogs(EventLogBackend):
+    """
+    In-memory channel store. channels maps name -> (max_size, retention,
+    auto_backup); channels named in read_only refuse every write.
+    """
+
+    def __init__(self, channels=None, read_only=()):
+        self._channels = {}
+        self._lock = threading.RLock()
+        self.read_only = {name.lower() for name in read_only}
+        self.saves = 0
+        for name, (max_size, retention, auto_backup) in (channels or {}).items():
+            self._channels[name.lower()] = ChannelConfig(name, max_size, retention, auto_backup)
+
+    def read(self, channel):
+        with self._lock:
+            config = self._channels.get(channel.lower())
+            if config is None:
+                raise ChannelNotFound(15007, f"Event log {channel} does not exist")
+            return config
+
+    def write(self, channel, changes):
+        with self._lock:
+            config = self.read(channel)
+            if channel.lower() in self.read_only:
+                raise OSError(5, f"Access to event log {channel} is denied")
+            self._channels[channel.lower()] = config._replace(**changes)
+            self.saves += 1
+
+    def dump(self):
+        """Return {name_lower: (max_size, retention, auto_backup)} for assertions"""
+        with self._lock:
+            return {key: tuple(config[1:]) for key, config in self._channels.items()}
+
+
+def default_eventlog_backend():
+    """Return the wevtapi backend on Windows and the in-memory fake elsewhere"""
+    if wevtapi is not None:
+        return WevtBackend()
+    return MemoryEventLogs()
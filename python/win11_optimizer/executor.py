@@ -0,0 +1,263 @@
+"""
+Plan executor for Windows 11 Optimizer.
+
+Turns a compiled Plan into scheduler tasks and runs them on a bounded
+thread pool: one task for the registry writes, one for all services
+(batched through a service backend: every stop, one bounded wait, then
+the start types) or one per service via sc.exe when no backend is
+given, one for the event log channels, one for the power scheme, one
+per tweak's command sequence and one per custom handler. Handlers for CallOp tweaks
+are supplied by the caller so this module has no GUI dependencies.
+Progress is reported through a log callable taking OperationLog.record
+keyword arguments.
+"""
+import threading
+
+from eventlog_backend import wevtutil_command
+from scheduler import DEFAULT_WORKERS, Task, run_tasks
+from oplog import tweak_scope
+from progress import DONE, FAIL, PENDING, RUNNING
+from ps_host import encoded_command
+from state_probe import StateProbe
+from tweak_catalog import SLOW_TWEAKS, PsOp, command_text, get_tweak
+
+# Commands that share system state with other tweaks must not overlap
+COMMAND_RESOURCES = {
+    "ipconfig": "network",
+    "netsh": "network",
+    "klist": "kerberos",
+    "cmdkey": "credentials",
+    "wevtutil": "eventlog",
+}
+
+
+class ExecutionResult:
+    """Outcome counters for one executed plan"""
+
+    def __init__(self):
+        self.executed = 0
+        self.failures = []   # (description, error text)
+        self.duration = 0.0
+        self.compliance = None  # state_probe.ComplianceReport when the plan was pruned
+        self.schedule = None    # scheduler.ScheduleResult with per-task timings
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    def record(self, description, output):
+        with self._lock:
+            self.executed += 1
+            if is_failure(output):
+                self.failures.append((description, output))
+                self._local.failures = getattr(self._local, "failures", 0) + 1
+
+    def take_thread_failures(self):
+        """Failures recorded by the calling thread since the last call"""
+        count = getattr(self._local, "failures", 0)
+        self._local.failures = 0
+        return count
+
+    def summary(self):
+        return (f"{self.executed} operations in {self.duration:.2f}s, "
+                f"{len(self.failures)} failed")
+
+
+def is_failure(output):
+    """run_cmd reports errors as "Failed: ..." strings instead of raising"""
+    return isinstance(output, str) and output.startswith("Failed")
+
+
+def command_resources(commands):
+    """Scheduler resources touched by a sequence of CmdOps"""
+    resources = set()
+    for cmd in commands:
+        if isinstance(cmd, PsOp):
+            continue
+        program = cmd.cmd.split(None, 1)[0].lower() if cmd.cmd.strip() else ""
+        if program in COMMAND_RESOURCES:
+            resources.add(COMMAND_RESOURCES[program])
+    return sorted(resources)
+
+
+def build_tasks(plan, registry, run_cmd, run_ps, handlers, result, log, services=None, eventlogs=None):
+    """Translate a Plan into scheduler Tasks that record into result"""
+    tasks = []
+
+    # Handlers first so services and commands sharing their resources wait for them
+    for tweak_id, call in plan.calls:
+        def run_handler(call=call, tweak_id=tweak_id):
+            handler = handlers.get(call.handler)
+            if handler is None:
+                result.record(f"Handler {call.handler}", f"Failed: no handler registered for {tweak_id}")
+                return
+            with tweak_scope(tweak_id):
+                try:
+                    result.record(f"Handler {call.handler}", handler())
+                except Exception as e:
+                    log(op="handler", target=call.handler, error=str(e))
+                    result.record(f"Handler {call.handler}", f"Failed: {e}")
+        tasks.append(Task(f"handler:{call.handler}", run_handler, resources=call.resources,
+                          priority=1 if tweak_id in SLOW_TWEAKS else 0))
+
+    if plan.registry:
+        def run_registry():
+            # One pass per key with the handle kept open by the backend
+            for group in plan.registry_groups():
+                for op, error in registry.apply(group):
+                    tweak = plan.owners[op.value_id]
+                    if error is None:
+                        log(op="registry", target=str(op), tweak=tweak, exit_code=0)
+                        result.record(str(op), "")
+                    else:
+                        log(op="registry", target=str(op), tweak=tweak, exit_code=1, error=str(error))
+                        result.record(str(op), f"Failed: {error}")
+        tasks.append(Task("registry", run_registry, resources=("registry",)))
+
+    if plan.services and services is not None:
+        def run_services():
+            for svc, error in services.apply(plan.services.values()):
+                with tweak_scope(plan.service_owners[svc.name.lower()]):
+                    if isinstance(error, TimeoutError):
+                        # Start type is in place; the service stops for good at the next boot
+                        log(op="service", target=svc.name, output=str(error), start=svc.start)
+                        result.record(f"Service {svc.name}", "")
+                    elif error is None:
+                        log(op="service", target=svc.name, exit_code=0, start=svc.start, stopped=svc.stop)
+                        result.record(f"Service {svc.name}", "")
+                    else:
+                        log(op="service", target=svc.name, exit_code=1, error=str(error), start=svc.start)
+                        result.record(f"Service {svc.name}", f"Failed: {error}")
+        tasks.append(Task("services", run_services,
+                          resources=tuple(f"service:{name}" for name in plan.services)))
+
+    elif plan.services:
+        for name, svc in plan.services.items():
+            def run_service(svc=svc, tweak_id=plan.service_owners[name]):
+                with tweak_scope(tweak_id):
+                    if svc.stop:
+                        # Stopping an already stopped service is not a failure worth reporting
+                        run_cmd(["sc", "stop", svc.name])
+                    if svc.start:
+                        result.record(f"Service {svc.name}", run_cmd(["sc", "config", svc.name, "start=", svc.start]))
+            tasks.append(Task(f"service:{name}", run_service, resources=(f"service:{name}",)))
+
+    if plan.eventlogs:
+        def run_eventlogs():
+            if eventlogs is None:
+                # No channel backend - one wevtutil call per channel with every option
+                for channel, op in plan.eventlogs.items():
+                    with tweak_scope(plan.eventlog_owners[channel]):
+                        result.record(f"Event log {op.channel}", run_cmd(wevtutil_command(op)))
+                return
+            for op, before, after, error in eventlogs.apply(plan.eventlogs.values()):
+                with tweak_scope(plan.eventlog_owners[op.channel.lower()]):
+                    sizes = {"before_size": before and before.max_size, "after_size": after and after.max_size}
+                    if error is None:
+                        log(op="eventlog", target=op.channel, exit_code=0, output=f"{before} -> {after}", **sizes)
+                        result.record(f"Event log {op.channel}", "")
+                    else:
+                        log(op="eventlog", target=op.channel, exit_code=1, error=str(error), **sizes)
+                        result.record(f"Event log {op.channel}", f"Failed: {error}")
+        tasks.append(Task("eventlogs", run_eventlogs, resources=("eventlog",)))
+
+    if plan.power:
+        def run_power():
+            with tweak_scope(plan.power[0]):
+                result.record("Power scheme", run_cmd(["powercfg", "/setactive", plan.power[1].scheme]))
+        tasks.append(Task("power", run_power, resources=("power",)))
+
+    # A tweak's commands stay in their original order; different tweaks may overlap
+    by_tweak = {}
+    for tweak_id, cmd in plan.commands:
+        by_tweak.setdefault(tweak_id, []).append(cmd)
+    for tweak_id, commands in by_tweak.items():
+        def run_commands(commands=commands, tweak_id=tweak_id):
+            with tweak_scope(tweak_id):
+                for cmd in commands:
+                    if isinstance(cmd, PsOp):
+                        result.record(command_text(cmd), run_ps(cmd.script))
+                    else:
+                        result.record(cmd.cmd, run_cmd(cmd.cmd))
+        tasks.append(Task(f"commands:{tweak_id}", run_commands,
+                          resources=command_resources(commands),
+                          priority=1 if tweak_id in SLOW_TWEAKS else 0))
+    return tasks
+
+
+def task_label(name, plan):
+    """Readable label for a task in the progress pane"""
+    kind, _, tweak_id = name.partition(":")
+    if kind == "commands":
+        return get_tweak(tweak_id).label
+    if kind == "handler":
+        return next(get_tweak(t).label for t, call in plan.calls if call.handler == tweak_id)
+    if kind == "registry":
+        return f"Registry ({len(plan.registry)} values, {len(plan.registry_groups())} keys)"
+    if kind == "services":
+        return f"Services ({len(plan.services)})"
+    if kind == "service":
+        return f"Service {tweak_id}"
+    if kind == "eventlogs":
+        return f"Event logs ({len(plan.eventlogs)})"
+    if kind == "power":
+        return "Power plan"
+    return name
+
+
+def with_progress(task, label, progress, result):
+    """Wrap a task so it reports running / done / fail to a ProgressChannel"""
+    fn = task.fn
+
+    def run():
+        progress.publish(task.name, label, RUNNING)
+        result.take_thread_failures()
+        try:
+            fn()
+        except Exception as e:
+            progress.finish(task.name, FAIL, str(e))
+            raise
+        failures = result.take_thread_failures()
+        if failures:
+            progress.finish(task.name, FAIL, f"{failures} failed")
+        else:
+            progress.finish(task.name, DONE)
+    task.fn = run
+    progress.publish(task.name, label, PENDING)
+    return task
+
+
+def journal_plan(plan, journal, registry, eventlogs=None, services=None):
+    """Write-ahead: record the prior state of every registry, service, event log and power op"""
+    ops = [(op, plan.owners[value_id]) for value_id, op in plan.registry.items()]
+    ops += [(svc, plan.service_owners[name]) for name, svc in plan.services.items() if svc.start]
+    ops += [(log, plan.eventlog_owners[channel]) for channel, log in plan.eventlogs.items()]
+    if plan.power:
+        ops.append((plan.power[1], plan.power[0]))
+    journal.record_all(ops, StateProbe(registry, eventlogs, services))
+
+
+def execute_plan(plan, registry, run_cmd, handlers=None, log=None, max_workers=DEFAULT_WORKERS,
+                 journal=None, run_ps=None, services=None, progress=None, eventlogs=None):
+    """
+    Execute a Plan on a bounded thread pool and return an ExecutionResult.
+    With a progress.ProgressChannel each task reports as it starts and ends.
+    """
+    result = ExecutionResult()
+    if journal is not None:
+        journal_plan(plan, journal, registry, eventlogs, services)
+    if run_ps is None:
+        # No persistent host supplied - fall back to one powershell.exe per script
+        def run_ps(script):
+            return run_cmd(["powershell", "-NoProfile", "-NonInteractive", "-EncodedCommand", encoded_command(script)])
+    tasks = build_tasks(plan, registry, run_cmd, run_ps, handlers or {}, result,
+                        log or (lambda **fields: None), services=services, eventlogs=eventlogs)
+    if progress is not None:
+        tasks = [with_progress(task, task_label(task.name, plan), progress, result) for task in tasks]
+    result.schedule = run_tasks(tasks, max_workers=max_workers)
+    for name, error in result.schedule.errors:
+        result.failures.append((name, f"Failed: {error}"))
+    result.duration = result.schedule.wall
+    return result
@@ -0,0 +1,162 @@
+"""
+Machine-state inventory for Windows 11 Optimizer.
+
+The registry keys the tweak catalog touches - the tweaks' own keys, the
+Services\\<name> keys holding service start types and the power scheme
+key - are read a whole key at a time and indexed in memory by hive, path
+and value name. Inventory is itself a RegistryBackend wrapping the real
+one, so StateProbe, the dry run, the snapshot, the undo journal and
+verification all read from the index instead of querying the same
+Netlogon or Control Panel\\Desktop keys again and again.
+
+Writes go through to the backend and update the index. Anything that
+changes state behind its back (the service manager, external commands)
+calls invalidate(). Every change bumps generation, so a consumer can tell
+whether what it showed is still current. Keys older than max_age are
+re-read on their next use.
+"""
+import threading
+import time
+
+from registry_backend import RegistryBackend
+from state_probe import POWER_SCHEMES_KEY, SERVICES_KEY
+
+DEFAULT_MAX_AGE = 60.0  # seconds before a loaded key is read again
+
+
+def plan_keys(plan):
+    """(hive, path) of every key a Plan reads or writes, in first-seen order"""
+    keys = [(op.hive, op.path) for op in plan.registry.values()]
+    keys += [("HKLM", f"{SERVICES_KEY}\\{svc.name}") for svc in plan.services.values()]
+    if plan.power:
+        keys.append(("HKLM", POWER_SCHEMES_KEY))
+    return list(dict.fromkeys((hive, path) for hive, path in keys))
+
+
+def catalog_keys():
+    """Keys of every tweak in the catalog"""
+    from planner import compile_plan
+    from tweak_catalog import CATALOG
+    return plan_keys(compile_plan(list(CATALOG)))
+
+
+class Inventory(RegistryBackend):
+    """Caching RegistryBackend: whole keys are read once and served from memory until changed or stale"""
+
+    def __init__(self, backend, max_age=DEFAULT_MAX_AGE, clock=time.monotonic):
+        self.backend = backend
+        self.max_age = max_age
+        self._clock = clock
+        self._keys = {}           # (hive, path_lower) -> (loaded_at, {name_lower: (type, data)}, complete)
+        self._lock = threading.RLock()
+        self.generation = 0       # bumped by every write, delete and invalidation
+        self.hits = 0
+        self.misses = 0
+        self.key_reads = 0        # whole-key reads from the backend
+
+    def _fresh(self, cache_key):
+        entry = self._keys.get(cache_key)
+        if entry is None or (self.max_age is not None and self._clock() - entry[0] > self.max_age):
+            return None
+        return entry
+
+    def _load_key(self, hive, path):
+        """Read every value of a key; returns the index entry, or None if the backend cannot enumerate keys"""
+        try:
+            values = self.backend.read_key(hive, path)
+        except NotImplementedError:
+            return None
+        self.key_reads += 1
+        entry = (self._clock(), values or {}, True)
+        self._keys[(hive, path.lower())] = entry
+        return entry
+
+    def load(self, keys):
+        """Bulk read the given (hive, path) keys that are not already indexed and fresh; returns how many were read"""
+        read = 0
+        with self._lock:
+            for hive, path in keys:
+                if self._fresh((hive, path.lower())) is None:
+                    try:
+                        if self._load_key(hive, path) is None:
+                            break
+                    except OSError:
+                        continue   # Unreadable key - left to per-value reads
+                    read += 1
+        return read
+
+    def read(self, hive, path, name):
+        cache_key, lname = (hive, path.lower()), (name or "").lower()
+        with self._lock:
+            entry = self._fresh(cache_key)
+            if entry is not None and (entry[2] or lname in entry[1]):
+                self.hits += 1
+                return entry[1].get(lname)
+            self.misses += 1
+            try:
+                entry = self._load_key(hive, path)
+            except OSError:
+                entry = None   # Key cannot be enumerated - the value itself may still be readable
+            if entry is not None:
+                return entry[1].get(lname)
+            # Backend without whole-key reads: index this one value
+            value = self.backend.read(hive, path, name)
+            entry = self._fresh(cache_key) or (self._clock(), {}, False)
+            entry[1][lname] = value
+            self._keys[cache_key] = entry
+            return value
+
+    def read_key(self, hive, path):
+        with self._lock:
+            entry = self._fresh((hive, path.lower()))
+            if entry is None or not entry[2]:
+                entry = self._load_key(hive, path)
+                if entry is None:
+                    return self.backend.read_key(hive, path)
+            return dict(entry[1])
+
+    def write(self, hive, path, name, reg_type, data):
+        with self._lock:
+            try:
+                self.backend.write(hive, path, name, reg_type, data)
+            except OSError:
+                self.invalidate(hive, path)
+                raise
+            entry = self._keys.get((hive, path.lower()))
+            if entry is not None:
+                entry[1][(name or "").lower()] = (reg_type, data)
+            self.generation += 1
+
+    def delete(self, hive, path, name):
+        with self._lock:
+            try:
+                existed = self.backend.delete(hive, path, name)
+            except OSError:
+                self.invalidate(hive, path)
+                raise
+            entry = self._keys.get((hive, path.lower()))
+            if entry is not None:
+                if entry[2]:
+                    entry[1].pop((name or "").lower(), None)
+                else:
+                    entry[1][(name or "").lower()] = None
+            self.generation += 1
+            return existed
+
+    def invalidate(self, hive=None, path=None):
+        """Forget one key, or everything when no key is given"""
+        with self._lock:
+            if hive is None:
+                self._keys.clear()
+            else:
+                self._keys.pop((hive, path.lower()), None)
+            self.generation += 1
+
+    def close(self):
+        """Release the backend's handles; the index is kept"""
+        self.backend.close()
+
+    def stats(self):
+        with self._lock:
+            return {"keys": len(self._keys), "generation": self.generation, "hits": self.hits,
+                    "misses": self.misses, "key_reads": self.key_reads}
@@ -0,0 +1,210 @@
+"""
+Offline image baking for Windows 11 Optimizer.
+
+Applies a compiled Plan to the registry hives of a mounted Windows
+image instead of a running system, so a golden image carries the tweaks
+and the seats deployed from it start out compliant. OfflineImage is a
+RegistryBackend over the image's hive files:
+- HKLM\\SOFTWARE (and HKCR, its Classes key) is Windows\\System32\\config\\SOFTWARE;
+- HKLM\\SYSTEM is Windows\\System32\\config\\SYSTEM, with CurrentControlSet
+  resolved through Select\\Current as the kernel does at boot;
+- HKCU is the default user's Users\\Default\\NTUSER.DAT, copied into every
+  new profile.
+
+bake_plan() writes the registry values of a plan and turns service start
+types, classic event log settings and the power scheme into the registry
+values Windows keeps them in. Commands, PowerShell and handlers need a
+running system and are reported as skipped.
+"""
+import os
+import time
+
+from regf import Hive, HiveError
+from registry_backend import REG_DWORD, REG_SZ, RegistryBackend, RegOp
+from service_backend import START_TYPE_VALUES
+from state_probe import POWER_SCHEMES_KEY, SERVICES_KEY, StateProbe
+from tweak_catalog import command_text
+
+# Hive files relative to the image root
+HIVE_FILES = {
+    "SOFTWARE": ("Windows", "System32", "config", "SOFTWARE"),
+    "SYSTEM": ("Windows", "System32", "config", "SYSTEM"),
+    "DEFAULT_USER": ("Users", "Default", "NTUSER.DAT"),
+}
+EVENTLOG_KEY = r"SYSTEM\CurrentControlSet\Services\EventLog"
+RETAIN_EVENTS = 0xFFFFFFFF   # Retention value for "do not overwrite events"
+
+
+def find_file(root, parts):
+    """Path of root/parts, matching each part case-insensitively (images mounted on Linux are case-sensitive)"""
+    path = root
+    for part in parts:
+        candidate = os.path.join(path, part)
+        if not os.path.exists(candidate) and os.path.isdir(path):
+            candidate = next((os.path.join(path, entry) for entry in os.listdir(path)
+                              if entry.lower() == part.lower()), candidate)
+        path = candidate
+    return path
+
+
+class OfflineImage(RegistryBackend):
+    """
+    RegistryBackend over the hive files of a mounted image. Hives are
+    read on first use; close() saves the ones that were changed.
+    """
+
+    def __init__(self, root):
+        if not os.path.isdir(find_file(root, ("Windows", "System32", "config"))):
+            raise FileNotFoundError(f"{root} does not look like a Windows image (no Windows\\System32\\config)")
+        self.root = root
+        self._hives = {}          # HIVE_FILES name -> Hive
+        self._control_set = None
+
+    def hive(self, name):
+        hive = self._hives.get(name)
+        if hive is None:
+            path = find_file(self.root, HIVE_FILES[name])
+            if not os.path.isfile(path):
+                raise HiveError(f"{path} not found in the image")
+            hive = self._hives[name] = Hive.open(path)
+        return hive
+
+    def control_set(self):
+        """Name of the control set CurrentControlSet stands for, e.g. ControlSet001"""
+        if self._control_set is None:
+            current = self.hive("SYSTEM").get_value("Select", "Current")
+            self._control_set = f"ControlSet{current[1] if current else 1:03d}"
+        return self._control_set
+
+    def _route(self, hive, path):
+        """(Hive, path within it) for a hive and path as written in the tweaks"""
+        if hive == "HKCU":
+            return self.hive("DEFAULT_USER"), path
+        if hive == "HKCR":
+            return self.hive("SOFTWARE"), f"Classes\\{path}"
+        top, _, rest = path.partition("\\")
+        if hive == "HKLM" and top.upper() == "SOFTWARE":
+            return self.hive("SOFTWARE"), rest
+        if hive == "HKLM" and top.upper() == "SYSTEM":
+            current, _, below = rest.partition("\\")
+            if current.upper() == "CURRENTCONTROLSET":
+                rest = f"{self.control_set()}\\{below}" if below else self.control_set()
+            return self.hive("SYSTEM"), rest
+        raise HiveError(f"{hive}\\{path} is not stored in an offline hive")
+
+    def read(self, hive, path, name):
+        target, path = self._route(hive, path)
+        return target.get_value(path, name)
+
+    def read_key(self, hive, path):
+        target, path = self._route(hive, path)
+        values = target.values(path)
+        if values is None:
+            return None
+        return {name.lower(): (reg_type, data) for name, reg_type, data in values}
+
+    def write(self, hive, path, name, reg_type, data):
+        target, path = self._route(hive, path)
+        target.set_value(path, name, reg_type, data)
+
+    def delete(self, hive, path, name):
+        target, path = self._route(hive, path)
+        return target.delete_value(path, name)
+
+    def close(self):
+        """Save every changed hive and forget the loaded ones"""
+        for hive in self._hives.values():
+            if hive.dirty:
+                hive.save()
+        self._hives.clear()
+        self._control_set = None
+
+
+# -----------------------------
+# BAKING
+# -----------------------------
+class BakeReport:
+    """What bake_plan() wrote, left alone, could not write and skipped"""
+
+    def __init__(self):
+        self.written = []      # descriptions of values changed
+        self.unchanged = 0     # values already as planned
+        self.failures = []     # (description, error text)
+        self.skipped = []      # (description, reason)
+        self.duration = 0.0
+
+    def summary(self):
+        return (f"{len(self.written)} values written, {self.unchanged} already set, "
+                f"{len(self.failures)} failed, {len(self.skipped)} skipped in {self.duration:.2f}s")
+
+
+def service_ops(svc):
+    """RegOps giving a service its start type in Services\\<name>"""
+    key = f"{SERVICES_KEY}\\{svc.name}"
+    ops = [RegOp("set", "HKLM", key, "Start", REG_DWORD, START_TYPE_VALUES[svc.start])]
+    if svc.start == "delayed-auto":
+        ops.append(RegOp("set", "HKLM", key, "DelayedAutostart", REG_DWORD, 1))
+    elif svc.start == "auto":
+        ops.append(RegOp("delete", "HKLM", key, "DelayedAutostart", None, None))
+    return ops
+
+
+def eventlog_ops(log):
+    """RegOps for the Services\\EventLog\\<log> values of a classic event log"""
+    key = f"{EVENTLOG_KEY}\\{log.channel}"
+    ops = []
+    if log.max_size is not None:
+        ops.append(RegOp("set", "HKLM", key, "MaxSize", REG_DWORD, log.max_size))
+    if log.retention is not None:
+        ops.append(RegOp("set", "HKLM", key, "Retention", REG_DWORD, RETAIN_EVENTS if log.retention else 0))
+    if log.auto_backup is not None:
+        ops.append(RegOp("set", "HKLM", key, "AutoBackupLogFiles", REG_DWORD, 1 if log.auto_backup else 0))
+    return ops
+
+
+def bake_plan(plan, image):
+    """Write a Plan into an OfflineImage (saved by image.close()); returns a BakeReport"""
+    started = time.perf_counter()
+    report = BakeReport()
+    ops = list(plan.registry.values())
+    for svc in plan.services.values():
+        if svc.start is None:
+            continue
+        try:
+            installed = image.read_key("HKLM", f"{SERVICES_KEY}\\{svc.name}") is not None
+        except OSError as e:
+            report.failures.append((f"Service {svc.name}", str(e)))
+            continue
+        if installed:
+            ops += service_ops(svc)
+        else:
+            report.skipped.append((f"Service {svc.name}", "not installed in the image"))
+    for log in plan.eventlogs.values():
+        if "/" in log.channel:
+            report.skipped.append((f"Event log {log.channel}", "only classic logs can be set offline"))
+        else:
+            ops += eventlog_ops(log)
+    if plan.power:
+        ops.append(RegOp("set", "HKLM", POWER_SCHEMES_KEY, "ActivePowerScheme", REG_SZ, plan.power[1].scheme))
+    for tweak_id, cmd in plan.commands:
+        report.skipped.append((f"{tweak_id}: {command_text(cmd)}", "needs a running system"))
+    for tweak_id, call in plan.calls:
+        report.skipped.append((f"{tweak_id}: {call.handler}", "needs a running system"))
+
+    probe = StateProbe(image)
+    pending = []
+    for op in ops:
+        try:
+            if probe.registry_compliant(op):
+                report.unchanged += 1
+            else:
+                pending.append(op)
+        except OSError as e:
+            report.failures.append((str(op), str(e)))
+    for op, error in image.apply(pending):
+        if error is None:
+            report.written.append(str(op))
+        else:
+            report.failures.append((str(op), str(error)))
+    report.duration = time.perf_counter() - started
+    return report
@@ -0,0 +1,182 @@
+"""
+Operation log for Windows 11 Optimizer.
+
+Every command, registry write, PowerShell script and engine step is
+recorded as one JSON line (time, session, tweak, op, target, duration,
+exit code, output) in an on-disk log that rotates by size. Outputs are
+capped so a chatty command cannot grow the log without bound, nothing is
+kept in memory, and reports are produced by streaming the file back.
+"""
+import contextlib
+import datetime
+import json
+import os
+import threading
+import uuid
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUPS = 3
+OUTPUT_LIMIT = 4096  # bytes of output kept per event
+
+_context = threading.local()
+
+
+@contextlib.contextmanager
+def tweak_scope(tweak_id):
+    """Attribute events recorded on this thread to tweak_id while the block runs"""
+    previous = getattr(_context, "tweak", None)
+    _context.tweak = tweak_id
+    try:
+        yield
+    finally:
+        _context.tweak = previous
+
+
+def current_tweak():
+    return getattr(_context, "tweak", None)
+
+
+def cap_output(text, limit=OUTPUT_LIMIT):
+    """Trim text to at most limit UTF-8 bytes; returns (text, original byte length)"""
+    if text is None:
+        return None, 0
+    text = str(text)
+    data = text.encode("utf-8", errors="replace")
+    if len(data) <= limit:
+        return text, len(data)
+    return data[:limit].decode("utf-8", errors="ignore"), len(data)
+
+
+class OperationLog:
+    """Append-only JSONL event log with size-based rotation (path, path.1 ... path.N)"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS,
+                 output_limit=OUTPUT_LIMIT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.output_limit = output_limit
+        self.session = uuid.uuid4().hex[:12]
+        self.count = 0  # events recorded by this session
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _rotate(self):
+        """Shift path.N-1 -> path.N ... path -> path.1, dropping the oldest"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def record(self, op, target="", output=None, exit_code=None, duration=None, error=None,
+               tweak=None, **fields):
+        """Append one event; output and error are capped at output_limit bytes"""
+        event = {
+            "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "session": self.session,
+            "tweak": tweak or current_tweak(),
+            "op": op,
+            "target": target,
+        }
+        if duration is not None:
+            event["duration"] = round(duration, 4)
+        if exit_code is not None:
+            event["exit_code"] = exit_code
+        for key, value in (("output", output), ("error", error)):
+            if value is None:
+                continue
+            text, size = cap_output(value, self.output_limit)
+            event[key] = text
+            if text is not None and size > len(text.encode("utf-8")):
+                event[f"{key}_bytes"] = size
+        event.update(fields)
+        line = json.dumps(event, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                f = self._open()
+                f.write(line)
+                f.flush()
+                self.count += 1
+                if f.tell() >= self.max_bytes:
+                    self._rotate()
+            except OSError as e:
+                # Logging must never break a tweak
+                print(f"Operation log error: {e}")
+        return event
+
+    def files(self):
+        """Log files oldest first"""
+        names = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)] + [self.path]
+        return [name for name in names if os.path.exists(name)]
+
+    def events(self, session=None):
+        """Stream events oldest first, optionally only those of one session"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        for name in self.files():
+            try:
+                f = open(name, encoding="utf-8")
+            except OSError:
+                continue  # Rotated away while we were reading
+            with f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if session is None or event.get("session") == session:
+                        yield event
+
+    def export(self, out, session=None, raw=False):
+        """Stream events into an open text file, as JSONL or readable text; returns the count"""
+        written = 0
+        for event in self.events(session):
+            if raw:
+                out.write(json.dumps(event, default=str, separators=(",", ":")) + "\n")
+            else:
+                out.write(format_event(event) + "\n")
+            written += 1
+        return written
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def format_event(event):
+    """Render an event the way the text report has always looked"""
+    header = f"[{event.get('time', '')}] {event.get('op', '')}: {event.get('target', '')}"
+    details = []
+    if event.get("tweak"):
+        details.append(f"tweak={event['tweak']}")
+    if "exit_code" in event:
+        details.append(f"exit={event['exit_code']}")
+    if "duration" in event:
+        details.append(f"{event['duration']:.2f}s")
+    if details:
+        header += f" ({', '.join(details)})"
+    lines = [header]
+    if event.get("error") is not None:
+        lines.append(f"Error: {event['error']}")
+    elif event.get("output"):
+        lines.append(f"Output: {event['output']}")
+    for key in ("output", "error"):
+        if f"{key}_bytes" in event:
+            lines.append(f"[{key} truncated, {event[f'{key}_bytes']} bytes total]")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,128 @@
+"""
+Execution planner for Windows 11 Optimizer.
+
+compile_plan() merges the ops of a set of catalog tweaks into one minimal
+Plan: registry values are deduplicated last-writer-wins and grouped by
+key, service ops are merged per service and event log settings per
+channel, only the last power scheme is kept and identical commands and
+PowerShell scripts run once.
+"""
+from registry_backend import RegOp, group_by_key
+from tweak_catalog import CallOp, CmdOp, EventLogOp, PowerOp, PsOp, ServiceOp, command_text, get_tweak
+
+
+class Plan:
+    """The deduplicated work for one run, plus counters describing it"""
+
+    def __init__(self):
+        self.tweaks = []             # tweak ids in selection order
+        self.registry = {}           # value_id -> RegOp (last writer wins)
+        self.owners = {}             # value_id -> tweak id that wrote the winning op
+        self.services = {}           # service name (lower) -> ServiceOp
+        self.service_owners = {}     # service name (lower) -> tweak id
+        self.eventlogs = {}          # channel (lower) -> EventLogOp
+        self.eventlog_owners = {}    # channel (lower) -> tweak id
+        self.power = None            # (tweak id, PowerOp) of the last power op
+        self.commands = []           # (tweak id, CmdOp or PsOp), identical commands kept once
+        self.calls = []              # (tweak id, CallOp)
+        self.requested_ops = 0       # ops before deduplication
+
+    def registry_groups(self):
+        """Registry ops grouped by key, in first-seen key order"""
+        return group_by_key(self.registry.values())
+
+    @property
+    def planned_ops(self):
+        """Number of operations the plan will actually execute"""
+        return (len(self.registry) + len(self.services) + len(self.eventlogs) + (1 if self.power else 0)
+                + len(self.commands) + len(self.calls))
+
+    def stats(self):
+        """Counters used for the completion message and the report"""
+        return {
+            "tweaks": len(self.tweaks),
+            "requested_ops": self.requested_ops,
+            "planned_ops": self.planned_ops,
+            "deduplicated": self.requested_ops - self.planned_ops,
+            "registry_values": len(self.registry),
+            "registry_keys": len(self.registry_groups()),
+            "services": len(self.services),
+            "eventlogs": len(self.eventlogs),
+            "power": 1 if self.power else 0,
+            "commands": len(self.commands),
+            "calls": len(self.calls),
+        }
+
+    def describe(self):
+        """Human readable listing of the plan"""
+        lines = [f"Tweaks: {', '.join(self.tweaks)}"]
+        for group in self.registry_groups():
+            lines.append(f"[{group[0].hive}\\{group[0].path}]")
+            for op in group:
+                lines.append(f"    {op}")
+        for svc in self.services.values():
+            action = "stop, " if svc.stop else ""
+            lines.append(f"Service {svc.name}: {action}start={svc.start}")
+        for log in self.eventlogs.values():
+            settings = ", ".join(f"{prop}={getattr(log, prop)}" for prop in log._fields[1:]
+                                 if getattr(log, prop) is not None)
+            lines.append(f"Event log {log.channel}: {settings}")
+        if self.power:
+            lines.append(f"Power scheme: {self.power[1].scheme}")
+        for tweak_id, cmd in self.commands:
+            lines.append(f"Command ({tweak_id}): {command_text(cmd)}")
+        for tweak_id, call in self.calls:
+            lines.append(f"Handler ({tweak_id}): {call.handler}")
+        return "\n".join(lines)
+
+
+def merge_service(current, op):
+    """Combine two ops on the same service: stop if either stops, last start type wins"""
+    if current is None:
+        return op
+    start = op.start if op.start is not None else current.start
+    return ServiceOp(op.name, start, current.stop or op.stop)
+
+
+def merge_eventlog(current, op):
+    """Combine two ops on the same channel: each property set later wins"""
+    if current is None:
+        return op
+    return EventLogOp(op.channel, *(new if new is not None else old
+                                    for old, new in zip(current[1:], op[1:])))
+
+
+def compile_plan(tweak_ids):
+    """Compile the selected tweak ids into a deduplicated Plan"""
+    plan = Plan()
+    seen_commands = set()
+    for tweak_id in dict.fromkeys(tweak_ids):
+        tweak = get_tweak(tweak_id)
+        plan.tweaks.append(tweak.id)
+        for op in tweak.ops:
+            plan.requested_ops += 1
+            if isinstance(op, RegOp):
+                # Re-inserting moves nothing: dict keeps first-seen order, value is replaced
+                plan.registry[op.value_id] = op
+                plan.owners[op.value_id] = tweak.id
+            elif isinstance(op, ServiceOp):
+                name = op.name.lower()
+                plan.services[name] = merge_service(plan.services.get(name), op)
+                plan.service_owners[name] = tweak.id
+            elif isinstance(op, EventLogOp):
+                channel = op.channel.lower()
+                plan.eventlogs[channel] = merge_eventlog(plan.eventlogs.get(channel), op)
+                plan.eventlog_owners[channel] = tweak.id
+            elif isinstance(op, PowerOp):
+                plan.power = (tweak.id, op)
+            elif isinstance(op, (CmdOp, PsOp)):
+                # Namedtuples compare by value, so key on the op type as well
+                command_key = (type(op).__name__, op[0])
+                if command_key not in seen_commands:
+                    seen_commands.add(command_key)
+                    plan.commands.append((tweak.id, op))
+            elif isinstance(op, CallOp):
+                plan.calls.append((tweak.id, op))
+            else:
+                raise TypeError(f"Unsupported op in {tweak.id}: {op!r}")
+    return plan
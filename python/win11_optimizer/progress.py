@@ -0,0 +1,85 @@
+"""
+Progress channel for Windows 11 Optimizer.
+
+Worker threads publish status changes ("registry running", "probe dns
+ok in 120 ms") into a ProgressChannel; the GUI drains it from the Tk
+thread with root.after and applies a whole batch per frame. Nothing here
+touches Tk, so the engine, the executor and the CLI can publish freely.
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+OK = "ok"
+WARN = "warn"
+FAIL = "fail"
+
+FINISHED = (DONE, OK, WARN, FAIL)
+
+ProgressEvent = namedtuple("ProgressEvent", "key label status elapsed detail output")
+
+
+class ProgressChannel:
+    """Thread-safe queue of ProgressEvents that also times each key from running to finished"""
+
+    def __init__(self):
+        self._events = queue.SimpleQueue()
+        self._started = {}
+        self._steps = {}     # step group -> key of its current step
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def publish(self, key, label=None, status=RUNNING, detail="", output="", elapsed=None):
+        """Report the status of key; elapsed is measured from its first RUNNING event unless given"""
+        now = time.monotonic()
+        with self._lock:
+            if status == RUNNING and self._started.get(key) is None:
+                self._started[key] = now
+            if elapsed is None and self._started.get(key) is not None:
+                elapsed = now - self._started[key]
+        self._events.put(ProgressEvent(key, label or key, status, elapsed, detail, output))
+
+    def step(self, key, label=None, detail=""):
+        """
+        Start key and finish the step before it, for linear procedures.
+        Steps are grouped by the prefix before ":" so concurrent procedures
+        do not finish each other's steps.
+        """
+        group = key.partition(":")[0] if ":" in key else ""
+        with self._lock:
+            previous = self._steps.get(group)
+            self._steps[group] = key
+        if previous is not None and previous != key:
+            self.finish(previous)
+        self.publish(key, label, RUNNING, detail)
+
+    def finish(self, key, status=DONE, detail="", output=""):
+        with self._lock:
+            started = self._started.get(key)
+            self._started[key] = None
+        elapsed = None if started is None else time.monotonic() - started
+        self.publish(key, None, status, detail, output, elapsed=elapsed)
+
+    def close(self, summary=""):
+        """Mark the operation complete; the summary is shown by the consumer"""
+        with self._lock:
+            running = [k for k, v in self._started.items() if v is not None]
+        for key in running:
+            self.finish(key)
+        self._events.put(ProgressEvent(None, None, DONE, None, summary, ""))
+        self.closed = True
+
+    def drain(self, limit=500):
+        """Events published since the last drain (at most limit)"""
+        events = []
+        while len(events) < limit:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
@@ -0,0 +1,133 @@
+"""
+Live results pane for Windows 11 Optimizer.
+
+A Toplevel with one row per tweak / task / probe (status, seconds,
+detail) fed from a progress.ProgressChannel. The channel is drained on
+the Tk thread every FRAME_MS and all pending events are applied in one
+go, so worker threads never touch widgets and a burst of events costs a
+single redraw. Selecting a row shows its raw output underneath.
+"""
+import time
+import tkinter as tk
+from tkinter import scrolledtext, ttk
+
+from progress import FAIL, FINISHED, OK, PENDING, RUNNING, WARN
+
+FRAME_MS = 50
+
+STATUS_TEXT = {PENDING: "waiting", RUNNING: "running...", "done": "done", OK: "OK", WARN: "WARNING", FAIL: "FAILED"}
+STATUS_COLORS = {RUNNING: "#1a5fb4", OK: "#26a269", "done": "#26a269", WARN: "#c64600", FAIL: "#c01c28"}
+
+
+class ProgressPane:
+    """Results window bound to one ProgressChannel"""
+
+    def __init__(self, root, title, channel, on_close=None):
+        self.root = root
+        self.channel = channel
+        self.on_close = on_close
+        self._rows = {}      # key -> tree item id
+        self._running = {}   # key -> (monotonic start, elapsed already reported)
+        self._outputs = {}   # key -> raw output
+        self._finished = False
+        self.started = time.monotonic()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("820x560")
+
+        self.summary = tk.Label(self.window, text="Working...", anchor="w", font=("Segoe UI", 9, "bold"))
+        self.summary.pack(fill="x", padx=10, pady=(10, 4))
+
+        panes = tk.PanedWindow(self.window, orient=tk.VERTICAL, sashrelief=tk.RAISED)
+        panes.pack(fill="both", expand=True, padx=10)
+
+        tree_frame = tk.Frame(panes)
+        self.tree = ttk.Treeview(tree_frame, columns=("status", "time", "detail"), show="tree headings", height=14)
+        self.tree.heading("#0", text="Item")
+        self.tree.heading("status", text="Status")
+        self.tree.heading("time", text="Time (s)")
+        self.tree.heading("detail", text="Detail")
+        self.tree.column("#0", width=280)
+        self.tree.column("status", width=90, anchor="center")
+        self.tree.column("time", width=70, anchor="e")
+        self.tree.column("detail", width=340)
+        for status, color in STATUS_COLORS.items():
+            self.tree.tag_configure(status, foreground=color)
+        scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scroll.pack(side="right", fill="y")
+        self.tree.bind("<<TreeviewSelect>>", self._show_output)
+        panes.add(tree_frame, stretch="always")
+
+        self.output = scrolledtext.ScrolledText(panes, wrap=tk.WORD, height=8, state=tk.DISABLED)
+        panes.add(self.output, stretch="never")
+
+        tk.Button(self.window, text="Close", command=self.close, width=15).pack(pady=8)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._poll()
+
+    def _poll(self):
+        """Apply everything published since the last frame, then tick running timers"""
+        if not self.window.winfo_exists():
+            return
+        for event in self.channel.drain():
+            if event.key is None:
+                self._finish(event.detail)
+            else:
+                self._apply(event)
+        now = time.monotonic()
+        for key, (since, elapsed) in self._running.items():
+            self.tree.set(self._rows[key], "time", f"{elapsed + now - since:.1f}")
+        if not self._finished or self._running:
+            self.window.after(FRAME_MS, self._poll)
+
+    def _apply(self, event):
+        values = (STATUS_TEXT.get(event.status, event.status),
+                  "" if event.elapsed is None else f"{event.elapsed:.2f}",
+                  event.detail)
+        item = self._rows.get(event.key)
+        if item is None:
+            item = self.tree.insert("", "end", text=event.label, values=values, tags=(event.status,))
+            self._rows[event.key] = item
+        else:
+            self.tree.item(item, values=values, tags=(event.status,))
+            if event.label != event.key:
+                self.tree.item(item, text=event.label)
+        if event.status == RUNNING:
+            self._running[event.key] = (time.monotonic(), event.elapsed or 0.0)
+            self.tree.see(item)
+        elif event.status in FINISHED:
+            self._running.pop(event.key, None)
+        if event.output:
+            self._outputs[event.key] = event.output
+
+    def _finish(self, summary):
+        self._finished = True
+        self._running.clear()
+        counts = {}
+        for item in self._rows.values():
+            tag = (self.tree.item(item, "tags") or ("",))[0]
+            counts[tag] = counts.get(tag, 0) + 1
+        failed = counts.get(FAIL, 0)
+        text = f"Finished in {time.monotonic() - self.started:.1f}s"
+        if failed:
+            text += f" - {failed} failed"
+        if summary:
+            text += f" - {summary}"
+        self.summary.config(text=text, fg=STATUS_COLORS[FAIL] if failed else STATUS_COLORS[OK])
+
+    def _show_output(self, _event=None):
+        selected = self.tree.selection()
+        key = next((k for k, item in self._rows.items() if selected and item == selected[0]), None)
+        self.output.config(state=tk.NORMAL)
+        self.output.delete("1.0", tk.END)
+        self.output.insert(tk.INSERT, self._outputs.get(key, ""))
+        self.output.config(state=tk.DISABLED)
+
+    def close(self):
+        if self.window.winfo_exists():
+            self.window.destroy()
+        if self.on_close:
+            self.on_close()
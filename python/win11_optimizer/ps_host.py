@@ -0,0 +1,192 @@
+"""
+Persistent PowerShell host for Windows 11 Optimizer.
+
+Starting powershell.exe costs 300-1000 ms, so instead of one process per
+script a long-lived host reads scripts from stdin and answers with the
+script output followed by a unique end marker line. Each script has its
+own timeout; a host that times out or dies is killed and transparently
+restarted on the next call.
+
+The framing is pluggable: powershell_frame() for the real host and
+shell_frame() for driving /bin/sh as a fake host on Linux.
+"""
+import atexit
+import base64
+import queue
+import subprocess
+import threading
+import time
+import uuid
+
+POWERSHELL_ARGV = [
+    "powershell", "-NoLogo", "-NoProfile", "-NonInteractive",
+    "-ExecutionPolicy", "Bypass", "-Command", "-",
+]
+
+# Run once when a host starts so output decodes predictably
+POWERSHELL_PRELUDE = "[Console]::OutputEncoding = [Text.Encoding]::UTF8; $ProgressPreference = 'SilentlyContinue'"
+
+DEFAULT_TIMEOUT = 30
+
+
+class HostError(Exception):
+    """The host process died or could not be started"""
+
+
+class HostTimeout(HostError):
+    """A script did not finish within its timeout"""
+
+
+def powershell_frame(script, marker):
+    """
+    One input line that runs script as a script block and prints its
+    output, then "<marker> <1|0>" for success/failure. Base64 keeps
+    quoting and multi-line scripts intact.
+    """
+    encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+    return (
+        "try { $__o = & ([ScriptBlock]::Create([Text.Encoding]::UTF8.GetString("
+        f"[Convert]::FromBase64String('{encoded}')))) 2>&1; $__ok = $? }} "
+        "catch { $__o = $_; $__ok = $false }; "
+        "[Console]::Out.Write(($__o | Out-String -Width 4096)); [Console]::Out.WriteLine(''); "
+        f"[Console]::Out.WriteLine('{marker} ' + [int]$__ok); [Console]::Out.Flush()"
+    )
+
+
+def encoded_command(script):
+    """Base64 UTF-16LE form of a script for `powershell -EncodedCommand`"""
+    return base64.b64encode(script.encode("utf-16-le")).decode("ascii")
+
+
+def shell_frame(script, marker):
+    """POSIX sh framing, used to drive /bin/sh as a fake host in tests"""
+    return f'{{ {script}\n}} 2>&1; if [ $? -eq 0 ]; then echo "{marker} 1"; else echo "{marker} 0"; fi'
+
+
+class PowerShellHost:
+    """One long-lived interpreter process fed over a pipe"""
+
+    def __init__(self, argv=None, framer=powershell_frame, prelude=POWERSHELL_PRELUDE):
+        self.argv = list(argv or POWERSHELL_ARGV)
+        self.framer = framer
+        self.prelude = prelude
+        self.restarts = 0
+        self._started = False
+        self._proc = None
+        self._lines = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self):
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        try:
+            self._proc = subprocess.Popen(
+                self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace",
+                bufsize=1, creationflags=creationflags)
+        except OSError as e:
+            self._proc = None
+            raise HostError(f"Could not start {self.argv[0]}: {e}") from e
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._lines),
+                         daemon=True, name="pshost-reader").start()
+        if self.prelude:
+            self._send(self.prelude)
+
+    @staticmethod
+    def _pump(proc, lines):
+        """Forward stdout lines to the queue; None marks end of stream"""
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def _send(self, line):
+        try:
+            self._proc.stdin.write(line + "\n")
+            self._proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            self._kill()
+            raise HostError(f"Host pipe closed: {e}") from e
+
+    def _kill(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.kill()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def run(self, script, timeout=DEFAULT_TIMEOUT):
+        """Run one script; returns (succeeded, output). Raises HostTimeout / HostError."""
+        with self._lock:
+            if not self.alive:
+                if self._started:
+                    self.restarts += 1
+                self._start()
+                self._started = True
+            marker = f"__W11OPT_END_{uuid.uuid4().hex}__"
+            # The timeout covers the whole script, not the gap between two output lines
+            deadline = None if timeout is None else time.monotonic() + timeout
+            self._send(self.framer(script, marker))
+            output = []
+            while True:
+                try:
+                    line = self._lines.get(timeout=None if deadline is None else
+                                           max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    # The host is stuck in this script - throw it away
+                    self._kill()
+                    raise HostTimeout(f"Timeout after {timeout} seconds") from None
+                if line is None:
+                    self._kill()
+                    raise HostError("Host exited while running script")
+                if line.startswith(marker):
+                    succeeded = line[len(marker):].strip() == "1"
+                    return succeeded, "".join(output).strip()
+                output.append(line)
+
+    def close(self):
+        with self._lock:
+            if self.alive:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+
+class PowerShellPool:
+    """A small fixed set of hosts shared by worker threads; hosts start on first use"""
+
+    def __init__(self, size=2, host_factory=PowerShellHost):
+        self._idle = queue.LifoQueue()
+        self._hosts = [host_factory() for _ in range(max(1, size))]
+        for host in self._hosts:
+            self._idle.put(host)
+        atexit.register(self.close)
+
+    def run(self, script, timeout=DEFAULT_TIMEOUT):
+        host = self._idle.get()
+        try:
+            return host.run(script, timeout=timeout)
+        finally:
+            self._idle.put(host)
+
+    @property
+    def restarts(self):
+        return sum(host.restarts for host in self._hosts)
+
+    def close(self):
+        for host in self._hosts:
+            host.close()
+
+
+def fake_host(shell=None):
+    """A PowerShellHost speaking the sh framing, for exercising the host on Linux"""
+    return PowerShellHost(argv=[shell or "/bin/sh"], framer=shell_frame, prelude=None)
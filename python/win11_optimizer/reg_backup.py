@@ -0,0 +1,392 @@
+"""
+Indexed reader for .reg backups for Windows 11 Optimizer.
+
+Before targeted snapshots, every apply exported all of HKCU and HKLM with
+`reg export` into registry_backup_<time>.reg (and ..._HKLM.reg). Those
+UTF-16 files run to hundreds of MB. RegBackup reads one without importing
+or loading it:
+- the first use streams the file once, looking only for [key] lines, and
+  writes a sidecar index (<file>.idx) of key -> byte range, sorted by key;
+- lookups binary-search the index file and parse just the byte ranges of
+  the keys asked for, so one key costs a few seeks however large the
+  backup is.
+
+Memory stays bounded: the file is read in chunks and the index is sorted
+in runs of run_size keys merged from temporary files. A stale index (the
+backup's size or modification time changed) is rebuilt.
+
+Values come back as RegOps, so a partial restore is just applying them.
+"""
+import heapq
+import json
+import os
+import tempfile
+
+from regf import decode_value
+from registry_backend import (REG_BINARY, REG_DWORD, REG_MULTI_SZ, REG_QWORD, REG_SZ, REG_TYPE_NAMES, RegOp,
+                              split_key)
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+CHUNK_SIZE = 1 << 20     # bytes read at a time
+RUN_SIZE = 100000        # index entries sorted in memory before spilling to a temporary file
+ANSI_ENCODING = "mbcs" if os.name == "nt" else "cp1252"   # REGEDIT4 files are in the ANSI code page
+ROOT_NAMES = {"HKCU": "HKEY_CURRENT_USER", "HKLM": "HKEY_LOCAL_MACHINE", "HKU": "HKEY_USERS",
+              "HKCR": "HKEY_CLASSES_ROOT", "HKCC": "HKEY_CURRENT_CONFIG"}
+
+
+def normalize_key(key):
+    """Index form of a key: full root name, lower case ("HKCU\\Software" -> "hkey_current_user\\software")"""
+    hive, path = split_key(key.strip().strip("[]"))
+    return (ROOT_NAMES[hive] + ("\\" + path if path else "")).lower()
+
+
+def unquote(text, start):
+    """(string, index after the closing quote) of the quoted string at text[start]"""
+    parts, i = [], start + 1
+    while True:
+        quote = text.find('"', i)
+        if quote == -1:
+            raise ValueError(f"Unterminated string in {text!r}")
+        escape = text.find("\\", i, quote)
+        if escape == -1:
+            parts.append(text[i:quote])
+            return "".join(parts), quote + 1
+        # reg export escapes only \\ and \" - keep the character after the backslash
+        parts.append(text[i:escape])
+        parts.append(text[escape + 1:escape + 2])
+        i = escape + 2
+
+
+def parse_value(line):
+    """(name, type, data) of a value line, name None for @ and type None for a deletion; None if not a value"""
+    if line.startswith("@"):
+        name, rest = None, line[1:]
+    elif line.startswith('"'):
+        name, end = unquote(line, 0)
+        rest = line[end:]
+    else:
+        return None
+    if not rest.startswith("="):
+        raise ValueError(f"Malformed value line {line!r}")
+    data = rest[1:]
+    if data == "-":
+        return name, None, None
+    if data.startswith('"'):
+        return name, REG_SZ, unquote(data, 0)[0]
+    if data.lower().startswith("dword:"):
+        return name, REG_DWORD, int(data[6:], 16)
+    if data.lower().startswith("hex"):
+        kind, _, octets = data.partition(":")
+        reg_type = int(kind[4:-1], 16) if kind.startswith("hex(") else REG_BINARY
+        raw = bytes.fromhex(octets.replace(",", "").replace(" ", ""))
+        return name, reg_type, decode_value(reg_type, raw)
+    raise ValueError(f"Unknown value data in {line!r}")
+
+
+def format_data(reg_type, data):
+    """Value data as `reg query` prints it"""
+    if reg_type in (REG_DWORD, REG_QWORD):
+        return f"0x{data:x}"
+    if reg_type == REG_MULTI_SZ:
+        return "\\0".join(data)
+    if isinstance(data, bytes):
+        return data.hex().upper()
+    return str(data)
+
+
+class RegBackup:
+    """One .reg export file and its sidecar index"""
+
+    def __init__(self, path, index_path=None, chunk_size=CHUNK_SIZE, run_size=RUN_SIZE):
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self.chunk_size = chunk_size - chunk_size % 2   # keep UTF-16 chunks on character boundaries
+        self.run_size = run_size
+        with open(path, "rb") as f:
+            head = f.read(2)
+        if head == b"\xff\xfe":
+            self.encoding, self._origin = "utf-16-le", 2
+        else:
+            self.encoding, self._origin = ANSI_ENCODING, 0
+        self._newline = "\n".encode(self.encoding)
+        self._width = len(self._newline)
+
+    # -----------------------------
+    # READING
+    # -----------------------------
+    def _find_newline(self, buffer, start, base):
+        """Index of the next newline in buffer at or after start that begins on a character boundary"""
+        i = buffer.find(self._newline, start)
+        while i != -1 and (base + i - self._origin) % self._width:
+            i = buffer.find(self._newline, i + 1)
+        return i
+
+    def _lines(self, f, start, end):
+        """Decoded lines of the byte range [start, end), read in chunks"""
+        f.seek(start)
+        base, pos, buffer = start, start, b""
+        while True:
+            chunk = f.read(min(self.chunk_size, end - pos)) if pos < end else b""
+            pos += len(chunk)
+            buffer += chunk
+            line_start = 0
+            while True:
+                i = self._find_newline(buffer, line_start, base)
+                if i == -1:
+                    break
+                yield buffer[line_start:i].decode(self.encoding, errors="replace").rstrip("\r")
+                line_start = i + self._width
+            base += line_start
+            buffer = buffer[line_start:]
+            if not chunk:
+                if buffer:
+                    yield buffer.decode(self.encoding, errors="replace").rstrip("\r")
+                return
+
+    def _logical_lines(self, f, start, end):
+        """Lines with hex continuations (a trailing backslash) joined"""
+        pending = None
+        for line in self._lines(f, start, end):
+            if pending is not None:
+                line = pending + line.lstrip()
+                pending = None
+            if line.endswith("\\") and not line.startswith("["):
+                pending = line[:-1]
+                continue
+            yield line
+        if pending is not None:
+            yield pending
+
+    @staticmethod
+    def _parse(lines):
+        """(key text, [RegOp]) for each [key] in lines; deleted keys ([-key]) are skipped"""
+        key, ops = None, []
+        for line in lines:
+            if line.startswith("["):
+                if key is not None:
+                    yield key, ops
+                key, ops = line.strip()[1:-1], []
+                if key.startswith("-"):
+                    key = None
+                else:
+                    hive, path = split_key(key)
+                continue
+            value = parse_value(line) if key is not None else None
+            if value is None:
+                continue
+            name, reg_type, data = value
+            if reg_type is None:
+                ops.append(RegOp("delete", hive, path, name, None, None))
+            else:
+                ops.append(RegOp("set", hive, path, name, reg_type, data))
+        if key is not None:
+            yield key, ops
+
+    def _section(self, f, start, end):
+        """(key text, [RegOp]) of the section at [start, end)"""
+        return next(self._parse(self._logical_lines(f, start, end)))
+
+    def sections(self):
+        """Every (key text, [RegOp]) in file order, parsed in one streaming pass"""
+        with open(self.path, "rb") as f:
+            yield from self._parse(self._logical_lines(f, self._origin, os.fstat(f.fileno()).st_size))
+
+    # -----------------------------
+    # INDEX
+    # -----------------------------
+    def _scan(self):
+        """(key lower, start, end) of every [key] section in file order; reads only the key lines"""
+        marker = "\n[".encode(self.encoding)
+        size = os.path.getsize(self.path)
+        previous = None
+        with open(self.path, "rb") as f:
+            f.seek(self._origin)
+            base, buffer = self._origin, b""
+            while True:
+                chunk = f.read(self.chunk_size)
+                buffer += chunk
+                search, cut = 0, None
+                while True:
+                    i = buffer.find(marker, search)
+                    if i != -1 and (base + i - self._origin) % self._width:
+                        search = i + 1
+                        continue
+                    if i == -1:
+                        cut = max(0, len(buffer) - len(marker) + self._width)
+                        cut -= (base + cut - self._origin) % self._width
+                        break
+                    key_start = i + self._width
+                    line_end = self._find_newline(buffer, key_start, base)
+                    if line_end == -1 and chunk:
+                        cut = i   # The key line continues in the next chunk
+                        break
+                    line = buffer[key_start:line_end if line_end != -1 else len(buffer)]
+                    text = line.decode(self.encoding, errors="replace").strip()
+                    if text.endswith("]") and not text.startswith("[-"):
+                        if previous is not None:
+                            yield previous[0], previous[1], base + key_start
+                        previous = (text[1:-1].lower(), base + key_start)
+                    if line_end == -1:
+                        cut = len(buffer)
+                        break
+                    search = line_end
+                if not chunk:
+                    break
+                base += cut
+                buffer = buffer[cut:]
+        if previous is not None:
+            yield previous[0], previous[1], size
+
+    def _spill(self, run, folder):
+        run.sort()
+        fd, path = tempfile.mkstemp(prefix=".regidx_", dir=folder)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(f"{start}\t{end}\t{key}\n" for key, start, end in run)
+        return path
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                start, end, key = line.rstrip("\n").split("\t", 2)
+                yield key, int(start), int(end)
+
+    def _header(self):
+        stat = os.stat(self.path)
+        return {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "encoding": self.encoding}
+
+    def index_is_current(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return False
+        return {k: header.get(k) for k in ("version", "size", "mtime_ns", "encoding")} == self._header()
+
+    def build_index(self):
+        """Stream the backup once and write the sorted sidecar index; returns the number of key sections"""
+        folder = os.path.dirname(os.path.abspath(self.index_path))
+        header = self._header()
+        runs, run, count = [], [], 0
+        try:
+            for entry in self._scan():
+                run.append(entry)
+                count += 1
+                if len(run) >= self.run_size:
+                    runs.append(self._spill(run, folder))
+                    run = []
+            run.sort()
+            header["keys"] = count
+            fd, temp_path = tempfile.mkstemp(prefix=".regidx_", dir=folder)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps(header) + "\n")
+                merged = heapq.merge(run, *(self._read_run(path) for path in runs))
+                f.writelines(f"{start}\t{end}\t{key}\n" for key, start, end in merged)
+            os.replace(temp_path, self.index_path)
+        finally:
+            for path in runs:
+                os.remove(path)
+        return count
+
+    def _ensure_index(self):
+        if not self.index_is_current():
+            self.build_index()
+
+    @staticmethod
+    def _entry(line):
+        start, end, key = line.decode("utf-8").rstrip("\n").split("\t", 2)
+        return key, int(start), int(end)
+
+    def _first_at_or_after(self, f, key, body, size):
+        """Offset of the first index line whose key is >= key (binary search over the file)"""
+        lo, hi = body, size   # lo is a line start; hi is the end or a line start whose key is >= key
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            f.readline()
+            start = f.tell()
+            if start >= hi:
+                break
+            if self._entry(f.readline())[0] < key:
+                lo = f.tell()
+            else:
+                hi = start
+        f.seek(lo)
+        while f.tell() < hi:
+            start = f.tell()
+            if self._entry(f.readline())[0] >= key:
+                return start
+        return hi
+
+    def _entries(self, key, prefix=False):
+        """(key, start, end) of index lines equal to key, or starting with it when prefix is true"""
+        self._ensure_index()
+        with open(self.index_path, "rb") as f:
+            f.readline()
+            body, size = f.tell(), os.fstat(f.fileno()).st_size
+            f.seek(self._first_at_or_after(f, key, body, size))
+            for line in iter(f.readline, b""):
+                entry = self._entry(line)
+                if entry[0] != key and not (prefix and entry[0].startswith(key)):
+                    return
+                yield entry
+
+    # -----------------------------
+    # LOOKUPS
+    # -----------------------------
+    def ranges(self, key, recurse=False):
+        """(start, end) byte ranges of a key's sections (and its subkeys' with recurse), in file order"""
+        wanted = normalize_key(key)
+        found = [(start, end) for _, start, end in self._entries(wanted)]
+        if recurse:
+            found += [(start, end) for _, start, end in self._entries(wanted + "\\", prefix=True)]
+        return sorted(found)
+
+    def values(self, key, recurse=False):
+        """[(key text, [RegOp])] of the sections of a key (and its subkeys with recurse), in file order"""
+        with open(self.path, "rb") as f:
+            return [self._section(f, start, end) for start, end in self.ranges(key, recurse)]
+
+    def read_key(self, key):
+        """{name_lower: (type, data)} of a key as backed up, or None if the backup does not hold it"""
+        sections = self.values(key)
+        if not sections:
+            return None
+        values = {}
+        for _, ops in sections:
+            for op in ops:
+                if op.action == "set":
+                    values[(op.name or "").lower()] = (op.type, op.data)
+                else:
+                    values.pop((op.name or "").lower(), None)
+        return values
+
+    def restore_ops(self, key, recurse=False):
+        """RegOps that put a key's backed-up values (and its subkeys' with recurse) back"""
+        return [op for _, ops in self.values(key, recurse) for op in ops]
+
+    def query(self, key, name=None, recurse=False):
+        """Lines in the format of `reg query KEY [/v NAME] [/s]`"""
+        return query_lines(self.values(key, recurse), name)
+
+
+def shown_values(ops, name=None):
+    """The set ops of a section, or only the one for value name"""
+    return [op for op in ops if op.action == "set" and (name is None or (op.name or "").lower() == name.lower())]
+
+
+def query_lines(sections, name=None):
+    """`reg query` style lines for [(key text, [RegOp])]; keys without the named value are left out"""
+    lines = []
+    for key_text, ops in sections:
+        shown = shown_values(ops, name)
+        if name is not None and not shown:
+            continue
+        lines.append(key_text)
+        for op in shown:
+            lines.append(f"    {op.name if op.name is not None else '(Default)'}    "
+                         f"{REG_TYPE_NAMES.get(op.type, f'REG_0x{op.type:x}')}    {format_data(op.type, op.data)}")
+        lines.append("")
+    return lines
@@ -0,0 +1,619 @@
+"""
+Offline registry hive files for Windows 11 Optimizer.
+
+A pure-Python reader/writer for the regf format Windows keeps in
+System32\\config\\SOFTWARE and SYSTEM and in each profile's NTUSER.DAT,
+for editing hives that are not loaded (a mounted installation image).
+It covers what applying a plan needs:
+- key lookup through lf/lh/li/ri subkey lists;
+- creating keys, inserted into the existing lists: a leaf with room is
+  updated in place and a full leaf is split under an ri index, as
+  Windows does, so a key with thousands of subkeys stays compact;
+- setting and deleting values, including big data (db) values;
+- allocating cells from free space or from new hive bins; freed cells
+  are merged with free neighbours in the same bin and reused;
+- a consistent base block on save (sequence numbers, bins size, checksum).
+
+The whole file is held in memory; the hives of an image are tens of MB
+at most. A dirty hive (sequence numbers differ because its transaction
+log was not replayed) is refused rather than risk writing over pending
+changes.
+"""
+import bisect
+import datetime
+import os
+import struct
+import tempfile
+
+from registry_backend import REG_DWORD, REG_EXPAND_SZ, REG_MULTI_SZ, REG_QWORD, REG_SZ
+
+BASE_BLOCK_SIZE = 4096
+BIN_SIZE = 4096
+BIN_HEADER_SIZE = 32
+NO_CELL = 0xFFFFFFFF
+BIG_DATA_SEGMENT = 16344   # largest value data kept in one cell; larger data uses a db record
+MIN_FREE_CELL = 16         # smaller leftovers stay part of the allocated cell
+LEAF_MAX = 507             # entries per lf/lh leaf, so a leaf cell fits in one 4 KB bin (as in Windows)
+
+KEY_HIVE_ENTRY = 0x0004
+KEY_NO_DELETE = 0x0008
+KEY_COMP_NAME = 0x0020
+VALUE_COMP_NAME = 0x0001
+DATA_INLINE = 0x80000000
+
+FILETIME_EPOCH = datetime.datetime(1601, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class HiveError(OSError):
+    """The file is not a usable regf hive, or the edit cannot be made"""
+
+
+def filetime_now():
+    delta = datetime.datetime.now(datetime.timezone.utc) - FILETIME_EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10000000 + delta.microseconds * 10
+
+
+def align(size, boundary):
+    return (size + boundary - 1) // boundary * boundary
+
+
+def name_hash(name):
+    """lh list hash of a key name"""
+    value = 0
+    for ch in name.upper():
+        value = (value * 37 + ord(ch)) & 0xFFFFFFFF
+    return value
+
+
+def encode_name(name):
+    """(bytes, compressed) - names that fit in Latin-1 are stored one byte per character"""
+    try:
+        return name.encode("latin-1"), True
+    except UnicodeEncodeError:
+        return name.encode("utf-16-le"), False
+
+
+def decode_name(raw, compressed):
+    return raw.decode("latin-1") if compressed else raw.decode("utf-16-le", errors="replace")
+
+
+def encode_value(reg_type, data):
+    """Value data as winreg would store it"""
+    if reg_type in (REG_SZ, REG_EXPAND_SZ):
+        return (str(data) + "\0").encode("utf-16-le")
+    if reg_type == REG_MULTI_SZ:
+        return ("".join(str(item) + "\0" for item in data) + "\0").encode("utf-16-le")
+    if reg_type == REG_DWORD:
+        return struct.pack("<I", int(data) & 0xFFFFFFFF)
+    if reg_type == REG_QWORD:
+        return struct.pack("<Q", int(data) & 0xFFFFFFFFFFFFFFFF)
+    return bytes(data or b"")
+
+
+def decode_value(reg_type, raw):
+    """Python value for raw data, matching winreg.QueryValueEx"""
+    if reg_type in (REG_SZ, REG_EXPAND_SZ):
+        text = raw.decode("utf-16-le", errors="replace")
+        return text.split("\0", 1)[0]
+    if reg_type == REG_MULTI_SZ:
+        text = raw.decode("utf-16-le", errors="replace").rstrip("\0")
+        return text.split("\0") if text else []
+    if reg_type == REG_DWORD and len(raw) >= 4:
+        return struct.unpack_from("<I", raw)[0]
+    if reg_type == REG_QWORD and len(raw) >= 8:
+        return struct.unpack_from("<Q", raw)[0]
+    return bytes(raw)
+
+
+def sid(authority, *subauthorities):
+    return (struct.pack("<BB", 1, len(subauthorities)) + authority.to_bytes(6, "big")
+            + b"".join(struct.pack("<I", s) for s in subauthorities))
+
+
+def default_security_descriptor():
+    """Self-relative descriptor for new hives: Administrators and SYSTEM full control, Users read, inherited"""
+    aces = b""
+    for mask, trustee in ((0xF003F, sid(5, 32, 544)), (0xF003F, sid(5, 18)), (0x20019, sid(5, 32, 545))):
+        aces += struct.pack("<BBHI", 0, 0x02, 8 + len(trustee), mask) + trustee
+    dacl = struct.pack("<BBHHH", 2, 0, 8 + len(aces), 3, 0) + aces
+    owner, group = sid(5, 32, 544), sid(5, 18)
+    header_size = 20
+    return (struct.pack("<BBHIIII", 1, 0, 0x8004, header_size, header_size + len(owner), 0,
+                        header_size + len(owner) + len(group)) + owner + group + dacl)
+
+
+class Hive:
+    """One regf file in memory. Key paths are relative to the hive root, separated by backslashes."""
+
+    def __init__(self, data, path=None):
+        self.data = bytearray(data)
+        self.path = path
+        self.dirty = False
+        if self.data[0:4] != b"regf":
+            raise HiveError(f"{path or 'data'} is not a registry hive")
+        seq1, seq2 = struct.unpack_from("<II", self.data, 4)
+        if seq1 != seq2:
+            raise HiveError(f"{path or 'Hive'} was not cleanly saved; replay its transaction logs first")
+        self.minor = struct.unpack_from("<I", self.data, 24)[0]
+        self.root = struct.unpack_from("<I", self.data, 36)[0]
+        self._free = {}         # offset -> size of each free cell
+        self._free_ends = {}    # offset just past a free cell -> its offset, for merging with the next release
+        self._bin_starts = []   # offsets of the hive bins, ascending
+        self._bin_ends = []
+        self._scan_bins()
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read(), path)
+
+    @classmethod
+    def create(cls, path=None, file_name=""):
+        """A new hive holding only an empty root key"""
+        data = bytearray(BASE_BLOCK_SIZE + BIN_SIZE)
+        struct.pack_into("<4sIIQIIIII", data, 0, b"regf", 1, 1, filetime_now(), 1, 5, 0, 1, BIN_HEADER_SIZE)
+        struct.pack_into("<II", data, 40, BIN_SIZE, 1)
+        data[48:48 + 64] = file_name[-31:].encode("utf-16-le").ljust(64, b"\0")
+        struct.pack_into("<4sII", data, BASE_BLOCK_SIZE, b"hbin", 0, BIN_SIZE)
+        struct.pack_into("<i", data, BASE_BLOCK_SIZE + BIN_HEADER_SIZE, BIN_SIZE - BIN_HEADER_SIZE)
+        hive = cls(data, path)
+        # The root key comes first in the first bin, as in hives Windows writes
+        root = hive._new_key("ROOT", NO_CELL, NO_CELL, KEY_HIVE_ENTRY | KEY_NO_DELETE)
+        descriptor = default_security_descriptor()
+        sk = hive._new_cell(struct.pack("<2sHIIII", b"sk", 0, 0, 0, 1, len(descriptor)) + descriptor)
+        hive._set(sk, 4, "<II", sk, sk)
+        hive._set(root, 44, "<I", sk)
+        hive.root = root
+        struct.pack_into("<I", hive.data, 36, root)
+        return hive
+
+    # -----------------------------
+    # CELLS
+    # -----------------------------
+    def _pos(self, offset):
+        return BASE_BLOCK_SIZE + offset
+
+    def _cell_size(self, offset):
+        return struct.unpack_from("<i", self.data, self._pos(offset))[0]
+
+    def _cell(self, offset):
+        """Copy of an allocated cell's data (without its size field)"""
+        if offset == NO_CELL or self._pos(offset) + 4 > len(self.data):
+            raise HiveError(f"Bad cell offset {offset:#x}")
+        size = self._cell_size(offset)
+        if size >= 0:
+            raise HiveError(f"Cell {offset:#x} is not allocated")
+        start = self._pos(offset) + 4
+        return bytes(self.data[start:start - size - 4])
+
+    def _write(self, offset, payload, field=0):
+        """Overwrite part of a cell's data, field bytes in"""
+        start = self._pos(offset) + 4 + field
+        self.data[start:start + len(payload)] = payload
+        self.dirty = True
+
+    def _set(self, offset, field, fmt, *values):
+        self._write(offset, struct.pack(fmt, *values), field)
+
+    def _scan_bins(self):
+        position = BASE_BLOCK_SIZE
+        end = BASE_BLOCK_SIZE + struct.unpack_from("<I", self.data, 40)[0]
+        while position < min(end, len(self.data)):
+            if self.data[position:position + 4] != b"hbin":
+                raise HiveError(f"Bad hive bin at {position:#x}")
+            bin_size = struct.unpack_from("<I", self.data, position + 8)[0]
+            self._bin_starts.append(position - BASE_BLOCK_SIZE)
+            self._bin_ends.append(position - BASE_BLOCK_SIZE + bin_size)
+            cell = position + BIN_HEADER_SIZE
+            while cell < position + bin_size:
+                size = struct.unpack_from("<i", self.data, cell)[0]
+                if size == 0:
+                    break
+                if size > 0:
+                    self._add_free(cell - BASE_BLOCK_SIZE, size)
+                cell += abs(size)
+            position += bin_size
+
+    def _bin_of(self, offset):
+        """(start, end) of the hive bin holding offset"""
+        index = bisect.bisect_right(self._bin_starts, offset) - 1
+        return self._bin_starts[index], self._bin_ends[index]
+
+    def _take_free(self, offset):
+        size = self._free.pop(offset)
+        del self._free_ends[offset + size]
+        return size
+
+    def _add_free(self, offset, size):
+        """Mark a cell free, merged with the free cells right before and after it in the same bin"""
+        bin_start, bin_end = self._bin_of(offset)
+        following = offset + size
+        if following < bin_end and following in self._free:
+            size += self._take_free(following)
+        previous = self._free_ends.get(offset)
+        if previous is not None and previous >= bin_start:
+            size += self._take_free(previous)
+            offset = previous
+        self._free[offset] = size
+        self._free_ends[offset + size] = offset
+        struct.pack_into("<i", self.data, self._pos(offset), size)
+
+    def _alloc(self, payload_size):
+        """Offset of a new zeroed cell with room for payload_size bytes"""
+        size = align(payload_size + 4, 8)
+        offset = next((offset for offset, free_size in self._free.items() if free_size >= size), None)
+        if offset is None:
+            offset = self._add_bin(size)
+        else:
+            free_size = self._take_free(offset)
+            if free_size - size >= MIN_FREE_CELL:
+                self._add_free(offset + size, free_size - size)
+            else:
+                size = free_size
+        struct.pack_into("<i", self.data, self._pos(offset), -size)
+        start = self._pos(offset) + 4
+        self.data[start:start + size - 4] = bytes(size - 4)
+        self.dirty = True
+        return offset
+
+    def _add_bin(self, cell_size):
+        """Append a hive bin big enough for one cell; returns that cell's offset, the rest is free"""
+        bins_size = struct.unpack_from("<I", self.data, 40)[0]
+        bin_size = align(cell_size + BIN_HEADER_SIZE, BIN_SIZE)
+        position = BASE_BLOCK_SIZE + bins_size
+        self.data[position:] = bytes(bin_size)
+        struct.pack_into("<4sII", self.data, position, b"hbin", bins_size, bin_size)
+        struct.pack_into("<Q", self.data, position + 20, filetime_now())
+        struct.pack_into("<I", self.data, 40, bins_size + bin_size)
+        self._bin_starts.append(bins_size)
+        self._bin_ends.append(bins_size + bin_size)
+        offset = bins_size + BIN_HEADER_SIZE
+        rest = bin_size - BIN_HEADER_SIZE - cell_size
+        if rest >= 8:
+            self._add_free(offset + cell_size, rest)
+        return offset
+
+    def _release(self, offset):
+        if offset == NO_CELL:
+            return
+        size = self._cell_size(offset)
+        if size < 0:
+            self._add_free(offset, -size)
+            self.dirty = True
+
+    def _new_cell(self, payload):
+        offset = self._alloc(len(payload))
+        self._write(offset, payload)
+        return offset
+
+    def _rewrite(self, offset, payload, limit=None):
+        """
+        Store payload in the cell at offset when it fits, otherwise in a
+        new cell with room to grow by half (at most limit bytes) and free
+        the old one; returns the offset used
+        """
+        if offset != NO_CELL and len(payload) <= -self._cell_size(offset) - 4:
+            self._write(offset, payload)
+            return offset
+        room = len(payload) * 3 // 2
+        new = self._alloc(max(len(payload), room if limit is None else min(room, limit)))
+        self._write(new, payload)
+        self._release(offset)
+        return new
+
+    # -----------------------------
+    # KEYS
+    # -----------------------------
+    def _nk(self, offset):
+        cell = self._cell(offset)
+        if cell[0:2] != b"nk":
+            raise HiveError(f"Cell {offset:#x} is not a key")
+        return cell
+
+    def key_name(self, offset):
+        cell = self._nk(offset)
+        flags = struct.unpack_from("<H", cell, 2)[0]
+        length = struct.unpack_from("<H", cell, 72)[0]
+        return decode_name(bytes(cell[76:76 + length]), flags & KEY_COMP_NAME)
+
+    def _subkey_offsets(self, list_offset):
+        if list_offset == NO_CELL:
+            return []
+        cell = self._cell(list_offset)
+        signature, count = bytes(cell[0:2]), struct.unpack_from("<H", cell, 2)[0]
+        if signature in (b"lf", b"lh"):
+            return [struct.unpack_from("<I", cell, 4 + 8 * i)[0] for i in range(count)]
+        if signature == b"li":
+            return [struct.unpack_from("<I", cell, 4 + 4 * i)[0] for i in range(count)]
+        if signature == b"ri":
+            offsets = []
+            for i in range(count):
+                offsets += self._subkey_offsets(struct.unpack_from("<I", cell, 4 + 4 * i)[0])
+            return offsets
+        raise HiveError(f"Unknown subkey list {signature!r} at {list_offset:#x}")
+
+    def subkeys(self, offset):
+        """[(name, offset)] of a key's subkeys"""
+        list_offset = struct.unpack_from("<I", self._nk(offset), 28)[0]
+        return [(self.key_name(child), child) for child in self._subkey_offsets(list_offset)]
+
+    def find_key(self, path):
+        """Offset of the key at path, or None"""
+        offset = self.root
+        for part in (p for p in path.split("\\") if p):
+            wanted = part.upper()
+            for name, child in self.subkeys(offset):
+                if name.upper() == wanted:
+                    offset = child
+                    break
+            else:
+                return None
+        return offset
+
+    def _new_key(self, name, parent, security, flags=0):
+        raw, compressed = encode_name(name)
+        payload = bytearray(76 + len(raw))
+        struct.pack_into("<2sHQII", payload, 0, b"nk", flags | (KEY_COMP_NAME if compressed else 0),
+                         filetime_now(), 0, parent)
+        struct.pack_into("<IIIIIIII", payload, 20, 0, 0, NO_CELL, NO_CELL, 0, NO_CELL, security, NO_CELL)
+        struct.pack_into("<HH", payload, 72, len(raw), 0)
+        payload[76:] = raw
+        offset = self._new_cell(bytes(payload))
+        if security != NO_CELL:
+            self._set(security, 12, "<I", struct.unpack_from("<I", self._cell(security), 12)[0] + 1)
+        return offset
+
+    def _touch(self, offset):
+        self._set(offset, 4, "<Q", filetime_now())
+
+    def create_key(self, path):
+        """Offset of the key at path, creating it and any missing parents"""
+        offset = self.root
+        for part in (p for p in path.split("\\") if p):
+            existing = {name.upper(): child for name, child in self.subkeys(offset)}
+            child = existing.get(part.upper())
+            if child is None:
+                child = self._add_subkey(offset, part)
+            offset = child
+        return offset
+
+    def _add_subkey(self, parent, name):
+        nk = self._nk(parent)
+        security = struct.unpack_from("<I", nk, 44)[0]
+        child = self._new_key(name, parent, security)
+        count, list_offset = struct.unpack_from("<I", nk, 20)[0], struct.unpack_from("<I", nk, 28)[0]
+        self._set(parent, 20, "<I", count + 1)
+        self._set(parent, 28, "<I", self._insert_subkey(list_offset, name, child))
+        self._set(parent, 52, "<I", max(struct.unpack_from("<I", nk, 52)[0], len(name) * 2))
+        self._touch(parent)
+        return child
+
+    def _list_entries(self, list_offset):
+        """(signature, [entry bytes]) of a subkey leaf (lf/lh/li) or index root (ri)"""
+        cell = self._cell(list_offset)
+        signature, count = bytes(cell[0:2]), struct.unpack_from("<H", cell, 2)[0]
+        if signature not in (b"lf", b"lh", b"li", b"ri"):
+            raise HiveError(f"Unknown subkey list {signature!r} at {list_offset:#x}")
+        width = 8 if signature in (b"lf", b"lh") else 4
+        return signature, [bytes(cell[4 + width * i:4 + width * (i + 1)]) for i in range(count)]
+
+    def _write_list(self, list_offset, signature, entries):
+        """Store a subkey list, in place when its cell has room; returns its offset"""
+        payload = struct.pack("<2sH", signature, len(entries)) + b"".join(entries)
+        # Room to grow is capped so a leaf never needs more than one bin
+        return self._rewrite(list_offset, payload, limit=4 + 8 * LEAF_MAX)
+
+    def _leaf_entry(self, signature, name, offset):
+        if signature == b"lh":
+            return struct.pack("<II", offset, name_hash(name))
+        if signature == b"lf":
+            return struct.pack("<I", offset) + name.encode("latin-1", "replace")[:4].ljust(4, b"\0")
+        return struct.pack("<I", offset)
+
+    def _entry_name(self, entry):
+        return self.key_name(struct.unpack_from("<I", entry)[0]).upper()
+
+    def _insert_subkey(self, list_offset, name, child):
+        """Add child to the subkey list at list_offset (NO_CELL for none); returns the list's offset"""
+        if list_offset == NO_CELL:
+            signature = b"lh" if self.minor >= 5 else b"lf"
+            return self._write_list(NO_CELL, signature, [self._leaf_entry(signature, name, child)])
+        signature, entries = self._list_entries(list_offset)
+        if signature != b"ri":
+            leaves = self._insert_into_leaf(list_offset, signature, entries, name, child)
+            if len(leaves) == 1:
+                return leaves[0]
+            # The leaf was split: an index root now lists both halves
+            return self._write_list(NO_CELL, b"ri", [struct.pack("<I", leaf) for leaf in leaves])
+        # The leaf whose names run past the new one, or the last leaf
+        wanted = name.upper()
+        leaves = [struct.unpack_from("<I", entry)[0] for entry in entries]
+        index = len(leaves) - 1
+        for i, leaf in enumerate(leaves[:-1]):
+            leaf_entries = self._list_entries(leaf)[1]
+            if leaf_entries and wanted < self._entry_name(leaf_entries[-1]):
+                index = i
+                break
+        leaf_signature, leaf_entries = self._list_entries(leaves[index])
+        leaves[index:index + 1] = self._insert_into_leaf(leaves[index], leaf_signature, leaf_entries, name, child)
+        return self._write_list(list_offset, b"ri", [struct.pack("<I", leaf) for leaf in leaves])
+
+    def _insert_into_leaf(self, leaf, signature, entries, name, child):
+        """Insert child into a leaf in name order; returns the leaf's offset, or two offsets if it was split"""
+        wanted, low, high = name.upper(), 0, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry_name(entries[middle]) < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        entries.insert(low, self._leaf_entry(signature, name, child))
+        if len(entries) <= LEAF_MAX:
+            return [self._write_list(leaf, signature, entries)]
+        half = len(entries) // 2
+        return [self._write_list(leaf, signature, entries[:half]), self._write_list(NO_CELL, signature, entries[half:])]
+
+    # -----------------------------
+    # VALUES
+    # -----------------------------
+    def _value_offsets(self, nk):
+        count, list_offset = struct.unpack_from("<II", nk, 36)
+        if not count or list_offset == NO_CELL:
+            return []
+        cell = self._cell(list_offset)
+        return [struct.unpack_from("<I", cell, 4 * i)[0] for i in range(count)]
+
+    def _vk(self, offset):
+        cell = self._cell(offset)
+        if cell[0:2] != b"vk":
+            raise HiveError(f"Cell {offset:#x} is not a value")
+        return cell
+
+    def _value_name(self, offset):
+        vk = self._vk(offset)
+        length, flags = struct.unpack_from("<H", vk, 2)[0], struct.unpack_from("<H", vk, 16)[0]
+        return decode_name(bytes(vk[20:20 + length]), flags & VALUE_COMP_NAME)
+
+    def _find_value(self, key, name):
+        wanted = (name or "").upper()
+        for offset in self._value_offsets(self._nk(key)):
+            if self._value_name(offset).upper() == wanted:
+                return offset
+        return None
+
+    def _value_data(self, vk):
+        size, data_offset = struct.unpack_from("<II", vk, 4)
+        if size & DATA_INLINE:
+            return bytes(vk[8:8 + min(size & ~DATA_INLINE, 4)])
+        if size == 0:
+            return b""
+        cell = self._cell(data_offset)
+        if size > BIG_DATA_SEGMENT and self.minor >= 4 and cell[0:2] == b"db":
+            count, segments = struct.unpack_from("<HI", cell, 2)
+            segment_list = self._cell(segments)
+            raw = b"".join(bytes(self._cell(struct.unpack_from("<I", segment_list, 4 * i)[0])[:BIG_DATA_SEGMENT])
+                           for i in range(count))
+            return raw[:size]
+        return bytes(cell[:size])
+
+    def values(self, path):
+        """[(name, type, data)] of the key at path, data decoded as winreg does; None if the key is absent"""
+        key = self.find_key(path)
+        if key is None:
+            return None
+        result = []
+        for offset in self._value_offsets(self._nk(key)):
+            vk = self._vk(offset)
+            reg_type = struct.unpack_from("<I", vk, 12)[0]
+            result.append((self._value_name(offset), reg_type, decode_value(reg_type, self._value_data(vk))))
+        return result
+
+    def get_value(self, path, name):
+        """(type, data) of a value, or None if the key or value is absent"""
+        key = self.find_key(path)
+        offset = None if key is None else self._find_value(key, name)
+        if offset is None:
+            return None
+        vk = self._vk(offset)
+        reg_type = struct.unpack_from("<I", vk, 12)[0]
+        return reg_type, decode_value(reg_type, self._value_data(vk))
+
+    def _store_data(self, raw):
+        """(size field, data offset field) for raw value data, allocating cells as needed"""
+        if len(raw) <= 4:
+            return len(raw) | DATA_INLINE, struct.unpack("<I", raw.ljust(4, b"\0"))[0]
+        if len(raw) <= BIG_DATA_SEGMENT or self.minor < 4:
+            return len(raw), self._new_cell(raw)
+        segments = [self._new_cell(raw[i:i + BIG_DATA_SEGMENT]) for i in range(0, len(raw), BIG_DATA_SEGMENT)]
+        segment_list = self._new_cell(b"".join(struct.pack("<I", s) for s in segments))
+        return len(raw), self._new_cell(struct.pack("<2sHI", b"db", len(segments), segment_list))
+
+    def _release_data(self, vk):
+        size, data_offset = struct.unpack_from("<II", vk, 4)
+        if size & DATA_INLINE or size == 0 or data_offset == NO_CELL:
+            return
+        cell = self._cell(data_offset)
+        if size > BIG_DATA_SEGMENT and self.minor >= 4 and cell[0:2] == b"db":
+            count, segments = struct.unpack_from("<HI", cell, 2)
+            segment_list = self._cell(segments)
+            for i in range(count):
+                self._release(struct.unpack_from("<I", segment_list, 4 * i)[0])
+            self._release(segments)
+        self._release(data_offset)
+
+    def _set_value_list(self, key, offsets):
+        old_list = struct.unpack_from("<I", self._nk(key), 40)[0]
+        if offsets:
+            new_list = self._rewrite(old_list, b"".join(struct.pack("<I", o) for o in offsets))
+        else:
+            self._release(old_list)
+            new_list = NO_CELL
+        self._set(key, 36, "<II", len(offsets), new_list)
+
+    def set_value(self, path, name, reg_type, data):
+        """Create the key if needed and set the value"""
+        key = self.create_key(path)
+        raw = encode_value(reg_type, data)
+        offset = self._find_value(key, name)
+        if offset is None:
+            name_raw, compressed = encode_name(name or "")
+            size, data_offset = self._store_data(raw)
+            offset = self._new_cell(struct.pack("<2sHIIIHH", b"vk", len(name_raw), size, data_offset, reg_type,
+                                                VALUE_COMP_NAME if compressed else 0, 0) + name_raw)
+            self._set_value_list(key, self._value_offsets(self._nk(key)) + [offset])
+        else:
+            self._release_data(self._vk(offset))
+            size, data_offset = self._store_data(raw)
+            self._set(offset, 4, "<III", size, data_offset, reg_type)
+        nk = self._nk(key)
+        self._set(key, 60, "<II", max(struct.unpack_from("<I", nk, 60)[0], len(name or "") * 2),
+                  max(struct.unpack_from("<I", nk, 64)[0], len(raw)))
+        self._touch(key)
+        self.dirty = True
+
+    def delete_value(self, path, name):
+        """Delete a value, returning False if the key or value did not exist"""
+        key = self.find_key(path)
+        offset = None if key is None else self._find_value(key, name)
+        if offset is None:
+            return False
+        self._set_value_list(key, [o for o in self._value_offsets(self._nk(key)) if o != offset])
+        self._release_data(self._vk(offset))
+        self._release(offset)
+        self._touch(key)
+        self.dirty = True
+        return True
+
+    # -----------------------------
+    # SAVING
+    # -----------------------------
+    def _finish_base_block(self):
+        sequence = struct.unpack_from("<I", self.data, 4)[0] + 1
+        struct.pack_into("<IIQ", self.data, 4, sequence, sequence, filetime_now())
+        checksum = 0
+        for (word,) in struct.iter_unpack("<I", bytes(self.data[:508])):
+            checksum ^= word
+        if checksum == 0xFFFFFFFF:
+            checksum = 0xFFFFFFFE
+        elif checksum == 0:
+            checksum = 1
+        struct.pack_into("<I", self.data, 508, checksum)
+
+    def save(self, path=None):
+        """Write the hive (atomically, through a temporary file next to it)"""
+        path = path or self.path
+        self._finish_base_block()
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(prefix=".regf_", dir=folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.path = path
+        self.dirty = False
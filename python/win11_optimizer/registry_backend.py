@@ -0,0 +1,368 @@
+"""
+Registry backend for Windows 11 Optimizer.
+
+Parses the `reg add` / `reg delete` specs used by the tweak functions and
+applies them in-process with winreg instead of spawning reg.exe for every
+value. Key handles are kept open across values under the same key until
+close() is called.
+
+MemoryRegistry is an in-memory stand-in with the same interface so the
+engine can be exercised on machines without winreg (Linux CI, dev boxes).
+"""
+import os
+import threading
+from collections import namedtuple
+
+try:
+    import winreg
+except ImportError:  # Not on Windows - only MemoryRegistry is usable
+    winreg = None
+
+# -----------------------------
+# CONSTANTS
+# -----------------------------
+HIVE_ALIASES = {
+    "HKCU": "HKCU", "HKEY_CURRENT_USER": "HKCU",
+    "HKLM": "HKLM", "HKEY_LOCAL_MACHINE": "HKLM",
+    "HKU": "HKU", "HKEY_USERS": "HKU",
+    "HKCR": "HKCR", "HKEY_CLASSES_ROOT": "HKCR",
+    "HKCC": "HKCC", "HKEY_CURRENT_CONFIG": "HKCC",
+}
+
+# Same numeric values as winreg.REG_* so data can be passed straight through
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+REG_TYPES = {
+    "REG_SZ": REG_SZ,
+    "REG_EXPAND_SZ": REG_EXPAND_SZ,
+    "REG_BINARY": REG_BINARY,
+    "REG_DWORD": REG_DWORD,
+    "REG_MULTI_SZ": REG_MULTI_SZ,
+    "REG_QWORD": REG_QWORD,
+}
+REG_TYPE_NAMES = {v: k for k, v in REG_TYPES.items()}
+
+
+class RegOp(namedtuple("RegOp", "action hive path name type data")):
+    """A single value operation: action is "set" or "delete", name None means the default value"""
+    __slots__ = ()
+
+    @property
+    def key(self):
+        """Case-insensitive identity of the key this op targets"""
+        return (self.hive, self.path.lower())
+
+    @property
+    def value_id(self):
+        """Case-insensitive identity of the value this op targets"""
+        return (self.hive, self.path.lower(), (self.name or "").lower())
+
+    def __str__(self):
+        name = self.name if self.name is not None else "(Default)"
+        if self.action == "delete":
+            return f"{self.hive}\\{self.path} [{name}] delete"
+        return f"{self.hive}\\{self.path} [{name}] = {REG_TYPE_NAMES.get(self.type, self.type)}:{self.data!r}"
+
+
+# -----------------------------
+# PARSING
+# -----------------------------
+def split_command(cmd):
+    """Split a cmd.exe style command line on whitespace, honouring double quotes"""
+    args, current, quoted, in_token = [], [], False, False
+    for ch in cmd:
+        if ch == '"':
+            quoted = not quoted
+            in_token = True
+        elif ch.isspace() and not quoted:
+            if in_token:
+                args.append("".join(current))
+                current, in_token = [], False
+        else:
+            current.append(ch)
+            in_token = True
+    if in_token:
+        args.append("".join(current))
+    return args
+
+
+def convert_data(reg_type, data):
+    """Convert `reg add /d` text into the Python value winreg expects"""
+    if reg_type in (REG_DWORD, REG_QWORD):
+        data = (data or "0").strip()
+        return int(data, 16) if data.lower().startswith("0x") else int(data)
+    if reg_type == REG_BINARY:
+        return bytes.fromhex(data or "")
+    if reg_type == REG_MULTI_SZ:
+        return [part for part in (data or "").split("\\0") if part]
+    # cmd.exe expands %VARS% before reg.exe sees them, keep that behaviour
+    return os.path.expandvars(data or "")
+
+
+def split_key(full_key):
+    """Split "HKLM\\SOFTWARE\\..." into ("HKLM", "SOFTWARE\\...")"""
+    hive, _, path = full_key.partition("\\")
+    hive = HIVE_ALIASES.get(hive.upper())
+    if hive is None:
+        raise ValueError(f"Unknown registry hive in {full_key!r}")
+    return hive, path.strip("\\")
+
+
+def parse_reg_command(cmd):
+    """Parse a `reg add`/`reg delete` value command into a RegOp, or None if it is not one"""
+    args = split_command(cmd)
+    if len(args) < 3 or args[0].lower() not in ("reg", "reg.exe"):
+        return None
+    verb = args[1].lower()
+    if verb not in ("add", "delete"):
+        return None
+    try:
+        hive, path = split_key(args[2])
+    except ValueError:
+        return None
+
+    name, default_value, reg_type, data = None, False, REG_SZ, ""
+    i = 3
+    while i < len(args):
+        flag = args[i].lower()
+        if flag == "/v" and i + 1 < len(args):
+            name = args[i + 1]
+            i += 2
+        elif flag == "/ve":
+            default_value = True
+            i += 1
+        elif flag == "/t" and i + 1 < len(args):
+            reg_type = REG_TYPES.get(args[i + 1].upper())
+            if reg_type is None:
+                return None
+            i += 2
+        elif flag == "/d" and i + 1 < len(args):
+            data = args[i + 1]
+            i += 2
+        elif flag in ("/f", "/reg:64"):
+            i += 1
+        else:
+            # Unsupported switch (/s, /reg:32, ...) - let reg.exe handle it
+            return None
+
+    if name is None and not default_value:
+        # Whole-key add/delete is left to reg.exe
+        return None
+
+    if verb == "delete":
+        return RegOp("delete", hive, path, name, None, None)
+    try:
+        value = convert_data(reg_type, data)
+    except ValueError:
+        return None
+    return RegOp("set", hive, path, name, reg_type, value)
+
+
+def group_by_key(ops):
+    """Group ops by target key, keeping first-seen key order and op order within a key"""
+    groups = {}
+    for op in ops:
+        groups.setdefault(op.key, []).append(op)
+    return list(groups.values())
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class RegistryBackend:
+    """Interface shared by the winreg backend and the in-memory fake"""
+
+    def read(self, hive, path, name):
+        """Return (type, data) for a value, or None if the key or value is absent"""
+        raise NotImplementedError
+
+    def read_key(self, hive, path):
+        """Return {name_lower: (type, data)} for every value of a key, or None if the key is absent"""
+        raise NotImplementedError
+
+    def write(self, hive, path, name, reg_type, data):
+        """Create the key if needed and set the value"""
+        raise NotImplementedError
+
+    def delete(self, hive, path, name):
+        """Delete a value, returning False if it did not exist"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any cached handles"""
+
+    def apply_op(self, op):
+        """Apply a single RegOp"""
+        if op.action == "delete":
+            self.delete(op.hive, op.path, op.name)
+        else:
+            self.write(op.hive, op.path, op.name, op.type, op.data)
+
+    def apply(self, ops):
+        """Apply ops grouped by key; returns a list of (op, error) with error None on success"""
+        results = []
+        for group in group_by_key(ops):
+            for op in group:
+                try:
+                    self.apply_op(op)
+                    results.append((op, None))
+                except OSError as e:
+                    results.append((op, e))
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class WinRegBackend(RegistryBackend):
+    """winreg implementation that caches one open handle per key"""
+
+    def __init__(self, view=None):
+        if winreg is None:
+            raise RuntimeError("winreg is not available on this platform")
+        self._roots = {
+            "HKCU": winreg.HKEY_CURRENT_USER,
+            "HKLM": winreg.HKEY_LOCAL_MACHINE,
+            "HKU": winreg.HKEY_USERS,
+            "HKCR": winreg.HKEY_CLASSES_ROOT,
+            "HKCC": winreg.HKEY_CURRENT_CONFIG,
+        }
+        # Match reg.exe on 64-bit Windows, which writes the native view
+        self._view = winreg.KEY_WOW64_64KEY if view is None else view
+        self._handles = {}
+        self._lock = threading.RLock()
+
+    def _open(self, hive, path, writable, create=True):
+        """Return a cached handle, opening (and creating when writable) on first use"""
+        cache_key = (hive, path.lower(), writable)
+        handle = self._handles.get(cache_key)
+        if handle is None and not writable:
+            # A write handle can serve reads too
+            handle = self._handles.get((hive, path.lower(), True))
+        if handle is not None:
+            return handle
+        root = self._roots[hive]
+        if writable and create:
+            handle = winreg.CreateKeyEx(root, path, 0,
+                                        winreg.KEY_READ | winreg.KEY_WRITE | self._view)
+        elif writable:
+            handle = winreg.OpenKeyEx(root, path, 0,
+                                      winreg.KEY_READ | winreg.KEY_WRITE | self._view)
+        else:
+            handle = winreg.OpenKeyEx(root, path, 0, winreg.KEY_READ | self._view)
+        self._handles[cache_key] = handle
+        return handle
+
+    def read(self, hive, path, name):
+        with self._lock:
+            try:
+                handle = self._open(hive, path, writable=False)
+                data, reg_type = winreg.QueryValueEx(handle, name or "")
+            except FileNotFoundError:
+                return None
+        return reg_type, data
+
+    def read_key(self, hive, path):
+        with self._lock:
+            try:
+                handle = self._open(hive, path, writable=False)
+                count = winreg.QueryInfoKey(handle)[1]
+                values = {}
+                for index in range(count):
+                    name, data, reg_type = winreg.EnumValue(handle, index)
+                    values[name.lower()] = (reg_type, data)
+            except FileNotFoundError:
+                return None
+        return values
+
+    def write(self, hive, path, name, reg_type, data):
+        with self._lock:
+            handle = self._open(hive, path, writable=True)
+            winreg.SetValueEx(handle, name or "", 0, reg_type, data)
+
+    def delete(self, hive, path, name):
+        with self._lock:
+            try:
+                # Deleting from a missing key must not create it
+                handle = self._open(hive, path, writable=True, create=False)
+                winreg.DeleteValue(handle, name or "")
+            except FileNotFoundError:
+                return False
+        return True
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                try:
+                    winreg.CloseKey(handle)
+                except OSError:
+                    pass
+            self._handles.clear()
+
+
+class MemoryRegistry(RegistryBackend):
+    """In-memory registry fake with Windows-like case-insensitive keys and names"""
+
+    def __init__(self, initial=None):
+        self._keys = {}
+        self._lock = threading.RLock()
+        self.reads = 0
+        self.writes = 0
+        for (hive, path, name), (reg_type, data) in (initial or {}).items():
+            self.write(hive, path, name, reg_type, data)
+        self.writes = 0
+
+    def read(self, hive, path, name):
+        with self._lock:
+            self.reads += 1
+            values = self._keys.get((hive, path.lower()))
+            if values is None:
+                return None
+            entry = values.get((name or "").lower())
+            return None if entry is None else (entry[1], entry[2])
+
+    def read_key(self, hive, path):
+        with self._lock:
+            self.reads += 1
+            values = self._keys.get((hive, path.lower()))
+            if values is None:
+                return None
+            return {lname: (entry[1], entry[2]) for lname, entry in values.items()}
+
+    def write(self, hive, path, name, reg_type, data):
+        with self._lock:
+            self.writes += 1
+            values = self._keys.setdefault((hive, path.lower()), {})
+            values[(name or "").lower()] = (name, reg_type, data)
+
+    def delete(self, hive, path, name):
+        with self._lock:
+            self.writes += 1
+            values = self._keys.get((hive, path.lower()))
+            if not values or (name or "").lower() not in values:
+                return False
+            del values[(name or "").lower()]
+            return True
+
+    def dump(self):
+        """Return {(hive, path_lower, name_lower): (type, data)} for assertions"""
+        with self._lock:
+            return {(hive, path, lname): (entry[1], entry[2])
+                    for (hive, path), values in self._keys.items()
+                    for lname, entry in values.items()}
+
+
+def default_backend():
+    """Return the native backend on Windows and the in-memory fake elsewhere"""
+    if winreg is not None:
+        return WinRegBackend()
+    return MemoryRegistry()
@@ -0,0 +1,155 @@
+"""
+Dependency-aware task scheduler for Windows 11 Optimizer.
+
+Runs tasks on a bounded thread pool. Ordering comes from two places:
+explicit `after` dependencies, and shared `resources` - tasks naming the
+same resource run one after another in submission order (e.g. every
+task touching "service:netlogon"). Higher priority tasks are started
+first so slow maintenance jobs overlap with the fast registry work.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_WORKERS = 4
+
+
+class Task:
+    """A unit of work: name must be unique within one run"""
+
+    def __init__(self, name, fn, after=(), resources=(), priority=0):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.resources = tuple(resources)
+        self.priority = priority
+
+    def __repr__(self):
+        return f"Task({self.name!r})"
+
+
+class TaskTiming:
+    """When a task ran relative to the start of the schedule"""
+
+    def __init__(self, name, start, duration, error=None, thread=None):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.error = error
+        self.thread = thread
+
+
+class ScheduleResult:
+    """Per-task timings and end-to-end wall time for one run"""
+
+    def __init__(self):
+        self.timings = []
+        self.wall = 0.0
+
+    @property
+    def errors(self):
+        return [(t.name, t.error) for t in self.timings if t.error is not None]
+
+    @property
+    def busy(self):
+        """Sum of task durations - what a sequential run would roughly have cost"""
+        return sum(t.duration for t in self.timings)
+
+    def summary(self):
+        return (f"{len(self.timings)} tasks, wall {self.wall:.2f}s, "
+                f"task time {self.busy:.2f}s, {len(self.errors)} errors")
+
+    def slowest(self, count=5):
+        return sorted(self.timings, key=lambda t: t.duration, reverse=True)[:count]
+
+
+def resolve_dependencies(tasks):
+    """
+    Return {name: set(prerequisite names)} from `after` plus resource
+    ordering. Raises ValueError for duplicate names, unknown prerequisites
+    or a cycle, so a bad schedule is rejected before any task runs.
+    """
+    names = [t.name for t in tasks]
+    if len(set(names)) != len(names):
+        raise ValueError("Task names must be unique")
+    deps = {t.name: set(t.after) for t in tasks}
+    last_holder = {}
+    for task in tasks:
+        for resource in task.resources:
+            if resource in last_holder:
+                deps[task.name].add(last_holder[resource])
+            last_holder[resource] = task.name
+    for name, prereqs in deps.items():
+        unknown = prereqs - set(names)
+        if unknown:
+            raise ValueError(f"Task {name} depends on unknown tasks: {sorted(unknown)}")
+    # Kahn pass: whatever cannot be reached from tasks without prerequisites is on or behind a cycle
+    waiting = {name: len(prereqs) for name, prereqs in deps.items()}
+    dependents = {name: [] for name in names}
+    for name, prereqs in deps.items():
+        for prereq in prereqs:
+            dependents[prereq].append(name)
+    ready = [name for name, count in waiting.items() if not count]
+    while ready:
+        for dependent in dependents[ready.pop()]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                ready.append(dependent)
+    stuck = sorted(name for name, count in waiting.items() if count)
+    if stuck:
+        raise ValueError(f"Dependency cycle between tasks: {stuck}")
+    return deps
+
+
+def run_tasks(tasks, max_workers=DEFAULT_WORKERS):
+    """
+    Run tasks respecting dependencies; task exceptions are recorded, not
+    raised. An invalid schedule raises ValueError before any task starts.
+    """
+    tasks = list(tasks)
+    deps = resolve_dependencies(tasks)
+    by_name = {t.name: t for t in tasks}
+    order = {t.name: i for i, t in enumerate(tasks)}
+    dependents = {t.name: [] for t in tasks}
+    for name, prereqs in deps.items():
+        for prereq in prereqs:
+            dependents[prereq].append(name)
+
+    result = ScheduleResult()
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def run_one(task):
+        begin = time.perf_counter()
+        error = None
+        try:
+            task.fn()
+        except Exception as e:
+            error = e
+        end = time.perf_counter()
+        with lock:
+            result.timings.append(TaskTiming(task.name, begin - started, end - begin,
+                                             error, threading.current_thread().name))
+
+    def by_priority(names):
+        return sorted(names, key=lambda n: (-by_name[n].priority, order[n]))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers),
+                            thread_name_prefix="tweak") as pool:
+        running = {}
+        for name in by_priority([n for n, d in deps.items() if not d]):
+            running[pool.submit(run_one, by_name[name])] = name
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            ready = []
+            for future in done:
+                name = running.pop(future)
+                for dependent in dependents[name]:
+                    deps[dependent].discard(name)
+                    if not deps[dependent]:
+                        ready.append(dependent)
+            for name in by_priority(ready):
+                running[pool.submit(run_one, by_name[name])] = name
+
+    result.wall = time.perf_counter() - started
+    return result
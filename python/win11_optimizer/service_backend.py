@@ -0,0 +1,448 @@
+"""
+Service backend for Windows 11 Optimizer.
+
+Talks to the Service Control Manager directly instead of spawning
+`sc stop` / `sc config` / `net start` for every service. One SCM handle
+is opened per backend and service handles are cached until close().
+Stops and starts are requested for a whole batch at once and then waited
+on with a bounded poll, so a start type is never changed while the stop
+is still pending.
+
+MemoryServices is an in-memory SCM with the same interface, including
+pending states that take time to settle, for exercising the engine on
+machines without the SCM.
+"""
+import ctypes
+import threading
+import time
+from collections import namedtuple
+
+try:
+    from ctypes import wintypes
+    advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+except (AttributeError, OSError, ImportError, ValueError):  # Not on Windows - only MemoryServices is usable
+    advapi32 = None
+
+# -----------------------------
+# CONSTANTS
+# -----------------------------
+# dwCurrentState values
+STOPPED = 1
+START_PENDING = 2
+STOP_PENDING = 3
+RUNNING = 4
+CONTINUE_PENDING = 5
+PAUSE_PENDING = 6
+PAUSED = 7
+
+STATE_NAMES = {
+    STOPPED: "stopped", START_PENDING: "start pending", STOP_PENDING: "stop pending",
+    RUNNING: "running", CONTINUE_PENDING: "continue pending", PAUSE_PENDING: "pause pending",
+    PAUSED: "paused",
+}
+
+# sc.exe start= names and their dwStartType values (delayed-auto is auto plus a flag)
+START_TYPE_VALUES = {"boot": 0, "system": 1, "auto": 2, "demand": 3, "disabled": 4, "delayed-auto": 2}
+
+DEFAULT_TIMEOUT = 30.0   # seconds to wait for a batch of stops or starts
+MIN_POLL = 0.05
+MAX_POLL = 1.0
+
+ServiceStatus = namedtuple("ServiceStatus", "name state start")
+
+
+class ServiceNotFound(OSError):
+    """The service is not installed"""
+
+
+def poll_interval(wait_hint_ms):
+    """SCM guidance: poll at a tenth of the wait hint, clamped to [MIN_POLL, MAX_POLL]"""
+    return min(MAX_POLL, max(MIN_POLL, (wait_hint_ms or 0) / 10000.0))
+
+
+# -----------------------------
+# BACKENDS
+# -----------------------------
+class ServiceBackend:
+    """Interface shared by the SCM backend and the in-memory fake"""
+
+    def status(self, name):
+        """Return (state, wait_hint_ms); raises ServiceNotFound"""
+        raise NotImplementedError
+
+    def start_type(self, name):
+        """Return the sc.exe start type name; raises ServiceNotFound"""
+        raise NotImplementedError
+
+    def set_start_type(self, name, start):
+        """Change the start type; raises ServiceNotFound / OSError"""
+        raise NotImplementedError
+
+    def request_stop(self, name):
+        """Ask a service to stop without waiting; False if it was not running"""
+        raise NotImplementedError
+
+    def request_start(self, name):
+        """Ask a service to start without waiting; False if it was already running"""
+        raise NotImplementedError
+
+    def dependents(self, name):
+        """Names of running services that depend on name"""
+        return []
+
+    def close(self):
+        """Release any cached handles"""
+
+    def query(self, name):
+        """ServiceStatus for name, or None if the service is not installed"""
+        try:
+            return ServiceStatus(name, self.status(name)[0], self.start_type(name))
+        except ServiceNotFound:
+            return None
+
+    def wait_for(self, names, state, timeout=DEFAULT_TIMEOUT):
+        """Poll until every service reaches state; returns the names that did not in time"""
+        waiting = list(names)
+        deadline = time.monotonic() + timeout
+        while waiting:
+            hints = []
+            for name in list(waiting):
+                try:
+                    current, hint = self.status(name)
+                except ServiceNotFound:
+                    waiting.remove(name)
+                    continue
+                if current == state:
+                    waiting.remove(name)
+                else:
+                    hints.append(hint)
+            remaining = deadline - time.monotonic()
+            if not waiting or remaining <= 0:
+                break
+            time.sleep(min(remaining, poll_interval(max(hints, default=0))))
+        return waiting
+
+    def stop(self, names, timeout=DEFAULT_TIMEOUT, dependents=False):
+        """
+        Stop services and wait; returns the names still not stopped. With
+        dependents=True their running dependents are stopped first, like
+        `net stop /y`: the SCM refuses to stop a service while a dependent
+        is still stop pending, so the dependents are waited on before the
+        services themselves are asked to stop. Both waits share timeout.
+        """
+        deadline = time.monotonic() + timeout
+        names = list(dict.fromkeys(names))
+        failed = []
+        if dependents:
+            ordered = []
+            for name in names:
+                try:
+                    ordered += [dep for dep in self.dependents(name) if dep not in ordered]
+                except ServiceNotFound:
+                    continue
+            failed = self._stop_batch(ordered, timeout)
+            names = [name for name in names if name not in ordered]
+        return failed + self._stop_batch(names, max(0.0, deadline - time.monotonic()))
+
+    def _stop_batch(self, names, timeout):
+        """Request every stop, then wait for them together; returns the names not stopped"""
+        requested, refused = [], []
+        for name in names:
+            try:
+                if self.request_stop(name):
+                    requested.append(name)
+            except ServiceNotFound:
+                continue
+            except OSError:
+                # Not stoppable, or dependents still running
+                refused.append(name)
+        return refused + self.wait_for(requested, STOPPED, timeout)
+
+    def start(self, names, timeout=DEFAULT_TIMEOUT):
+        """Start services and wait; returns the names not running (missing ones included)"""
+        requested, failed = [], []
+        for name in names:
+            try:
+                self.request_start(name)
+                requested.append(name)
+            except OSError:
+                failed.append(name)
+        return failed + self.wait_for(requested, RUNNING, timeout)
+
+    def apply(self, ops, timeout=DEFAULT_TIMEOUT):
+        """
+        Apply ServiceOps as one batch: request every stop, wait for all of
+        them together, then change start types. Returns [(op, error)] with
+        error None on success. A service that does not stop in time gets a
+        TimeoutError, but its start type is still changed.
+        """
+        ops = list(ops)
+        still_running = set(self.stop([op.name for op in ops if op.stop], timeout))
+        results = []
+        for op in ops:
+            try:
+                if op.start:
+                    self.set_start_type(op.name, op.start)
+                error = None
+                if op.name in still_running:
+                    error = TimeoutError(f"{op.name} could not be stopped within {timeout:.0f} seconds")
+            except OSError as e:
+                error = e
+            results.append((op, error))
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+if advapi32 is not None:
+    class SERVICE_STATUS(ctypes.Structure):
+        _fields_ = [(name, wintypes.DWORD) for name in (
+            "dwServiceType", "dwCurrentState", "dwControlsAccepted", "dwWin32ExitCode",
+            "dwServiceSpecificExitCode", "dwCheckPoint", "dwWaitHint")]
+
+    class SERVICE_STATUS_PROCESS(ctypes.Structure):
+        _fields_ = [(name, wintypes.DWORD) for name in (
+            "dwServiceType", "dwCurrentState", "dwControlsAccepted", "dwWin32ExitCode",
+            "dwServiceSpecificExitCode", "dwCheckPoint", "dwWaitHint", "dwProcessId",
+            "dwServiceFlags")]
+
+    class ENUM_SERVICE_STATUSW(ctypes.Structure):
+        _fields_ = [("lpServiceName", wintypes.LPWSTR), ("lpDisplayName", wintypes.LPWSTR),
+                    ("ServiceStatus", SERVICE_STATUS)]
+
+    SC_HANDLE = wintypes.HANDLE
+    advapi32.OpenSCManagerW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD]
+    advapi32.OpenSCManagerW.restype = SC_HANDLE
+    advapi32.OpenServiceW.argtypes = [SC_HANDLE, wintypes.LPCWSTR, wintypes.DWORD]
+    advapi32.OpenServiceW.restype = SC_HANDLE
+    advapi32.CloseServiceHandle.argtypes = [SC_HANDLE]
+    advapi32.QueryServiceStatusEx.argtypes = [SC_HANDLE, ctypes.c_int, ctypes.c_void_p,
+                                              wintypes.DWORD, ctypes.POINTER(wintypes.DWORD)]
+    advapi32.QueryServiceConfigW.argtypes = [SC_HANDLE, ctypes.c_void_p, wintypes.DWORD,
+                                             ctypes.POINTER(wintypes.DWORD)]
+    advapi32.QueryServiceConfig2W.argtypes = [SC_HANDLE, wintypes.DWORD, ctypes.c_void_p,
+                                              wintypes.DWORD, ctypes.POINTER(wintypes.DWORD)]
+    advapi32.ChangeServiceConfigW.argtypes = [SC_HANDLE, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD,
+                                              wintypes.LPCWSTR, wintypes.LPCWSTR, ctypes.c_void_p,
+                                              wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.LPCWSTR,
+                                              wintypes.LPCWSTR]
+    advapi32.ChangeServiceConfig2W.argtypes = [SC_HANDLE, wintypes.DWORD, ctypes.c_void_p]
+    advapi32.ControlService.argtypes = [SC_HANDLE, wintypes.DWORD, ctypes.POINTER(SERVICE_STATUS)]
+    advapi32.StartServiceW.argtypes = [SC_HANDLE, wintypes.DWORD, ctypes.c_void_p]
+    advapi32.EnumDependentServicesW.argtypes = [SC_HANDLE, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD,
+                                                ctypes.POINTER(wintypes.DWORD),
+                                                ctypes.POINTER(wintypes.DWORD)]
+
+
+class ScmBackend(ServiceBackend):
+    """advapi32 implementation holding one SCM handle and cached service handles"""
+
+    SC_MANAGER_CONNECT = 0x0001
+    SERVICE_ACCESS = 0x0001 | 0x0002 | 0x0004 | 0x0008 | 0x0010 | 0x0020  # query/change config, status, deps, start, stop
+    SERVICE_NO_CHANGE = 0xFFFFFFFF
+    SERVICE_CONTROL_STOP = 0x00000001
+    SERVICE_ACTIVE = 0x00000001
+    SC_STATUS_PROCESS_INFO = 0
+    SERVICE_CONFIG_DELAYED_AUTO_START_INFO = 3
+    ERROR_INSUFFICIENT_BUFFER = 122
+    ERROR_MORE_DATA = 234
+    ERROR_SERVICE_ALREADY_RUNNING = 1056
+    ERROR_SERVICE_DOES_NOT_EXIST = 1060
+    ERROR_SERVICE_NOT_ACTIVE = 1062
+
+    def __init__(self):
+        if advapi32 is None:
+            raise RuntimeError("The Service Control Manager is not available on this platform")
+        self._scm = advapi32.OpenSCManagerW(None, None, self.SC_MANAGER_CONNECT)
+        if not self._scm:
+            raise ctypes.WinError(ctypes.get_last_error())
+        self._handles = {}
+        self._lock = threading.RLock()
+
+    def _error(self, name):
+        code = ctypes.get_last_error()
+        if code == self.ERROR_SERVICE_DOES_NOT_EXIST:
+            return ServiceNotFound(code, f"Service {name} is not installed")
+        return ctypes.WinError(code)
+
+    def _open(self, name):
+        """Return a cached service handle"""
+        with self._lock:
+            handle = self._handles.get(name.lower())
+            if handle is None:
+                handle = advapi32.OpenServiceW(self._scm, name, self.SERVICE_ACCESS)
+                if not handle:
+                    raise self._error(name)
+                self._handles[name.lower()] = handle
+            return handle
+
+    def status(self, name):
+        info = SERVICE_STATUS_PROCESS()
+        needed = wintypes.DWORD()
+        if not advapi32.QueryServiceStatusEx(self._open(name), self.SC_STATUS_PROCESS_INFO, ctypes.byref(info),
+                                             ctypes.sizeof(info), ctypes.byref(needed)):
+            raise self._error(name)
+        return info.dwCurrentState, info.dwWaitHint
+
+    def _query_buffer(self, query, name):
+        """Call a QueryServiceConfig* style function with a right-sized buffer"""
+        needed = wintypes.DWORD()
+        query(None, 0, ctypes.byref(needed))
+        if ctypes.get_last_error() not in (self.ERROR_INSUFFICIENT_BUFFER, 0):
+            raise self._error(name)
+        buffer = ctypes.create_string_buffer(max(needed.value, 64))
+        if not query(buffer, len(buffer), ctypes.byref(needed)):
+            raise self._error(name)
+        return buffer
+
+    def start_type(self, name):
+        handle = self._open(name)
+        config = self._query_buffer(
+            lambda buf, size, needed: advapi32.QueryServiceConfigW(handle, buf, size, needed), name)
+        start = ctypes.cast(config, ctypes.POINTER(wintypes.DWORD))[1]  # dwServiceType, dwStartType, ...
+        if start == START_TYPE_VALUES["auto"]:
+            delayed = self._query_buffer(
+                lambda buf, size, needed: advapi32.QueryServiceConfig2W(
+                    handle, self.SERVICE_CONFIG_DELAYED_AUTO_START_INFO, buf, size, needed), name)
+            if ctypes.cast(delayed, ctypes.POINTER(wintypes.BOOL))[0]:
+                return "delayed-auto"
+        return {value: key for key, value in START_TYPE_VALUES.items() if key != "delayed-auto"}.get(start)
+
+    def set_start_type(self, name, start):
+        handle = self._open(name)
+        if not advapi32.ChangeServiceConfigW(handle, self.SERVICE_NO_CHANGE, START_TYPE_VALUES[start],
+                                             self.SERVICE_NO_CHANGE, None, None, None, None, None, None, None):
+            raise self._error(name)
+        if start == "delayed-auto":
+            flag = wintypes.BOOL(True)
+            if not advapi32.ChangeServiceConfig2W(handle, self.SERVICE_CONFIG_DELAYED_AUTO_START_INFO,
+                                                  ctypes.byref(flag)):
+                raise self._error(name)
+
+    def request_stop(self, name):
+        status = SERVICE_STATUS()
+        if advapi32.ControlService(self._open(name), self.SERVICE_CONTROL_STOP, ctypes.byref(status)):
+            return True
+        if ctypes.get_last_error() == self.ERROR_SERVICE_NOT_ACTIVE:
+            return False
+        raise self._error(name)
+
+    def request_start(self, name):
+        if advapi32.StartServiceW(self._open(name), 0, None):
+            return True
+        if ctypes.get_last_error() == self.ERROR_SERVICE_ALREADY_RUNNING:
+            return False
+        raise self._error(name)
+
+    def dependents(self, name):
+        handle = self._open(name)
+        needed, count = wintypes.DWORD(), wintypes.DWORD()
+        if advapi32.EnumDependentServicesW(handle, self.SERVICE_ACTIVE, None, 0,
+                                           ctypes.byref(needed), ctypes.byref(count)):
+            return []  # No active dependents
+        if ctypes.get_last_error() != self.ERROR_MORE_DATA:
+            raise self._error(name)
+        buffer = ctypes.create_string_buffer(needed.value)
+        if not advapi32.EnumDependentServicesW(handle, self.SERVICE_ACTIVE, buffer, needed,
+                                               ctypes.byref(needed), ctypes.byref(count)):
+            raise self._error(name)
+        entries = ctypes.cast(buffer, ctypes.POINTER(ENUM_SERVICE_STATUSW))
+        # Returned in reverse start order, i.e. the order to stop them in
+        return [entries[i].lpServiceName for i in range(count.value)]
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                advapi32.CloseServiceHandle(handle)
+            self._handles.clear()
+
+
+class MemoryServices(ServiceBackend):
+    """
+    In-memory SCM. services maps name -> (state, start type); stops and
+    starts stay pending for transition seconds, and names in stuck never
+    finish stopping.
+    """
+
+    def __init__(self, services=None, transition=0.0, dependents=None, stuck=()):
+        self._services = {}
+        self._lock = threading.RLock()
+        self.transition = transition
+        self._dependents = {k.lower(): list(v) for k, v in (dependents or {}).items()}
+        self.stuck = {name.lower() for name in stuck}
+        self.calls = 0
+        for name, (state, start) in (services or {}).items():
+            self._services[name.lower()] = {"name": name, "state": state, "start": start, "due": None}
+
+    def _get(self, name):
+        self.calls += 1
+        entry = self._services.get(name.lower())
+        if entry is None:
+            raise ServiceNotFound(1060, f"Service {name} is not installed")
+        if entry["due"] is not None and time.monotonic() >= entry["due"][0]:
+            entry["state"], entry["due"] = entry["due"][1], None
+        return entry
+
+    def _transition(self, entry, pending, final):
+        entry["state"] = pending
+        entry["due"] = None if entry["name"].lower() in self.stuck and final == STOPPED else \
+            (time.monotonic() + self.transition, final)
+        if entry["due"] is not None and self.transition <= 0:
+            entry["state"], entry["due"] = final, None
+
+    def status(self, name):
+        with self._lock:
+            entry = self._get(name)
+            return entry["state"], int(self.transition * 1000)
+
+    def start_type(self, name):
+        with self._lock:
+            return self._get(name)["start"]
+
+    def set_start_type(self, name, start):
+        if start not in START_TYPE_VALUES:
+            raise OSError(87, f"Invalid start type {start!r}")
+        with self._lock:
+            self._get(name)["start"] = start
+
+    def request_stop(self, name):
+        with self._lock:
+            entry = self._get(name)
+            if entry["state"] == STOPPED:
+                return False
+            if any(self._get(dep)["state"] != STOPPED for dep in self._dependents.get(name.lower(), [])):
+                raise OSError(1051, f"Dependent services of {name} are running")
+            self._transition(entry, STOP_PENDING, STOPPED)
+            return True
+
+    def request_start(self, name):
+        with self._lock:
+            entry = self._get(name)
+            if entry["start"] == "disabled":
+                raise OSError(1058, f"Service {name} is disabled")
+            if entry["state"] == RUNNING:
+                return False
+            self._transition(entry, START_PENDING, RUNNING)
+            return True
+
+    def dependents(self, name):
+        with self._lock:
+            return [dep for dep in self._dependents.get(name.lower(), [])
+                    if self._get(dep)["state"] != STOPPED]
+
+    def dump(self):
+        """Return {name_lower: (state, start)} for assertions"""
+        with self._lock:
+            return {key: (self._get(key)["state"], entry["start"]) for key, entry in self._services.items()}
+
+
+def default_service_backend():
+    """Return the SCM backend on Windows and the in-memory fake elsewhere"""
+    if advapi32 is not None:
+        return ScmBackend()
+    return MemoryServices()
@@ -0,0 +1,105 @@
+"""
+Targeted pre-change snapshots for Windows 11 Optimizer.
+
+Instead of exporting whole hives, a snapshot records only the registry
+values, service start types, event log settings and power scheme a plan
+is about to change, as a small JSON file. Cost scales with the plan, not the hive.
+"""
+import datetime
+import json
+import os
+
+from registry_backend import REG_EXPAND_SZ, REG_SZ, RegOp
+from tweak_catalog import EventLogOp, PowerOp, ServiceOp
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(OSError):
+    """The snapshot could not be written, so nothing may be changed"""
+
+
+def encode_data(reg_type, data):
+    """
+    Make registry data JSON-safe: bytes become a hex string, whatever the
+    type (REG_BINARY, but also REG_NONE, REG_RESOURCE_LIST... come back
+    from winreg as bytes)
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data).hex()
+    return data
+
+
+def decode_data(reg_type, data):
+    """Inverse of encode_data; only REG_SZ and REG_EXPAND_SZ hold real strings"""
+    if isinstance(data, str) and reg_type not in (REG_SZ, REG_EXPAND_SZ):
+        return bytes.fromhex(data)
+    return data
+
+
+def take_snapshot(plan, probe):
+    """Read the current state of everything the plan touches"""
+    registry = []
+    for op in plan.registry.values():
+        current = probe.registry_value(op)
+        entry = {"hive": op.hive, "path": op.path, "name": op.name, "exists": current is not None}
+        if current is not None:
+            entry["type"] = current[0]
+            entry["data"] = encode_data(current[0], current[1])
+        registry.append(entry)
+    services = [{"name": svc.name, "start": probe.service_start(svc.name)}
+                for svc in plan.services.values()]
+    eventlogs = []
+    for log in plan.eventlogs.values():
+        current = probe.eventlog_config(log.channel)
+        if current is not None:
+            eventlogs.append(dict(current._asdict()))
+    power = probe.active_power_scheme() if plan.power else None
+    return {
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "tweaks": list(plan.tweaks),
+        "registry": registry,
+        "services": services,
+        "eventlogs": eventlogs,
+        "power": power,
+    }
+
+
+def save_snapshot(snapshot, directory):
+    """Write a snapshot next to older ones and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = os.path.join(directory, f"snapshot_{timestamp}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path):
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version in {path}")
+    return snapshot
+
+
+def restore_ops(snapshot):
+    """Ops that put every recorded setting back to its snapshotted state"""
+    ops = []
+    for entry in snapshot["registry"]:
+        if entry["exists"]:
+            ops.append(RegOp("set", entry["hive"], entry["path"], entry["name"], entry["type"],
+                             decode_data(entry["type"], entry["data"])))
+        else:
+            ops.append(RegOp("delete", entry["hive"], entry["path"], entry["name"], None, None))
+    for entry in snapshot["services"]:
+        if entry["start"]:
+            ops.append(ServiceOp(entry["name"], entry["start"], False))
+    for entry in snapshot.get("eventlogs", []):
+        ops.append(EventLogOp(entry["channel"], entry["max_size"], entry["retention"], entry["auto_backup"]))
+    if snapshot.get("power"):
+        ops.append(PowerOp(snapshot["power"]))
+    return ops
@@ -0,0 +1,34 @@
+"""
+Startup timing marks for Windows 11 Optimizer.
+
+When W11OPT_STARTUP_TRACE names a file, mark() records wall-clock
+timestamps ("imports", "first_window", "interactive", ...) and flush()
+writes them there as JSON for benchmarks/startup_benchmark.py. With
+W11OPT_STARTUP_EXIT=1 the GUI closes itself once it is interactive. With
+neither variable set this module does nothing.
+"""
+import json
+import os
+import time
+
+TRACE_PATH = os.environ.get("W11OPT_STARTUP_TRACE")
+EXIT_WHEN_INTERACTIVE = os.environ.get("W11OPT_STARTUP_EXIT") == "1"
+
+_marks = {}
+
+
+def mark(name):
+    """Record time.time() for name (first call wins)"""
+    if TRACE_PATH:
+        _marks.setdefault(name, time.time())
+
+
+def flush():
+    """Write the recorded marks to TRACE_PATH"""
+    if not TRACE_PATH:
+        return
+    try:
+        with open(TRACE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "marks": _marks}, f)
+    except OSError as e:
+        print(f"Startup trace error: {e}")
@@ -0,0 +1,144 @@
+"""
+Read-before-write state probe for Windows 11 Optimizer.
+
+Reads the current registry values, service start types, event log
+channel settings and the active power scheme so a plan can be pruned
+down to the operations that would actually change something, and whether
+a service is running so the undo journal can start it again. Everything
+is read through the registry, event log and service backends, so probing
+costs no process launches.
+"""
+from eventlog_backend import changed_properties
+from planner import Plan
+from service_backend import RUNNING
+
+SERVICES_KEY = r"SYSTEM\CurrentControlSet\Services"
+POWER_SCHEMES_KEY = r"SYSTEM\CurrentControlSet\Control\Power\User\PowerSchemes"
+
+# Services\<name>\Start values
+START_TYPES = {0: "boot", 1: "system", 2: "auto", 3: "demand", 4: "disabled"}
+
+
+class StateProbe:
+    """Answers "is this op already in effect?" for registry, service, event log and power ops"""
+
+    def __init__(self, registry, eventlogs=None, services=None):
+        self.registry = registry
+        self.eventlogs = eventlogs
+        self.services = services
+
+    def registry_value(self, op):
+        """Current (type, data) of the value an op targets, or None if absent"""
+        return self.registry.read(op.hive, op.path, op.name)
+
+    def registry_compliant(self, op):
+        current = self.registry_value(op)
+        if op.action == "delete":
+            return current is None
+        return current == (op.type, op.data)
+
+    def service_start(self, name):
+        """Configured start type of a service ("auto", "disabled", ...) or None if unknown"""
+        current = self.registry.read("HKLM", f"{SERVICES_KEY}\\{name}", "Start")
+        if current is None:
+            return None
+        return START_TYPES.get(current[1])
+
+    def service_running(self, name):
+        """Whether a service is running, or None if unknown (no service backend or not installed)"""
+        if self.services is None:
+            return None
+        status = self.services.query(name)
+        return None if status is None else status.state == RUNNING
+
+    def service_compliant(self, svc):
+        # A stop request is considered satisfied once the start type is in place:
+        # the service was stopped when the start type was first changed
+        return svc.start is None or self.service_start(svc.name) == svc.start
+
+    def eventlog_config(self, channel):
+        """Current ChannelConfig of an event log, or None if unknown"""
+        if self.eventlogs is None:
+            return None
+        return self.eventlogs.query(channel)
+
+    def eventlog_compliant(self, op):
+        current = self.eventlog_config(op.channel)
+        return current is not None and not changed_properties(current, op)
+
+    def active_power_scheme(self):
+        current = self.registry.read("HKLM", POWER_SCHEMES_KEY, "ActivePowerScheme")
+        return None if current is None else str(current[1]).lower()
+
+    def power_compliant(self, power_op):
+        return self.active_power_scheme() == power_op.scheme.lower()
+
+
+class ComplianceReport:
+    """Per-category counts of ops checked and ops already compliant"""
+
+    def __init__(self):
+        self.checked = {"registry": 0, "services": 0, "eventlogs": 0, "power": 0}
+        self.compliant = {"registry": 0, "services": 0, "eventlogs": 0, "power": 0}
+
+    @property
+    def total_compliant(self):
+        return sum(self.compliant.values())
+
+    @property
+    def total_checked(self):
+        return sum(self.checked.values())
+
+    def summary(self):
+        return (f"{self.total_compliant} of {self.total_checked} settings already compliant "
+                f"(registry {self.compliant['registry']}/{self.checked['registry']}, "
+                f"services {self.compliant['services']}/{self.checked['services']}, "
+                f"event logs {self.compliant['eventlogs']}/{self.checked['eventlogs']}, "
+                f"power {self.compliant['power']}/{self.checked['power']})")
+
+
+def prune_compliant(plan, probe):
+    """
+    Return (pending_plan, report) where pending_plan only holds ops that
+    would change the system. Commands and handlers cannot be probed and
+    are always kept.
+    """
+    report = ComplianceReport()
+    pending = Plan()
+    pending.tweaks = list(plan.tweaks)
+    pending.requested_ops = plan.requested_ops
+    pending.commands = list(plan.commands)
+    pending.calls = list(plan.calls)
+
+    for value_id, op in plan.registry.items():
+        report.checked["registry"] += 1
+        if probe.registry_compliant(op):
+            report.compliant["registry"] += 1
+        else:
+            pending.registry[value_id] = op
+            pending.owners[value_id] = plan.owners[value_id]
+
+    for name, svc in plan.services.items():
+        report.checked["services"] += 1
+        if probe.service_compliant(svc):
+            report.compliant["services"] += 1
+        else:
+            pending.services[name] = svc
+            pending.service_owners[name] = plan.service_owners[name]
+
+    for channel, log in plan.eventlogs.items():
+        report.checked["eventlogs"] += 1
+        if probe.eventlog_compliant(log):
+            report.compliant["eventlogs"] += 1
+        else:
+            pending.eventlogs[channel] = log
+            pending.eventlog_owners[channel] = plan.eventlog_owners[channel]
+
+    if plan.power:
+        report.checked["power"] += 1
+        if probe.power_compliant(plan.power[1]):
+            report.compliant["power"] += 1
+        else:
+            pending.power = plan.power
+
+    return pending, report
@@ -0,0 +1,192 @@
+"""
+Temporary file cleanup for Windows 11 Optimizer.
+
+Replaces `Get-ChildItem -Recurse | Remove-Item` for cleanup_temp_files.
+The tree is walked with os.scandir (on Windows the directory listing
+already carries size, times and attributes, so no extra stat per file)
+and deletions are handed to a thread pool in batches while the walk
+goes on. Files another process holds open fail with a sharing violation
+and are skipped at once instead of retried. Links and junctions are
+removed themselves, never followed. Folders emptied by the run are
+removed afterwards, deepest first.
+
+Works on any platform, so it can be exercised on a Linux temp tree.
+"""
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+BATCH_SIZE = 128           # paths per pool task
+PROGRESS_INTERVAL = 0.25   # seconds between progress callbacks
+MAX_ERROR_SAMPLES = 20
+
+ERROR_SHARING_VIOLATION = 32   # winerror: the file is open in another process
+ERROR_LOCK_VIOLATION = 33
+FILE_ATTRIBUTE_READONLY = 0x1
+FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+class CleanupResult:
+    """Counters for one cleanup run; updated from the worker threads"""
+
+    def __init__(self):
+        self.files = 0        # files (and links) removed
+        self.bytes = 0        # bytes reclaimed
+        self.dirs = 0         # emptied folders removed
+        self.locked = 0       # in use by another process, skipped
+        self.kept = 0         # excluded by the age / size filters
+        self.errors = 0
+        self.error_samples = []   # (path, message), the first MAX_ERROR_SAMPLES errors
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, files=0, size=0, locked=0, errors=()):
+        with self._lock:
+            self.files += files
+            self.bytes += size
+            self.locked += locked
+            self.errors += len(errors)
+            room = MAX_ERROR_SAMPLES - len(self.error_samples)
+            if room > 0:
+                self.error_samples.extend(errors[:room])
+
+    @property
+    def files_per_second(self):
+        return self.files / self.duration if self.duration > 0 else 0.0
+
+    def summary(self):
+        text = (f"Removed {self.files} files ({format_bytes(self.bytes)}) and {self.dirs} folders "
+                f"in {self.duration:.1f}s ({self.files_per_second:.0f} files/s)")
+        if self.locked:
+            text += f"; {self.locked} in use skipped"
+        if self.kept:
+            text += f"; {self.kept} kept by filters"
+        if self.errors:
+            text += f"; {self.errors} errors"
+        return text
+
+
+def is_link(entry):
+    """Symlink or junction - removed as an entry, never descended into"""
+    if entry.is_symlink():
+        return True
+    try:
+        attributes = getattr(entry.stat(follow_symlinks=False), "st_file_attributes", 0)
+    except OSError:
+        return False
+    return bool(attributes & FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def is_locked(error):
+    return getattr(error, "winerror", None) in (ERROR_SHARING_VIOLATION, ERROR_LOCK_VIOLATION)
+
+
+def remove_entry(path, readonly=False, directory_link=False):
+    """Delete one file or link, clearing the read-only attribute first if it is set"""
+    if readonly:
+        os.chmod(path, stat.S_IWRITE)
+    if directory_link:
+        os.rmdir(path)   # Windows directory symlink or junction: removes the link only
+    else:
+        os.unlink(path)
+
+
+def delete_batch(batch, result):
+    """Pool task: delete (path, size, readonly, directory_link) entries and count the outcome"""
+    files = size = locked = 0
+    errors = []
+    for path, entry_size, readonly, directory_link in batch:
+        try:
+            remove_entry(path, readonly, directory_link)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            if is_locked(e):
+                locked += 1
+            else:
+                errors.append((path, str(e)))
+            continue
+        files += 1
+        size += entry_size
+    result.add(files, size, locked, errors)
+
+
+def clean_tree(roots, min_age=0, min_size=0, max_size=None, workers=DEFAULT_WORKERS,
+               remove_dirs=True, progress=None, now=None):
+    """
+    Delete the files below each root (the roots themselves are kept).
+    min_age: only files last modified at least this many seconds ago.
+    min_size / max_size: only files within this size range, in bytes.
+    progress(files, bytes) is called periodically from this thread.
+    Returns a CleanupResult.
+    """
+    if isinstance(roots, str):
+        roots = [roots]
+    result = CleanupResult()
+    started = time.perf_counter()
+    cutoff = (time.time() if now is None else now) - min_age
+    dirs = []        # (path, mtime) of every folder below a root, parents before children
+    batch = []
+    last_report = started
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cleanup") as pool:
+        stack = list(roots)
+        while stack:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            info = entry.stat(follow_symlinks=False)
+                            link = is_link(entry)
+                            if not link and entry.is_dir(follow_symlinks=False):
+                                dirs.append((entry.path, info.st_mtime))
+                                stack.append(entry.path)
+                                continue
+                        except OSError as e:
+                            result.add(errors=[(entry.path, str(e))])
+                            continue
+                        if (info.st_mtime > cutoff or info.st_size < min_size
+                                or (max_size is not None and info.st_size > max_size)):
+                            result.kept += 1
+                            continue
+                        attributes = getattr(info, "st_file_attributes", 0)
+                        batch.append((entry.path, 0 if link else info.st_size,
+                                      bool(attributes & FILE_ATTRIBUTE_READONLY),
+                                      link and os.name == "nt" and entry.is_dir()))
+                        if len(batch) >= BATCH_SIZE:
+                            pool.submit(delete_batch, batch, result)
+                            batch = []
+            except OSError as e:
+                result.add(errors=[(folder, str(e))])
+            if progress is not None and time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.perf_counter()
+                progress(result.files, result.bytes)
+        if batch:
+            pool.submit(delete_batch, batch, result)
+
+    if remove_dirs:
+        # Deepest first; a folder that still holds skipped or new files just stays
+        for path, mtime in reversed(dirs):
+            if mtime > cutoff:
+                continue
+            try:
+                os.rmdir(path)
+                result.dirs += 1
+            except OSError:
+                pass
+
+    result.duration = time.perf_counter() - started
+    if progress is not None:
+        progress(result.files, result.bytes)
+    return result
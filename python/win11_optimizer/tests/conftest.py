@@ -0,0 +1,12 @@
+"""
+Test setup for Windows 11 Optimizer.
+
+The app is a folder of flat modules run from its own directory, so the
+tests put that directory on sys.path the way the benchmarks do. Every test
+runs against the in-memory backends and fakes, so the suite runs on Linux.
+"""
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
@@ -0,0 +1,58 @@
+"""Tests for the single-pass AppX removal script and the parsing of its output"""
+import json
+
+from appx import ENUM_PREFIX, RESULT_PREFIX, parse_removal_output, ps_quote, remove_packages, removal_script
+
+
+def result_line(name, ok=True, ms=1500, error=""):
+    return RESULT_PREFIX + json.dumps({"name": name, "package": f"{name}_1.0_x64", "pattern": "*Xbox*",
+                                       "ok": ok, "ms": ms, "error": error})
+
+
+def test_complete_run_reports_every_removal():
+    output = "\n".join([f"{ENUM_PREFIX}120 2500", result_line("Microsoft.XboxApp"),
+                        result_line("Microsoft.XboxGameOverlay", ok=False, ms=200, error="Access denied. "),
+                        "PS noise that is not ours"])
+    report = parse_removal_output(output)
+    assert (report.enumerated, report.enumerate_seconds) == (120, 2.5)
+    assert [removal.name for removal in report.removals] == ["Microsoft.XboxApp", "Microsoft.XboxGameOverlay"]
+    assert report.removals[0].duration == 1.5
+    assert report.failures[0].error == "Access denied."
+    assert report.summary() == ("Removed 1 of 2 matching packages (120 enumerated in 2.5s); "
+                                "failed: Microsoft.XboxGameOverlay")
+    assert str(report.removals[0]) == "Microsoft.XboxApp_1.0_x64 [*Xbox*] removed in 1.50s"
+
+
+def test_run_cut_off_after_enumeration_keeps_what_finished():
+    output = f"{ENUM_PREFIX}80 900\n{result_line('Microsoft.BingNews')}\n{RESULT_PREFIX}{{\"name\": \"Micro"
+    report = parse_removal_output(output)
+    assert report.enumerated == 80
+    assert [removal.name for removal in report.removals] == ["Microsoft.BingNews"]
+    assert report.summary().startswith("Removed 1 of 1 matching packages")
+
+
+def test_missing_enumeration_line():
+    report = parse_removal_output("Failed: Timeout after 900 seconds")
+    assert report.enumerated is None
+    assert report.removals == []
+    assert report.summary() == "Package enumeration did not complete"
+
+
+def test_malformed_result_line_is_skipped():
+    report = parse_removal_output(f"{ENUM_PREFIX}5 10\n{RESULT_PREFIX}not json\n{result_line('Clipchamp.Clipchamp')}")
+    assert [removal.name for removal in report.removals] == ["Clipchamp.Clipchamp"]
+
+
+def test_script_quotes_patterns_and_runs_once():
+    script = removal_script(["*Xbox*", "O'Brien.App*"], all_users=True)
+    assert "$patterns = @('*Xbox*', 'O''Brien.App*')" in script
+    assert "Get-AppxPackage -AllUsers" in script
+    assert ps_quote("it's") == "'it''s'"
+    calls = []
+
+    def run_ps(script, timeout):
+        calls.append(timeout)
+        return f"{ENUM_PREFIX}3 40"
+    report, output = remove_packages(["*Xbox*"], run_ps, timeout=60)
+    assert calls == [60]
+    assert (report.enumerated, output) == (3, f"{ENUM_PREFIX}3 40")
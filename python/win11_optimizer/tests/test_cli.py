@@ -0,0 +1,115 @@
+"""Tests for the headless command line, driving main() against the in-memory backends"""
+import json
+import os
+
+import pytest
+
+import cli
+import endpoint_security
+import engine
+from command_pool import CommandPool, FakeLauncher
+from eventlog_backend import MemoryEventLogs
+from inventory import Inventory
+from registry_backend import REG_DWORD, MemoryRegistry
+from service_backend import MemoryServices
+
+TRANSPARENCY = ("HKCU", "software\\microsoft\\windows\\currentversion\\themes\\personalize", "enabletransparency")
+SELECT = ["--mode", "Basic", "--select", "disable_transparency"]
+
+
+@pytest.fixture
+def machine(tmp_path, monkeypatch):
+    """In-memory backends behind the engine; the engine's globals are put back afterwards"""
+    for name in ("BACKUP_DIR", "journal", "oplog", "last_backup", "applied_tweaks"):
+        monkeypatch.setattr(engine, name, getattr(engine, name))
+    registry = MemoryRegistry({TRANSPARENCY: (REG_DWORD, 1)})
+    monkeypatch.setattr(engine, "registry", registry)
+    monkeypatch.setattr(engine, "inventory", Inventory(registry))
+    monkeypatch.setattr(engine, "services", MemoryServices())
+    monkeypatch.setattr(engine, "eventlogs", MemoryEventLogs())
+    monkeypatch.setattr(engine, "commands", CommandPool(launcher=FakeLauncher()))
+    monkeypatch.setattr(endpoint_security, "check_endpoint_security", lambda: [])
+    yield registry, str(tmp_path)
+    engine.oplog.close()
+
+
+def run(capsys, *argv):
+    """(exit code, stdout) of one main() call"""
+    code = cli.main(list(argv))
+    return code, capsys.readouterr().out
+
+
+def test_plan_prints_the_diff_and_changes_nothing(machine, capsys):
+    registry, backup_dir = machine
+    code, out = run(capsys, "plan", *SELECT, "--backup-dir", backup_dir, "--json")
+    assert code == cli.EXIT_OK
+    data = json.loads(out)
+    assert data["tweaks"] == ["disable_transparency"]
+    assert [entry["change"] for entry in data["diff"]] == ["~"]
+    assert registry.dump()[TRANSPARENCY] == (REG_DWORD, 1)
+    code, out = run(capsys, "plan", *SELECT, "--backup-dir", backup_dir, "--max-cost", "0")
+    assert code == cli.EXIT_TOO_COSTLY
+    assert "REJECTED" in out
+
+
+def test_apply_verify_and_undo_round_trip(machine, capsys):
+    registry, backup_dir = machine
+    assert run(capsys, "verify", *SELECT, "--backup-dir", backup_dir)[0] == cli.EXIT_NONCOMPLIANT
+    code, out = run(capsys, "apply", *SELECT, "--backup-dir", backup_dir, "--json")
+    assert code == cli.EXIT_OK
+    data = json.loads(out)
+    assert data["failures"] == []
+    assert os.path.dirname(data["backup"]) == backup_dir
+    assert registry.dump()[TRANSPARENCY] == (REG_DWORD, 0)
+    assert os.path.exists(os.path.join(backup_dir, "undo_journal.jsonl"))
+
+    code, out = run(capsys, "verify", *SELECT, "--backup-dir", backup_dir, "--json")
+    assert (code, json.loads(out)["compliant"]) == (cli.EXIT_OK, True)
+
+    code, out = run(capsys, "undo", "--backup-dir", backup_dir, "--json")
+    assert (code, json.loads(out)["failures"]) == (cli.EXIT_OK, [])
+    assert registry.dump()[TRANSPARENCY] == (REG_DWORD, 1)
+    assert run(capsys, "undo", "--backup-dir", backup_dir)[1].strip() == "No journaled changes to undo."
+
+
+def test_apply_exit_codes_for_failures(machine, capsys, monkeypatch):
+    registry, backup_dir = machine
+    monkeypatch.setattr(endpoint_security, "check_endpoint_security", lambda: ["Sophos Endpoint"])
+    assert run(capsys, "apply", *SELECT, "--backup-dir", backup_dir)[0] == cli.EXIT_BLOCKED
+
+    def refuse(snapshot, directory):
+        raise PermissionError(13, "Access is denied")
+    monkeypatch.setattr(engine, "save_snapshot", refuse)
+    assert run(capsys, "apply", *SELECT, "--backup-dir", backup_dir, "--allow-endpoint-security")[0] == \
+        cli.EXIT_FAILED
+    assert registry.dump()[TRANSPARENCY] == (REG_DWORD, 1)
+
+
+def test_bad_selection_is_a_usage_error(machine, capsys):
+    backup_dir = machine[1]
+    assert cli.main(["plan", "--mode", "Basic", "--select", "no_such_tweak", "--backup-dir", backup_dir]) == \
+        cli.EXIT_USAGE
+    assert "Unknown tweak" in capsys.readouterr().err
+    assert cli.main(["verify", "--mode", "Basic", "--backup-dir", backup_dir]) == cli.EXIT_USAGE
+
+
+def test_max_commands_sizes_the_command_pool(machine, capsys):
+    run(capsys, "verify", *SELECT, "--backup-dir", machine[1], "--max-commands", "3")
+    assert engine.commands.max_parallel == 3
+
+
+def test_backup_query_reads_one_key(machine, capsys, tmp_path):
+    path = tmp_path / "registry_backup.reg"
+    text = ("Windows Registry Editor Version 5.00\r\n\r\n"
+            "[HKEY_CURRENT_USER\\Control Panel\\Desktop]\r\n\"MenuShowDelay\"=\"400\"\r\n\r\n"
+            "[HKEY_CURRENT_USER\\Control Panel\\Mouse]\r\n\"MouseSpeed\"=\"1\"\r\n\r\n")
+    path.write_bytes(b"\xff\xfe" + text.encode("utf-16-le"))
+    code, out = run(capsys, "backup-query", str(path), "HKCU\\Control Panel\\Desktop", "--json")
+    assert code == cli.EXIT_OK
+    assert json.loads(out) == [{"key": "HKEY_CURRENT_USER\\Control Panel\\Desktop",
+                                "values": [{"name": "MenuShowDelay", "type": "REG_SZ", "data": "400"}]}]
+    code, out = run(capsys, "backup-query", str(path), "HKCU\\Control Panel", "--recurse", "--value", "MouseSpeed")
+    assert code == cli.EXIT_OK
+    assert out.splitlines() == ["HKEY_CURRENT_USER\\Control Panel\\Mouse", "    MouseSpeed    REG_SZ    1"]
+    assert run(capsys, "backup-query", str(path), "HKCU\\Missing")[0] == cli.EXIT_FAILED
+    assert run(capsys, "backup-query", str(tmp_path / "missing.reg"), "HKCU\\Missing")[0] == cli.EXIT_FAILED
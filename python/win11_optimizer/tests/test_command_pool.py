@@ -0,0 +1,98 @@
+"""Tests for the shared command pool, with FakeLauncher standing in for processes"""
+import subprocess
+import threading
+import time
+
+import pytest
+
+from command_pool import (BACKGROUND, INTERACTIVE, NORMAL, CommandPool, FakeLauncher, expand_vars, needs_shell,
+                          priority_scope)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    pool = CommandPool(max_parallel=1, interactive_slots=0)
+    order = []
+    release = threading.Event()
+
+    def blocker():
+        with pool.slot(NORMAL):
+            release.wait()
+    holder = threading.Thread(target=blocker)
+    holder.start()
+    time.sleep(0.05)
+    def waiter(name, priority):
+        pool.call(name, lambda: order.append(name) or (0, ""), priority)
+    waiters = []
+    for name, priority in (("background", BACKGROUND), ("normal 1", NORMAL), ("interactive", INTERACTIVE),
+                           ("normal 2", NORMAL)):
+        thread = threading.Thread(target=waiter, args=(name, priority))
+        thread.start()
+        waiters.append(thread)
+        time.sleep(0.05)   # make arrival order deterministic
+    release.set()
+    for thread in [holder] + waiters:
+        thread.join(5)
+    assert order == ["interactive", "normal 1", "normal 2", "background"]
+
+
+def test_max_parallel_bounds_running_commands():
+    launcher = FakeLauncher(delay=0.05)
+    pool = CommandPool(max_parallel=3, launcher=launcher)
+    threads = [threading.Thread(target=pool.run, args=(f"cmd {i}",)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert launcher.peak == 3 and pool.peak == 3
+    assert pool.stats()["commands"] == 12
+
+
+def test_interactive_commands_have_their_own_slots():
+    launcher = FakeLauncher(delay=0.1)
+    pool = CommandPool(max_parallel=1, launcher=launcher, interactive_slots=4)
+    threads = [threading.Thread(target=pool.run, args=(f"normal {i}",)) for i in range(2)]
+    threads += [threading.Thread(target=pool.run, args=(f"probe {i}",), kwargs={"priority": INTERACTIVE})
+                for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert launcher.peak == 5
+    assert max(r.queued for r in pool.records if r.priority == INTERACTIVE) < 0.05
+    assert max(r.queued for r in pool.records if r.priority == NORMAL) >= 0.05
+
+
+def test_priority_scope_sets_the_default_for_this_thread():
+    pool = CommandPool(launcher=FakeLauncher())
+    with priority_scope(BACKGROUND):
+        pool.run("defrag C: /O")
+    pool.run("ipconfig /flushdns")
+    assert [r.priority for r in pool.records] == [BACKGROUND, NORMAL]
+    assert pool.stats()["by_priority"] == {"background": 1, "normal": 1}
+
+
+def test_records_exit_codes_errors_and_hooks():
+    launcher = FakeLauncher({"sc query missing": (1060, "FAILED 1060"), "slow": (0, "")})
+    pool = CommandPool(launcher=launcher)
+    seen = []
+    pool.hooks.append(seen.append)
+    pool.hooks.append(lambda record: 1 / 0)   # a broken hook must not break commands
+    assert pool.run(["sc", "query", "missing"]) == (1060, "FAILED 1060")
+    launcher.delay = 0.2
+    with pytest.raises(subprocess.TimeoutExpired):
+        pool.run("slow", timeout=0.05)
+    first, second = pool.records
+    assert (first.command, first.exit_code, first.output_bytes) == ("sc query missing", 1060, 11)
+    assert second.error.startswith("TimeoutExpired")
+    assert seen == [first, second]
+    assert pool.stats(since=first.seq)["commands"] == 1
+    assert "2 failed" in pool.summary()
+
+
+def test_needs_shell_and_expand_vars(monkeypatch):
+    assert needs_shell('ipconfig /all | findstr /i "dns"')
+    assert needs_shell("echo %USERDOMAIN%")
+    assert not needs_shell('nltest "/dsgetdc:a|b"')
+    assert not needs_shell("sc query netlogon")
+    monkeypatch.setenv("W11OPT_DOMAIN", "CORP")
+    assert expand_vars("nltest /dsgetdc:%W11OPT_DOMAIN% %W11OPT_UNSET%") == "nltest /dsgetdc:CORP %W11OPT_UNSET%"
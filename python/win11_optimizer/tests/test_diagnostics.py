@@ -0,0 +1,70 @@
+"""Tests for the concurrent domain trust probes"""
+import subprocess
+import time
+
+from command_pool import INTERACTIVE, NORMAL, CommandPool, FakeLauncher
+from diagnostics import DOMAIN_TRUST_PROBES, FAIL, OK, WARN, Probe, classify_present, format_report, run_probes
+
+
+def runner(pool, priority=INTERACTIVE):
+    """run_cmd/run_ps stand-in: the output, or "Failed: ..." like engine.run_cmd"""
+    def run(command, timeout):
+        try:
+            exit_code, output = pool.run(command, timeout=timeout, priority=priority)
+        except subprocess.TimeoutExpired:
+            return "Failed: Timeout"
+        return output if exit_code == 0 else f"Failed: exit code {exit_code}"
+    return run
+
+
+def test_probes_do_not_queue_behind_each_other():
+    launcher = FakeLauncher({"sc query netlogon": (0, "STATE : 4 RUNNING"), "klist": (0, "Cached Tickets: (2)")},
+                            delay=0.3)
+    pool = CommandPool(max_parallel=2, launcher=launcher)
+    started = time.monotonic()
+    results = run_probes(DOMAIN_TRUST_PROBES, runner(pool), runner(pool), deadline=5)
+    assert time.monotonic() - started < 1.0          # hostname and echo run one after the other
+    assert launcher.peak >= len(DOMAIN_TRUST_PROBES)
+    assert max(record.queued for record in pool.records) < 0.1
+    by_name = {result.name: result for result in results}
+    assert by_name["netlogon"].status == OK
+    assert by_name["kerberos"].status == OK
+    assert by_name["ping"].status == WARN
+
+
+def test_interactive_slots_leave_tweak_work_bounded():
+    launcher = FakeLauncher(delay=0.2)
+    pool = CommandPool(max_parallel=2, launcher=launcher, interactive_slots=0)
+    started = time.monotonic()
+    run_probes(DOMAIN_TRUST_PROBES, runner(pool), runner(pool), deadline=5)
+    # Without interactive slots the ten commands share two slots
+    assert time.monotonic() - started >= 0.9
+    assert launcher.peak == 2
+    assert runner(pool, NORMAL)("hostname", 1) == ""
+
+
+def test_probe_commands_only_get_the_time_left_before_the_deadline():
+    timeouts = []
+
+    def run_cmd(command, timeout):
+        timeouts.append(timeout)
+        time.sleep(1.0)
+        return "output"
+    probe = Probe("two", "TWO COMMANDS", ["first", "second"], classify_present)
+    probe.run(run_cmd, None, time.monotonic() + 3)
+    assert timeouts == [2, 1]   # whole seconds left, rounded down
+
+
+def test_probe_past_the_deadline_is_reported_failed():
+    launcher = FakeLauncher({"klist": lambda: time.sleep(1.5) or (0, "Cached Tickets: (1)")})
+    pool = CommandPool(launcher=launcher)
+    seen = []
+    started = time.monotonic()
+    results = run_probes(DOMAIN_TRUST_PROBES, runner(pool), runner(pool), deadline=0.5,
+                         on_result=lambda i, result: seen.append(i))
+    assert time.monotonic() - started < 1.2
+    assert sorted(seen) == list(range(len(DOMAIN_TRUST_PROBES)))
+    kerberos = results[[p.name for p in DOMAIN_TRUST_PROBES].index("kerberos")]
+    assert kerberos.status == FAIL and "No result" in kerberos.detail
+    report = format_report(DOMAIN_TRUST_PROBES, results)
+    assert f"({len(DOMAIN_TRUST_PROBES)}/{len(DOMAIN_TRUST_PROBES)} checks done)" in report
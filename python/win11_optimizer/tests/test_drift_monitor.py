@@ -0,0 +1,109 @@
+"""Tests for the drift monitor, driven through FakeNotifier"""
+import threading
+import time
+
+import pytest
+
+from drift_monitor import DriftMonitor, FakeNotifier
+from inventory import Inventory
+from registry_backend import REG_DWORD, MemoryRegistry, RegOp
+from undo_journal import UndoJournal
+
+UPDATE_KEY = "SOFTWARE\\Policies\\Microsoft\\Windows\\WindowsUpdate\\AU"
+TELEMETRY_KEY = "SOFTWARE\\Policies\\Microsoft\\Windows\\DataCollection"
+OPS = [RegOp("set", "HKLM", UPDATE_KEY, "NoAutoUpdate", REG_DWORD, 1),
+       RegOp("set", "HKLM", UPDATE_KEY, "AUOptions", REG_DWORD, 2),
+       RegOp("set", "HKLM", TELEMETRY_KEY, "AllowTelemetry", REG_DWORD, 0)]
+OWNERS = {OPS[0]: "disable_auto_update", OPS[1]: "disable_auto_update", OPS[2]: "safe_reduce_telemetry"}
+
+
+@pytest.fixture
+def machine(tmp_path):
+    """A compliant registry, a monitor over it (not started) and the drift events it reports"""
+    registry = MemoryRegistry({(op.hive, op.path, op.name): (op.type, op.data) for op in OPS})
+    events = []
+    drifted = threading.Event()
+
+    def on_drift(event):
+        events.append(event)
+        drifted.set()
+    monitor = DriftMonitor(OPS, Inventory(registry), FakeNotifier(), coalesce=0.2, on_drift=on_drift,
+                           journal=UndoJournal(str(tmp_path / "undo_journal.jsonl")), owners=OWNERS)
+    yield registry, monitor, events, drifted
+    monitor.stop()
+
+
+def test_start_watches_every_key_and_rewrites_nothing_when_compliant(machine):
+    registry, monitor, events, _ = machine
+    monitor.start()
+    assert sorted(monitor.notifier.watched) == sorted([("HKLM", UPDATE_KEY), ("HKLM", TELEMETRY_KEY)])
+    assert monitor.checks == 1 and registry.writes == 0 and events == []
+
+
+def test_burst_of_changes_is_checked_once(machine):
+    registry, monitor, events, drifted = machine
+    monitor.start()
+    registry.write("HKLM", UPDATE_KEY, "NoAutoUpdate", REG_DWORD, 0)
+    for _ in range(5):
+        monitor.notifier.fire("HKLM", UPDATE_KEY)
+        time.sleep(0.02)
+    monitor.notifier.fire("HKLM", TELEMETRY_KEY.upper())
+    assert drifted.wait(2)
+    time.sleep(0.3)
+    assert monitor.checks == 2
+    [event] = events
+    assert sorted(event.keys) == sorted([("HKLM", UPDATE_KEY), ("HKLM", TELEMETRY_KEY)])
+    assert event.checked == 3
+
+
+def test_only_drifted_values_are_rewritten(machine):
+    registry, monitor, events, _ = machine
+    monitor.start()
+    registry.write("HKLM", UPDATE_KEY, "AUOptions", REG_DWORD, 4)
+    registry.delete("HKLM", TELEMETRY_KEY, "AllowTelemetry")
+    registry.writes = 0
+    event = monitor.check([("HKLM", UPDATE_KEY), ("HKLM", TELEMETRY_KEY)])
+    assert event.drifted == [OPS[1], OPS[2]] and event.errors == []
+    assert registry.writes == 2
+    assert registry.read("HKLM", UPDATE_KEY, "AUOptions") == (REG_DWORD, 2)
+    assert registry.read("HKLM", TELEMETRY_KEY, "AllowTelemetry") == (REG_DWORD, 0)
+    assert monitor.restored == 2
+
+
+def test_rewrites_are_journaled_with_the_reverted_values(machine):
+    registry, monitor, _, _ = machine
+    registry.write("HKLM", UPDATE_KEY, "AUOptions", REG_DWORD, 4)
+    registry.delete("HKLM", TELEMETRY_KEY, "AllowTelemetry")
+    monitor.start()
+    entries = monitor.journal.entries()
+    assert [(e["name"], e["exists"], e.get("data"), e["tweak"]) for e in entries] == [
+        ("AUOptions", True, 4, "disable_auto_update"),
+        ("AllowTelemetry", False, None, "safe_reduce_telemetry"),
+    ]
+
+
+def test_changes_to_unwatched_keys_are_ignored(machine):
+    _, monitor, events, _ = machine
+    monitor.start()
+    event = monitor.check([("HKCU", "Software\\Elsewhere")])
+    assert event.checked == 0 and event.keys == []
+
+
+def test_stop_wakes_a_blocked_wait(machine):
+    _, monitor, _, _ = machine
+    monitor.start()
+    time.sleep(0.05)   # the watcher thread is now blocked in notifier.wait()
+    started = time.monotonic()
+    monitor.stop()
+    assert time.monotonic() - started < 1
+    assert not any(thread.name == "drift-monitor" for thread in threading.enumerate())
+
+
+def test_closed_notifier_returns_no_changes():
+    notifier = FakeNotifier()
+    returned = []
+    waiter = threading.Thread(target=lambda: returned.append(notifier.wait()))
+    waiter.start()
+    notifier.close()
+    waiter.join(2)
+    assert returned == [set()]
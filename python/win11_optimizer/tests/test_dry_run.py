@@ -0,0 +1,101 @@
+"""Tests for the dry run diff and its cost model, over the in-memory backends"""
+from dry_run import (ADD, DEFAULT_HANDLER_COST, DELETE, EVENTLOG_COST, REGISTRY_COST, RUN, SAME, SERVICE_CONFIG_COST,
+                     SERVICE_STOP_COST, SET, command_cost, diff_plan)
+from eventlog_backend import MemoryEventLogs
+from planner import Plan
+from registry_backend import REG_DWORD, MemoryRegistry, RegOp
+from service_backend import RUNNING, STOPPED, MemoryServices
+from state_probe import SERVICES_KEY, StateProbe
+from tweak_catalog import CallOp, CmdOp, EventLogOp, PsOp, ServiceOp
+
+KEY = "Software\\Test"
+
+
+def make_plan():
+    plan = Plan()
+    for value_id, op in (("new", RegOp("set", "HKCU", KEY, "New", REG_DWORD, 1)),
+                         ("changed", RegOp("set", "HKCU", KEY, "Changed", REG_DWORD, 0)),
+                         ("removed", RegOp("delete", "HKCU", KEY, "Removed", None, None)),
+                         ("same", RegOp("set", "HKCU", KEY, "Same", REG_DWORD, 1))):
+        plan.registry[value_id] = op
+        plan.owners[value_id] = "registry_tweak"
+    for svc in (ServiceOp("WSearch", "disabled", True), ServiceOp("SysMain", "disabled", True),
+                ServiceOp("DiagTrack", "disabled", False)):
+        plan.services[svc.name.lower()] = svc
+        plan.service_owners[svc.name.lower()] = "service_tweak"
+    for log in (EventLogOp("Application", max_size=20971520), EventLogOp("Security", max_size=134217728)):
+        plan.eventlogs[log.channel.lower()] = log
+        plan.eventlog_owners[log.channel.lower()] = "eventlog_tweak"
+    plan.commands = [("maintenance", CmdOp("defrag C: /O /U")), ("maintenance", CmdOp("ipconfig /flushdns")),
+                     ("maintenance", PsOp("Get-AppxPackage | Remove-AppxPackage"))]
+    plan.calls = [("handler_tweak", CallOp("custom_handler"))]
+    return plan
+
+
+def make_report():
+    registry = MemoryRegistry({
+        ("HKCU", KEY, "Changed"): (REG_DWORD, 1),
+        ("HKCU", KEY, "Removed"): (REG_DWORD, 1),
+        ("HKCU", KEY, "Same"): (REG_DWORD, 1),
+        ("HKLM", f"{SERVICES_KEY}\\WSearch", "Start"): (REG_DWORD, 2),
+        ("HKLM", f"{SERVICES_KEY}\\SysMain", "Start"): (REG_DWORD, 2),
+        ("HKLM", f"{SERVICES_KEY}\\DiagTrack", "Start"): (REG_DWORD, 4),
+    })
+    services = MemoryServices({"WSearch": (RUNNING, "auto"), "SysMain": (STOPPED, "auto"),
+                               "DiagTrack": (STOPPED, "disabled")})
+    eventlogs = MemoryEventLogs({"Application": (20971520, False, False), "Security": (20971520, False, False)})
+    return diff_plan(make_plan(), StateProbe(registry, eventlogs), services), registry
+
+
+def by_target(report):
+    return {entry.target: entry for entry in report.entries}
+
+
+def test_registry_values_are_marked_add_set_delete_or_same():
+    report, registry = make_report()
+    entries = by_target(report)
+    assert entries[f"HKCU\\{KEY} [New]"].change == ADD
+    assert entries[f"HKCU\\{KEY} [New]"].current == "(absent)"
+    assert entries[f"HKCU\\{KEY} [Changed]"][:5] == (SET, "registry", f"HKCU\\{KEY} [Changed]", "REG_DWORD:1",
+                                                      "REG_DWORD:0")
+    assert entries[f"HKCU\\{KEY} [Removed]"].change == DELETE
+    assert entries[f"HKCU\\{KEY} [Same]"].change == SAME
+    assert entries[f"HKCU\\{KEY} [Same]"].cost == 0.0
+    assert entries[f"HKCU\\{KEY} [New]"].cost == REGISTRY_COST
+    assert registry.writes == 0
+
+
+def test_stop_is_charged_only_for_running_services():
+    entries = by_target(make_report()[0])
+    assert entries["WSearch"].cost == SERVICE_CONFIG_COST + SERVICE_STOP_COST
+    assert entries["WSearch"].current == "running, start=auto"
+    assert entries["WSearch"].desired == "stopped, start=disabled"
+    assert entries["SysMain"].cost == SERVICE_CONFIG_COST
+    assert entries["DiagTrack"].change == SAME
+
+
+def test_eventlog_already_at_size_is_same():
+    entries = by_target(make_report()[0])
+    assert entries["Application"].change == SAME
+    assert (entries["Security"].change, entries["Security"].cost) == (SET, EVENTLOG_COST)
+    assert entries["Security"].desired == "max_size=134217728"
+
+
+def test_commands_and_handlers_are_costed_by_program():
+    assert command_cost(CmdOp("defrag C: /O /U")) == 900
+    assert command_cost(CmdOp("DEFRAG")) == 900
+    assert command_cost(CmdOp("unknown.exe /x")) == 0.3
+    assert command_cost(PsOp("Get-AppxPackage | Remove-AppxPackage")) == 30.0
+    entries = by_target(make_report()[0])
+    assert entries["custom_handler"][:2] == (RUN, "handler")
+    assert entries["custom_handler"].cost == DEFAULT_HANDLER_COST
+
+
+def test_expensive_changes_come_most_expensive_first():
+    report = make_report()[0]
+    assert [entry.cost for entry in report.expensive(10)] == [900.0, DEFAULT_HANDLER_COST, 30.0]
+    assert report.expensive(1000) == []
+    assert len(report.changes) == 10
+    assert report.summary().startswith("10 of 13 operations would change the system (3 already compliant)")
+    assert len(report.lines(include_unchanged=True)) == 13
+    assert len(report.as_dict()["diff"]) == 10
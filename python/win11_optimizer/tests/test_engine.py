@@ -0,0 +1,51 @@
+"""Tests for engine.run_tweaks bookkeeping, against the in-memory backends"""
+import pytest
+
+import engine
+from command_pool import CommandPool, FakeLauncher
+from eventlog_backend import MemoryEventLogs
+from inventory import Inventory
+from registry_backend import REG_DWORD, MemoryRegistry
+from service_backend import MemoryServices
+from snapshot import SnapshotError, load_snapshot
+
+TRANSPARENCY = ("HKCU", "software\\microsoft\\windows\\currentversion\\themes\\personalize", "enabletransparency")
+
+
+@pytest.fixture
+def fake_engine(tmp_path, monkeypatch):
+    """Point the engine at fresh in-memory backends and a temporary backup folder"""
+    engine.configure(str(tmp_path))
+    monkeypatch.setattr(engine, "last_backup", None)
+    monkeypatch.setattr(engine, "applied_tweaks", [])
+    registry = MemoryRegistry({TRANSPARENCY: (REG_DWORD, 1)})
+    monkeypatch.setattr(engine, "registry", registry)
+    monkeypatch.setattr(engine, "inventory", Inventory(registry))
+    monkeypatch.setattr(engine, "services", MemoryServices())
+    monkeypatch.setattr(engine, "eventlogs", MemoryEventLogs())
+    monkeypatch.setattr(engine, "commands", CommandPool(launcher=FakeLauncher()))
+    yield registry
+    engine.oplog.close()
+
+
+def test_run_tweaks_snapshots_then_applies(fake_engine):
+    plan, result = engine.run_tweaks(["disable_transparency"])
+    assert not result.failures
+    assert fake_engine.dump()[TRANSPARENCY] == (REG_DWORD, 0)
+    snapshot = load_snapshot(engine.last_backup)
+    assert snapshot["registry"][0]["data"] == 1
+
+
+def test_failed_snapshot_changes_nothing(fake_engine, monkeypatch):
+    engine.run_tweaks(["disable_transparency"])
+    fake_engine.write(*TRANSPARENCY, REG_DWORD, 1)
+    engine.inventory.invalidate(TRANSPARENCY[0], TRANSPARENCY[1])
+
+    def refuse(snapshot, directory):
+        raise PermissionError(13, "Access is denied")
+    monkeypatch.setattr(engine, "save_snapshot", refuse)
+    with pytest.raises(SnapshotError):
+        engine.run_tweaks(["disable_transparency"])
+    # The previous run's snapshot must not be reported as this one's
+    assert engine.last_backup is None
+    assert fake_engine.dump()[TRANSPARENCY] == (REG_DWORD, 1)
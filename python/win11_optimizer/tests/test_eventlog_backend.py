@@ -0,0 +1,44 @@
+"""Tests for the event log channel backend, against MemoryEventLogs"""
+import pytest
+
+from eventlog_backend import ChannelConfig, ChannelNotFound, MemoryEventLogs, changed_properties, wevtutil_command
+from tweak_catalog import EventLogOp
+
+
+def test_changed_properties_ignores_unset_and_equal_values():
+    current = ChannelConfig("Security", 20971520, False, False)
+    assert changed_properties(current, EventLogOp("Security", 20971520, None, True)) == {"auto_backup": True}
+    assert changed_properties(None, EventLogOp("Security", 1024)) == {"max_size": 1024}
+
+
+def test_wevtutil_command_sets_everything_in_one_call():
+    assert wevtutil_command(EventLogOp("Security", 134217728, False, True)) == \
+        ["wevtutil", "sl", "Security", "/ms:134217728", "/rt:false", "/ab:true"]
+    assert wevtutil_command(EventLogOp("System", retention=True)) == ["wevtutil", "sl", "System", "/rt:true"]
+
+
+def test_apply_saves_each_channel_once_and_only_when_needed():
+    logs = MemoryEventLogs({"Security": (20971520, False, False), "System": (67108864, False, False)})
+    results = logs.apply([EventLogOp("Security", 134217728, False, True), EventLogOp("system", 67108864, False)])
+    assert logs.saves == 1
+    (_, before, after, error), (_, system_before, system_after, system_error) = results
+    assert error is None and system_error is None
+    assert before == ChannelConfig("Security", 20971520, False, False)
+    assert after == ChannelConfig("Security", 134217728, False, True)
+    assert system_before == system_after
+
+
+def test_missing_channel_is_reported_not_raised():
+    logs = MemoryEventLogs()
+    [(_, before, after, error)] = logs.apply([EventLogOp("Missing", 1024)])
+    assert isinstance(error, ChannelNotFound) and before is None and after is None
+    assert logs.query("Missing") is None
+    with pytest.raises(ChannelNotFound):
+        logs.read("Missing")
+
+
+def test_refused_save_reports_every_property():
+    logs = MemoryEventLogs({"Security": (20971520, False, False)}, read_only=["Security"])
+    [(_, _, after, error)] = logs.apply([EventLogOp("Security", 134217728, None, True)])
+    assert "max_size" in str(error) and "auto_backup" in str(error)
+    assert after == ChannelConfig("Security", 20971520, False, False)
@@ -0,0 +1,123 @@
+"""Tests for the caching Inventory over MemoryRegistry, driven by an injected clock"""
+import pytest
+
+from inventory import Inventory
+from registry_backend import REG_DWORD, REG_SZ, MemoryRegistry
+
+DESKTOP = "Control Panel\\Desktop"
+SYSMAIN = "SYSTEM\\CurrentControlSet\\Services\\SysMain"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_inventory(registry=None, max_age=60.0):
+    registry = registry or MemoryRegistry({
+        ("HKCU", DESKTOP, "MenuShowDelay"): (REG_SZ, "400"),
+        ("HKCU", DESKTOP, "DragFullWindows"): (REG_SZ, "1"),
+        ("HKLM", SYSMAIN, "Start"): (REG_DWORD, 2),
+    })
+    clock = Clock()
+    return Inventory(registry, max_age=max_age, clock=clock), registry, clock
+
+
+def test_whole_key_is_read_once_and_served_from_memory():
+    inventory, registry, _ = make_inventory()
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "400")
+    assert inventory.read("HKCU", DESKTOP.upper(), "dragfullwindows") == (REG_SZ, "1")
+    assert inventory.read("HKCU", DESKTOP, "Missing") is None
+    assert registry.reads == 1
+    assert inventory.stats()["hits"] == 2
+
+
+def test_keys_older_than_max_age_are_read_again():
+    inventory, registry, clock = make_inventory(max_age=60.0)
+    inventory.read("HKCU", DESKTOP, "MenuShowDelay")
+    registry.write("HKCU", DESKTOP, "MenuShowDelay", REG_SZ, "0")   # changed behind the inventory's back
+    clock.now += 60.0
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "400")
+    clock.now += 0.5
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "0")
+    assert inventory.key_reads == 2
+
+
+def test_every_change_bumps_generation():
+    inventory, registry, _ = make_inventory()
+    inventory.read("HKCU", DESKTOP, "MenuShowDelay")
+    inventory.write("HKCU", DESKTOP, "MenuShowDelay", REG_SZ, "0")
+    assert inventory.generation == 1
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "0")
+    assert inventory.delete("HKCU", DESKTOP, "DragFullWindows")
+    assert inventory.generation == 2
+    assert inventory.read_key("HKCU", DESKTOP) == {"menushowdelay": (REG_SZ, "0")}
+    assert registry.reads == 1
+    registry.write("HKCU", DESKTOP, "MenuShowDelay", REG_SZ, "200")
+    inventory.invalidate("HKCU", DESKTOP)
+    assert inventory.generation == 3
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "200")
+    inventory.invalidate()
+    assert inventory.generation == 4
+    assert inventory.stats()["keys"] == 0
+
+
+class FailingWrites(MemoryRegistry):
+    def write(self, hive, path, name, reg_type, data):
+        super().write(hive, path, name, reg_type, data)
+        raise OSError(5, "Access is denied")
+
+    def delete(self, hive, path, name):
+        raise OSError(5, "Access is denied")
+
+
+def test_failed_write_invalidates_the_key():
+    registry = FailingWrites()
+    MemoryRegistry.write(registry, "HKCU", DESKTOP, "MenuShowDelay", REG_SZ, "400")
+    inventory, _, _ = make_inventory(registry)
+    inventory.read("HKCU", DESKTOP, "MenuShowDelay")
+    # The write may have partly landed: the key is read again rather than trusted
+    with pytest.raises(OSError):
+        inventory.write("HKCU", DESKTOP, "MenuShowDelay", REG_SZ, "0")
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "0")
+    with pytest.raises(OSError):
+        inventory.delete("HKCU", DESKTOP, "MenuShowDelay")
+    assert inventory.stats()["keys"] == 0
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "0")
+    assert inventory.key_reads == 3
+
+
+class ValueOnlyRegistry(MemoryRegistry):
+    """A backend that cannot enumerate a key"""
+
+    def read_key(self, hive, path):
+        raise NotImplementedError
+
+
+def test_backend_without_key_reads_is_indexed_per_value():
+    registry = ValueOnlyRegistry({("HKCU", DESKTOP, "MenuShowDelay"): (REG_SZ, "400")})
+    inventory, _, _ = make_inventory(registry)
+    assert inventory.load([("HKCU", DESKTOP)]) == 0
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") == (REG_SZ, "400")
+    assert inventory.read("HKCU", DESKTOP, "Missing") is None
+    reads = registry.reads
+    assert inventory.read("HKCU", DESKTOP, "menushowdelay") == (REG_SZ, "400")
+    assert inventory.read("HKCU", DESKTOP, "Missing") is None
+    assert registry.reads == reads
+    inventory.delete("HKCU", DESKTOP, "MenuShowDelay")
+    assert inventory.read("HKCU", DESKTOP, "MenuShowDelay") is None
+    assert inventory.key_reads == 0
+
+
+def test_load_skips_keys_that_are_still_fresh():
+    inventory, registry, clock = make_inventory()
+    keys = [("HKCU", DESKTOP), ("HKLM", SYSMAIN)]
+    assert inventory.load(keys) == 2
+    assert inventory.load(keys) == 0
+    clock.now += 61.0
+    inventory.read("HKLM", SYSMAIN, "Start")
+    assert inventory.load(keys) == 1
+    assert inventory.key_reads == 4
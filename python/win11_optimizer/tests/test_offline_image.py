@@ -0,0 +1,61 @@
+"""Tests for OfflineImage routing registry paths into the hive files of a synthesized image"""
+import os
+
+import pytest
+
+from offline_image import HIVE_FILES, OfflineImage
+from regf import Hive, HiveError
+from registry_backend import REG_DWORD, REG_SZ
+
+
+@pytest.fixture
+def image(tmp_path):
+    """An image root holding new SYSTEM, SOFTWARE and default user hives, ControlSet002 current"""
+    paths = {}
+    for name, parts in HIVE_FILES.items():
+        paths[name] = os.path.join(str(tmp_path), *parts)
+        os.makedirs(os.path.dirname(paths[name]), exist_ok=True)
+        hive = Hive.create(paths[name], parts[-1])
+        if name == "SYSTEM":
+            hive.set_value("Select", "Current", REG_DWORD, 2)
+            hive.create_key("ControlSet001\\Services")
+            hive.create_key("ControlSet002\\Services")
+        hive.save()
+    return str(tmp_path), paths
+
+
+def test_current_control_set_follows_select(image):
+    root, paths = image
+    offline = OfflineImage(root)
+    assert offline.control_set() == "ControlSet002"
+    offline.write("HKLM", "SYSTEM\\CurrentControlSet\\Services\\SysMain", "Start", REG_DWORD, 4)
+    assert offline.read("HKLM", "SYSTEM\\CurrentControlSet\\Services\\SysMain", "Start") == (REG_DWORD, 4)
+    offline.close()
+    system = Hive.open(paths["SYSTEM"])
+    assert system.get_value("ControlSet002\\Services\\SysMain", "Start") == (REG_DWORD, 4)
+    assert system.find_key("ControlSet001\\Services\\SysMain") is None
+
+
+def test_hives_are_routed_and_saved_on_close(image):
+    root, paths = image
+    offline = OfflineImage(root)
+    offline.write("HKLM", "SOFTWARE\\Policies\\Test", "Enabled", REG_DWORD, 0)
+    offline.write("HKCR", ".txt", "", REG_SZ, "txtfile")
+    offline.write("HKCU", "Control Panel\\Desktop", "MenuShowDelay", REG_SZ, "0")
+    assert offline.read_key("HKLM", "SOFTWARE\\Policies\\Test") == {"enabled": (REG_DWORD, 0)}
+    assert offline.delete("HKLM", "SOFTWARE\\Policies\\Test", "Enabled")
+    offline.close()
+    assert Hive.open(paths["SOFTWARE"]).values("Policies\\Test") == []
+    assert Hive.open(paths["SOFTWARE"]).get_value("Classes\\.txt", "") == (REG_SZ, "txtfile")
+    assert Hive.open(paths["DEFAULT_USER"]).get_value("Control Panel\\Desktop", "MenuShowDelay") == (REG_SZ, "0")
+
+
+def test_paths_outside_the_image_hives_are_refused(image):
+    offline = OfflineImage(image[0])
+    with pytest.raises(HiveError):
+        offline.read("HKLM", "HARDWARE\\Description", "Identifier")
+
+
+def test_folder_without_config_is_not_an_image(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        OfflineImage(str(tmp_path))
@@ -0,0 +1,79 @@
+"""Tests for the rotating JSONL operation log"""
+import io
+import json
+import os
+
+from oplog import OperationLog, cap_output, tweak_scope
+
+
+def test_log_rotates_past_max_bytes_and_drops_the_oldest(tmp_path):
+    path = str(tmp_path / "oplog.jsonl")
+    # Events of about 530 bytes: every second one takes the file past max_bytes
+    log = OperationLog(path, max_bytes=1000, backups=2)
+    for i in range(9):
+        log.record("command", f"target {i}", output="x" * 400)
+    log.close()
+    assert log.files() == [f"{path}.2", f"{path}.1", path]
+    assert not os.path.exists(f"{path}.3")
+    assert [event["target"] for event in log.events()] == [f"target {i}" for i in range(4, 9)]
+    assert log.count == 9
+
+
+def test_no_backups_starts_the_log_over(tmp_path):
+    path = str(tmp_path / "oplog.jsonl")
+    log = OperationLog(path, max_bytes=1000, backups=0)
+    for i in range(5):
+        log.record("command", f"target {i}", output="x" * 400)
+    log.close()
+    assert os.listdir(str(tmp_path)) == ["oplog.jsonl"]
+    assert [event["target"] for event in log.events()] == ["target 4"]
+
+
+def test_cap_output_never_splits_a_character():
+    text = "é" * 10   # two bytes each in UTF-8
+    capped, size = cap_output(text, limit=7)
+    assert capped == "ééé"
+    assert size == 20
+    assert cap_output("short", limit=7) == ("short", 5)
+    assert cap_output(None) == (None, 0)
+
+
+def test_truncated_output_records_its_full_size(tmp_path):
+    log = OperationLog(str(tmp_path / "oplog.jsonl"), output_limit=10)
+    event = log.record("command", "chatty", output="y" * 25, error="short")
+    assert event["output"] == "y" * 10
+    assert event["output_bytes"] == 25
+    assert "error_bytes" not in event
+    log.close()
+
+
+def test_events_filter_by_session_across_rotated_files(tmp_path):
+    path = str(tmp_path / "oplog.jsonl")
+    first = OperationLog(path, max_bytes=400, backups=5)
+    second = OperationLog(path, max_bytes=400, backups=5)
+    for i in range(6):
+        first.record("command", f"first {i}", output="z" * 40)
+        first.close()
+        second.record("command", f"second {i}", output="z" * 40)
+        second.close()
+    assert len(first.files()) > 1
+    assert [event["target"] for event in first.events(session=first.session)] == [f"first {i}" for i in range(6)]
+    assert len(list(first.events())) == 12
+
+
+def test_export_writes_jsonl_or_text(tmp_path):
+    log = OperationLog(str(tmp_path / "oplog.jsonl"), output_limit=4)
+    with tweak_scope("visual_effects"):
+        log.record("registry", "HKCU\\Control Panel\\Desktop", output="done!", exit_code=0, duration=0.5)
+    log.record("command", "sfc /scannow", error="Failed")
+    raw = io.StringIO()
+    assert log.export(raw, raw=True) == 2
+    events = [json.loads(line) for line in raw.getvalue().splitlines()]
+    assert events[0]["tweak"] == "visual_effects"
+    assert events[1]["tweak"] is None
+    text = io.StringIO()
+    assert log.export(text, session=log.session) == 2
+    assert "registry: HKCU\\Control Panel\\Desktop (tweak=visual_effects, exit=0, 0.50s)" in text.getvalue()
+    assert "Output: done\n[output truncated, 5 bytes total]" in text.getvalue()
+    assert "Error: Fail" in text.getvalue()
+    log.close()
@@ -0,0 +1,95 @@
+"""Tests for planner.compile_plan and the catalog selection it is fed from"""
+import pytest
+
+import tweak_catalog
+from planner import compile_plan
+from registry_backend import REG_DWORD, REG_SZ, RegOp
+from tweak_catalog import (CallOp, CmdOp, EventLogOp, PowerOp, PsOp, ServiceOp, Tweak, dword, select_for_mode,
+                           string)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    tweaks = [
+        Tweak("first", "First", "Basic", [
+            dword(r"HKCU\Software\Test", "Shared", 1),
+            dword(r"HKCU\Software\Test", "OnlyFirst", 1),
+            ServiceOp("SysMain", "demand", True),
+            EventLogOp("Security", max_size=1024, retention=False),
+            PowerOp("balanced"),
+            CmdOp("ipconfig /flushdns"),
+            PsOp("Clear-RecycleBin -Force"),
+        ]),
+        Tweak("second", "Second", "Basic", [
+            dword(r"HKCU\SOFTWARE\test", "SHARED", 2),
+            string(r"HKCU\Software\Other", None, "x"),
+            ServiceOp("sysmain", "disabled", False),
+            EventLogOp("security", auto_backup=True),
+            PowerOp("high"),
+            CmdOp("ipconfig /flushdns"),
+            CmdOp("Clear-RecycleBin -Force"),   # same text as the PsOp, different kind
+            CallOp("handler", ("network",)),
+        ]),
+    ]
+    monkeypatch.setattr(tweak_catalog, "CATALOG", {tweak.id: tweak for tweak in tweaks})
+    return tweaks
+
+
+def test_registry_last_writer_wins_in_first_seen_order(catalog):
+    plan = compile_plan(["first", "second"])
+    assert list(plan.registry.values()) == [
+        RegOp("set", "HKCU", "SOFTWARE\\test", "SHARED", REG_DWORD, 2),
+        RegOp("set", "HKCU", "Software\\Test", "OnlyFirst", REG_DWORD, 1),
+        RegOp("set", "HKCU", "Software\\Other", None, REG_SZ, "x"),
+    ]
+    assert plan.owners[("HKCU", "software\\test", "shared")] == "second"
+    assert plan.owners[("HKCU", "software\\test", "onlyfirst")] == "first"
+    assert [len(group) for group in plan.registry_groups()] == [2, 1]
+
+
+def test_services_eventlogs_and_power_are_merged(catalog):
+    plan = compile_plan(["first", "second"])
+    assert plan.services == {"sysmain": ServiceOp("sysmain", "disabled", True)}
+    assert plan.service_owners == {"sysmain": "second"}
+    assert plan.eventlogs == {"security": EventLogOp("security", 1024, False, True)}
+    assert plan.power == ("second", PowerOp("high"))
+
+
+def test_identical_commands_run_once(catalog):
+    plan = compile_plan(["first", "second"])
+    assert plan.commands == [("first", CmdOp("ipconfig /flushdns")), ("first", PsOp("Clear-RecycleBin -Force")),
+                             ("second", CmdOp("Clear-RecycleBin -Force"))]
+    assert plan.calls == [("second", CallOp("handler", ("network",)))]
+
+
+def test_stats_count_what_deduplication_removed(catalog):
+    plan = compile_plan(["first", "second", "first"])
+    stats = plan.stats()
+    assert plan.tweaks == ["first", "second"]
+    assert stats["requested_ops"] == 15
+    assert stats["planned_ops"] == 3 + 1 + 1 + 1 + 3 + 1
+    assert stats["deduplicated"] == 15 - 10
+
+
+def test_unknown_tweak_raises(catalog):
+    with pytest.raises(KeyError):
+        compile_plan(["missing"])
+
+
+def test_select_for_mode_adds_the_common_set_without_duplicates():
+    basic = select_for_mode("Basic", ["disable_transparency"])
+    assert basic == ["disable_transparency"]
+    ids = select_for_mode("Standard", ["disable_transparency"], basic_selected=["fix_security_log_full"])
+    assert ids[0] == "fix_security_log_full"
+    assert len(ids) == len(set(ids))
+    assert set(tweak_catalog.ADVANCED_BASE) <= set(ids)
+    assert not set(t.id for t in tweak_catalog.ULTIMATE) & set(ids)
+    assert set(t.id for t in tweak_catalog.ULTIMATE) <= set(select_for_mode("Extreme"))
+    with pytest.raises(ValueError):
+        select_for_mode("Turbo")
+
+
+def test_whole_catalog_compiles():
+    plan = compile_plan(select_for_mode("Extreme", [t.id for t in tweak_catalog.EXTREME],
+                                        basic_selected=tweak_catalog.ADVANCED_OPTIONAL))
+    assert plan.planned_ops < plan.requested_ops
@@ -0,0 +1,74 @@
+"""Tests for the progress channel workers publish into and the GUI drains"""
+import types
+
+import pytest
+
+import progress
+from progress import DONE, FAIL, OK, RUNNING, ProgressChannel
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable monotonic clock for the progress module"""
+    fake = types.SimpleNamespace(now=100.0)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(progress, "time", fake)
+    return fake
+
+
+def test_finish_reports_time_since_running(clock):
+    channel = ProgressChannel()
+    channel.publish("registry", "Registry writes")
+    clock.now += 2.5
+    channel.publish("registry", detail="halfway")
+    clock.now += 1.0
+    channel.finish("registry", OK, detail="12 values")
+    events = channel.drain()
+    assert [(e.status, e.elapsed) for e in events] == [(RUNNING, 0.0), (RUNNING, 2.5), (OK, 3.5)]
+    assert events[0].label == "Registry writes"
+    assert events[2].detail == "12 values"
+    # A finished key starts timing again from its next RUNNING event
+    clock.now += 10.0
+    channel.publish("registry")
+    assert channel.drain()[0].elapsed == 0.0
+
+
+def test_step_finishes_only_the_previous_step_of_its_group(clock):
+    channel = ProgressChannel()
+    channel.step("trust:stop", "Stop services")
+    channel.step("repair:scan")
+    clock.now += 1.0
+    channel.step("trust:reset", "Reset secure channel")
+    events = channel.drain()
+    assert [(e.key, e.status) for e in events] == [
+        ("trust:stop", RUNNING), ("repair:scan", RUNNING), ("trust:stop", DONE), ("trust:reset", RUNNING)]
+    assert events[2].elapsed == 1.0
+    # Repeating the current step does not finish it
+    channel.step("trust:reset")
+    assert [e.status for e in channel.drain()] == [RUNNING]
+    channel.step("plain")
+    channel.step("other")
+    assert [(e.key, e.status) for e in channel.drain()] == [("plain", RUNNING), ("plain", DONE), ("other", RUNNING)]
+
+
+def test_close_finishes_running_keys_then_sends_the_summary(clock):
+    channel = ProgressChannel()
+    channel.publish("services")
+    channel.publish("commands")
+    channel.finish("commands", FAIL)
+    clock.now += 4.0
+    channel.close("2 tasks, 1 failed")
+    events = channel.drain()
+    assert [(e.key, e.status) for e in events[-2:]] == [("services", DONE), (None, DONE)]
+    assert events[-2].elapsed == 4.0
+    assert events[-1].detail == "2 tasks, 1 failed"
+    assert channel.closed
+
+
+def test_drain_returns_at_most_limit_events():
+    channel = ProgressChannel()
+    for i in range(7):
+        channel.publish(f"probe{i}")
+    assert len(channel.drain(limit=5)) == 5
+    assert [e.key for e in channel.drain(limit=5)] == ["probe5", "probe6"]
+    assert channel.drain() == []
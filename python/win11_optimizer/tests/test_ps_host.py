@@ -0,0 +1,57 @@
+"""Tests for the persistent host, driven through /bin/sh as a fake host"""
+import shutil
+import time
+
+import pytest
+
+from ps_host import HostError, HostTimeout, PowerShellPool, fake_host
+
+pytestmark = pytest.mark.skipif(shutil.which("sh") is None, reason="needs a POSIX shell as the fake host")
+
+
+@pytest.fixture
+def host():
+    host = fake_host()
+    yield host
+    host.close()
+
+
+def test_round_trip_keeps_one_process(host):
+    assert host.run("echo hello; echo world") == (True, "hello\nworld")
+    assert host.run("false") == (False, "")
+    host.run("GREETING=kept")
+    assert host.run('echo "$GREETING"') == (True, "kept")   # same interpreter between calls
+    assert host.run("echo oops >&2") == (True, "oops")        # stderr is merged
+    assert host.restarts == 0
+
+
+def test_timeout_covers_the_whole_script(host):
+    started = time.monotonic()
+    with pytest.raises(HostTimeout):
+        host.run("while true; do echo tick; sleep 0.2; done", timeout=1)
+    assert time.monotonic() - started < 2
+    assert not host.alive
+    assert host.run("echo back") == (True, "back")
+    assert host.restarts == 1
+
+
+def test_host_that_dies_is_restarted(host):
+    host.run("echo warm")
+    with pytest.raises(HostError):
+        host.run("exit 3")
+    assert host.run("echo again") == (True, "again")
+    assert host.restarts == 1
+
+
+def test_missing_interpreter_raises_host_error():
+    with pytest.raises(HostError):
+        fake_host("/nonexistent/shell").run("echo never")
+
+
+def test_pool_shares_hosts_between_threads():
+    pool = PowerShellPool(size=2, host_factory=fake_host)
+    try:
+        assert [pool.run(f"echo {i}") for i in range(4)] == [(True, str(i)) for i in range(4)]
+        assert pool.restarts == 0
+    finally:
+        pool.close()
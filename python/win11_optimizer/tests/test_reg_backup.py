@@ -0,0 +1,106 @@
+"""Tests for the indexed .reg backup reader, on UTF-16 and ANSI exports read in tiny chunks"""
+import os
+import random
+
+import pytest
+
+from reg_backup import RegBackup, normalize_key
+from registry_backend import REG_BINARY, REG_DWORD, REG_MULTI_SZ, REG_SZ, RegOp
+
+TEST_KEY = "HKEY_CURRENT_USER\\Software\\Test"
+SECTIONS = [
+    (TEST_KEY, [
+        '"Path"="C:\\\\Temp\\\\\\"quoted\\""',
+        '@="default"',
+        '"Count"=dword:0000002a',
+        '"Multi"=hex(7):61,00,62,00,00,00,63,00,00,00,00,00',
+        '"Blob"=hex:01,02,03,\\',
+        '  04,05',
+        '"Gone"=-',
+    ]),
+    ("-HKEY_CURRENT_USER\\Software\\Removed", []),
+    (TEST_KEY + "\\Child", ['"Name"="child"']),
+    ("HKEY_CURRENT_USER\\Software\\TestOther", ['"Other"=dword:00000001']),
+] + [(f"HKEY_LOCAL_MACHINE\\Software\\Bulk\\Key{i:02d}", [f'"Index"=dword:{i:08x}']) for i in range(30)]
+
+
+def write_export(path, sections, utf16=True):
+    header = "Windows Registry Editor Version 5.00" if utf16 else "REGEDIT4"
+    text = header + "\r\n\r\n" + "".join(f"[{key}]\r\n" + "".join(line + "\r\n" for line in lines) + "\r\n"
+                                         for key, lines in sections)
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfe" + text.encode("utf-16-le") if utf16 else text.encode("cp1252"))
+    return path
+
+
+@pytest.fixture(params=[True, False], ids=["utf16", "ansi"])
+def backup(request, tmp_path):
+    bulk = SECTIONS[4:]
+    random.Random(7).shuffle(bulk)
+    path = write_export(str(tmp_path / "backup.reg"), SECTIONS[:4] + bulk, utf16=request.param)
+    return RegBackup(path, chunk_size=7, run_size=4)
+
+
+def test_values_are_parsed_with_escapes_and_continuations(backup):
+    assert backup.read_key("HKCU\\Software\\Test") == {
+        "path": (REG_SZ, 'C:\\Temp\\"quoted"'),
+        "": (REG_SZ, "default"),
+        "count": (REG_DWORD, 42),
+        "multi": (REG_MULTI_SZ, ["ab", "c"]),
+        "blob": (REG_BINARY, b"\x01\x02\x03\x04\x05"),
+    }
+    ops = backup.restore_ops("hkey_current_user\\software\\test")
+    assert ops[-1] == RegOp("delete", "HKCU", "Software\\Test", "Gone", None, None)
+
+
+def test_every_key_is_indexed_across_chunks_and_runs(backup):
+    assert backup.build_index() == 33
+    for i in range(30):
+        assert backup.read_key(f"HKLM\\Software\\Bulk\\Key{i:02d}") == {"index": (REG_DWORD, i)}
+    with open(backup.index_path, encoding="utf-8") as f:
+        keys = [line.rstrip("\n").split("\t", 2)[2] for line in list(f)[1:]]
+    assert keys == sorted(keys)
+    assert not [name for name in os.listdir(os.path.dirname(backup.index_path)) if name.startswith(".regidx_")]
+
+
+def test_streamed_sections_match_indexed_lookups(backup):
+    for key, ops in backup.sections():
+        assert backup.values(key) == [(key, ops)]
+
+
+def test_recursive_lookup_takes_subkeys_only(backup):
+    keys = [key for key, _ in backup.values("HKCU\\Software\\Test", recurse=True)]
+    assert keys == [TEST_KEY, TEST_KEY + "\\Child"]
+    assert len(backup.ranges("HKLM\\Software\\Bulk", recurse=True)) == 30
+
+
+def test_missing_and_deleted_keys_return_none(backup):
+    assert backup.read_key("HKCU\\Software\\Missing") is None
+    assert backup.read_key("HKCU\\Software\\Removed") is None
+    assert backup.values("HKLM\\Software\\Bulk") == []
+
+
+def test_query_prints_like_reg_query(backup):
+    assert backup.query("HKCU\\Software\\Test\\Child") == [TEST_KEY + "\\Child", "    Name    REG_SZ    child", ""]
+    assert backup.query("HKCU\\Software\\Test", name="Other", recurse=True) == []
+    assert backup.query("HKCU\\Software", name="Other", recurse=True)[0] == "HKEY_CURRENT_USER\\Software\\TestOther"
+    assert backup.query("HKCU\\Software\\Test", name="count")[1] == "    Count    REG_DWORD    0x2a"
+
+
+def test_index_is_rebuilt_when_the_backup_changes(backup):
+    backup.build_index()
+    assert backup.index_is_current()
+    stat = os.stat(backup.path)
+    os.utime(backup.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not backup.index_is_current()
+    utf16 = backup.encoding == "utf-16-le"
+    write_export(backup.path, SECTIONS[:4] + [("HKEY_CURRENT_USER\\Software\\Added", ['"New"="yes"'])], utf16)
+    assert not backup.index_is_current()
+    assert backup.read_key("HKCU\\Software\\Added") == {"new": (REG_SZ, "yes")}
+    assert backup.read_key("HKLM\\Software\\Bulk\\Key00") is None
+    assert backup.index_is_current()
+
+
+def test_normalize_key_expands_the_root():
+    assert normalize_key("[HKCU\\Software\\Test]") == "hkey_current_user\\software\\test"
+    assert normalize_key("HKEY_LOCAL_MACHINE") == "hkey_local_machine"
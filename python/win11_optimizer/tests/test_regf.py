@@ -0,0 +1,128 @@
+"""Tests for the offline hive reader/writer, round-tripping synthesized hives through save() and open()"""
+import os
+import random
+import struct
+
+import pytest
+
+from regf import BIG_DATA_SEGMENT, LEAF_MAX, NO_CELL, Hive, HiveError
+from registry_backend import REG_BINARY, REG_DWORD, REG_MULTI_SZ, REG_QWORD, REG_SZ
+
+
+def reopen(hive):
+    hive.save()
+    return Hive.open(hive.path)
+
+
+def test_keys_are_found_case_insensitively(tmp_path):
+    hive = Hive.create(str(tmp_path / "SOFTWARE"), "SOFTWARE")
+    hive.create_key("Policies\\Microsoft\\Windows\\DataCollection")
+    hive.create_key("Policies\\Microsoft\\Edge")
+    hive = reopen(hive)
+    assert hive.find_key("policies\\MICROSOFT\\windows\\datacollection") is not None
+    assert hive.find_key("Policies\\Microsoft\\Missing") is None
+    assert [name for name, _ in hive.subkeys(hive.find_key("Policies\\Microsoft"))] == ["Edge", "Windows"]
+
+
+def test_values_of_every_size_round_trip(tmp_path):
+    big = bytes(range(256)) * (BIG_DATA_SEGMENT // 256 * 2 + 3)
+    values = [
+        ("Inline", REG_DWORD, 0x12345678),
+        ("Tiny", REG_BINARY, b"\x01\x02"),
+        ("Small", REG_SZ, "Hello hive"),
+        ("List", REG_MULTI_SZ, ["a", "bc"]),
+        ("Wide", REG_QWORD, 2 ** 40),
+        ("Big", REG_BINARY, big),
+    ]
+    hive = Hive.create(str(tmp_path / "SOFTWARE"))
+    for name, reg_type, data in values:
+        hive.set_value("Test", name, reg_type, data)
+    hive = reopen(hive)
+    for name, reg_type, data in values:
+        assert hive.get_value("Test", name.lower()) == (reg_type, data)
+    assert [name for name, _, _ in hive.values("Test")] == [name for name, _, _ in values]
+    assert hive.get_value("Test", "Missing") is None
+    assert hive.values("Missing") is None
+
+
+def test_values_are_replaced_and_deleted(tmp_path):
+    hive = Hive.create(str(tmp_path / "SOFTWARE"))
+    hive.set_value("Test", "Kept", REG_DWORD, 1)
+    hive.set_value("Test", "Gone", REG_BINARY, b"\xff" * (BIG_DATA_SEGMENT + 10))
+    hive.set_value("Test", "Kept", REG_SZ, "changed")
+    assert hive.delete_value("Test", "gone")
+    assert not hive.delete_value("Test", "gone")
+    assert not hive.delete_value("Missing", "Kept")
+    hive = reopen(hive)
+    assert hive.values("Test") == [("Kept", REG_SZ, "changed")]
+
+
+def test_save_bumps_both_sequence_numbers_and_the_checksum(tmp_path):
+    hive = Hive.create(str(tmp_path / "SYSTEM"))
+    hive.set_value("Select", "Current", REG_DWORD, 1)
+    hive.save()
+    hive.save()
+    with open(hive.path, "rb") as f:
+        data = f.read()
+    primary, secondary = struct.unpack_from("<II", data, 4)
+    assert primary == secondary == 3
+    checksum = 0
+    for (word,) in struct.iter_unpack("<I", data[:508]):
+        checksum ^= word
+    assert struct.unpack_from("<I", data, 508)[0] == checksum
+    assert not hive.dirty
+
+
+def test_dirty_hive_is_refused(tmp_path):
+    hive = Hive.create(str(tmp_path / "SYSTEM"))
+    hive.save()
+    data = bytearray(open(hive.path, "rb").read())
+    struct.pack_into("<I", data, 8, 99)
+    with pytest.raises(HiveError):
+        Hive(data)
+
+
+def test_many_subkeys_split_into_leaves_under_an_index(tmp_path):
+    names = [f"Key{i:05d}" for i in range(3 * LEAF_MAX)]
+    random.Random(1).shuffle(names)
+    hive = Hive.create(str(tmp_path / "SOFTWARE"))
+    for name in names:
+        hive.set_value(f"Parent\\{name}", "Value", REG_SZ, name)
+    hive = reopen(hive)
+    parent = hive.find_key("Parent")
+    assert [name for name, _ in hive.subkeys(parent)] == sorted(names)
+    signature, entries = hive._list_entries(struct.unpack_from("<I", hive._nk(parent), 28)[0])
+    assert signature == b"ri"
+    assert all(0 < len(hive._list_entries(struct.unpack_from("<I", entry)[0])[1]) <= LEAF_MAX
+               for entry in entries)
+    assert hive.get_value(f"Parent\\{names[42]}", "Value") == (REG_SZ, names[42])
+    # Leaves grow in place, so the hive stays near the size of its keys
+    assert os.path.getsize(hive.path) < 400 * 1024
+
+    hive.create_key("Parent\\AAA")
+    hive = reopen(hive)
+    assert hive._list_entries(struct.unpack_from("<I", hive._nk(hive.find_key("Parent")), 28)[0])[0] == b"ri"
+    assert hive.subkeys(hive.find_key("Parent"))[0][0] == "AAA"
+
+
+def test_freed_cells_are_merged_and_reused(tmp_path):
+    hive = Hive.create(str(tmp_path / "SOFTWARE"))
+    hive.set_value("Test", "Seed", REG_DWORD, 1)
+    size = len(hive.data)
+    for i in range(50):
+        hive.set_value("Test", "Blob", REG_BINARY, bytes([i]) * (3000 + 40 * i))
+        hive.set_value("Test", f"Value{i}", REG_SZ, "x" * 100)
+        hive.delete_value("Test", f"Value{i}")
+    assert len(hive.data) <= size + 3 * 4096
+    offset = next(iter(hive._free))
+    assert hive._free[offset] == struct.unpack_from("<i", hive.data, hive._pos(offset))[0]
+    assert all(o + s not in hive._free for o, s in hive._free.items() if o + s < hive._bin_of(o)[1])
+    hive = reopen(hive)
+    assert hive.get_value("Test", "Blob") == (REG_BINARY, bytes([49]) * (3000 + 40 * 49))
+    assert [name for name, _, _ in hive.values("Test")] == ["Seed", "Blob"]
+
+
+def test_new_hive_has_an_empty_root(tmp_path):
+    hive = Hive.create(str(tmp_path / "NTUSER.DAT"), "NTUSER.DAT")
+    assert hive.subkeys(hive.root) == []
+    assert struct.unpack_from("<I", hive._nk(hive.root), 28)[0] == NO_CELL
@@ -0,0 +1,72 @@
+"""Tests for registry_backend: reg add/delete parsing and the in-memory backend"""
+import pytest
+
+from registry_backend import (REG_BINARY, REG_DWORD, REG_MULTI_SZ, REG_QWORD, REG_SZ, MemoryRegistry, RegOp,
+                              group_by_key, parse_reg_command, split_command, split_key)
+
+
+def test_split_command_honours_quotes():
+    assert split_command('reg add "HKCU\\Control Panel\\Desktop" /v  Wallpaper /d ""') == \
+        ["reg", "add", "HKCU\\Control Panel\\Desktop", "/v", "Wallpaper", "/d", ""]
+
+
+def test_split_key_resolves_long_hive_names():
+    assert split_key("HKEY_LOCAL_MACHINE\\SOFTWARE\\Policies\\") == ("HKLM", "SOFTWARE\\Policies")
+    with pytest.raises(ValueError):
+        split_key("HKXX\\Software")
+
+
+@pytest.mark.parametrize("cmd, expected", [
+    ('reg add "HKCU\\Control Panel\\Desktop" /v MenuShowDelay /t REG_SZ /d 0 /f',
+     RegOp("set", "HKCU", "Control Panel\\Desktop", "MenuShowDelay", REG_SZ, "0")),
+    ("reg add HKLM\\SYSTEM\\Test /v Flag /t REG_DWORD /d 0x10 /f",
+     RegOp("set", "HKLM", "SYSTEM\\Test", "Flag", REG_DWORD, 16)),
+    ("reg.exe add HKLM\\SYSTEM\\Test /v Big /t REG_QWORD /d 42 /f /reg:64",
+     RegOp("set", "HKLM", "SYSTEM\\Test", "Big", REG_QWORD, 42)),
+    ("reg add HKCU\\Test /v Mask /t REG_BINARY /d 9012038010000000 /f",
+     RegOp("set", "HKCU", "Test", "Mask", REG_BINARY, bytes.fromhex("9012038010000000"))),
+    ("reg add HKCU\\Test /v List /t REG_MULTI_SZ /d a\\0b /f",
+     RegOp("set", "HKCU", "Test", "List", REG_MULTI_SZ, ["a", "b"])),
+    ("reg add HKCU\\Test /ve /d Hello /f", RegOp("set", "HKCU", "Test", None, REG_SZ, "Hello")),
+    ("reg delete HKCU\\Test /v Old /f", RegOp("delete", "HKCU", "Test", "Old", None, None)),
+])
+def test_parse_reg_command(cmd, expected):
+    assert parse_reg_command(cmd) == expected
+
+
+@pytest.mark.parametrize("cmd", [
+    "sc config SysMain start= disabled",
+    "reg add HKCU\\Test /f",                        # whole key
+    "reg delete HKCU\\Test /f",
+    "reg add HKCU\\Test /v X /t REG_NONE /d 1 /f",  # unsupported type
+    "reg add HKCU\\Test /v X /d 1 /reg:32 /f",      # unsupported switch
+    "reg add HKXX\\Test /v X /d 1 /f",
+    "reg add HKCU\\Test /v X /t REG_DWORD /d zz /f",
+])
+def test_parse_reg_command_leaves_other_commands_to_reg_exe(cmd):
+    assert parse_reg_command(cmd) is None
+
+
+def test_group_by_key_keeps_first_seen_order():
+    a1 = RegOp("set", "HKCU", "A", "x", REG_SZ, "1")
+    b1 = RegOp("set", "HKCU", "B", "x", REG_SZ, "1")
+    a2 = RegOp("delete", "HKCU", "a", "y", None, None)
+    assert group_by_key([a1, b1, a2]) == [[a1, a2], [b1]]
+
+
+def test_memory_registry_is_case_insensitive():
+    registry = MemoryRegistry({("HKCU", "Software\\Test", "Value"): (REG_DWORD, 1)})
+    assert registry.read("HKCU", "SOFTWARE\\test", "VALUE") == (REG_DWORD, 1)
+    assert registry.read_key("HKCU", "software\\TEST") == {"value": (REG_DWORD, 1)}
+    assert registry.read("HKCU", "Software\\Missing", "Value") is None
+    assert registry.delete("HKCU", "Software\\Test", "value") is True
+    assert registry.delete("HKCU", "Software\\Test", "value") is False
+    assert registry.read_key("HKCU", "Software\\Test") == {}
+
+
+def test_apply_reports_each_op():
+    registry = MemoryRegistry()
+    ops = [RegOp("set", "HKCU", "Test", "A", REG_SZ, "1"), RegOp("delete", "HKCU", "Test", "B", None, None),
+           RegOp("set", "HKCU", "Other", None, REG_DWORD, 2)]
+    assert registry.apply(ops) == [(op, None) for op in ops]
+    assert registry.dump() == {("HKCU", "test", "a"): (REG_SZ, "1"), ("HKCU", "other", ""): (REG_DWORD, 2)}
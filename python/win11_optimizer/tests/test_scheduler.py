@@ -0,0 +1,88 @@
+"""Tests for the dependency-aware task scheduler"""
+import threading
+import time
+
+import pytest
+
+from scheduler import Task, resolve_dependencies, run_tasks
+
+
+def recorder():
+    """(ran, make) where make(name, delay) builds a fn appending name to ran after sleeping delay"""
+    ran, lock = [], threading.Lock()
+
+    def make(name, delay=0.0):
+        def fn():
+            time.sleep(delay)
+            with lock:
+                ran.append(name)
+        return fn
+    return ran, make
+
+
+def timings(result):
+    return {t.name: t for t in result.timings}
+
+
+def test_tasks_sharing_a_resource_run_one_after_another():
+    ran, make = recorder()
+    tasks = [Task("first", make("first", 0.05), resources=("service:netlogon",)),
+             Task("other", make("other"), resources=("service:dns",)),
+             Task("second", make("second", 0.02), resources=("service:netlogon",)),
+             Task("third", make("third"), resources=("service:netlogon",))]
+    result = run_tasks(tasks, max_workers=4)
+    assert [name for name in ran if name != "other"] == ["first", "second", "third"]
+    by_name = timings(result)
+    assert by_name["second"].start >= by_name["first"].start + by_name["first"].duration
+    assert by_name["other"].start < by_name["first"].start + by_name["first"].duration
+
+
+def test_after_waits_for_the_prerequisite():
+    ran, make = recorder()
+    result = run_tasks([Task("restart", make("restart"), after=("stop",)),
+                        Task("stop", make("stop", 0.05))], max_workers=4)
+    assert ran == ["stop", "restart"]
+    by_name = timings(result)
+    assert by_name["restart"].start >= by_name["stop"].start + by_name["stop"].duration
+
+
+def test_higher_priority_tasks_start_first():
+    ran, make = recorder()
+    run_tasks([Task("registry", make("registry")),
+               Task("defrag", make("defrag"), priority=5),
+               Task("sfc", make("sfc"), priority=5),
+               Task("cleanup", make("cleanup"), priority=1)], max_workers=1)
+    assert ran == ["defrag", "sfc", "cleanup", "registry"]
+
+
+def test_failed_task_is_recorded_and_does_not_block_dependents():
+    ran, make = recorder()
+
+    def fail():
+        raise OSError("access denied")
+    result = run_tasks([Task("broken", fail), Task("next", make("next"), after=("broken",))])
+    assert ran == ["next"]
+    assert [(name, str(error)) for name, error in result.errors] == [("broken", "access denied")]
+    assert "2 tasks" in result.summary()
+
+
+def test_cycle_is_rejected_before_anything_runs():
+    ran, make = recorder()
+    tasks = [Task("independent", make("independent")),
+             Task("a", make("a"), after=("c",)),
+             Task("b", make("b"), after=("a",)),
+             Task("c", make("c"), after=("b",)),
+             Task("behind", make("behind"), after=("c",))]
+    with pytest.raises(ValueError, match="cycle") as raised:
+        run_tasks(tasks)
+    assert "'a'" in str(raised.value) and "'independent'" not in str(raised.value)
+    assert ran == []
+
+
+def test_invalid_dependencies_are_rejected():
+    with pytest.raises(ValueError, match="unique"):
+        resolve_dependencies([Task("a", None), Task("a", None)])
+    with pytest.raises(ValueError, match="unknown"):
+        resolve_dependencies([Task("a", None, after=("missing",))])
+    assert resolve_dependencies([Task("a", None, resources=("r",)), Task("b", None, resources=("r",))]) == \
+        {"a": set(), "b": {"a"}}
@@ -0,0 +1,61 @@
+"""Tests for the batched service backend, against MemoryServices"""
+import time
+
+from service_backend import RUNNING, STOPPED, MemoryServices, poll_interval
+from tweak_catalog import ServiceOp
+
+
+def test_stop_waits_for_dependents_before_the_service():
+    services = MemoryServices({"Netlogon": (RUNNING, "auto"), "Dep": (RUNNING, "auto")},
+                              transition=0.2, dependents={"netlogon": ["Dep"]})
+    assert services.stop(["netlogon"], dependents=True) == []
+    assert services.dump() == {"netlogon": (STOPPED, "auto"), "dep": (STOPPED, "auto")}
+
+
+def test_stop_without_dependents_is_refused_while_they_run():
+    services = MemoryServices({"Netlogon": (RUNNING, "auto"), "Dep": (RUNNING, "auto")},
+                              dependents={"netlogon": ["Dep"]})
+    assert services.stop(["Netlogon"]) == ["Netlogon"]
+    assert services.dump()["netlogon"] == (RUNNING, "auto")
+
+
+def test_dependent_that_never_stops_is_reported_with_its_parent():
+    services = MemoryServices({"Netlogon": (RUNNING, "auto"), "Dep": (RUNNING, "auto")},
+                              dependents={"netlogon": ["Dep"]}, stuck=["Dep"])
+    started = time.monotonic()
+    assert services.stop(["Netlogon"], timeout=0.3, dependents=True) == ["Dep", "Netlogon"]
+    assert time.monotonic() - started < 1
+
+
+def test_apply_stops_the_batch_together_then_sets_start_types():
+    services = MemoryServices({"SysMain": (RUNNING, "auto"), "Spooler": (RUNNING, "auto"),
+                               "WSearch": (STOPPED, "auto")}, transition=0.2)
+    ops = [ServiceOp("SysMain", "disabled", True), ServiceOp("Spooler", "disabled", True),
+           ServiceOp("WSearch", "demand", False), ServiceOp("Missing", "disabled", True)]
+    started = time.monotonic()
+    results = services.apply(ops)
+    assert time.monotonic() - started < 0.35   # the two 0.2s stops overlap
+    assert [error for _, error in results[:3]] == [None, None, None]
+    assert results[3][1].errno == 1060
+    assert services.dump() == {"sysmain": (STOPPED, "disabled"), "spooler": (STOPPED, "disabled"),
+                               "wsearch": (STOPPED, "demand")}
+
+
+def test_apply_times_out_but_still_sets_the_start_type():
+    services = MemoryServices({"SysMain": (RUNNING, "auto")}, stuck=["SysMain"])
+    [(op, error)] = services.apply([ServiceOp("SysMain", "disabled", True)], timeout=0.2)
+    assert isinstance(error, TimeoutError)
+    assert services.query("SysMain").start == "disabled"
+
+
+def test_start_reports_disabled_and_missing_services():
+    services = MemoryServices({"A": (STOPPED, "demand"), "B": (STOPPED, "disabled")}, transition=0.1)
+    assert services.start(["A", "B", "C"]) == ["B", "C"]
+    assert services.query("A").state == RUNNING
+    assert services.query("C") is None
+
+
+def test_poll_interval_follows_the_wait_hint():
+    assert poll_interval(0) == 0.05
+    assert poll_interval(3000) == 0.3
+    assert poll_interval(60000) == 1.0
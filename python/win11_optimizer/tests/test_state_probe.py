@@ -0,0 +1,68 @@
+"""Tests for state_probe: compliance checks and prune_compliant"""
+from eventlog_backend import MemoryEventLogs
+from planner import Plan
+from registry_backend import REG_DWORD, REG_SZ, MemoryRegistry, RegOp
+from state_probe import POWER_SCHEMES_KEY, SERVICES_KEY, StateProbe, prune_compliant
+from tweak_catalog import CmdOp, EventLogOp, PowerOp, ServiceOp
+
+DONE = RegOp("set", "HKCU", "Software\\Test", "Done", REG_DWORD, 1)
+TODO = RegOp("set", "HKCU", "Software\\Test", "Todo", REG_DWORD, 1)
+GONE = RegOp("delete", "HKCU", "Software\\Test", "Gone", None, None)
+STALE = RegOp("delete", "HKCU", "Software\\Test", "Stale", None, None)
+
+
+def make_plan():
+    plan = Plan()
+    plan.tweaks = ["tweak"]
+    for op in (DONE, TODO, GONE, STALE):
+        plan.registry[op.value_id] = op
+        plan.owners[op.value_id] = "tweak"
+    for svc in (ServiceOp("SysMain", "disabled", True), ServiceOp("Spooler", "disabled", True)):
+        plan.services[svc.name.lower()] = svc
+        plan.service_owners[svc.name.lower()] = "tweak"
+    for log in (EventLogOp("Security", 1024, False), EventLogOp("System", 2048, False)):
+        plan.eventlogs[log.channel.lower()] = log
+        plan.eventlog_owners[log.channel.lower()] = "tweak"
+    plan.power = ("tweak", PowerOp("8C5E7FDA-E8BF-4A96-9A85-A6E23A8C635C"))
+    plan.commands = [("tweak", CmdOp("ipconfig /flushdns"))]
+    plan.requested_ops = plan.planned_ops
+    return plan
+
+
+def make_probe(power="8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c"):
+    registry = MemoryRegistry({
+        ("HKCU", "Software\\Test", "Done"): (REG_DWORD, 1),
+        ("HKCU", "Software\\Test", "Todo"): (REG_SZ, "1"),     # right data, wrong type
+        ("HKCU", "Software\\Test", "Stale"): (REG_DWORD, 0),
+        ("HKLM", f"{SERVICES_KEY}\\SysMain", "Start"): (REG_DWORD, 4),
+        ("HKLM", f"{SERVICES_KEY}\\Spooler", "Start"): (REG_DWORD, 2),
+        ("HKLM", POWER_SCHEMES_KEY, "ActivePowerScheme"): (REG_SZ, power),
+    })
+    eventlogs = MemoryEventLogs({"Security": (1024, False, True), "System": (1024, False, False)})
+    return StateProbe(registry, eventlogs)
+
+
+def test_prune_keeps_only_ops_that_change_something():
+    pending, report = prune_compliant(make_plan(), make_probe())
+    assert list(pending.registry.values()) == [TODO, STALE]
+    assert list(pending.services) == ["spooler"]
+    assert list(pending.eventlogs) == ["system"]
+    assert pending.power is None
+    assert pending.commands == [("tweak", CmdOp("ipconfig /flushdns"))]
+    assert pending.owners == {TODO.value_id: "tweak", STALE.value_id: "tweak"}
+    assert report.checked == {"registry": 4, "services": 2, "eventlogs": 2, "power": 1}
+    assert report.compliant == {"registry": 2, "services": 1, "eventlogs": 1, "power": 1}
+    assert report.summary().startswith("5 of 9 settings already compliant")
+
+
+def test_power_scheme_is_compared_case_insensitively():
+    pending, _ = prune_compliant(make_plan(), make_probe(power="381b4222-f694-41f0-9685-ff5bb260df2e"))
+    assert pending.power is not None
+
+
+def test_unknown_state_is_not_compliant():
+    probe = StateProbe(MemoryRegistry())
+    assert probe.service_start("SysMain") is None
+    assert not probe.service_compliant(ServiceOp("SysMain", "disabled", True))
+    assert probe.service_compliant(ServiceOp("SysMain", None, True))
+    assert not probe.eventlog_compliant(EventLogOp("Security", 1024))
@@ -0,0 +1,84 @@
+"""Tests for the scandir temp cleanup, on a temporary tree"""
+import os
+import time
+
+import temp_cleanup
+from temp_cleanup import clean_tree, format_bytes
+
+
+def write(path, size=10, age=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_removes_files_and_emptied_folders_but_keeps_the_root(tmp_path):
+    root = tmp_path / "Temp"
+    for i in range(300):   # more than one batch
+        write(str(root / f"dir{i % 7}" / "nested" / f"file{i}.tmp"), size=100)
+    write(str(root / "top.log"), size=50)
+    progress = []
+    result = clean_tree(str(root), workers=4, progress=lambda files, size: progress.append((files, size)))
+    assert (result.files, result.bytes, result.errors) == (301, 30050, 0)
+    assert result.dirs == 14
+    assert os.listdir(root) == []
+    assert progress[-1] == (301, 30050)
+
+
+def test_links_are_removed_not_followed(tmp_path):
+    outside = tmp_path / "keep"
+    write(str(outside / "precious.txt"))
+    root = tmp_path / "Temp"
+    os.makedirs(root)
+    os.symlink(outside, root / "link_to_dir", target_is_directory=True)
+    os.symlink(outside / "precious.txt", root / "link_to_file")
+    result = clean_tree(str(root))
+    assert result.files == 2 and result.bytes == 0
+    assert os.listdir(root) == []
+    assert os.path.exists(outside / "precious.txt")
+
+
+def test_age_and_size_filters_keep_files(tmp_path):
+    root = tmp_path / "Temp"
+    old = write(str(root / "old" / "old.tmp"), size=10, age=7200)
+    new = write(str(root / "new" / "new.tmp"), size=10)
+    small = write(str(root / "old" / "small.tmp"), size=1, age=7200)
+    big = write(str(root / "old" / "big.tmp"), size=5000, age=7200)
+    result = clean_tree(str(root), min_age=3600, min_size=5, max_size=1000)
+    assert result.files == 1 and result.kept == 3
+    assert not os.path.exists(old)
+    assert all(os.path.exists(path) for path in (new, small, big))
+    assert result.dirs == 0   # both folders still hold kept files
+
+
+def test_files_in_use_are_skipped(tmp_path, monkeypatch):
+    root = tmp_path / "Temp"
+    busy = write(str(root / "busy.tmp"))
+    write(str(root / "free.tmp"))
+    remove = temp_cleanup.remove_entry
+
+    def remove_entry(path, readonly=False, directory_link=False):
+        if path == busy:
+            error = PermissionError(13, "The process cannot access the file")
+            error.winerror = temp_cleanup.ERROR_SHARING_VIOLATION
+            raise error
+        remove(path, readonly, directory_link)
+    monkeypatch.setattr(temp_cleanup, "remove_entry", remove_entry)
+    result = clean_tree(str(root))
+    assert (result.files, result.locked, result.errors) == (1, 1, 0)
+    assert "1 in use skipped" in result.summary()
+
+
+def test_missing_root_is_an_error_not_an_exception(tmp_path):
+    result = clean_tree([str(tmp_path / "missing")])
+    assert result.errors == 1 and result.files == 0
+
+
+def test_format_bytes():
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_bytes(3 * 1024 ** 4) == "3072.0 GB"
@@ -0,0 +1,171 @@
+"""Tests for the undo journal: recording prior state and replaying its inverse"""
+import json
+import os
+
+from eventlog_backend import MemoryEventLogs
+from registry_backend import REG_BINARY, REG_DWORD, REG_SZ, MemoryRegistry, RegOp
+from service_backend import MemoryServices, RUNNING, STOPPED
+from snapshot import decode_data, encode_data
+from state_probe import POWER_SCHEMES_KEY, SERVICES_KEY, StateProbe
+from tweak_catalog import EventLogOp, PowerOp, ServiceOp
+from undo_journal import UndoJournal, inverse_ops, undo
+
+REG_NONE = 0
+REG_RESOURCE_LIST = 8
+KEY = "Software\\Test"
+
+
+def test_encode_data_round_trips_bytes_of_any_type():
+    for reg_type, data in ((REG_BINARY, b"\x01\x02"), (REG_NONE, b"\x00"), (REG_RESOURCE_LIST, b"\xff" * 4),
+                           (REG_DWORD, b"\x01"), (REG_SZ, "0102"), (REG_DWORD, 5), (7, ["a", "b"])):
+        encoded = encode_data(reg_type, data)
+        json.dumps(encoded)
+        assert decode_data(reg_type, json.loads(json.dumps(encoded))) == data
+
+
+def make_machine():
+    registry = MemoryRegistry({
+        ("HKCU", KEY, "Existing"): (REG_DWORD, 1),
+        ("HKCU", KEY, "Blob"): (REG_NONE, b"\x00\x01"),
+        ("HKLM", f"{SERVICES_KEY}\\SysMain", "Start"): (REG_DWORD, 2),
+        ("HKLM", f"{SERVICES_KEY}\\WSearch", "Start"): (REG_DWORD, 2),
+        ("HKLM", POWER_SCHEMES_KEY, "ActivePowerScheme"): (REG_SZ, "balanced"),
+    })
+    services = MemoryServices({"SysMain": (STOPPED, "auto"), "WSearch": (RUNNING, "auto")})
+    eventlogs = MemoryEventLogs({"Security": (20971520, False, False)})
+    return registry, services, eventlogs
+
+
+def change(registry, services, eventlogs, journal, ops):
+    """Journal ops and then apply them the way the executor does"""
+    journal.record_all([(op, "tweak") for op in ops], StateProbe(registry, eventlogs, services))
+    for op in ops:
+        if isinstance(op, RegOp):
+            registry.apply_op(op)
+        elif isinstance(op, ServiceOp):
+            services.apply([op])
+            registry.write("HKLM", f"{SERVICES_KEY}\\{op.name}", "Start", REG_DWORD, 4)
+        elif isinstance(op, EventLogOp):
+            eventlogs.apply([op])
+        else:
+            registry.write("HKLM", POWER_SCHEMES_KEY, "ActivePowerScheme", REG_SZ, op.scheme)
+
+
+def test_undo_restores_exactly_what_was_changed(tmp_path):
+    registry, services, eventlogs = make_machine()
+    before = registry.dump()
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    change(registry, services, eventlogs, journal, [
+        RegOp("set", "HKCU", KEY, "Existing", REG_DWORD, 0),
+        RegOp("set", "HKCU", KEY, "New", REG_SZ, "x"),
+        RegOp("delete", "HKCU", KEY, "Blob", None, None),
+        ServiceOp("SysMain", "disabled", True),
+        EventLogOp("Security", max_size=134217728, auto_backup=True),
+        PowerOp("high"),
+    ])
+    # A second run changing the same value again must not hide the first prior value
+    change(registry, services, eventlogs, journal, [RegOp("set", "HKCU", KEY, "Existing", REG_DWORD, 7)])
+
+    commands = []
+    result = undo(journal, registry, lambda cmd: commands.append(cmd) or "", services=services, eventlogs=eventlogs)
+    assert result.failures == []
+    assert result.restored == 6
+    assert commands == [["powercfg", "/setactive", "balanced"]]
+    registry.write("HKLM", POWER_SCHEMES_KEY, "ActivePowerScheme", REG_SZ, "balanced")  # what powercfg would do
+    registry.write("HKLM", f"{SERVICES_KEY}\\SysMain", "Start", REG_DWORD, 2)            # what the SCM would do
+    assert registry.dump() == before
+    assert services.dump()["sysmain"] == (STOPPED, "auto")
+    assert eventlogs.dump()["security"] == (20971520, False, False)
+    # A clean undo archives the journal so it is not replayed twice
+    assert not os.path.exists(journal.path)
+    assert journal.entries() == []
+
+
+def test_inverse_ops_are_newest_first_with_the_oldest_prior_state(tmp_path):
+    registry, services, eventlogs = make_machine()
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    change(registry, services, eventlogs, journal, [RegOp("set", "HKCU", KEY, "Existing", REG_DWORD, 2)])
+    change(registry, services, eventlogs, journal, [RegOp("set", "HKCU", KEY, "New", REG_DWORD, 1)])
+    change(registry, services, eventlogs, journal, [RegOp("set", "HKCU", KEY, "existing", REG_DWORD, 3)])
+    assert inverse_ops(journal.entries()) == [
+        RegOp("delete", "HKCU", KEY, "New", None, None),
+        RegOp("set", "HKCU", KEY, "Existing", REG_DWORD, 1),
+    ]
+
+
+def test_failed_undo_keeps_the_journal(tmp_path):
+    registry, services, eventlogs = make_machine()
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    change(registry, services, eventlogs, journal, [PowerOp("high")])
+    result = undo(journal, registry, lambda cmd: "Failed: powercfg not found")
+    assert len(result.failures) == 1
+    assert len(journal.entries()) == 1
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    registry, services, eventlogs = make_machine()
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    change(registry, services, eventlogs, journal, [RegOp("set", "HKCU", KEY, "Existing", REG_DWORD, 0)])
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"kind":"registry","hive"')
+    assert len(journal.entries()) == 1
+
+
+def test_undo_starts_services_a_tweak_stopped(tmp_path):
+    registry, services, eventlogs = make_machine()
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    change(registry, services, eventlogs, journal, [ServiceOp("WSearch", "disabled", True),
+                                                    ServiceOp("SysMain", "disabled", True)])
+    assert services.dump()["wsearch"] == (STOPPED, "disabled")
+    assert [entry["running"] for entry in journal.entries()] == [True, False]
+    result = undo(journal, registry, lambda cmd: "", services=services)
+    assert result.failures == []
+    assert result.started == ["WSearch"]
+    assert "1 services started" in result.summary()
+    assert services.dump()["wsearch"] == (RUNNING, "auto")
+    assert services.dump()["sysmain"] == (STOPPED, "auto")
+
+
+def test_undo_without_a_service_backend_starts_through_sc(tmp_path):
+    registry, services, eventlogs = make_machine()
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    change(registry, services, eventlogs, journal, [ServiceOp("WSearch", "disabled", True)])
+    commands = []
+    undo(journal, registry, lambda cmd: commands.append(cmd) or "")
+    assert commands == [["sc", "config", "WSearch", "start=", "auto"], ["sc", "start", "WSearch"]]
+
+
+class RecordingRegistry(MemoryRegistry):
+    def __init__(self, initial, calls):
+        super().__init__(initial)
+        self.calls = calls
+
+    def apply_op(self, op):
+        self.calls.append(op.name)
+        return super().apply_op(op)
+
+
+class RecordingServices(MemoryServices):
+    def __init__(self, services, calls):
+        super().__init__(services)
+        self.recorded = calls
+
+    def apply(self, ops, timeout=30.0):
+        ops = list(ops)
+        self.recorded.append([op.name for op in ops])
+        return super().apply(ops, timeout)
+
+
+def test_undo_replays_kinds_in_journal_order(tmp_path):
+    calls = []
+    registry = RecordingRegistry({("HKLM", f"{SERVICES_KEY}\\SysMain", "Start"): (REG_DWORD, 2),
+                                  ("HKCU", KEY, "Existing"): (REG_DWORD, 1)}, calls)
+    services = RecordingServices({"SysMain": (STOPPED, "auto")}, calls)
+    journal = UndoJournal(str(tmp_path / "undo_journal.jsonl"))
+    probe = StateProbe(registry, services=services)
+    journal.record(RegOp("set", "HKCU", KEY, "Existing", REG_DWORD, 0), probe)
+    journal.record(ServiceOp("SysMain", "disabled", False), probe)
+    # A later tweak writes the same service's Start value directly
+    journal.record(RegOp("set", "HKLM", f"{SERVICES_KEY}\\SysMain", "Start", REG_DWORD, 3), probe)
+    undo(journal, registry, lambda cmd: "", services=services)
+    assert calls == ["Start", ["SysMain"], "Existing"]
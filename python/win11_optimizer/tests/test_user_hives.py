@@ -0,0 +1,89 @@
+"""Tests for applying the HKCU part of a plan to every user profile through MemoryUserHives"""
+from planner import Plan
+from registry_backend import REG_DWORD, REG_SZ, MemoryRegistry, RegOp
+from undo_journal import UndoJournal
+from user_hives import MOUNT_PREFIX, MemoryUserHives, apply_to_profiles
+
+DESKTOP = "Control Panel\\Desktop"
+PERSONALIZE = "Software\\Microsoft\\Windows\\CurrentVersion\\Themes\\Personalize"
+LOGGED_ON = "S-1-5-21-1-1001"
+AWAY = "S-1-5-21-1-1002"
+
+
+def make_plan():
+    plan = Plan()
+    for value_id, op in (("delay", RegOp("set", "HKCU", DESKTOP, "MenuShowDelay", REG_SZ, "0")),
+                         ("transparency", RegOp("set", "HKCU", PERSONALIZE, "EnableTransparency", REG_DWORD, 0)),
+                         ("machine", RegOp("set", "HKLM", "Software\\Test", "Value", REG_DWORD, 1))):
+        plan.registry[value_id] = op
+        plan.owners[value_id] = "visual_effects"
+    return plan
+
+
+def make_loader(registry=None, **kwargs):
+    return MemoryUserHives({
+        LOGGED_ON: (True, {(DESKTOP, "MenuShowDelay"): (REG_SZ, "400"),
+                           (PERSONALIZE, "EnableTransparency"): (REG_DWORD, 0)}),
+        AWAY: (False, {(DESKTOP, "MenuShowDelay"): (REG_SZ, "400")}),
+    }, registry=registry, **kwargs)
+
+
+def test_loaded_and_unloaded_profiles_are_both_written():
+    loader = make_loader()
+    result = apply_to_profiles(make_plan(), loader)
+    assert not result.failures
+    for sid in (LOGGED_ON, AWAY):
+        values = loader.hive_values(sid)
+        assert values[(DESKTOP.lower(), "menushowdelay")] == (REG_SZ, "0")
+        assert values[(PERSONALIZE.lower(), "enabletransparency")] == (REG_DWORD, 0)
+    assert loader.loads == 1
+    # The unloaded hive went back to its file and nothing is left mounted
+    assert not any(path.startswith(MOUNT_PREFIX.lower()) for _, path, _ in loader.registry.dump())
+
+
+def test_only_non_compliant_values_are_written():
+    loader = make_loader()
+    result = apply_to_profiles(make_plan(), loader)
+    changed = {profile.profile.sid: [op.name for op in profile.changed] for profile in result.profiles}
+    assert changed == {LOGGED_ON: ["MenuShowDelay"], AWAY: ["MenuShowDelay", "EnableTransparency"]}
+    assert all(profile.checked == 2 for profile in result.profiles)
+
+
+def test_only_logged_on_profiles_are_journaled(tmp_path):
+    journal = UndoJournal(str(tmp_path / "undo.jsonl"))
+    apply_to_profiles(make_plan(), make_loader(), journal=journal)
+    entries = journal.entries()
+    assert [(entry["hive"], entry["path"], entry["name"]) for entry in entries] == \
+        [("HKU", f"{LOGGED_ON}\\{DESKTOP}", "MenuShowDelay")]
+    assert entries[0]["data"] == "400"
+
+
+class FailingRegistry(MemoryRegistry):
+    def apply(self, ops):
+        raise OSError("Access is denied")
+
+
+def test_hive_is_unloaded_when_apply_fails():
+    loader = make_loader(registry=FailingRegistry())
+    result = apply_to_profiles(make_plan(), loader)
+    assert [error for _, error in result.failures] == ["Access is denied", "Access is denied"]
+    assert loader.hive_values(AWAY) == {(DESKTOP.lower(), "menushowdelay"): (REG_SZ, "400")}
+    assert not any(path.startswith(MOUNT_PREFIX.lower()) for _, path, _ in loader.registry.dump())
+
+
+def test_mounted_hives_stay_within_the_workers():
+    profiles = {f"S-1-5-21-1-{2000 + i}": (False, {(DESKTOP, "MenuShowDelay"): (REG_SZ, "400")}) for i in range(8)}
+    loader = MemoryUserHives(profiles, load_delay=0.02)
+    result = apply_to_profiles(make_plan(), loader, max_workers=3)
+    assert loader.loads == 8
+    assert 1 <= loader.max_mounted <= 3
+    assert all(len(profile.changed) == 2 for profile in result.profiles)
+
+
+def test_plan_without_user_values_touches_no_profile():
+    plan = Plan()
+    plan.registry["machine"] = RegOp("set", "HKLM", "Software\\Test", "Value", REG_DWORD, 1)
+    plan.owners["machine"] = "machine"
+    loader = make_loader()
+    assert apply_to_profiles(plan, loader).profiles == []
+    assert loader.loads == 0
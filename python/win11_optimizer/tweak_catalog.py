@@ -0,0 +1,392 @@
+"""
+Declarative tweak catalog for Windows 11 Optimizer.
+
+Every tweak is plain data: registry ops, service ops, a power scheme,
+shell commands, or a named handler for the few tweaks that need custom
+Python logic (resolved by the executor). planner.compile_plan() turns a
+selection of tweak ids into one deduplicated execution plan.
+"""
+from collections import namedtuple
+
+from registry_backend import RegOp, REG_DWORD, REG_SZ, split_key
+
+Tweak = namedtuple("Tweak", "id label mode ops")
+ServiceOp = namedtuple("ServiceOp", "name start stop")   # start: auto/demand/disabled or None
+PowerOp = namedtuple("PowerOp", "scheme")                # power scheme GUID
+CmdOp = namedtuple("CmdOp", "cmd")                       # command line passed to run_cmd
+PsOp = namedtuple("PsOp", "script")                      # script run in the persistent PowerShell host
+EventLogOp = namedtuple("EventLogOp", "channel max_size retention auto_backup",  # None leaves a
+                        defaults=(None, None, None))                             # property as it is
+CallOp = namedtuple("CallOp", "handler resources",      # name of a Python handler and the
+                    defaults=((),))                      # scheduler resources it touches
+
+MODES = ("Basic", "Standard", "Ultimate", "Extreme")
+
+HIGH_PERFORMANCE_SCHEME = "8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c"
+BALANCED_SCHEME = "381b4222-f694-41f0-9685-ff5bb260df2e"
+
+# AppX package names (-like patterns) removed by remove_bloat_apps
+BLOAT_APP_PATTERNS = ["*Xbox*", "*Bing*", "*Zune*"]
+
+# Frequently used keys
+DESKTOP = r"HKCU\Control Panel\Desktop"
+EXPLORER = r"HKCU\Software\Microsoft\Windows\CurrentVersion\Explorer"
+EXPLORER_ADVANCED = EXPLORER + r"\Advanced"
+VISUAL_EFFECTS = EXPLORER + r"\VisualEffects"
+CONTENT_DELIVERY = r"HKCU\Software\Microsoft\Windows\CurrentVersion\ContentDeliveryManager"
+CONTROL = r"HKLM\SYSTEM\CurrentControlSet\Control"
+MEMORY_MANAGEMENT = CONTROL + r"\Session Manager\Memory Management"
+PRIORITY_CONTROL = CONTROL + r"\PriorityControl"
+WINLOGON = r"HKLM\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon"
+POLICIES = r"HKLM\SOFTWARE\Policies\Microsoft\Windows"
+POLICIES_SYSTEM = POLICIES + r"\System"
+WINDOWS_SEARCH_POLICY = POLICIES + r"\Windows Search"
+WINDOWS_UPDATE_AU = POLICIES + r"\WindowsUpdate\AU"
+TCPIP_PARAMETERS = r"HKLM\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters"
+
+
+def dword(key, name, value):
+    """REG_DWORD set op"""
+    hive, path = split_key(key)
+    return RegOp("set", hive, path, name, REG_DWORD, value)
+
+
+def string(key, name, value):
+    """REG_SZ set op (name None sets the default value)"""
+    hive, path = split_key(key)
+    return RegOp("set", hive, path, name, REG_SZ, value)
+
+
+def command_text(op):
+    """Display text for a CmdOp or PsOp"""
+    if isinstance(op, PsOp):
+        return f"PowerShell: {op.script}"
+    return op.cmd
+
+
+def disable_service(name):
+    """Stop a service and set its start type to disabled"""
+    return ServiceOp(name, "disabled", True)
+
+
+# -----------------------------
+# BASIC MODE
+# -----------------------------
+BASIC = [
+    Tweak("fix_domain_trust_relationship", "Fix Domain Trust Relationship", "Basic", [
+        # Stops/starts these services itself and resets network, Kerberos and credentials
+        CallOp("fix_domain_trust_relationship", (
+            "service:netlogon", "service:w32time", "service:dns", "service:kdc",
+            "network", "kerberos", "credentials",
+        )),
+    ]),
+    Tweak("fix_security_log_full", "Fix Security Log Full", "Basic", [
+        # Security log to 128MB (default is 20MB), overwrite as needed, archive when full.
+        # One channel config save per log; Windows persists it under Services\EventLog
+        EventLogOp("Security", max_size=134217728, retention=False, auto_backup=True),
+        PsOp("Clear-EventLog -LogName Security -ErrorAction SilentlyContinue"),
+        # Same treatment for the other important logs (64MB)
+        EventLogOp("Application", max_size=67108864, retention=False),
+        EventLogOp("System", max_size=67108864, retention=False),
+    ]),
+    Tweak("disable_startup_apps", "Disable Startup Apps", "Basic", [
+        PsOp("Get-CimInstance Win32_StartupCommand | Remove-CimInstance"),
+        dword(EXPLORER + r"\StartupApproved", "StartupDelayInMSec", 0),
+    ]),
+    Tweak("disable_visual_effects", "Disable Visual Effects", "Basic", [
+        dword(VISUAL_EFFECTS, "VisualFXSetting", 2),
+        string(DESKTOP, "DragFullWindows", "0"),
+    ]),
+    Tweak("disable_transparency", "Disable Transparency", "Basic", [
+        dword(r"HKCU\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize", "EnableTransparency", 0),
+    ]),
+    Tweak("disable_background_apps", "Disable Background Apps", "Basic", [
+        dword(r"HKCU\Software\Microsoft\Windows\CurrentVersion\BackgroundAccessApplications", "GlobalUserDisabled", 1),
+    ]),
+    Tweak("optimize_taskbar_animations", "Optimize Taskbar Animations", "Basic", [
+        dword(EXPLORER_ADVANCED, "TaskbarAnimations", 0),
+    ]),
+    Tweak("disable_notification_sounds", "Disable Notification Sounds", "Basic", [
+        string(r"HKCU\AppEvents\Schemes\Apps\.Default\.Default\.Current", None, ""),
+    ]),
+    Tweak("enable_fast_start_menu", "Enable Fast Start Menu", "Basic", [
+        dword(EXPLORER_ADVANCED, "Start_SearchFiles", 2),
+    ]),
+    Tweak("disable_lockscreen_blur", "Disable Lockscreen Blur", "Basic", [
+        dword(POLICIES_SYSTEM, "DisableAcrylicBackgroundOnLogon", 1),
+    ]),
+    Tweak("optimize_file_explorer", "Optimize File Explorer", "Basic", [
+        dword(EXPLORER_ADVANCED, "Hidden", 1),
+        dword(EXPLORER_ADVANCED, "ShowSuperHidden", 0),
+    ]),
+    Tweak("disable_game_bar", "Disable Game Bar", "Basic", [
+        dword(r"HKCU\Software\Microsoft\Windows\CurrentVersion\GameBar", "AllowAutoGameMode", 0),
+    ]),
+]
+
+# -----------------------------
+# STANDARD MODE
+# -----------------------------
+STANDARD = [
+    Tweak("safe_reduce_telemetry", "Reduce Telemetry (Safe)", "Standard", [
+        # Basic level instead of completely disabled (less suspicious)
+        dword(POLICIES + r"\DataCollection", "AllowTelemetry", 1),
+        dword(r"HKCU\Software\Microsoft\Windows\CurrentVersion\Privacy", "TailoredExperiencesWithDiagnosticDataEnabled", 0),
+        dword(POLICIES + r"\AdvertisingInfo", "DisabledByGroupPolicy", 1),
+    ]),
+    Tweak("disable_services", "Disable Unnecessary Services", "Standard", [
+        disable_service("OneSyncSvc"),
+        disable_service("MapsBroker"),
+    ]),
+    Tweak("disable_indexing", "Disable Indexing", "Standard", [
+        disable_service("WSearch"),
+    ]),
+    Tweak("set_high_performance", "Set High Performance", "Standard", [
+        PowerOp(HIGH_PERFORMANCE_SCHEME),
+        dword(CONTROL + r"\Power", "HibernateEnabled", 0),
+    ]),
+    Tweak("disk_defrag_trim", "Disk Defrag/Trim", "Standard", [
+        CmdOp("defrag C: /O /U"),
+        PsOp("Optimize-Volume -DriveLetter C -ReTrim -Verbose"),
+    ]),
+    Tweak("disable_timeline", "Disable Timeline", "Standard", [
+        dword(POLICIES_SYSTEM, "EnableActivityFeed", 0),
+    ]),
+    Tweak("disable_location_tracking", "Disable Location Tracking", "Standard", [
+        dword(POLICIES + r"\LocationAndSensors", "DisableLocation", 1),
+    ]),
+    Tweak("optimize_system_cache", "Optimize System Cache", "Standard", [
+        dword(MEMORY_MANAGEMENT, "LargeSystemCache", 1),
+    ]),
+    Tweak("disable_print_spooler", "Disable Print Spooler", "Standard", [
+        disable_service("Spooler"),
+    ]),
+    Tweak("optimize_processor_scheduling", "Optimize Processor", "Standard", [
+        dword(PRIORITY_CONTROL, "Win32PrioritySeparation", 26),
+    ]),
+    Tweak("disable_remote_assistance", "Disable Remote Assistance", "Standard", [
+        dword(CONTROL + r"\Remote Assistance", "fAllowToGetHelp", 0),
+    ]),
+    Tweak("enable_fast_restart", "Enable Fast Restart", "Standard", [
+        string(CONTROL, "WaitToKillServiceTimeout", "2000"),
+        dword(CONTROL + r"\Session Manager\Power", "HiberbootEnabled", 1),
+        string(DESKTOP, "HungAppTimeout", "3000"),
+        string(DESKTOP, "WaitToKillAppTimeout", "2000"),
+        string(DESKTOP, "AutoEndTasks", "1"),
+        dword(CONTROL, "ServicesPipeTimeout", 3000),
+    ]),
+    Tweak("enable_fast_signout", "Enable Fast Signout", "Standard", [
+        dword(WINLOGON, "ProfileDlgTimeOut", 10),
+        dword(WINLOGON, "DelayedDesktopSwitchTimeout", 0),
+        dword(MEMORY_MANAGEMENT, "ClearPageFileAtShutdown", 0),
+        string(DESKTOP, "WaitToKillAppTimeout", "2000"),
+        string(DESKTOP, "AutoEndTasks", "1"),
+    ]),
+    Tweak("clear_session_cookies_fsso", "Clear Session Cookies (FSSO)", "Standard", [
+        CmdOp("RunDll32.exe InetCpl.cpl,ClearMyTracksByProcess 255"),
+        PsOp(r'Remove-Item -Path "$env:LOCALAPPDATA\Google\Chrome\User Data\Default\Session Storage" -Recurse -Force -ErrorAction SilentlyContinue'),
+        PsOp(r'Remove-Item -Path "$env:LOCALAPPDATA\Google\Chrome\User Data\Default\Cookies" -Force -ErrorAction SilentlyContinue'),
+        PsOp(r'Remove-Item -Path "$env:APPDATA\Mozilla\Firefox\Profiles\*\cookies.sqlite" -Force -ErrorAction SilentlyContinue'),
+        PsOp(r'Remove-Item -Path "$env:APPDATA\Mozilla\Firefox\Profiles\*\sessionstore.js" -Force -ErrorAction SilentlyContinue'),
+        CmdOp("cmdkey /delete:WindowsLive"),
+        CmdOp("cmdkey /delete:MicrosoftAccount"),
+        CmdOp("klist purge"),
+        CmdOp("klist -li 0x3e7 purge"),
+        CmdOp("ipconfig /flushdns"),
+        CmdOp("wevtutil cl System"),
+        CmdOp("wevtutil cl Application"),
+        CmdOp("RunDll32.exe InetCpl.cpl,ClearMyTracksByProcess 8"),
+    ]),
+]
+
+# -----------------------------
+# ULTIMATE MODE
+# -----------------------------
+ULTIMATE = [
+    Tweak("disable_defender", "Disable Defender", "Ultimate", [
+        dword(r"HKLM\SOFTWARE\Policies\Microsoft\Windows Defender", "DisableAntiSpyware", 1),
+        disable_service("WinDefend"),
+    ]),
+    Tweak("disable_cortana", "Disable Cortana", "Ultimate", [
+        dword(WINDOWS_SEARCH_POLICY, "AllowCortana", 0),
+        dword(WINDOWS_SEARCH_POLICY, "DisableWebSearch", 1),
+    ]),
+    Tweak("disable_xbox_services", "Disable Xbox Services", "Ultimate", [
+        disable_service("XblAuthManager"),
+        disable_service("XboxGipSvc"),
+    ]),
+    Tweak("remove_bloat_apps", "Remove Bloat Apps", "Ultimate", [
+        # BLOAT_APP_PATTERNS, enumerated once and removed in one PowerShell call (appx.py)
+        CallOp("remove_bloat_apps", ("appx",)),
+    ]),
+    Tweak("disable_tips_notifications", "Disable Tips/Notifications", "Ultimate", [
+        dword(CONTENT_DELIVERY, "SubscribedContent-338388Enabled", 0),
+        dword(CONTENT_DELIVERY, "SubscribedContent-353694Enabled", 0),
+    ]),
+    Tweak("disable_advertising", "Disable Advertising", "Ultimate", [
+        dword(CONTENT_DELIVERY, "SubscribedContent-353696Enabled", 0),
+        dword(POLICIES + r"\CloudContent", "DisableWindowsConsumerFeatures", 1),
+    ]),
+    Tweak("disable_error_reporting", "Disable Error Reporting", "Ultimate", [
+        dword(POLICIES + r"\Windows Error Reporting", "Disabled", 1),
+    ]),
+    Tweak("disable_smart_screen", "Disable Smart Screen", "Ultimate", [
+        dword(POLICIES_SYSTEM, "EnableSmartScreen", 0),
+    ]),
+    Tweak("disable_feedback", "Disable Feedback", "Ultimate", [
+        dword(POLICIES + r"\DataCollection", "DoNotShowFeedbackNotifications", 1),
+    ]),
+    Tweak("disable_auto_update", "Disable Auto Update", "Ultimate", [
+        dword(WINDOWS_UPDATE_AU, "NoAutoUpdate", 1),
+    ]),
+    Tweak("disable_onedrive", "Disable OneDrive", "Ultimate", [
+        CmdOp("taskkill /f /im OneDrive.exe"),
+        dword(POLICIES + r"\OneDrive", "DisableFileSyncNGSC", 1),
+    ]),
+]
+
+# -----------------------------
+# EXTREME MODE
+# -----------------------------
+EXTREME = [
+    Tweak("optimize_hdd_performance", "Optimize HDD Performance", "Extreme", [
+        CmdOp('schtasks /change /tn "Microsoft\\Windows\\Defrag\\ScheduledDefrag" /disable'),
+        dword(CONTROL + r"\FileSystem", "NtfsDisableLastAccessUpdate", 1),
+        dword(MEMORY_MANAGEMENT + r"\PrefetchParameters", "EnablePrefetcher", 1),
+        dword(MEMORY_MANAGEMENT + r"\PrefetchParameters", "EnableSuperfetch", 0),
+    ]),
+    Tweak("disable_animations", "Disable UI Animations", "Extreme", [
+        dword(EXPLORER_ADVANCED, "ListviewAlphaSelect", 0),
+        dword(EXPLORER_ADVANCED, "TaskbarAnimations", 0),
+        dword(EXPLORER_ADVANCED, "ImeSwitchNotification", 0),
+        string(DESKTOP + r"\WindowMetrics", "MinAnimate", "0"),
+    ]),
+    Tweak("optimize_login_performance", "Optimize Login Performance", "Extreme", [
+        dword(WINLOGON, "AutoRestartShell", 1),
+        dword(EXPLORER, "Serialize", 0),
+        string(CONTROL, "WaitToKillServiceTimeout", "2000"),
+        string(DESKTOP, "AutoEndTasks", "1"),
+        string(DESKTOP, "HungAppTimeout", "3000"),
+        string(DESKTOP, "WaitToKillAppTimeout", "2000"),
+    ]),
+    Tweak("disable_windows_update_auto_restart", "Disable Auto-Restart Updates", "Extreme", [
+        dword(WINDOWS_UPDATE_AU, "NoAutoRebootWithLoggedOnUsers", 1),
+        dword(WINDOWS_UPDATE_AU, "AUPowerManagement", 0),
+    ]),
+    Tweak("optimize_network_performance", "Optimize Network Performance", "Extreme", [
+        dword(TCPIP_PARAMETERS, "Tcp1323Opts", 1),
+        dword(TCPIP_PARAMETERS, "TCPWindowSize", 64240),
+        dword(TCPIP_PARAMETERS, "DefaultTTL", 64),
+        CmdOp("netsh int tcp set global autotuninglevel=normal"),
+        CmdOp("netsh int tcp set global rss=enabled"),
+    ]),
+    Tweak("disable_system_maintenance", "Disable System Maintenance", "Extreme", [
+        dword(r"HKLM\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Schedule\Maintenance", "MaintenanceDisabled", 1),
+        CmdOp('schtasks /change /tn "Microsoft\\Windows\\TaskScheduler\\Maintenance Configurator" /disable'),
+    ]),
+    Tweak("optimize_paging_file", "Optimize Paging File", "Extreme", [
+        CmdOp('wmic computersystem where name="%computername%" set AutomaticManagedPagefile=False'),
+        CmdOp('wmic pagefileset where name="C:\\\\pagefile.sys" set InitialSize=2048,MaximumSize=4096'),
+    ]),
+    Tweak("disable_search_indexing", "Disable Search Indexing", "Extreme", [
+        disable_service("WSearch"),
+        dword(WINDOWS_SEARCH_POLICY, "PreventIndexingOutlook", 1),
+    ]),
+    Tweak("cleanup_temp_files", "Cleanup Temp Files", "Extreme", [
+        # Parallel scandir walk in temp_cleanup.py; reports bytes reclaimed and skips files in use
+        CallOp("cleanup_temp_files", ("temp",)),
+        CmdOp("cleanmgr /sagerun:1"),
+        CmdOp("ipconfig /flushdns"),
+    ]),
+    Tweak("optimize_system_responsiveness", "Optimize System Responsiveness", "Extreme", [
+        dword(PRIORITY_CONTROL, "Win32PrioritySeparation", 38),
+        dword(r"HKLM\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile", "SystemResponsiveness", 20),
+    ]),
+    Tweak("disable_visual_effects_advanced", "Advanced Visual Effects", "Extreme", [
+        dword(VISUAL_EFFECTS, "AnimateMinMax", 0),
+        dword(VISUAL_EFFECTS, "ComboBoxAnimation", 0),
+        dword(VISUAL_EFFECTS, "ListBoxSmoothScrolling", 0),
+    ]),
+    Tweak("optimize_memory_management", "Optimize Memory Management", "Extreme", [
+        dword(MEMORY_MANAGEMENT, "ClearPageFileAtShutdown", 0),
+        dword(MEMORY_MANAGEMENT, "DisablePagingExecutive", 1),
+    ]),
+    Tweak("optimize_disk_cache", "Optimize Disk Cache", "Extreme", [
+        dword(MEMORY_MANAGEMENT, "IoPageLockLimit", 0),
+    ]),
+    Tweak("disable_thumbnail_cache", "Disable Thumbnail Cache", "Extreme", [
+        dword(EXPLORER_ADVANCED, "DisableThumbnailCache", 1),
+    ]),
+    Tweak("optimize_context_menu", "Optimize Context Menu", "Extreme", [
+        string(r"HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\Shell Extensions\Blocked", "{e2bf9676-5f8f-435c-97eb-11607a5bedf7}", ""),
+    ]),
+]
+
+CATALOG = {tweak.id: tweak for tweak in BASIC + STANDARD + ULTIMATE + EXTREME}
+
+MODE_TWEAKS = {
+    "Basic": BASIC,
+    "Standard": STANDARD,
+    "Ultimate": ULTIMATE,
+    "Extreme": EXTREME,
+}
+
+# Long-running maintenance tweaks, started first so they overlap with the fast work
+SLOW_TWEAKS = {
+    "fix_domain_trust_relationship",
+    "disk_defrag_trim",
+    "cleanup_temp_files",
+    "remove_bloat_apps",
+    "disable_startup_apps",
+    "optimize_paging_file",
+}
+
+# Basic tweaks that every advanced mode applies unconditionally
+ADVANCED_BASE = [
+    "disable_startup_apps",
+    "disable_visual_effects",
+    "disable_transparency",
+    "disable_background_apps",
+    "optimize_taskbar_animations",
+]
+
+# Basic tweaks that advanced modes only apply when ticked in the Basic section
+ADVANCED_OPTIONAL = ["fix_domain_trust_relationship", "fix_security_log_full"]
+
+
+def tweaks_for_mode(mode):
+    """Return the catalog entries listed under a mode, in display order"""
+    return list(MODE_TWEAKS[mode])
+
+
+def get_tweak(tweak_id):
+    """Look up a tweak by id, raising KeyError with a readable message"""
+    try:
+        return CATALOG[tweak_id]
+    except KeyError:
+        raise KeyError(f"Unknown tweak: {tweak_id}") from None
+
+
+def select_for_mode(mode, selected=(), basic_selected=()):
+    """
+    Resolve the tweak ids a mode run applies, without duplicates.
+
+    Basic applies only what is ticked. Advanced modes add the ticked
+    domain-trust / security-log fixes, the common Basic set, every
+    Standard tweak, every Ultimate tweak for Ultimate and Extreme, and the
+    ticked tweaks of the chosen mode.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    if mode == "Basic":
+        ids = [tid for tid in selected]
+    else:
+        ids = [tid for tid in ADVANCED_OPTIONAL if tid in basic_selected]
+        ids += ADVANCED_BASE
+        ids += [t.id for t in STANDARD]
+        if mode in ("Ultimate", "Extreme"):
+            ids += [t.id for t in ULTIMATE]
+        ids += list(selected)
+    for tid in ids:
+        get_tweak(tid)
+    return list(dict.fromkeys(ids))
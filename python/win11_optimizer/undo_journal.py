@@ -0,0 +1,230 @@
+"""
+Undo journal for Windows 11 Optimizer.
+
+Before a registry value, service start type, event log setting or power
+scheme is changed, its prior state (or a marker that the value was
+absent) is appended to a JSONL journal; a service entry also records
+whether the service was running. Undo replays the exact inverse of the
+journal, newest first, then starts again the services that were running,
+so only what was actually changed is touched and the machine ends up
+exactly as it was before the first journaled change.
+"""
+import datetime
+import itertools
+import json
+import os
+import threading
+
+from eventlog_backend import wevtutil_command
+from registry_backend import RegOp
+from snapshot import decode_data, encode_data
+from tweak_catalog import EventLogOp, PowerOp, ServiceOp
+
+
+class UndoJournal:
+    """Append-only JSONL journal of prior states"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = max((entry.get("seq", 0) for entry in self.entries()), default=0)
+
+    def _append(self, entries):
+        """Append entries with a single write and fsync"""
+        if not entries:
+            return
+        with self._lock:
+            now = datetime.datetime.now().isoformat(timespec="seconds")
+            lines = []
+            for entry in entries:
+                self._seq += 1
+                entry["seq"] = self._seq
+                entry["time"] = now
+                lines.append(json.dumps(entry, separators=(",", ":")) + "\n")
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entry_for(self, op, probe, tweak=None):
+        """Build the journal entry holding the current state of whatever op will change"""
+        if isinstance(op, RegOp):
+            prior = probe.registry_value(op)
+            entry = {"kind": "registry", "hive": op.hive, "path": op.path, "name": op.name,
+                     "exists": prior is not None}
+            if prior is not None:
+                entry["type"] = prior[0]
+                entry["data"] = encode_data(prior[0], prior[1])
+        elif isinstance(op, ServiceOp):
+            entry = {"kind": "service", "name": op.name, "start": probe.service_start(op.name),
+                     "running": probe.service_running(op.name)}
+        elif isinstance(op, EventLogOp):
+            prior = probe.eventlog_config(op.channel)
+            entry = {"kind": "eventlog", "channel": op.channel}
+            for prop in ("max_size", "retention", "auto_backup"):
+                entry[prop] = getattr(prior, prop) if prior is not None else None
+        elif isinstance(op, PowerOp):
+            entry = {"kind": "power", "scheme": probe.active_power_scheme()}
+        else:
+            raise TypeError(f"Cannot journal {op!r}")
+        entry["tweak"] = tweak
+        return entry
+
+    def record(self, op, probe, tweak=None):
+        """Journal one op before it is applied (write-ahead)"""
+        self._append([self.entry_for(op, probe, tweak)])
+
+    def record_all(self, ops, probe):
+        """Journal (op, tweak) pairs before they are applied, with one fsync"""
+        self._append([self.entry_for(op, probe, tweak) for op, tweak in ops])
+
+    def entries(self):
+        """All journal entries, oldest first; a torn last line is ignored"""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries
+
+    def archive(self):
+        """Move the journal aside after a successful undo; returns the archived path"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return None
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            archived = f"{self.path}.undone_{timestamp}"
+            os.replace(self.path, archived)
+            self._seq = 0
+            return archived
+
+
+def target_of(entry):
+    """Case-insensitive identity of what a journal entry describes"""
+    if entry["kind"] == "registry":
+        return ("registry", entry["hive"], entry["path"].lower(), (entry["name"] or "").lower())
+    if entry["kind"] == "service":
+        return ("service", entry["name"].lower())
+    if entry["kind"] == "eventlog":
+        return ("eventlog", entry["channel"].lower())
+    return ("power",)
+
+
+def oldest_entries(entries):
+    """
+    The oldest entry of each target, newest change first. Replaying every
+    entry newest-first ends at the oldest prior state of each target, so
+    only that entry is kept per target.
+    """
+    oldest = {}
+    for entry in entries:
+        oldest.setdefault(target_of(entry), entry)
+    return sorted(oldest.values(), key=lambda e: e["seq"], reverse=True)
+
+
+def inverse_ops(entries):
+    """Inverse ops, newest change first, each putting back the oldest prior state of its target"""
+    ops = []
+    for entry in oldest_entries(entries):
+        if entry["kind"] == "registry":
+            if entry["exists"]:
+                ops.append(RegOp("set", entry["hive"], entry["path"], entry["name"], entry["type"],
+                                 decode_data(entry["type"], entry["data"])))
+            else:
+                ops.append(RegOp("delete", entry["hive"], entry["path"], entry["name"], None, None))
+        elif entry["kind"] == "service":
+            # Unknown prior start type means the service did not exist - nothing to restore
+            if entry["start"]:
+                ops.append(ServiceOp(entry["name"], entry["start"], False))
+        elif entry["kind"] == "eventlog":
+            # Unknown prior settings (channel missing or no backend) - nothing to restore
+            if entry["max_size"] is not None:
+                ops.append(EventLogOp(entry["channel"], entry["max_size"], entry["retention"],
+                                      entry["auto_backup"]))
+        elif entry["scheme"]:
+            ops.append(PowerOp(entry["scheme"]))
+    return ops
+
+
+def running_services(entries):
+    """Services that were running before their first journaled change (journals without the flag: none)"""
+    return [entry["name"] for entry in oldest_entries(entries)
+            if entry["kind"] == "service" and entry["start"] and entry.get("running")]
+
+
+class UndoResult:
+    def __init__(self):
+        self.restored = 0
+        self.started = []
+        self.failures = []
+
+    def summary(self):
+        started = f", {len(self.started)} services started" if self.started else ""
+        return f"{self.restored} settings restored{started}, {len(self.failures)} failed"
+
+    def count(self, op, error):
+        if error is None:
+            self.restored += 1
+        else:
+            self.failures.append((str(op), f"Failed: {error}"))
+
+
+def undo(journal, registry, run_cmd, services=None, eventlogs=None):
+    """
+    Replay the inverse of the journal newest first, start the services
+    that were running, and archive the journal when everything succeeded.
+    Consecutive service and event log inverses go through their backends
+    as one batch; the batches keep their place in the newest-first order,
+    since two kinds can target the same setting (a registry tweak on a
+    service's Start value).
+    """
+    result = UndoResult()
+    entries = journal.entries()
+    for kind, group in itertools.groupby(inverse_ops(entries), key=type):
+        group = list(group)
+        if kind is ServiceOp and services is not None:
+            for op, error in services.apply(group):
+                result.count(op, error)
+            continue
+        if kind is EventLogOp and eventlogs is not None:
+            for op, _, _, error in eventlogs.apply(group):
+                result.count(op, error)
+            continue
+        for op in group:
+            if isinstance(op, RegOp):
+                try:
+                    registry.apply_op(op)
+                    output = ""
+                except OSError as e:
+                    output = f"Failed: {e}"
+            elif isinstance(op, ServiceOp):
+                output = run_cmd(["sc", "config", op.name, "start=", op.start])
+            elif isinstance(op, EventLogOp):
+                output = run_cmd(wevtutil_command(op))
+            else:
+                output = run_cmd(["powercfg", "/setactive", op.scheme])
+            if isinstance(output, str) and output.startswith("Failed"):
+                result.failures.append((str(op), output))
+            else:
+                result.restored += 1
+    # Start types are back by now, so services a tweak disabled and stopped can start again
+    names = running_services(entries)
+    if names and services is not None:
+        failed = services.start(names)
+    else:
+        failed = [name for name in names if str(run_cmd(["sc", "start", name])).startswith("Failed")]
+    result.started = [name for name in names if name not in failed]
+    result.failures += [(f"Start service {name}", "Failed: did not start") for name in failed]
+    registry.close()
+    if services is not None:
+        services.close()
+    if eventlogs is not None:
+        eventlogs.close()
+    if not result.failures:
+        journal.archive()
+    return result
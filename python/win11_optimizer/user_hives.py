@@ -0,0 +1,328 @@
+"""
+Per-user registry hives for Windows 11 Optimizer.
+
+HKCU tweaks (visual effects, transparency, background apps...) only reach
+the account running the optimizer. apply_to_profiles() applies the HKCU
+part of a plan to every user profile on the machine instead:
+- profiles that are logged on are written in place under HKU\\<SID>;
+- the NTUSER.DAT of every other profile is loaded under a temporary
+  HKU name, written and unloaded again.
+
+Profiles are processed concurrently, each with its own registry backend
+so unloading one hive never closes handles another worker is using. Only
+values that differ are written. Changes to logged-on profiles are
+journaled under HKU\\<SID>; unloaded hives are not, as Undo could not
+reach them.
+
+WinHiveLoader finds profiles in the ProfileList key and loads hives with
+RegLoadKey. MemoryUserHives keeps several user hives in memory, for
+exercising this on machines without winreg.
+"""
+import ctypes
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from registry_backend import MemoryRegistry, WinRegBackend
+from state_probe import StateProbe
+
+try:
+    import winreg
+    from ctypes import wintypes
+    advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+except (AttributeError, OSError, ImportError, ValueError):  # Not on Windows - only MemoryUserHives is usable
+    winreg = advapi32 = kernel32 = None
+
+PROFILE_LIST_KEY = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\ProfileList"
+USER_SID_PREFIXES = ("S-1-5-21-", "S-1-12-1-")   # local/domain and Azure AD accounts, not service accounts
+MOUNT_PREFIX = "W11OPT_"                         # HKU name an unloaded profile's hive is loaded under
+DEFAULT_WORKERS = 4
+
+
+class Profile(namedtuple("Profile", "sid hive_path loaded")):
+    """A user profile: its SID, the path of its NTUSER.DAT and whether HKU\\<SID> is loaded"""
+    __slots__ = ()
+
+
+class ProfileResult(namedtuple("ProfileResult", "profile checked changed errors duration")):
+    """Outcome for one profile: values checked, RegOps written and (description, error) failures"""
+    __slots__ = ()
+
+    def __str__(self):
+        state = "logged on" if self.profile.loaded else "loaded from NTUSER.DAT"
+        text = f"{self.profile.sid} ({state}): {len(self.changed)} of {self.checked} values changed"
+        if self.errors:
+            text += "; failed: " + ", ".join(f"{what} ({error})" for what, error in self.errors)
+        return text
+
+
+class UserHivesResult:
+    """Per-profile results of one apply_to_profiles() call"""
+
+    def __init__(self):
+        self.profiles = []     # ProfileResult
+        self.duration = 0.0
+
+    @property
+    def failures(self):
+        return [(f"{result.profile.sid}: {what}", error) for result in self.profiles for what, error in result.errors]
+
+    def summary(self):
+        changed = sum(len(result.changed) for result in self.profiles)
+        return (f"{len(self.profiles)} user profiles, {changed} values changed in {self.duration:.2f}s, "
+                f"{len(self.failures)} failed")
+
+
+def user_ops(plan):
+    """[(RegOp, tweak id)] of the HKCU ops of a Plan"""
+    return [(op, plan.owners[value_id]) for value_id, op in plan.registry.items() if op.hive == "HKCU"]
+
+
+def retarget(op, mount):
+    """The HKCU op addressed to the hive loaded at HKU\\<mount>"""
+    return op._replace(hive="HKU", path=f"{mount}\\{op.path}")
+
+
+# -----------------------------
+# LOADERS
+# -----------------------------
+class HiveLoader:
+    """Interface shared by the RegLoadKey loader and the in-memory fake"""
+
+    def profiles(self):
+        """Every user Profile on the machine"""
+        raise NotImplementedError
+
+    def backend(self):
+        """A RegistryBackend for one worker; HKU paths reach the loaded hives"""
+        raise NotImplementedError
+
+    def load(self, profile):
+        """Load an unloaded profile's hive; returns the HKU name it is loaded under"""
+        raise NotImplementedError
+
+    def unload(self, mount):
+        """Unload a hive load() loaded, saving it"""
+        raise NotImplementedError
+
+
+if advapi32 is not None:
+    class LUID_AND_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [("LowPart", wintypes.DWORD), ("HighPart", wintypes.LONG), ("Attributes", wintypes.DWORD)]
+
+    class TOKEN_PRIVILEGES(ctypes.Structure):
+        _fields_ = [("PrivilegeCount", wintypes.DWORD), ("Privileges", LUID_AND_ATTRIBUTES * 1)]
+
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    advapi32.OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE)]
+    advapi32.LookupPrivilegeValueW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR, ctypes.POINTER(LUID_AND_ATTRIBUTES)]
+    advapi32.AdjustTokenPrivileges.argtypes = [wintypes.HANDLE, wintypes.BOOL, ctypes.POINTER(TOKEN_PRIVILEGES),
+                                               wintypes.DWORD, ctypes.c_void_p, ctypes.c_void_p]
+    advapi32.RegUnLoadKeyW.argtypes = [wintypes.HKEY, wintypes.LPCWSTR]
+
+
+class WinHiveLoader(HiveLoader):
+    """Profiles from the ProfileList key; NTUSER.DAT loaded with RegLoadKey (needs backup/restore privileges)"""
+
+    SE_PRIVILEGE_ENABLED = 0x2
+    TOKEN_ADJUST_PRIVILEGES = 0x20
+    TOKEN_QUERY = 0x8
+
+    def __init__(self):
+        if winreg is None:
+            raise RuntimeError("winreg is not available on this platform")
+        self._privileges = False
+        self._lock = threading.Lock()
+
+    def profiles(self):
+        found = []
+        with winreg.OpenKeyEx(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_KEY, 0,
+                              winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as profile_list:
+            for index in range(winreg.QueryInfoKey(profile_list)[0]):
+                sid = winreg.EnumKey(profile_list, index)
+                if not sid.startswith(USER_SID_PREFIXES):
+                    continue
+                try:
+                    with winreg.OpenKeyEx(profile_list, sid) as key:
+                        folder = winreg.QueryValueEx(key, "ProfileImagePath")[0]
+                except FileNotFoundError:
+                    continue
+                found.append(Profile(sid, os.path.join(os.path.expandvars(folder), "NTUSER.DAT"),
+                                     self._is_loaded(sid)))
+        return found
+
+    def _is_loaded(self, sid):
+        try:
+            winreg.CloseKey(winreg.OpenKeyEx(winreg.HKEY_USERS, sid))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _enable_privileges(self):
+        """RegLoadKey and RegUnLoadKey need SeBackupPrivilege and SeRestorePrivilege enabled in the token"""
+        with self._lock:
+            if self._privileges:
+                return
+            token = wintypes.HANDLE()
+            if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(),
+                                             self.TOKEN_ADJUST_PRIVILEGES | self.TOKEN_QUERY, ctypes.byref(token)):
+                raise ctypes.WinError(ctypes.get_last_error())
+            try:
+                for name in ("SeBackupPrivilege", "SeRestorePrivilege"):
+                    privileges = TOKEN_PRIVILEGES(1)
+                    # LookupPrivilegeValue fills in the LUID half of the entry
+                    if not advapi32.LookupPrivilegeValueW(None, name, privileges.Privileges):
+                        raise ctypes.WinError(ctypes.get_last_error())
+                    privileges.Privileges[0].Attributes = self.SE_PRIVILEGE_ENABLED
+                    advapi32.AdjustTokenPrivileges(token, False, ctypes.byref(privileges), 0, None, None)
+                    error = ctypes.get_last_error()
+                    if error:   # ERROR_NOT_ALL_ASSIGNED: not elevated
+                        raise ctypes.WinError(error, f"{name} is not held; run as Administrator")
+            finally:
+                kernel32.CloseHandle(token)
+            self._privileges = True
+
+    def backend(self):
+        return WinRegBackend()
+
+    def load(self, profile):
+        self._enable_privileges()
+        mount = MOUNT_PREFIX + profile.sid
+        winreg.LoadKey(winreg.HKEY_USERS, mount, profile.hive_path)
+        return mount
+
+    def unload(self, mount):
+        status = advapi32.RegUnLoadKeyW(winreg.HKEY_USERS, mount)
+        if status:
+            raise ctypes.WinError(status)
+
+
+class MemoryUserHives(HiveLoader):
+    """
+    In-memory multi-hive store. profiles maps SID -> (loaded, {(path,
+    name): (type, data)}); logged-on hives live in registry under HKU\\<SID>,
+    the others are copied in by load() and back out by unload(), which
+    take load_delay seconds like reading a hive file does.
+    """
+
+    def __init__(self, profiles=None, registry=None, load_delay=0.0):
+        self.registry = registry or MemoryRegistry()
+        self.load_delay = load_delay
+        self.files = {}           # SID -> {(path_lower, name_lower): (type, data)} of unloaded hives
+        self._loaded = {}         # SID -> loaded at logon
+        self._mounts = {}         # mount -> SID
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.max_mounted = 0
+        for sid, (loaded, values) in (profiles or {}).items():
+            self._loaded[sid] = loaded
+            if loaded:
+                for (path, name), (reg_type, data) in values.items():
+                    self.registry.write("HKU", f"{sid}\\{path}", name, reg_type, data)
+            else:
+                self.files[sid] = {(path.lower(), (name or "").lower()): value
+                                   for (path, name), value in values.items()}
+
+    def profiles(self):
+        return [Profile(sid, f"C:\\Users\\{sid}\\NTUSER.DAT", loaded) for sid, loaded in self._loaded.items()]
+
+    def backend(self):
+        return self.registry
+
+    def load(self, profile):
+        time.sleep(self.load_delay)
+        mount = MOUNT_PREFIX + profile.sid
+        with self._lock:
+            if mount in self._mounts:
+                raise OSError(f"{profile.hive_path} is already loaded")
+            self._mounts[mount] = profile.sid
+            self.loads += 1
+            self.max_mounted = max(self.max_mounted, len(self._mounts))
+        for (path, name), (reg_type, data) in self.files[profile.sid].items():
+            self.registry.write("HKU", f"{mount}\\{path}", name, reg_type, data)
+        return mount
+
+    def unload(self, mount):
+        prefix = mount.lower() + "\\"
+        values = {}
+        for (hive, path, name), value in self.registry.dump().items():
+            if hive == "HKU" and path.startswith(prefix):
+                values[(path[len(prefix):], name)] = value
+                self.registry.delete(hive, path, name)
+        time.sleep(self.load_delay)
+        with self._lock:
+            self.files[self._mounts.pop(mount)] = values
+
+    def hive_values(self, sid):
+        """{(path_lower, name_lower): (type, data)} of a profile's hive, wherever it is"""
+        if sid in self.files and not self._loaded[sid]:
+            return dict(self.files[sid])
+        prefix = sid.lower() + "\\"
+        return {(path[len(prefix):], name): value for (hive, path, name), value in self.registry.dump().items()
+                if hive == "HKU" and path.startswith(prefix)}
+
+
+def default_hive_loader():
+    """Return the RegLoadKey loader on Windows and an empty in-memory store elsewhere"""
+    if winreg is not None:
+        return WinHiveLoader()
+    return MemoryUserHives()
+
+
+# -----------------------------
+# APPLYING
+# -----------------------------
+def apply_profile(profile, ops, loader, journal=None):
+    """Apply [(HKCU RegOp, tweak id)] to one profile's hive; returns a ProfileResult"""
+    started = time.perf_counter()
+    try:
+        mount = profile.sid if profile.loaded else loader.load(profile)
+    except OSError as e:
+        return ProfileResult(profile, len(ops), [], [(profile.hive_path, str(e))], time.perf_counter() - started)
+    backend = loader.backend()
+    changed, errors = [], []
+    try:
+        targeted = [(retarget(op, mount), tweak_id) for op, tweak_id in ops]
+        probe = StateProbe(backend)
+        pending = [(op, tweak_id) for op, tweak_id in targeted if not probe.registry_compliant(op)]
+        if pending and journal is not None and profile.loaded:
+            journal.record_all(pending, probe)
+        for op, error in backend.apply([op for op, _ in pending]):
+            if error is None:
+                changed.append(op)
+            else:
+                errors.append((str(op), str(error)))
+    except OSError as e:
+        errors.append((profile.sid, str(e)))
+    finally:
+        # Every handle into the hive has to be closed before it can be unloaded
+        backend.close()
+        if not profile.loaded:
+            try:
+                loader.unload(mount)
+            except OSError as e:
+                errors.append((f"unload {profile.hive_path}", str(e)))
+    return ProfileResult(profile, len(ops), changed, errors, time.perf_counter() - started)
+
+
+def apply_to_profiles(plan, loader, journal=None, max_workers=DEFAULT_WORKERS, log=None):
+    """Apply the HKCU part of a Plan to every user profile; returns a UserHivesResult"""
+    started = time.perf_counter()
+    result = UserHivesResult()
+    ops = user_ops(plan)
+    if not ops:
+        return result
+    profiles = loader.profiles()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="profile") as pool:
+        result.profiles = list(pool.map(lambda profile: apply_profile(profile, ops, loader, journal), profiles))
+    result.duration = time.perf_counter() - started
+    if log is not None:
+        for profile_result in result.profiles:
+            log(op="user_hive", target=profile_result.profile.sid, output=str(profile_result),
+                exit_code=1 if profile_result.errors else 0, duration=profile_result.duration,
+                changed=len(profile_result.changed))
+    return result
@@ -1,11 +1,24 @@
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Headless: `python -m win11_optimizer apply|plan|undo|verify ...` never imports tkinter
+    from cli import main
+    sys.exit(main())
+
+import startup_trace
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog, scrolledtext
-import subprocess, os, datetime, threading, sys, ctypes, winreg, psutil
+import os, datetime, functools, threading
+from tweak_catalog import get_tweak, select_for_mode, tweaks_for_mode
+from diagnostics import DEFAULT_DEADLINE, DOMAIN_TRUST_PROBES, format_report, run_probes
+from progress import FAIL, OK, RUNNING, ProgressChannel
+from progress_pane import ProgressPane
+# engine (subprocess, executor, PowerShell host) and the endpoint security
+# probe are imported after the window is drawn - see the end of this file
 
 VERSION = "4.7"  # Updated version number
-last_backup = None
-report_log = []
-applied_tweaks = []  # Track all applied tweaks for restoration
+security_cleared = False  # Set once the startup endpoint security check has passed
+startup_trace.mark("imports")
 
 # -----------------------------
 # ENDPOINT SECURITY DETECTION
@@ -24,104 +37,9 @@ def set_custom_icon(root):
         # Fallback if icon file is not found
         pass
 
-def check_endpoint_security():
-    """Check for installed endpoint security software (excluding Microsoft Defender)"""
-    security_products = []
-    
-    # Common endpoint security product names and services
-    security_indicators = [
-        # Sophos
-        ("Sophos", ["Sophos", "Sophos Endpoint", "Sophos Anti-Virus", "Sophos Endpoint Defense"]),
-        ("McAfee", ["McAfee", "VirusScan", "Endpoint Security", "McAfee Agent"]),
-        ("Norton", ["Norton", "Symantec", "Norton Security", "Symantec Endpoint"]),
-        ("Kaspersky", ["Kaspersky", "Kaspersky Endpoint", "Kaspersky Security"]),
-        ("Trend Micro", ["Trend Micro", "OfficeScan", "Trend Micro Apex One"]),
-        ("ESET", ["ESET", "ESET Endpoint", "ESET Security"]),
-        ("CrowdStrike", ["CrowdStrike", "Falcon"]),
-        ("SentinelOne", ["SentinelOne", "Sentinel Agent"]),
-        ("Carbon Black", ["Carbon Black", "CB Defense", "VMware Carbon Black"]),
-        ("Bitdefender", ["Bitdefender", "Bitdefender Endpoint", "Bitdefender GravityZone"]),
-        ("Avast", ["Avast", "Avast Business", "AVG Business"]),
-        ("AVG", ["AVG", "AVG Business"]),
-        ("Webroot", ["Webroot", "Webroot SecureAnywhere"]),
-        ("Malwarebytes", ["Malwarebytes", "Malwarebytes Endpoint"]),
-        ("Cylance", ["Cylance", "CylancePROTECT"]),
-        ("FireEye", ["FireEye", "FireEye Endpoint", "FireEye HX"]),
-        ("Check Point", ["Check Point", "ZoneAlarm", "Endpoint Security"]),
-        ("Panda", ["Panda", "Panda Security"]),
-        ("Comodo", ["Comodo", "Comodo Security"]),
-    ]
-    
-    # Check installed programs from registry
-    try:
-        # Check in registry
-        reg_paths = [
-            r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-            r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-        ]
-        
-        for reg_path in reg_paths:
-            try:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
-                for i in range(0, winreg.QueryInfoKey(key)[0]):
-                    try:
-                        subkey_name = winreg.EnumKey(key, i)
-                        subkey = winreg.OpenKey(key, subkey_name)
-                        try:
-                            display_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
-                            for product_name, keywords in security_indicators:
-                                if any(keyword.lower() in display_name.lower() for keyword in keywords):
-                                    if not any(product_name in p for p in security_products):
-                                        security_products.append(f"{product_name}: {display_name}")
-                        except:
-                            pass
-                        winreg.CloseKey(subkey)
-                    except:
-                        continue
-                winreg.CloseKey(key)
-            except:
-                continue
-    except Exception as e:
-        print(f"Registry check error: {e}")
-    
-    # Check running processes
-    try:
-        for proc in psutil.process_iter(['name']):
-            try:
-                proc_name = proc.info['name'].lower()
-                for product_name, keywords in security_indicators:
-                    if any(keyword.lower() in proc_name for keyword in keywords):
-                        if not any(product_name in p for p in security_products):
-                            security_products.append(f"{product_name}: {proc_name} (running process)")
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-    except Exception as e:
-        print(f"Process check error: {e}")
-    
-    # Check installed services
-    try:
-        output = subprocess.check_output('sc query', shell=True, text=True, stderr=subprocess.STDOUT)
-        for line in output.split('\n'):
-            for product_name, keywords in security_indicators:
-                if any(keyword.lower() in line.lower() for keyword in keywords):
-                    if not any(product_name in p for p in security_products):
-                        security_products.append(f"{product_name}: Service detected")
-    except Exception as e:
-        print(f"Service check error: {e}")
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_products = []
-    for product in security_products:
-        if product not in seen:
-            seen.add(product)
-            unique_products.append(product)
-    
-    return unique_products
-
-def show_security_warning():
+def show_security_warning(security_products):
     """Display security warning and exit if endpoint security is detected"""
-    security_products = check_endpoint_security()
+    global security_cleared
     
     if security_products:
         # Create warning message
@@ -139,11 +57,35 @@ def show_security_warning():
         warning_message += "Click OK to exit the application."
         
         # Show warning and exit
-        ctypes.windll.user32.MessageBoxW(0, warning_message, "SECURITY WARNING - Endpoint Security Detected", 0x30)
+        messagebox.showwarning("SECURITY WARNING - Endpoint Security Detected", warning_message, parent=root)
+        root.destroy()
         sys.exit(1)
+    
+    security_cleared = True
+    root.title(f"Windows 11 Optimizer v{VERSION} - SECURE")
+    startup_trace.mark("interactive")
+    startup_trace.flush()
+    if startup_trace.EXIT_WHEN_INTERACTIVE:
+        root.destroy()
+
+def start_security_check():
+    """Probe for endpoint security off the GUI thread; the window stays responsive meanwhile"""
+    root.title(f"Windows 11 Optimizer v{VERSION} - checking endpoint security...")
+    
+    def check_thread():
+        from endpoint_security import check_endpoint_security
+        security_products = check_endpoint_security()
+        root.after(0, lambda: show_security_warning(security_products))
+    
+    threading.Thread(target=check_thread, daemon=True).start()
+
+def security_check_pending():
+    """True (after telling the user) while the startup security check is still running"""
+    if security_cleared:
+        return False
+    messagebox.showinfo("Please Wait", "Still checking for endpoint security software.\nTry again in a moment.")
+    return True
 
-# Run security check at startup
-show_security_warning()
 
 """
 ================================================================================
@@ -270,62 +212,33 @@ COMPILATION NOTES:
 # -----------------------------
 # HELPER FUNCTIONS
 # -----------------------------
-def run_cmd(cmd):
-    """Execute command and log results safely"""
-    try:
-        output = subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT, timeout=30).strip()
-        report_log.append(f"Command: {cmd}\nOutput: {output}\n")
-        return output
-    except subprocess.TimeoutExpired:
-        report_log.append(f"Command: {cmd}\nError: Timeout after 30 seconds\n")
-        return "Failed: Timeout"
-    except Exception as e:
-        report_log.append(f"Command: {cmd}\nError: {str(e)}\n")
-        return f"Failed: {e}"
-
-def backup_registry(path=r"C:\\Win11_Optimizer_Backup"):
-    """Create registry backup with timestamp"""
-    global last_backup
-    os.makedirs(path, exist_ok=True)
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(path, f"registry_backup_{timestamp}.reg")
-    
-    def backup_thread():
-        try:
-            run_cmd(f'reg export HKCU "{backup_file}" /y')
-            run_cmd(f'reg export HKLM "{backup_file}_HKLM.reg" /y')
-            last_backup = backup_file
-        except Exception as e:
-            print(f"Backup error: {e}")
-    
-    threading.Thread(target=backup_thread, daemon=True).start()
-    return backup_file
-
-def create_restore_point():
-    """Create system restore point for safety - NON-BLOCKING VERSION"""
+def create_restore_point(progress):
+    """Create system restore point for safety - NON-BLOCKING VERSION, status goes to the progress pane"""
     def create_restore_thread():
+        progress.publish("restore_point", "System restore point", RUNNING)
         try:
-            result = run_cmd(r'powershell -Command "Checkpoint-Computer -Description \"Win11Optimizer Backup\" -RestorePointType \"MODIFY_SETTINGS\""')
+            result = engine.create_restore_point()
             if "Failed" not in result:
-                messagebox.showinfo("Restore Point Created", "System restore point created successfully.")
+                progress.finish("restore_point", OK, "Created")
             else:
-                messagebox.showwarning("Restore Point Failed", "Could not create restore point!")
+                progress.finish("restore_point", FAIL, "Could not create restore point!", output=result)
         except Exception as e:
-            print(f"Restore point error: {e}")
+            progress.finish("restore_point", FAIL, str(e))
     
-    threading.Thread(target=create_restore_thread, daemon=True).start()
-    messagebox.showinfo("Creating Restore Point", "System restore point is being created in the background. You can continue using the application.")
+    thread = threading.Thread(target=create_restore_thread, daemon=True)
+    thread.start()
+    return thread
 
 def export_report():
-    """Export optimization report to file"""
-    if not report_log:
+    """Export this session's operations to a text report or raw JSONL, streamed from the log"""
+    if not engine.oplog.count:
         messagebox.showinfo("Export Report", "No actions have been performed yet.")
         return
     path = filedialog.asksaveasfilename(defaultextension=".txt",
-                                        filetypes=[("Text files", "*.txt")])
+                                        filetypes=[("Text files", "*.txt"), ("JSON Lines", "*.jsonl")])
     if path:
-        with open(path, "w") as f:
-            f.write("\n".join(report_log))
+        with open(path, "w", encoding="utf-8") as f:
+            engine.oplog.export(f, session=engine.oplog.session, raw=path.lower().endswith(".jsonl"))
         messagebox.showinfo("Export Report", f"Report saved to {path}")
 
 # -----------------------------
@@ -333,88 +246,36 @@ def export_report():
 # -----------------------------
 def verify_domain_trust():
     """Verify domain trust status and show detailed information"""
+    probes = DOMAIN_TRUST_PROBES
+    timestamp = datetime.datetime.now()
+    channel = ProgressChannel()
+    ProgressPane(root, "Domain Trust Status Report", channel)
+    
+    def on_result(index, result):
+        channel.finish(probes[index].name, result.status, result.detail, output=result.output)
+    
     def verify_thread():
         try:
-            messagebox.showinfo("Verifying Domain Trust", "Checking domain trust relationship status...")
-            
-            results = []
-            results.append("=== DOMAIN TRUST STATUS CHECK ===")
-            results.append(f"Timestamp: {datetime.datetime.now()}")
-            results.append("")
-            
-            # 1. Check computer name and domain
-            results.append("1. COMPUTER INFORMATION:")
-            computer_name = run_cmd('hostname')
-            results.append(f"   Computer Name: {computer_name}")
-            
-            domain_info = run_cmd('echo %USERDOMAIN%')
-            results.append(f"   Domain: {domain_info}")
-            
-            # 2. Test secure channel
-            results.append("\n2. SECURE CHANNEL TEST:")
-            secure_test = run_cmd('powershell -Command "Test-ComputerSecureChannel -Verbose"')
-            results.append(f"   Test-ComputerSecureChannel Result:\n   {secure_test}")
-            
-            # 3. Check Netlogon service
-            results.append("\n3. NETLOGON SERVICE STATUS:")
-            netlogon_status = run_cmd('sc query netlogon')
-            results.append(f"   Netlogon Service:\n   {netlogon_status}")
-            
-            # 4. Check domain connectivity
-            results.append("\n4. DOMAIN CONNECTIVITY:")
-            domain_test = run_cmd('nltest /dsgetdc:%USERDOMAIN%')
-            results.append(f"   Domain Controller Discovery:\n   {domain_test}")
-            
-            # 5. Check secure channel status
-            results.append("\n5. SECURE CHANNEL DETAILS:")
-            sc_status = run_cmd('nltest /sc_query:%USERDOMAIN%')
-            results.append(f"   Secure Channel Query:\n   {sc_status}")
-            
-            # 6. Check DNS registration
-            results.append("\n6. DNS REGISTRATION:")
-            dns_reg = run_cmd('ipconfig /all | findstr /i "dns"')
-            results.append(f"   DNS Configuration:\n   {dns_reg}")
-            
-            # 7. Check time synchronization
-            results.append("\n7. TIME SYNCHRONIZATION:")
-            time_status = run_cmd('w32tm /query /status')
-            results.append(f"   Time Service Status:\n   {time_status}")
-            
-            # 8. Check Kerberos tickets
-            results.append("\n8. KERBEROS TICKETS:")
-            kerberos_tickets = run_cmd('klist')
-            results.append(f"   Kerberos Tickets:\n   {kerberos_tickets}")
-            
-            # 9. Check network connectivity to domain
-            results.append("\n9. NETWORK CONNECTIVITY:")
-            ping_test = run_cmd('ping -n 2 %USERDOMAIN%')
-            results.append(f"   Ping to Domain:\n   {ping_test}")
+            for probe in probes:
+                channel.publish(probe.name, probe.title.capitalize(), RUNNING)
+            # Diagnostics are interactive: their commands get the pool's own interactive slots
+            # instead of queueing behind tweak work (or behind each other)
+            results = run_probes(probes, functools.partial(run_cmd, priority=INTERACTIVE),
+                                 functools.partial(run_ps, priority=INTERACTIVE),
+                                 deadline=DEFAULT_DEADLINE, on_result=on_result)
+            failed = sum(1 for r in results if r.status == FAIL)
+            channel.close(f"{len(results) - failed} of {len(results)} checks passed")
             
             # Save results to file
             log_file = r"C:\Windows\DomainTrustStatus.log"
             with open(log_file, 'w') as f:
-                f.write('\n'.join(results))
-            
-            # Show results in messagebox
-            result_text = '\n'.join(results)
-            
-            # Create a results window
-            result_window = tk.Toplevel(root)
-            result_window.title("Domain Trust Status Report")
-            result_window.geometry("800x600")
-            
-            text_frame = tk.Frame(result_window)
-            text_frame.pack(fill="both", expand=True, padx=10, pady=10)
-            
-            text_area = scrolledtext.ScrolledText(text_frame, wrap=tk.WORD, width=90, height=30)
-            text_area.pack(fill="both", expand=True)
-            text_area.insert(tk.INSERT, result_text)
-            text_area.config(state=tk.DISABLED)
-            
-            tk.Button(result_window, text="Close", command=result_window.destroy, width=15).pack(pady=10)
+                f.write(format_report(probes, results, timestamp))
             
         except Exception as e:
-            messagebox.showerror("Verification Error", f"Failed to verify domain trust: {str(e)}")
+            channel.close()
+            # Bind the text now: e is cleared when the except block ends, before the dialog runs
+            message = f"Failed to verify domain trust: {str(e)}"
+            root.after(0, lambda: messagebox.showerror("Verification Error", message))
     
     threading.Thread(target=verify_thread, daemon=True).start()
 
@@ -422,367 +283,49 @@ def verify_domain_trust():
 # COMPREHENSIVE RESTORE FUNCTION
 # -----------------------------
 def restore_all_tweaks():
-    """Completely restore all Windows optimizations to default settings"""
+    """Undo every journaled change, newest first, back to the exact prior state"""
+    entries = engine.journal.entries()
+    if not entries:
+        messagebox.showinfo("Undo Tweaks", "No journaled changes to undo.")
+        return
+    
     def restore_thread():
+        # Tk is not thread-safe: every dialog is posted to the GUI thread
         try:
-            messagebox.showinfo("Restore Started", "Beginning comprehensive system restoration...")
-            
-            # Restore telemetry to default
-            restore_telemetry()
-            
-            # Restore visual effects
-            run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects" /v "VisualFXSetting" /t REG_DWORD /d 3 /f')
-            run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "DragFullWindows" /t REG_SZ /d "1" /f')
-            
-            # Restore transparency
-            run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Themes\\Personalize" /v "EnableTransparency" /t REG_DWORD /d 1 /f')
-            
-            # Restore background apps
-            run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\BackgroundAccessApplications" /v "GlobalUserDisabled" /t REG_DWORD /d 0 /f')
-            
-            # Restore taskbar animations
-            run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "TaskbarAnimations" /t REG_DWORD /d 1 /f')
-            
-            # Restore notification sounds
-            run_cmd('reg add "HKCU\\AppEvents\\Schemes\\Apps\\.Default\\.Default\\.Current" /ve /t REG_SZ /d "%SystemRoot%\\media\\Windows Notify System Generic.wav" /f')
-            
-            # Restore security log settings
-            restore_security_log()
-            
-            # Restore domain trust settings
-            restore_domain_trust()
-            
-            # Restore power plan to balanced
-            run_cmd("powercfg /setactive 381b4222-f694-41f0-9685-ff5bb260df2e")
-            
-            # Restore services
-            run_cmd("sc config DiagTrack start= demand")
-            run_cmd("sc config OneSyncSvc start= demand")
-            run_cmd("sc config WSearch start= auto")
-            run_cmd("sc config Spooler start= auto")
-            run_cmd("sc config WinDefend start= auto")
-            run_cmd("sc config Netlogon start= auto")  # NEW: Restore Netlogon service
-            
-            # Restore Windows Defender
-            run_cmd('reg delete "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows Defender" /v "DisableAntiSpyware" /f')
+            root.after(0, lambda: messagebox.showinfo("Restore Started",
+                                                      f"Restoring {len(entries)} journaled changes..."))
             
-            # Restore shutdown timeouts to default
-            run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control" /v "WaitToKillServiceTimeout" /t REG_SZ /d "5000" /f')
-            run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "AutoEndTasks" /t REG_SZ /d "0" /f')
-            run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "HungAppTimeout" /t REG_SZ /d "5000" /f')
-            run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "WaitToKillAppTimeout" /t REG_SZ /d "20000" /f')
+            result = engine.undo_tweaks()
             
-            # Restore fast boot
-            run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Power" /v "HiberbootEnabled" /t REG_DWORD /d 1 /f')
-            
-            # Clear applied tweaks list
-            applied_tweaks.clear()
-            
-            messagebox.showinfo("Restore Complete", "All system optimizations have been restored to default Windows settings!")
+            if result.failures:
+                message = f"{result.summary()}\n\nThe journal was kept so Undo can be retried."
+                root.after(0, lambda: messagebox.showwarning("Restore Incomplete", message))
+            else:
+                message = f"All journaled changes have been restored to their previous values!\n\n{result.summary()}"
+                root.after(0, lambda: messagebox.showinfo("Restore Complete", message))
             
         except Exception as e:
-            messagebox.showerror("Restore Error", f"Failed to restore some settings: {str(e)}")
+            message = f"Failed to restore some settings: {str(e)}"
+            root.after(0, lambda: messagebox.showerror("Restore Error", message))
     
     threading.Thread(target=restore_thread, daemon=True).start()
 
 # -----------------------------
 # NEW DOMAIN TRUST RELATIONSHIP FUNCTION - UPDATED WITH REBOOT MESSAGE
 # -----------------------------
-def fix_domain_trust_relationship():
+def fix_domain_trust_relationship(progress=None):
     """Permanently fix 'domain is broken or trust relationship issue' error - ENHANCED VERSION"""
-    applied_tweaks.append("fix_domain_trust_relationship")
-    
-    result_log = []
-    
-    # 1. FIRST CHECK CURRENT STATUS
-    result_log.append("=== DOMAIN TRUST REPAIR STARTED ===")
-    result_log.append(f"Timestamp: {datetime.datetime.now()}")
-    
-    # Get current domain
-    current_domain = run_cmd('echo %USERDOMAIN%').strip()
-    if not current_domain:
-        current_domain = "openaccess.bpo"  # Default fallback
-    
-    # Check current domain status
-    status1 = run_cmd(f'netdom verify /d:{current_domain}')
-    result_log.append(f"Initial domain status: {status1}")
-    
-    # 2. STOP CRITICAL SERVICES TEMPORARILY
-    result_log.append("\n=== STOPPING SERVICES ===")
-    run_cmd('net stop netlogon /y')
-    run_cmd('sc stop kdc')
-    run_cmd('sc stop dns')
-    run_cmd('sc stop w32time')
-    
-    # 3. COMPLETELY CLEAR AUTHENTICATION CACHE
-    result_log.append("\n=== CLEARING AUTHENTICATION CACHE ===")
-    run_cmd('klist purge -li 0x3e7')
-    run_cmd('klist purge -li 0x0')
-    run_cmd('klist purge')
-    
-    # Clear credential manager
-    run_cmd('cmdkey /delete:TERMSRV/*')
-    run_cmd(f'cmdkey /delete:{current_domain}')
-    run_cmd('cmdkey /list | findstr /i "domain" | for /f "tokens=1,2 delims= " %a in (''more'') do cmdkey /delete:%b')
-    
-    # 4. FORCE COMPUTER ACCOUNT PASSWORD RESET (MULTIPLE METHODS)
-    result_log.append("\n=== RESETTING COMPUTER ACCOUNT PASSWORD ===")
-    
-    # Method 1: Using netdom (most reliable)
-    run_cmd(f'netdom resetpwd /s:{current_domain} /ud:{current_domain}\\administrator /pd:*')
-    
-    # Method 2: PowerShell method
-    ps_command = f'''
-    $domain = "{current_domain}"
-    $computer = $env:COMPUTERNAME
-    try {{
-        Reset-ComputerMachinePassword -Server $domain -ErrorAction Stop
-        Write-Output "Password reset successful for $computer in domain $domain"
-    }} catch {{
-        Write-Output "Failed to reset password: $_"
-        # Try alternative method
-        nltest /sc_reset:$domain
-    }}
-    '''
-    run_cmd(f'powershell -Command "{ps_command}"')
-    
-    # Method 3: Direct registry method
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "MachinePassword" /f')
-    
-    # 5. REBUILD SECURE CHANNEL FROM SCRATCH
-    result_log.append("\n=== REBUILDING SECURE CHANNEL ===")
-    
-    # Reset secure channel completely
-    run_cmd(f'nltest /sc_reset:{current_domain}')
-    run_cmd(f'nltest /sc_verify:{current_domain}')
-    run_cmd(f'nltest /dsgetdc:{current_domain}')
-    
-    # Force re-discovery of domain controller
-    run_cmd(f'nltest /dsgetdc:{current_domain} /force')
-    
-    # 6. FIX DNS REGISTRATION (CRITICAL)
-    result_log.append("\n=== FIXING DNS REGISTRATION ===")
-    
-    # Clear ALL DNS caches
-    run_cmd('ipconfig /flushdns')
-    run_cmd('ipconfig /registerdns')
-    run_cmd('ipconfig /release')
-    run_cmd('ipconfig /renew')
-    run_cmd('ipconfig /registerdns')
-    
-    # Force DNS registration
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Tcpip\\Parameters" /v "DisableDynamicUpdate" /t REG_DWORD /d 0 /f')
-    
-    # 7. FIX TIME SYNCHRONIZATION (ESSENTIAL FOR KERBEROS)
-    result_log.append("\n=== FIXING TIME SYNCHRONIZATION ===")
-    
-    # Configure time service for domain
-    run_cmd('w32tm /config /syncfromflags:domhier /update')
-    run_cmd('w32tm /resync /force')
-    run_cmd('w32tm /query /status')
-    
-    # Set time service to auto
-    run_cmd('sc config w32time start= auto')
-    run_cmd('sc start w32time')
-    
-    # 8. FIX NETLOGON SERVICE SETTINGS
-    result_log.append("\n=== CONFIGURING NETLOGON SERVICE ===")
-    
-    # Reset Netlogon service to defaults and reconfigure
-    run_cmd('sc config netlogon start= auto')
-    run_cmd('sc failure netlogon reset= 86400 actions= restart/5000/restart/10000/restart/30000')
-    
-    # Configure Netlogon for better domain communication
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "ScavengeInterval" /t REG_DWORD /d 172800 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "MaximumPasswordAge" /t REG_DWORD /d 42 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SecureChannelIdleTimeout" /t REG_DWORD /d 1209600 /f')  # 14 days
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SecureChannelTimeout" /t REG_DWORD /d 7200 /f')  # 2 hours
-    
-    # 9. FIX GROUP POLICY PROCESSING
-    result_log.append("\n=== FIXING GROUP POLICY ===")
-    
-    # Clear Group Policy cache
-    run_cmd('rd /s /q "%WinDir%\\System32\\GroupPolicyUsers"')
-    run_cmd('rd /s /q "%WinDir%\\System32\\GroupPolicy"')
-    
-    # Force Group Policy update
-    run_cmd('gpupdate /force')
-    
-    # 10. RESTART SERVICES IN CORRECT ORDER
-    result_log.append("\n=== RESTARTING SERVICES ===")
-    
-    run_cmd('sc start w32time')
-    run_cmd('sc start dns')
-    run_cmd('net start netlogon')
-    run_cmd('sc start kdc')
-    
-    # 11. VERIFY REPAIR
-    result_log.append("\n=== VERIFYING REPAIR ===")
-    
-    # Test secure channel
-    verify1 = run_cmd(f'nltest /sc_query:{current_domain}')
-    result_log.append(f"Secure channel query: {verify1}")
-    
-    # Test domain trust
-    verify2 = run_cmd(f'netdom verify /d:{current_domain}')
-    result_log.append(f"Domain verification: {verify2}")
-    
-    # Test computer secure channel
-    verify3 = run_cmd('powershell -Command "Test-ComputerSecureChannel -Verbose"')
-    result_log.append(f"Test-ComputerSecureChannel: {verify3}")
+    log_path = repair_domain_trust(progress)
     
-    # 12. CREATE REPAIR LOG
-    result_log.append("\n=== REPAIR COMPLETE ===")
-    result_log.append(f"Timestamp: {datetime.datetime.now()}")
-    
-    # Save detailed log
-    log_path = r"C:\Windows\DomainTrustRepair.log"
-    try:
-        with open(log_path, 'w') as f:
-            f.write('\n'.join(result_log))
-    except:
-        log_path = r"C:\DomainTrustRepair.log"
-        with open(log_path, 'w') as f:
-            f.write('\n'.join(result_log))
-    
-    # 13. FINAL CLEANUP AND REBOOT RECOMMENDATION
-    run_cmd('gpupdate /force')
-    run_cmd('ipconfig /flushdns')
-    
-    # Show reboot message
-    messagebox.showwarning("REBOOT REQUIRED", 
+    # Show reboot message (on the GUI thread - this runs as a tweak task)
+    root.after(0, lambda: messagebox.showwarning("REBOOT REQUIRED", 
         "Domain trust repair completed successfully!\n\n"
         "⚠️ REBOOT THE SYSTEM TO TAKE EFFECT THE CHANGES ⚠️\n\n"
         f"Log saved to: {log_path}\n\n"
-        "After reboot, use 'Verify Domain Trust' button to confirm repair.")
+        "After reboot, use 'Verify Domain Trust' button to confirm repair."))
     
     return f"Domain trust repair completed. REBOOT REQUIRED for changes to take full effect."
 
-def restore_domain_trust():
-    """Restore domain trust settings to Windows defaults"""
-    # Remove registry optimizations
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "ScavengeInterval" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "MaximumPasswordAge" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SecureChannelIdleTimeout" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SecureChannelTimeout" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "DisablePasswordChange" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "NegativeCachePeriod" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SignSecureChannel" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Netlogon\\Parameters" /v "SealSecureChannel" /f')
-    
-    # Restore DNS settings
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Tcpip\\Parameters" /v "DisableDynamicUpdate" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\NetBT\\Parameters\\Interfaces" /v "NetbiosOptions" /f')
-    
-    # Clear DNS cache
-    run_cmd('ipconfig /flushdns')
-    
-    # Restart Netlogon service
-    run_cmd('sc config Netlogon start= auto')
-    run_cmd('net stop Netlogon /y')
-    run_cmd('net start Netlogon')
-    
-    # Clear Kerberos tickets
-    run_cmd('klist purge')
-    
-    # Force Group Policy update
-    run_cmd('gpupdate /force')
-    
-    return "Domain trust settings restored to Windows defaults"
-
-# -----------------------------
-# SECURITY LOG FUNCTION
-# -----------------------------
-def fix_security_log_full():
-    """Permanently fix 'security log is full' error by increasing size and enabling auto-overwrite"""
-    applied_tweaks.append("fix_security_log_full")
-    
-    # Increase Security log size to 128MB (default is 20MB)
-    run_cmd('wevtutil sl Security /ms:134217728')
-    
-    # Set maximum log size to 128MB
-    run_cmd('wevtutil sl Security /maxsize:134217728')
-    
-    # Configure Security log to overwrite events as needed (prevents log full errors)
-    run_cmd('wevtutil sl Security /retention:false')
-    
-    # Clear any existing 'log full' state
-    run_cmd('powershell "Clear-EventLog -LogName Security -ErrorAction SilentlyContinue"')
-    
-    # Set Security log to archive when full (optional, but good for compliance)
-    run_cmd('wevtutil sl Security /autobackup:true')
-    
-    # Apply same settings to other important logs to prevent similar issues
-    run_cmd('wevtutil sl Application /ms:67108864')  # 64MB
-    run_cmd('wevtutil sl Application /maxsize:67108864')
-    run_cmd('wevtutil sl Application /retention:false')
-    
-    run_cmd('wevtutil sl System /ms:67108864')  # 64MB
-    run_cmd('wevtutil sl System /maxsize:67108864')
-    run_cmd('wevtutil sl System /retention:false')
-    
-    # Also configure via registry for persistent settings
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog\\Security" /v "MaxSize" /t REG_DWORD /d 134217728 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog\\Security" /v "Retention" /t REG_DWORD /d 0 /f')  # 0 = overwrite as needed
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog\\Security" /v "AutoBackupLogFiles" /t REG_DWORD /d 1 /f')
-    
-    return "Security log permanently fixed: Increased to 128MB with auto-overwrite enabled"
-
-def restore_security_log():
-    """Restore security log to Windows default settings"""
-    # Restore Security log to default size (20MB)
-    run_cmd('wevtutil sl Security /ms:20971520')
-    run_cmd('wevtutil sl Security /maxsize:20971520')
-    run_cmd('wevtutil sl Security /retention:true')  # Default retention
-    run_cmd('wevtutil sl Security /autobackup:false')
-    
-    # Restore other logs to default
-    run_cmd('wevtutil sl Application /ms:20971520')
-    run_cmd('wevtutil sl Application /maxsize:20971520')
-    run_cmd('wevtutil sl Application /retention:true')
-    
-    run_cmd('wevtutil sl System /ms:20971520')
-    run_cmd('wevtutil sl System /maxsize:20971520')
-    run_cmd('wevtutil sl System /retention:true')
-    
-    # Remove registry overrides
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog\\Security" /v "MaxSize" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog\\Security" /v "Retention" /f')
-    run_cmd('reg delete "HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog\\Security" /v "AutoBackupLogFiles" /f')
-    
-    return "Security log restored to Windows defaults"
-
-# -----------------------------
-# SAFE TELEMETRY FUNCTIONS
-# -----------------------------
-def safe_reduce_telemetry():
-    """Safe telemetry reduction that won't trigger security alerts"""
-    applied_tweaks.append("safe_reduce_telemetry")
-    
-    # Set to Basic level instead of completely disabled (less suspicious)
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\DataCollection" /v "AllowTelemetry" /t REG_DWORD /d 1 /f')  # Basic level
-    
-    # Reduce tailored experiences without disabling service
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Privacy" /v "TailoredExperiencesWithDiagnosticDataEnabled" /t REG_DWORD /d 0 /f')
-    
-    # Disable advertising ID without aggressive service changes
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\AdvertisingInfo" /v "DisabledByGroupPolicy" /t REG_DWORD /d 1 /f')
-    
-    return "Reduced telemetry to Basic level safely"
-
-def restore_telemetry():
-    """Completely restore telemetry to Windows default settings"""
-    # Remove telemetry restrictions
-    run_cmd('reg delete "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\DataCollection" /v "AllowTelemetry" /f')
-    run_cmd('reg delete "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Privacy" /v "TailoredExperiencesWithDiagnosticDataEnabled" /f')
-    run_cmd('reg delete "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\AdvertisingInfo" /v "DisabledByGroupPolicy" /f')
-    
-    # Restore DiagTrack service
-    run_cmd("sc config DiagTrack start= demand")
-    run_cmd("sc start DiagTrack")
-    
-    return "Telemetry restored to Windows defaults"
-
 # -----------------------------
 # UPDATED DOCUMENTATION FUNCTIONS
 # -----------------------------
@@ -1133,9 +676,10 @@ EXTREME MODE OPTIMIZATIONS
 
 COMPREHENSIVE RESTORE FEATURE
 ------------------------------------
-• "Undo Tweaks" button completely restores ALL changes
-• Restores domain trust settings to Windows defaults
-• Restores security log settings to defaults
+• "Undo Tweaks" button restores every registry value, service start type
+  and power plan the optimizer changed to the exact value it had before
+• Values that did not exist before are removed again
+• Only what was actually changed is touched, newest change first
 • Perfect for troubleshooting or reverting changes
 
 SAFETY INFORMATION
@@ -1181,282 +725,6 @@ BACKUP FEATURES:
     # Close button
     tk.Button(help_window, text="Close", command=help_window.destroy, width=15).pack(pady=10)
 
-# -----------------------------
-# TWEAK FUNCTIONS - BASIC MODE
-# -----------------------------
-def disable_startup_apps(): 
-    applied_tweaks.append("disable_startup_apps")
-    run_cmd("powershell Get-CimInstance Win32_StartupCommand | Remove-CimInstance")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\StartupApproved" /v "StartupDelayInMSec" /t REG_DWORD /d 0 /f')
-
-def disable_visual_effects(): 
-    applied_tweaks.append("disable_visual_effects")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects" /v "VisualFXSetting" /t REG_DWORD /d 2 /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "DragFullWindows" /t REG_SZ /d "0" /f')
-
-def disable_transparency(): 
-    applied_tweaks.append("disable_transparency")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Themes\\Personalize" /v "EnableTransparency" /t REG_DWORD /d 0 /f')
-
-def disable_background_apps(): 
-    applied_tweaks.append("disable_background_apps")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\BackgroundAccessApplications" /v "GlobalUserDisabled" /t REG_DWORD /d 1 /f')
-
-def optimize_taskbar_animations():
-    applied_tweaks.append("optimize_taskbar_animations")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "TaskbarAnimations" /t REG_DWORD /d 0 /f')
-
-def disable_notification_sounds():
-    applied_tweaks.append("disable_notification_sounds")
-    run_cmd('reg add "HKCU\\AppEvents\\Schemes\\Apps\\.Default\\.Default\\.Current" /ve /t REG_SZ /d "" /f')
-
-def enable_fast_start_menu():
-    applied_tweaks.append("enable_fast_start_menu")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "Start_SearchFiles" /t REG_DWORD /d 2 /f')
-
-def disable_lockscreen_blur():
-    applied_tweaks.append("disable_lockscreen_blur")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\System" /v "DisableAcrylicBackgroundOnLogon" /t REG_DWORD /d 1 /f')
-
-def optimize_file_explorer():
-    applied_tweaks.append("optimize_file_explorer")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "Hidden" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "ShowSuperHidden" /t REG_DWORD /d 0 /f')
-
-def disable_game_bar():
-    applied_tweaks.append("disable_game_bar")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\GameBar" /v "AllowAutoGameMode" /t REG_DWORD /d 0 /f')
-
-# -----------------------------
-# STANDARD MODE FUNCTIONS
-# -----------------------------
-def disable_services(): 
-    applied_tweaks.append("disable_services")
-    run_cmd("sc stop OneSyncSvc")
-    run_cmd("sc config OneSyncSvc start= disabled")
-    run_cmd("sc stop MapsBroker")
-    run_cmd("sc config MapsBroker start= disabled")
-
-def disable_indexing(): 
-    applied_tweaks.append("disable_indexing")
-    run_cmd("sc stop WSearch")
-    run_cmd("sc config WSearch start= disabled")
-
-def set_high_performance(): 
-    applied_tweaks.append("set_high_performance")
-    run_cmd("powercfg /setactive 8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Power" /v "HibernateEnabled" /t REG_DWORD /d 0 /f')
-
-def disk_defrag_trim(): 
-    applied_tweaks.append("disk_defrag_trim")
-    run_cmd("defrag C: /O /U")
-    run_cmd("powershell Optimize-Volume -DriveLetter C -ReTrim -Verbose")
-
-def disable_timeline():
-    applied_tweaks.append("disable_timeline")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\System" /v "EnableActivityFeed" /t REG_DWORD /d 0 /f')
-
-def disable_location_tracking():
-    applied_tweaks.append("disable_location_tracking")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\LocationAndSensors" /v "DisableLocation" /t REG_DWORD /d 1 /f')
-
-def optimize_system_cache():
-    applied_tweaks.append("optimize_system_cache")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management" /v "LargeSystemCache" /t REG_DWORD /d 1 /f')
-
-def disable_print_spooler():
-    applied_tweaks.append("disable_print_spooler")
-    run_cmd("sc stop Spooler")
-    run_cmd("sc config Spooler start= disabled")
-
-def optimize_processor_scheduling():
-    applied_tweaks.append("optimize_processor_scheduling")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\PriorityControl" /v "Win32PrioritySeparation" /t REG_DWORD /d 26 /f')
-
-def disable_remote_assistance():
-    applied_tweaks.append("disable_remote_assistance")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Remote Assistance" /v "fAllowToGetHelp" /t REG_DWORD /d 0 /f')
-
-def enable_fast_restart():
-    applied_tweaks.append("enable_fast_restart")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control" /v "WaitToKillServiceTimeout" /t REG_SZ /d "2000" /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Power" /v "HiberbootEnabled" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "HungAppTimeout" /t REG_SZ /d "3000" /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "WaitToKillAppTimeout" /t REG_SZ /d "2000" /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "AutoEndTasks" /t REG_SZ /d "1" /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control" /v "ServicesPipeTimeout" /t REG_DWORD /d 3000 /f')
-
-def enable_fast_signout():
-    applied_tweaks.append("enable_fast_signout")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Winlogon" /v "ProfileDlgTimeOut" /t REG_DWORD /d 10 /f')
-    run_cmd('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Winlogon" /v "DelayedDesktopSwitchTimeout" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management" /v "ClearPageFileAtShutdown" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "WaitToKillAppTimeout" /t REG_SZ /d "2000" /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "AutoEndTasks" /t REG_SZ /d "1" /f')
-
-def clear_session_cookies_fsso():
-    applied_tweaks.append("clear_session_cookies_fsso")
-    run_cmd('RunDll32.exe InetCpl.cpl,ClearMyTracksByProcess 255')
-    run_cmd('powershell "Remove-Item -Path \"$env:LOCALAPPDATA\\Google\\Chrome\\User Data\\Default\\Session Storage\" -Recurse -Force -ErrorAction SilentlyContinue"')
-    run_cmd('powershell "Remove-Item -Path \"$env:LOCALAPPDATA\\Google\\Chrome\\User Data\\Default\\Cookies\" -Force -ErrorAction SilentlyContinue"')
-    run_cmd('powershell "Remove-Item -Path \"$env:APPDATA\\Mozilla\\Firefox\\Profiles\\*\\cookies.sqlite\" -Force -ErrorAction SilentlyContinue"')
-    run_cmd('powershell "Remove-Item -Path \"$env:APPDATA\\Mozilla\\Firefox\\Profiles\\*\\sessionstore.js\" -Force -ErrorAction SilentlyContinue"')
-    run_cmd('cmdkey /delete:WindowsLive')
-    run_cmd('cmdkey /delete:MicrosoftAccount')
-    run_cmd('klist purge')
-    run_cmd('klist -li 0x3e7 purge')
-    run_cmd('ipconfig /flushdns')
-    run_cmd('wevtutil cl System')
-    run_cmd('wevtutil cl Application')
-    run_cmd('RunDll32.exe InetCpl.cpl,ClearMyTracksByProcess 8')
-
-# -----------------------------
-# ULTIMATE MODE FUNCTIONS
-# -----------------------------
-def disable_defender(): 
-    applied_tweaks.append("disable_defender")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows Defender" /v "DisableAntiSpyware" /t REG_DWORD /d 1 /f')
-    run_cmd("sc stop WinDefend")
-    run_cmd("sc config WinDefend start= disabled")
-
-def disable_cortana(): 
-    applied_tweaks.append("disable_cortana")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\Windows Search" /v "AllowCortana" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\Windows Search" /v "DisableWebSearch" /t REG_DWORD /d 1 /f')
-
-def disable_xbox_services(): 
-    applied_tweaks.append("disable_xbox_services")
-    run_cmd("sc stop XblAuthManager")
-    run_cmd("sc config XblAuthManager start= disabled")
-    run_cmd("sc stop XboxGipSvc")
-    run_cmd("sc config XboxGipSvc start= disabled")
-
-def remove_bloat_apps(): 
-    applied_tweaks.append("remove_bloat_apps")
-    run_cmd('powershell "Get-AppxPackage *Xbox* | Remove-AppxPackage"')
-    run_cmd('powershell "Get-AppxPackage *Bing* | Remove-AppxPackage"')
-    run_cmd('powershell "Get-AppxPackage *Zune* | Remove-AppxPackage"')
-
-def disable_tips_notifications(): 
-    applied_tweaks.append("disable_tips_notifications")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\ContentDeliveryManager" /v "SubscribedContent-338388Enabled" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\ContentDeliveryManager" /v "SubscribedContent-353694Enabled" /t REG_DWORD /d 0 /f')
-
-def disable_advertising():
-    applied_tweaks.append("disable_advertising")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\ContentDeliveryManager" /v "SubscribedContent-353696Enabled" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\CloudContent" /v "DisableWindowsConsumerFeatures" /t REG_DWORD /d 1 /f')
-
-def disable_error_reporting():
-    applied_tweaks.append("disable_error_reporting")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\Windows Error Reporting" /v "Disabled" /t REG_DWORD /d 1 /f')
-
-def disable_smart_screen():
-    applied_tweaks.append("disable_smart_screen")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\System" /v "EnableSmartScreen" /t REG_DWORD /d 0 /f')
-
-def disable_feedback():
-    applied_tweaks.append("disable_feedback")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\DataCollection" /v "DoNotShowFeedbackNotifications" /t REG_DWORD /d 1 /f')
-
-def disable_auto_update():
-    applied_tweaks.append("disable_auto_update")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\WindowsUpdate\\AU" /v "NoAutoUpdate" /t REG_DWORD /d 1 /f')
-
-def disable_onedrive():
-    applied_tweaks.append("disable_onedrive")
-    run_cmd('taskkill /f /im OneDrive.exe')
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\OneDrive" /v "DisableFileSyncNGSC" /t REG_DWORD /d 1 /f')
-
-# -----------------------------
-# EXTREME MODE FUNCTIONS
-# -----------------------------
-def optimize_hdd_performance():
-    applied_tweaks.append("optimize_hdd_performance")
-    run_cmd('schtasks /change /tn "Microsoft\\Windows\\Defrag\\ScheduledDefrag" /disable')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\FileSystem" /v "NtfsDisableLastAccessUpdate" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management\\PrefetchParameters" /v "EnablePrefetcher" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management\\PrefetchParameters" /v "EnableSuperfetch" /t REG_DWORD /d 0 /f')
-
-def disable_animations():
-    applied_tweaks.append("disable_animations")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "ListviewAlphaSelect" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "TaskbarAnimations" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "ImeSwitchNotification" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop\\WindowMetrics" /v "MinAnimate" /t REG_SZ /d "0" /f')
-
-def optimize_login_performance():
-    applied_tweaks.append("optimize_login_performance")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Winlogon" /v "AutoRestartShell" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer" /v "Serialize" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control" /v "WaitToKillServiceTimeout" /t REG_SZ /d "2000" /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "AutoEndTasks" /t REG_SZ /d "1" /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "HungAppTimeout" /t REG_SZ /d "3000" /f')
-    run_cmd('reg add "HKCU\\Control Panel\\Desktop" /v "WaitToKillAppTimeout" /t REG_SZ /d "2000" /f')
-
-def disable_windows_update_auto_restart():
-    applied_tweaks.append("disable_windows_update_auto_restart")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\WindowsUpdate\\AU" /v "NoAutoRebootWithLoggedOnUsers" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\WindowsUpdate\\AU" /v "AUPowerManagement" /t REG_DWORD /d 0 /f')
-
-def optimize_network_performance():
-    applied_tweaks.append("optimize_network_performance")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Tcpip\\Parameters" /v "Tcp1323Opts" /t REG_DWORD /d 1 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Tcpip\\Parameters" /v "TCPWindowSize" /t REG_DWORD /d 64240 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\Tcpip\\Parameters" /v "DefaultTTL" /t REG_DWORD /d 64 /f')
-    run_cmd(r'netsh int tcp set global autotuninglevel=normal')
-    run_cmd(r'netsh int tcp set global rss=enabled')
-
-def disable_system_maintenance():
-    applied_tweaks.append("disable_system_maintenance")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Schedule\\Maintenance" /v "MaintenanceDisabled" /t REG_DWORD /d 1 /f')
-    run_cmd('schtasks /change /tn "Microsoft\\Windows\\TaskScheduler\\Maintenance Configurator" /disable')
-
-def optimize_paging_file():
-    applied_tweaks.append("optimize_paging_file")
-    run_cmd('wmic computersystem where name="%computername%" set AutomaticManagedPagefile=False')
-    run_cmd('wmic pagefileset where name="C:\\\\pagefile.sys" set InitialSize=2048,MaximumSize=4096')
-
-def disable_search_indexing():
-    applied_tweaks.append("disable_search_indexing")
-    run_cmd("sc stop WSearch")
-    run_cmd("sc config WSearch start= disabled")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Policies\\Microsoft\\Windows\\Windows Search" /v "PreventIndexingOutlook" /t REG_DWORD /d 1 /f')
-
-def cleanup_temp_files():
-    applied_tweaks.append("cleanup_temp_files")
-    run_cmd('powershell "Get-ChildItem -Path $env:TEMP -Recurse -Force | Remove-Item -Force -Recurse -ErrorAction SilentlyContinue"')
-    run_cmd('cleanmgr /sagerun:1')
-    run_cmd('ipconfig /flushdns')
-
-def optimize_system_responsiveness():
-    applied_tweaks.append("optimize_system_responsiveness")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\PriorityControl" /v "Win32PrioritySeparation" /t REG_DWORD /d 38 /f')
-    run_cmd('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile" /v "SystemResponsiveness" /t REG_DWORD /d 20 /f')
-
-def disable_visual_effects_advanced():
-    applied_tweaks.append("disable_visual_effects_advanced")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects" /v "AnimateMinMax" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects" /v "ComboBoxAnimation" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects" /v "ListBoxSmoothScrolling" /t REG_DWORD /d 0 /f')
-
-def optimize_memory_management():
-    applied_tweaks.append("optimize_memory_management")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management" /v "ClearPageFileAtShutdown" /t REG_DWORD /d 0 /f')
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management" /v "DisablePagingExecutive" /t REG_DWORD /d 1 /f')
-
-def optimize_disk_cache():
-    applied_tweaks.append("optimize_disk_cache")
-    run_cmd('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Memory Management" /v "IoPageLockLimit" /t REG_DWORD /d 0 /f')
-
-def disable_thumbnail_cache():
-    applied_tweaks.append("disable_thumbnail_cache")
-    run_cmd('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Advanced" /v "DisableThumbnailCache" /t REG_DWORD /d 1 /f')
-
-def optimize_context_menu():
-    applied_tweaks.append("optimize_context_menu")
-    run_cmd('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Shell Extensions\\Blocked" /v "{e2bf9676-5f8f-435c-97eb-11607a5bedf7}" /t REG_SZ /d "" /f')
-
 # -----------------------------
 # COMPACT GUI SETUP
 # -----------------------------
@@ -1523,6 +791,22 @@ tk.Checkbutton(basic_right_frame, text="Disable Lockscreen Blur", variable=disab
 tk.Checkbutton(basic_right_frame, text="Optimize File Explorer", variable=optimize_file_explorer_var, anchor="w").pack(fill="x")
 tk.Checkbutton(basic_right_frame, text="Disable Game Bar", variable=disable_game_bar_var, anchor="w").pack(fill="x")
 
+# Catalog ids behind the Basic checkboxes
+basic_tweak_vars = [
+    ("fix_domain_trust_relationship", fix_domain_trust_var),
+    ("fix_security_log_full", fix_security_log_var),
+    ("disable_startup_apps", disable_startup_var),
+    ("disable_visual_effects", disable_visual_var),
+    ("disable_transparency", disable_transparency_var),
+    ("disable_background_apps", disable_background_var),
+    ("optimize_taskbar_animations", optimize_taskbar_var),
+    ("disable_notification_sounds", disable_notification_sounds_var),
+    ("enable_fast_start_menu", enable_fast_start_var),
+    ("disable_lockscreen_blur", disable_lockscreen_blur_var),
+    ("optimize_file_explorer", optimize_file_explorer_var),
+    ("disable_game_bar", disable_game_bar_var),
+]
+
 # Apply Basic button
 tk.Button(mode_frame, text="Apply Basic", width=15, 
           command=lambda: apply_basic()).pack(anchor="w", pady=(5, 0))
@@ -1552,22 +836,7 @@ extreme_frame = tk.Frame(advanced_frame)
 
 # Standard mode checkboxes
 standard_vars = []
-standard_tweaks = [
-    ("Reduce Telemetry (Safe)", safe_reduce_telemetry),
-    ("Disable Unnecessary Services", disable_services),
-    ("Disable Indexing", disable_indexing),
-    ("Set High Performance", set_high_performance),
-    ("Disk Defrag/Trim", disk_defrag_trim),
-    ("Disable Timeline", disable_timeline),
-    ("Disable Location Tracking", disable_location_tracking),
-    ("Optimize System Cache", optimize_system_cache),
-    ("Disable Print Spooler", disable_print_spooler),
-    ("Optimize Processor", optimize_processor_scheduling),
-    ("Disable Remote Assistance", disable_remote_assistance),
-    ("Enable Fast Restart", enable_fast_restart),
-    ("Enable Fast Signout", enable_fast_signout),
-    ("Clear Session Cookies (FSSO)", clear_session_cookies_fsso)
-]
+standard_tweaks = [(t.label, t.id) for t in tweaks_for_mode("Standard")]
 
 standard_select_all_var = tk.IntVar()
 
@@ -1585,9 +854,9 @@ tk.Checkbutton(standard_left_frame, text="Select All", variable=standard_select_
 
 # Distribute standard tweaks across two columns
 mid_point = len(standard_tweaks) // 2
-for i, (name, func) in enumerate(standard_tweaks):
+for i, (name, tweak_id) in enumerate(standard_tweaks):
     var = tk.IntVar()
-    standard_vars.append((var, (name, func)))
+    standard_vars.append((var, (name, tweak_id)))
     if i < mid_point:
         tk.Checkbutton(standard_left_frame, text=name, variable=var, anchor="w").pack(fill="x")
     else:
@@ -1597,19 +866,7 @@ tk.Button(standard_frame, text="Apply Standard", command=lambda: apply_advanced(
 
 # Ultimate mode checkboxes
 ultimate_vars = []
-ultimate_tweaks = [
-    ("Disable Defender", disable_defender),
-    ("Disable Cortana", disable_cortana),
-    ("Disable Xbox Services", disable_xbox_services),
-    ("Remove Bloat Apps", remove_bloat_apps),
-    ("Disable Tips/Notifications", disable_tips_notifications),
-    ("Disable Advertising", disable_advertising),
-    ("Disable Error Reporting", disable_error_reporting),
-    ("Disable Smart Screen", disable_smart_screen),
-    ("Disable Feedback", disable_feedback),
-    ("Disable Auto Update", disable_auto_update),
-    ("Disable OneDrive", disable_onedrive)
-]
+ultimate_tweaks = [(t.label, t.id) for t in tweaks_for_mode("Ultimate")]
 
 ultimate_select_all_var = tk.IntVar()
 
@@ -1627,9 +884,9 @@ tk.Checkbutton(ultimate_left_frame, text="Select All", variable=ultimate_select_
 
 # Distribute ultimate tweaks across two columns
 mid_point = len(ultimate_tweaks) // 2
-for i, (name, func) in enumerate(ultimate_tweaks):
+for i, (name, tweak_id) in enumerate(ultimate_tweaks):
     var = tk.IntVar()
-    ultimate_vars.append((var, (name, func)))
+    ultimate_vars.append((var, (name, tweak_id)))
     if i < mid_point:
         tk.Checkbutton(ultimate_left_frame, text=name, variable=var, anchor="w").pack(fill="x")
     else:
@@ -1639,23 +896,7 @@ tk.Button(ultimate_frame, text="Apply Ultimate", command=lambda: apply_advanced(
 
 # Extreme mode checkboxes
 extreme_vars = []
-extreme_tweaks = [
-    ("Optimize HDD Performance", optimize_hdd_performance),
-    ("Disable UI Animations", disable_animations),
-    ("Optimize Login Performance", optimize_login_performance),
-    ("Disable Auto-Restart Updates", disable_windows_update_auto_restart),
-    ("Optimize Network Performance", optimize_network_performance),
-    ("Disable System Maintenance", disable_system_maintenance),
-    ("Optimize Paging File", optimize_paging_file),
-    ("Disable Search Indexing", disable_search_indexing),
-    ("Cleanup Temp Files", cleanup_temp_files),
-    ("Optimize System Responsiveness", optimize_system_responsiveness),
-    ("Advanced Visual Effects", disable_visual_effects_advanced),
-    ("Optimize Memory Management", optimize_memory_management),
-    ("Optimize Disk Cache", optimize_disk_cache),
-    ("Disable Thumbnail Cache", disable_thumbnail_cache),
-    ("Optimize Context Menu", optimize_context_menu)
-]
+extreme_tweaks = [(t.label, t.id) for t in tweaks_for_mode("Extreme")]
 
 extreme_select_all_var = tk.IntVar(value=1)
 
@@ -1673,9 +914,9 @@ tk.Checkbutton(extreme_left_frame, text="Select All", variable=extreme_select_al
 
 # Distribute extreme tweaks across two columns
 mid_point = len(extreme_tweaks) // 2
-for i, (name, func) in enumerate(extreme_tweaks):
+for i, (name, tweak_id) in enumerate(extreme_tweaks):
     var = tk.IntVar(value=1)
-    extreme_vars.append((var, (name, func)))
+    extreme_vars.append((var, (name, tweak_id)))
     if i < mid_point:
         tk.Checkbutton(extreme_left_frame, text=name, variable=var, anchor="w").pack(fill="x")
     else:
@@ -1692,6 +933,8 @@ button_frame.pack(fill="x", pady=10)
 
 # Action buttons - Now with Comprehensive Restore
 tk.Button(button_frame, text="Undo Tweaks", width=15, command=restore_all_tweaks).pack(side="left", padx=5)
+tk.Button(button_frame, text="Preview Changes", width=15,
+          command=lambda: preview_changes(mode_choice.get())).pack(side="left", padx=5)
 tk.Button(button_frame, text="Export Report", width=15, command=export_report).pack(side="left", padx=5)
 tk.Button(button_frame, text="Version History", width=15, command=show_version_history).pack(side="left", padx=5)
 tk.Button(button_frame, text="Help Guide", width=15, command=show_help).pack(side="left", padx=5)
@@ -1715,137 +958,117 @@ tk.Button(button_frame, text="About Optimizer", width=15,
 # -----------------------------
 # GUI FUNCTIONS - UPDATED WITH DOMAIN TRUST FIX
 # -----------------------------
+def tweak_handlers(progress):
+    """Handlers for tweaks whose catalog entry is a CallOp; the GUI version adds the reboot prompt"""
+    return {
+        "fix_domain_trust_relationship": lambda: fix_domain_trust_relationship(progress),
+        "cleanup_temp_files": lambda: engine.cleanup_temp_files(progress),
+        "remove_bloat_apps": lambda: engine.remove_bloat_apps(progress),
+    }
+
+def start_apply(title, tweak_ids, completion_message):
+    """Open a live results pane and run the tweaks (plus a restore point) in the background"""
+    channel = ProgressChannel()
+    ProgressPane(root, title, channel)
+    
+    def apply_thread():
+        # The restore point is created alongside the tweaks, as before
+        restore_thread = create_restore_point(channel)
+        try:
+            plan, result = run_tweaks(tweak_ids, tweak_handlers(channel), progress=channel)
+        except Exception as e:
+            channel.close()
+            message = f"Optimization failed: {str(e)}"
+            root.after(0, lambda: messagebox.showerror(title, message))
+            return
+        restore_thread.join()
+        channel.close(result.summary())
+        
+        # Show completion message in main thread
+        message = completion_message(plan, result)
+        root.after(0, lambda: messagebox.showinfo(f"{title} Complete", message))
+    
+    threading.Thread(target=apply_thread, daemon=True).start()
+
+def selected_basic_ids():
+    """Tweak ids ticked in the Basic section"""
+    return [tweak_id for tweak_id, var in basic_tweak_vars if var.get()]
+
+def selected_mode_ids(mode):
+    """Tweak ids ticked for an advanced mode (all of them when Select All is on)"""
+    vars_list, select_all = {
+        "Standard": (standard_vars, standard_select_all_var),
+        "Ultimate": (ultimate_vars, ultimate_select_all_var),
+        "Extreme": (extreme_vars, extreme_select_all_var),
+    }[mode]
+    return [tweak_id for var, (name, tweak_id) in vars_list if select_all.get() or var.get()]
+
 def apply_basic():
-    # Show backup/restore point creation message immediately
-    messagebox.showinfo("Starting Optimization", "Starting optimization process...\n\n- Creating system restore point (background)\n- Backing up registry (background)\n- Applying selected tweaks")
+    if security_check_pending():
+        return
     
-    # Run the actual work in a thread to prevent GUI freezing
-    def apply_basic_thread():
-        # These will run in background threads internally now
-        create_restore_point()
-        backup_registry()
-        
-        selected_tweaks = []
-        # UPDATED: Added domain trust fix to basic tweaks
-        basic_tweaks = [
-            ("Fix Domain Trust Relationship", fix_domain_trust_relationship, fix_domain_trust_var),  # NEW
-            ("Fix Security Log Full", fix_security_log_full, fix_security_log_var),
-            ("Disable Startup Apps", disable_startup_apps, disable_startup_var),
-            ("Disable Visual Effects", disable_visual_effects, disable_visual_var),
-            ("Disable Transparency", disable_transparency, disable_transparency_var),
-            ("Disable Background Apps", disable_background_apps, disable_background_var),
-            ("Optimize Taskbar Animations", optimize_taskbar_animations, optimize_taskbar_var),
-            ("Disable Notification Sounds", disable_notification_sounds, disable_notification_sounds_var),
-            ("Enable Fast Start Menu", enable_fast_start_menu, enable_fast_start_var),
-            ("Disable Lockscreen Blur", disable_lockscreen_blur, disable_lockscreen_blur_var),
-            ("Optimize File Explorer", optimize_file_explorer, optimize_file_explorer_var),
-            ("Disable Game Bar", disable_game_bar, disable_game_bar_var)
-        ]
-        
-        # Apply selected tweaks
-        if select_all_var.get():
-            for name, func, _ in basic_tweaks:
-                func()
-                selected_tweaks.append(name)
-        else:
-            for name, func, var in basic_tweaks:
-                if var.get():
-                    func()
-                    selected_tweaks.append(name)
-        
-        # Show completion message
-        if selected_tweaks:
-            root.after(0, lambda: messagebox.showinfo("Basic Mode Complete", 
-                f"Applied tweaks:\n{', '.join(selected_tweaks)}\n\nBackup location: {last_backup}"))
-        else:
-            root.after(0, lambda: messagebox.showinfo("Basic Mode", "No tweaks selected"))
+    # Read the Tk variables on the GUI thread
+    if select_all_var.get():
+        tweak_ids = [tweak_id for tweak_id, _ in basic_tweak_vars]
+    else:
+        tweak_ids = selected_basic_ids()
+    
+    if not tweak_ids:
+        messagebox.showinfo("Basic Mode", "No tweaks selected")
+        return
+    
+    def completion_message(plan, result):
+        names = [get_tweak(tweak_id).label for tweak_id in plan.tweaks]
+        return (f"Applied tweaks:\n{', '.join(names)}\n\n{result.summary()}\n{result.compliance.summary()}\n"
+                f"Backup location: {engine.last_backup}")
     
-    # Start the optimization in a background thread
-    threading.Thread(target=apply_basic_thread, daemon=True).start()
+    # Progress streams into the results pane while the work runs in the background
+    start_apply("Basic Mode", select_for_mode("Basic", tweak_ids), completion_message)
 
 def apply_advanced(mode):
-    # Show immediate feedback
-    messagebox.showinfo(f"Starting {mode} Mode", 
-        f"Starting {mode} optimization process...\n\n- Creating system restore point (background)\n- Backing up registry (background)\n- Applying selected tweaks")
+    if security_check_pending():
+        return
     
-    def apply_advanced_thread():
-        # These run in background threads internally
-        create_restore_point()
-        backup_registry()
-        selected_tweaks = []
-
-        # Apply Basic mode tweaks for ALL advanced modes (including domain trust fix if selected)
-        if fix_domain_trust_var.get():
-            fix_domain_trust_relationship()
-            selected_tweaks.append("Fix Domain Trust Relationship")
-        
-        if fix_security_log_var.get():
-            fix_security_log_full()
-            selected_tweaks.append("Fix Security Log Full")
-        
-        basic_tweaks = [
-            ("Disable Startup Apps", disable_startup_apps),
-            ("Disable Visual Effects", disable_visual_effects),
-            ("Disable Transparency", disable_transparency),
-            ("Disable Background Apps", disable_background_apps),
-            ("Optimize Taskbar Animations", optimize_taskbar_animations)
-        ]
-        
-        for name, func in basic_tweaks:
-            func()
-            selected_tweaks.append(name)
-
-        if mode == "Standard" or mode == "Ultimate" or mode == "Extreme":
-            # Apply Standard mode tweaks
-            for name, func in standard_tweaks:
-                func()
-                selected_tweaks.append(name)
-
-        if mode == "Ultimate" or mode == "Extreme":
-            # Apply Ultimate mode tweaks
-            for name, func in ultimate_tweaks:
-                func()
-                selected_tweaks.append(name)
-
-        # Apply Extreme-specific tweaks if Extreme mode is selected
-        if mode == "Extreme":
-            if extreme_select_all_var.get():
-                for name, func in extreme_tweaks:
-                    func()
-                    selected_tweaks.append(name)
-            else:
-                for (var, (name, func)) in extreme_vars:
-                    if var.get():
-                        func()
-                        selected_tweaks.append(name)
-        else:
-            # For Standard and Ultimate modes, apply selected tweaks
-            if mode == "Standard":
-                vars_list = standard_vars
-                select_all_var = standard_select_all_var
-            else:  # Ultimate
-                vars_list = ultimate_vars
-                select_all_var = ultimate_select_all_var
-
-            if select_all_var.get():
-                for name, func in (standard_tweaks if mode == "Standard" else ultimate_tweaks):
-                    func()
-                    selected_tweaks.append(name)
-            else:
-                for (var, (name, func)) in vars_list:
-                    if var.get():
-                        func()
-                        selected_tweaks.append(name)
+    # Advanced modes include the ticked Basic fixes (domain trust, security log)
+    tweak_ids = select_for_mode(mode, selected_mode_ids(mode), selected_basic_ids())
+    
+    def completion_message(plan, result):
+        stats = plan.stats()
+        return (f"Applied optimizations including:\n- Basic Mode (with Domain Trust & Security Log Fixes)\n- {mode} Specific Tweaks\n\n"
+                f"Total tweaks applied: {stats['tweaks']}\n"
+                f"Operations: {stats['planned_ops']} ({stats['deduplicated']} redundant skipped)\n"
+                f"{result.summary()}\n{result.compliance.summary()}\nBackup: {engine.last_backup}")
+    
+    start_apply(f"{mode} Mode", tweak_ids, completion_message)
 
-        # Show completion message in main thread
-        if selected_tweaks:
-            root.after(0, lambda: messagebox.showinfo(f"{mode} Mode Complete", 
-                f"Applied optimizations including:\n- Basic Mode (with Domain Trust & Security Log Fixes)\n- {mode} Specific Tweaks\n\nTotal tweaks applied: {len(selected_tweaks)}\nBackup: {last_backup}"))
-        else:
-            root.after(0, lambda: messagebox.showinfo(f"{mode} Mode", "No tweaks selected"))
+def preview_changes(mode):
+    """Dry run of the ticked tweaks for an advanced mode: current -> target diff with estimated costs"""
+    tweak_ids = select_for_mode(mode, selected_mode_ids(mode), selected_basic_ids())
+    if not tweak_ids:
+        messagebox.showinfo("Preview Changes", "No tweaks selected")
+        return
     
-    # Start the optimization in a background thread
-    threading.Thread(target=apply_advanced_thread, daemon=True).start()
+    def show(plan, compliance, report):
+        preview_window = tk.Toplevel(root)
+        preview_window.title(f"Preview - {mode} Mode")
+        preview_window.geometry("900x560")
+        tk.Label(preview_window, text=f"{report.summary()}\n{compliance.summary()}",
+                 justify="left", anchor="w", font=("Segoe UI", 9, "bold")).pack(fill="x", padx=10, pady=(10, 4))
+        text_area = scrolledtext.ScrolledText(preview_window, wrap=tk.NONE, width=110, height=28)
+        text_area.pack(fill="both", expand=True, padx=10)
+        text_area.insert(tk.INSERT, "\n".join(report.lines()) or "Nothing to change.")
+        text_area.config(state=tk.DISABLED)
+        tk.Button(preview_window, text="Close", command=preview_window.destroy, width=15).pack(pady=10)
+    
+    def preview_thread():
+        try:
+            plan, compliance, report = engine.dry_run(tweak_ids)
+            root.after(0, lambda: show(plan, compliance, report))
+        except Exception as e:
+            message = f"Dry run failed: {str(e)}"
+            root.after(0, lambda: messagebox.showerror("Preview Changes", message))
+    
+    threading.Thread(target=preview_thread, daemon=True).start()
 
 def show_advanced_mode(selected_mode):
     if selected_mode == "Standard":
@@ -1908,6 +1131,17 @@ def auto_fit_window():
 
 # Show initial advanced mode and auto-fit
 show_advanced_mode("Standard")
-root.after(100, auto_fit_window)
+auto_fit_window()
+
+# Paint the window before the heavier imports and system probes
+root.update()
+startup_trace.mark("first_window")
+
+import engine
+from engine import repair_domain_trust, run_cmd, run_ps, run_tweaks
+from command_pool import INTERACTIVE
 
+start_security_check()
+# Index the catalog's registry keys while the user looks at the window
+threading.Thread(target=engine.warm_inventory, daemon=True).start()
 root.mainloop()
\ No newline at end of file